@@ -350,7 +350,7 @@ def increment_query_usage(user_id: str, access_token: Optional[str] = None, rais
 # WEBHOOK EVENT HANDLERS
 # =============================================================================
 
-def _handle_checkout_completed(supabase, data: Dict[str, Any], event_id: str) -> None:
+def _handle_checkout_completed(supabase, data: Dict[str, Any], event_id: str) -> Optional[str]:
     """Handle checkout.session.completed event - subscription started via checkout."""
     user_id = data.get("metadata", {}).get("user_id")
     tier_id = data.get("metadata", {}).get("tier_id")
@@ -365,9 +365,10 @@ def _handle_checkout_completed(supabase, data: Dict[str, Any], event_id: str) ->
             'updated_at': datetime.now(timezone.utc).isoformat()
         }, on_conflict='user_id').execute()
         log_billing_event("Subscription started", user_id=user_id, tier=tier_id, status="active")
+    return user_id
 
 
-def _handle_subscription_updated(supabase, data: Dict[str, Any], event_id: str) -> None:
+def _handle_subscription_updated(supabase, data: Dict[str, Any], event_id: str) -> Optional[str]:
     """Handle customer.subscription.updated event - upgrade/downgrade/renewal."""
     status = data.get("status")
     tier_id = data.get("metadata", {}).get("tier_id")
@@ -387,9 +388,10 @@ def _handle_subscription_updated(supabase, data: Dict[str, Any], event_id: str)
 
         supabase.table('user_profiles').upsert(update_data, on_conflict='user_id').execute()
         log_billing_event("Subscription updated", user_id=user_id, tier=tier_id, status=status)
+    return user_id
 
 
-def _handle_subscription_deleted(supabase, data: Dict[str, Any], event_id: str) -> None:
+def _handle_subscription_deleted(supabase, data: Dict[str, Any], event_id: str) -> Optional[str]:
     """Handle customer.subscription.deleted event - subscription cancelled."""
     user_id = data.get("metadata", {}).get("user_id")
 
@@ -402,9 +404,10 @@ def _handle_subscription_deleted(supabase, data: Dict[str, Any], event_id: str)
             'updated_at': datetime.now(timezone.utc).isoformat()
         }, on_conflict='user_id').execute()
         log_billing_event("Subscription cancelled", user_id=user_id, tier="free", status="cancelled")
+    return user_id
 
 
-def _handle_invoice_paid(supabase, data: Dict[str, Any], event_id: str) -> None:
+def _handle_invoice_paid(supabase, data: Dict[str, Any], event_id: str) -> Optional[str]:
     """Handle invoice.paid event - payment successful, reset usage counter."""
     subscription_id = data.get("subscription")
     if subscription_id:
@@ -421,9 +424,11 @@ def _handle_invoice_paid(supabase, data: Dict[str, Any], event_id: str) -> None:
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }, on_conflict='user_id').execute()
             log_billing_event("Usage reset on invoice payment", user_id=user_id)
+        return user_id
+    return None
 
 
-def _handle_invoice_payment_failed(supabase, data: Dict[str, Any], event_id: str) -> None:
+def _handle_invoice_payment_failed(supabase, data: Dict[str, Any], event_id: str) -> Optional[str]:
     """Handle invoice.payment_failed event - payment failed."""
     subscription_id = data.get("subscription")
     if subscription_id:
@@ -437,10 +442,12 @@ def _handle_invoice_payment_failed(supabase, data: Dict[str, Any], event_id: str
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }, on_conflict='user_id').execute()
             log_billing_event("Payment failed", user_id=user_id, status="past_due")
+        return user_id
+    return None
 
 
-# Event handler dispatch table
-_WEBHOOK_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any], str], None]] = {
+# Event handler dispatch table; handlers return the affected user's id
+_WEBHOOK_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any], str], Optional[str]]] = {
     "checkout.session.completed": _handle_checkout_completed,
     "customer.subscription.updated": _handle_subscription_updated,
     "customer.subscription.deleted": _handle_subscription_deleted,
@@ -461,7 +468,8 @@ def handle_webhook_event(payload: bytes, sig_header: str) -> Dict[str, Any]:
         sig_header: Stripe-Signature header value
 
     Returns:
-        Dict with success status and message
+        Dict with success status and message, plus the affected user_id
+        (so callers can drop cached quota state)
     """
     # Validate and parse the webhook event
     try:
@@ -504,10 +512,9 @@ def handle_webhook_event(payload: bytes, sig_header: str) -> Dict[str, Any]:
 
     # Dispatch to the appropriate handler
     handler = _WEBHOOK_HANDLERS.get(event_type)
-    if handler:
-        handler(supabase, data, event_id)
+    user_id = handler(supabase, data, event_id) if handler else None
 
-    return {"success": True, "event_type": event_type}
+    return {"success": True, "event_type": event_type, "user_id": user_id}
 
 
 def get_available_plans() -> List[Dict[str, Any]]:
@@ -30,9 +30,11 @@ from redis.asyncio.connection import ConnectionPool
 try:
     from .config import REDIS_URL, REDIS_ENABLED, REDIS_DEFAULT_TTL
     from .security import log_error
+    from .metrics import record_cache_lookup
 except ImportError:
     from backend.config import REDIS_URL, REDIS_ENABLED, REDIS_DEFAULT_TTL
     from backend.security import log_error
+    from backend.metrics import record_cache_lookup
 
 
 # =============================================================================
@@ -160,6 +162,12 @@ def make_llm_cache_key(
     )
 
 
+def _key_namespace(cache_key: str) -> str:
+    """Extract the namespace from an "axcouncil:{prefix}:{hash}" key."""
+    parts = cache_key.split(":")
+    return parts[1] if len(parts) > 2 else "other"
+
+
 def hash_messages(messages: list) -> str:
     """Create a hash of the messages array for cache key."""
     messages_json = json.dumps(messages, sort_keys=True, default=str)
@@ -186,6 +194,7 @@ async def get_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
 
     try:
         cached = await client.get(cache_key)
+        record_cache_lookup(_key_namespace(cache_key), bool(cached))
         if cached:
             return json.loads(cached)
         return None
@@ -476,6 +485,7 @@ def cached(
             if client:
                 try:
                     cached_result = await client.get(cache_key)
+                    record_cache_lookup(_key_namespace(cache_key), bool(cached_result))
                     if cached_result:
                         return json.loads(cached_result)
                 except Exception as e:
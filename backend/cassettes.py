@@ -0,0 +1,374 @@
+"""
+Stream cassettes: record real OpenRouter SSE streams and replay them.
+
+mock_llm.py emits synthetic text in fixed 15-character chunks every 20ms,
+which doesn't look like real token sizes, pacing or usage payloads. A
+cassette is the raw SSE byte stream of a real response plus the delay
+before each network chunk, so performance work can be validated offline.
+
+RECORD (OPENROUTER_CASSETTE_MODE=record):
+query_model_stream wraps the live response in a RecordingResponse; bytes
+are captured as _process_sse_stream reads them and saved when the stream
+ends. Cassettes never contain headers or message content: the request is
+stored as model, sampling params and a hash of the messages, and anything
+that looks like an API key in the stream is redacted.
+
+REPLAY (OPENROUTER_CASSETTE_MODE=replay):
+A ReplayResponse feeds the recorded bytes through the real
+_process_sse_stream, so parsing, usage extraction, telemetry and truncation
+handling all run exactly as in production. Speed (OPENROUTER_CASSETTE_SPEED):
+"recorded" keeps the original timing, "4" plays 4x faster, "instant" skips
+all delays.
+
+Lookup: exact match on (model, messages hash), otherwise the model's
+cassettes in rotation, otherwise any cassette - so benchmarks can replay
+realistic streams for prompts that were never recorded.
+
+Cassettes live in OPENROUTER_CASSETTE_DIR (no default; functions taking a
+directory read it at call time). The repo's sample cassettes are test data
+under backend/tests/cassettes.
+
+Non-streaming query_model() calls are not recorded.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import itertools
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+try:
+    from .config import OPENROUTER_CASSETTE_DIR, OPENROUTER_CASSETTE_SPEED
+    from .security import log_app_event
+except ImportError:
+    from backend.config import OPENROUTER_CASSETTE_DIR, OPENROUTER_CASSETTE_SPEED
+    from backend.security import log_app_event
+
+
+CASSETTE_VERSION = 1
+
+# API keys and bearer tokens that could be echoed back in a stream
+_SECRET_PATTERN = re.compile(r"sk-[A-Za-z0-9_\-]{8,}|Bearer\s+[A-Za-z0-9_\-\.]+")
+REDACTED = "[REDACTED]"
+
+
+def parse_speed(value: Any) -> float:
+    """
+    Parse a replay speed: "recorded" -> 1.0, "instant" -> 0.0 (no delays),
+    "4" / "4x" -> 4.0. Invalid values fall back to recorded speed.
+    """
+    text = str(value).strip().lower()
+    if text in ("", "recorded", "realtime"):
+        return 1.0
+    if text == "instant":
+        return 0.0
+    try:
+        speed = float(text.rstrip("x"))
+    except ValueError:
+        return 1.0
+    return max(0.0, speed)
+
+
+def messages_hash(messages: List[Dict[str, Any]]) -> str:
+    """Stable short hash of a message list (the messages themselves aren't stored)."""
+    encoded = json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _model_slug(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.]+", "-", model).strip("-")
+
+
+def redact(text: str) -> str:
+    """Remove anything that looks like a credential."""
+    return _SECRET_PATTERN.sub(REDACTED, text)
+
+
+def redact_chunks(chunks: List[Tuple[float, str]]) -> List[Tuple[float, str]]:
+    """
+    Redact a recorded stream as a whole, keeping its chunk timings.
+
+    A secret split across network chunks is matched in the joined text and
+    replaced in the chunk where it starts; the rest of it is dropped from
+    the following chunks.
+    """
+    text = "".join(chunk for _, chunk in chunks)
+    matches = [(m.start(), m.end()) for m in _SECRET_PATTERN.finditer(text)]
+    redacted = _SECRET_PATTERN.sub(REDACTED, text)
+
+    def redacted_offset(offset: int) -> int:
+        shift = 0
+        for start, end in matches:
+            if end <= offset:
+                shift += len(REDACTED) - (end - start)
+            elif start < offset:
+                return start + shift + len(REDACTED)
+            else:
+                break
+        return offset + shift
+
+    result = []
+    offset, previous = 0, 0
+    for delay, chunk in chunks:
+        offset += len(chunk)
+        boundary = redacted_offset(offset)
+        result.append((delay, redacted[previous:boundary]))
+        previous = boundary
+    return result
+
+
+class _LineSplitter:
+    """Split streamed text into lines the way httpx.aiter_lines() does."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        lines = self._buffer.splitlines(keepends=True)
+        # The last piece may be an incomplete line
+        if lines and not lines[-1].endswith(("\n", "\r")):
+            self._buffer = lines.pop()
+        else:
+            self._buffer = ""
+        return [line.rstrip("\r\n") for line in lines]
+
+    def flush(self) -> List[str]:
+        remaining, self._buffer = self._buffer, ""
+        return [remaining] if remaining else []
+
+
+# =============================================================================
+# CASSETTE FORMAT
+# =============================================================================
+
+class Cassette:
+    """A recorded stream: [delay_seconds, text] per network chunk."""
+
+    def __init__(self, model: str, request: Optional[Dict[str, Any]] = None,
+                 status_code: int = 200, chunks: Optional[List[Tuple[float, str]]] = None):
+        self.model = model
+        self.request = request or {}
+        self.status_code = status_code
+        self.chunks: List[Tuple[float, str]] = chunks or []
+
+    @property
+    def duration(self) -> float:
+        return sum(delay for delay, _ in self.chunks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CASSETTE_VERSION,
+            "model": self.model,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "request": self.request,
+            "status_code": self.status_code,
+            "chunks": [[round(delay, 4), text] for delay, text in self.chunks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Cassette":
+        return cls(
+            model=data["model"],
+            request=data.get("request", {}),
+            status_code=data.get("status_code", 200),
+            chunks=[(float(delay), text) for delay, text in data.get("chunks", [])],
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1, ensure_ascii=False)
+
+
+def cassette_path(directory: str, model: str, messages: List[Dict[str, Any]]) -> Path:
+    return Path(directory) / f"{_model_slug(model)}__{messages_hash(messages)}.json"
+
+
+def _cassette_dir(directory: Optional[str]) -> str:
+    """Explicit directory, else OPENROUTER_CASSETTE_DIR (read at call time)."""
+    directory = directory or OPENROUTER_CASSETTE_DIR
+    if not directory:
+        raise ValueError("OPENROUTER_CASSETTE_DIR is not set")
+    return directory
+
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+class RecordingResponse:
+    """
+    Wraps a streaming httpx response and records its bytes with timings.
+
+    Exposes the parts of the response _process_sse_stream uses. The first
+    chunk's delay is measured from started_at (time.time() when the request
+    was sent), so replays reproduce the real time to first byte. Chunks are
+    redacted as a whole stream when saved.
+    """
+
+    def __init__(self, response, model: str, payload: Dict[str, Any],
+                 messages: List[Dict[str, Any]], directory: Optional[str] = None,
+                 started_at: Optional[float] = None):
+        self._response = response
+        self.started_at = started_at
+        self.path = cassette_path(_cassette_dir(directory), model, messages)
+        self.cassette = Cassette(
+            model=model,
+            request={
+                "model": model,
+                "messages_sha": messages_hash(messages),
+                "message_count": len(messages),
+                **{k: payload[k] for k in ("temperature", "max_tokens", "top_p") if payload.get(k) is not None},
+            },
+            status_code=response.status_code,
+        )
+
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+
+    async def aiter_lines(self) -> AsyncGenerator[str, None]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        splitter = _LineSplitter()
+        last = time.perf_counter()
+        if self.started_at is not None:
+            last -= max(0.0, time.time() - self.started_at)
+        async for raw in self._response.aiter_bytes():
+            now = time.perf_counter()
+            text = decoder.decode(raw)
+            self.cassette.chunks.append((now - last, text))
+            last = now
+            for line in splitter.feed(text):
+                yield line
+        for line in splitter.feed(decoder.decode(b"", final=True)) + splitter.flush():
+            yield line
+
+    async def save(self) -> None:
+        """Write the cassette (off the event loop)."""
+        if not self.cassette.chunks:
+            return
+        self.cassette.chunks = redact_chunks(self.cassette.chunks)
+        await asyncio.to_thread(self.cassette.save, self.path)
+        log_app_event("CASSETTE_RECORDED", level="INFO", model=self.cassette.model,
+                      path=self.path.name, chunks=len(self.cassette.chunks))
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+class ReplayResponse:
+    """Plays a cassette back with the original (or scaled) inter-chunk delays."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        self.cassette = cassette
+        self.speed = speed
+        self.status_code = cassette.status_code
+
+    async def aiter_bytes(self) -> AsyncGenerator[bytes, None]:
+        for delay, text in self.cassette.chunks:
+            if self.speed > 0 and delay > 0:
+                await asyncio.sleep(delay / self.speed)
+            yield text.encode("utf-8")
+
+    async def aiter_lines(self) -> AsyncGenerator[str, None]:
+        splitter = _LineSplitter()
+        async for raw in self.aiter_bytes():
+            for line in splitter.feed(raw.decode("utf-8")):
+                yield line
+        for line in splitter.flush():
+            yield line
+
+    async def aread(self) -> bytes:
+        return b"".join([text.encode("utf-8") async for text in self.aiter_bytes()])
+
+
+class _NullBreaker:
+    """Replays shouldn't open or close real circuit breakers."""
+
+    async def record_success(self) -> None:
+        pass
+
+    async def record_failure(self) -> None:
+        pass
+
+
+_loaded: Dict[Path, Tuple[float, Cassette]] = {}
+_rotation: Dict[str, Any] = {}
+
+
+def load_cassette(path: Path) -> Cassette:
+    """Load a cassette, cached until the file changes."""
+    mtime = path.stat().st_mtime
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    cassette = Cassette.load(path)
+    _loaded[path] = (mtime, cassette)
+    return cassette
+
+
+def find_cassette(model: str, messages: List[Dict[str, Any]],
+                  directory: Optional[str] = None) -> Optional[Path]:
+    """Exact match, else rotate through the model's cassettes, else any cassette."""
+    directory = _cassette_dir(directory)
+    exact = cassette_path(directory, model, messages)
+    if exact.exists():
+        return exact
+
+    root = Path(directory)
+    for key, pattern in ((model, f"{_model_slug(model)}__*.json"), ("*", "*.json")):
+        candidates = sorted(root.glob(pattern))
+        if candidates:
+            rotation_key = f"{directory}:{key}:{len(candidates)}"
+            if rotation_key not in _rotation:
+                _rotation[rotation_key] = itertools.cycle(candidates)
+            return next(_rotation[rotation_key])
+    return None
+
+
+async def replay_stream(
+    model: str,
+    messages: List[Dict[str, Any]],
+    directory: Optional[str] = None,
+    speed: Any = OPENROUTER_CASSETTE_SPEED,
+    cassette: Optional[Cassette] = None,
+) -> AsyncGenerator[str, None]:
+    """
+    Replay a cassette through _process_sse_stream.
+
+    Yields the same chunks query_model_stream would: content, [TRUNCATED],
+    [USAGE:...] and [Error: ...] markers.
+    """
+    from .openrouter_stream import _process_sse_stream
+
+    if cassette is None:
+        if not (directory or OPENROUTER_CASSETTE_DIR):
+            yield "[Error: OPENROUTER_CASSETTE_DIR is not set]"
+            return
+        path = find_cassette(model, messages, directory)
+        if path is None:
+            yield f"[Error: No cassette available for {model}]"
+            return
+        cassette = await asyncio.to_thread(load_cassette, path)
+
+    response = ReplayResponse(cassette, parse_speed(speed))
+    if response.status_code >= 400:
+        yield f"[Error: Status {response.status_code}]"
+        return
+
+    # Replays attribute telemetry to the requested model, not the recorded one
+    async for chunk in _process_sse_stream(response, model, _NullBreaker(), time.time(), 0, 0):
+        if isinstance(chunk, tuple):
+            return
+        yield chunk
@@ -0,0 +1,267 @@
+"""
+Versioned snapshots of company read views with ETag support.
+
+The SPA polls the team, overview, playbook and role views, which run several
+queries each and return large payloads (context_md, system_prompt) that almost
+never change. Each company now has a version counter in Redis
+(axcouncil:company:{id}:v) that company write endpoints bump, and views are
+served from serialized snapshots tagged with the version they were built at:
+
+1. MEMORY - A per-process LRU of (company, view) snapshots bounded by
+   COMPANY_SNAPSHOT_MAX_BYTES.
+2. REDIS - axcouncil:company:{id}:snapshot:{view}, shared by all workers.
+
+A snapshot is served only while its version matches the company's current
+version and it's younger than COMPANY_SNAPSHOT_TTL. Responses carry an ETag
+(hash of the body), and a matching If-None-Match gets a 304 with no body.
+
+Without Redis snapshots aren't cached, but ETags and 304s still apply.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    from .config import COMPANY_SNAPSHOT_ENABLED, COMPANY_SNAPSHOT_TTL, COMPANY_SNAPSHOT_MAX_BYTES
+    from .cache import get_redis
+    from .metrics import record_cache_lookup
+except ImportError:
+    from backend.config import COMPANY_SNAPSHOT_ENABLED, COMPANY_SNAPSHOT_TTL, COMPANY_SNAPSHOT_MAX_BYTES
+    from backend.cache import get_redis
+    from backend.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(company_uuid: str) -> str:
+    return f"axcouncil:company:{company_uuid}:v"
+
+
+def _snapshot_key(company_uuid: str, view: str) -> str:
+    return f"axcouncil:company:{company_uuid}:snapshot:{view}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# =============================================================================
+# VERSION COUNTER
+# =============================================================================
+
+async def get_company_version(company_uuid: str) -> Optional[int]:
+    """Current version of a company's views, or None when Redis is unavailable."""
+    if not COMPANY_SNAPSHOT_ENABLED:
+        return None
+    client = await get_redis()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(_version_key(company_uuid))
+        return int(raw) if raw is not None else 0
+    except Exception as e:
+        logger.debug("Company version read failed for %s: %s", company_uuid, e)
+        return None
+
+
+async def bump_company_version(company_uuid: Optional[str]) -> None:
+    """
+    Mark a company's views as changed. Call after every write that affects
+    departments, roles, playbooks, decisions, company context or members.
+    """
+    if not company_uuid:
+        return
+    get_snapshot_cache().drop_company(company_uuid)
+    client = await get_redis()
+    if client is None:
+        return
+    try:
+        await client.incr(_version_key(company_uuid))
+    except Exception as e:
+        logger.debug("Company version bump failed for %s: %s", company_uuid, e)
+
+
+# =============================================================================
+# SNAPSHOT CACHE
+# =============================================================================
+
+@dataclass
+class Snapshot:
+    version: Optional[int]
+    etag: str
+    body: bytes
+    created_at: float
+
+
+class SnapshotCache:
+    """Per-process LRU of serialized views backed by Redis."""
+
+    def __init__(self, max_bytes: int = COMPANY_SNAPSHOT_MAX_BYTES, ttl: int = COMPANY_SNAPSHOT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Snapshot]" = OrderedDict()
+        self._bytes = 0
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _put(self, key: Tuple[str, str], snapshot: Snapshot) -> None:
+        self._drop(key)
+        if len(snapshot.body) > self.max_bytes:
+            return
+        self._entries[key] = snapshot
+        self._bytes += len(snapshot.body)
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        snapshot = self._entries.pop(key, None)
+        if snapshot is not None:
+            self._bytes -= len(snapshot.body)
+
+    def drop_company(self, company_uuid: str) -> None:
+        for key in [k for k in self._entries if k[0] == company_uuid]:
+            self._drop(key)
+
+    def _fresh(self, snapshot: Snapshot, version: int) -> bool:
+        return snapshot.version == version and time.time() - snapshot.created_at < self.ttl
+
+    async def lookup(self, company_uuid: str, view: str, version: int) -> Optional[Snapshot]:
+        key = (company_uuid, view)
+        snapshot = self._entries.get(key)
+        if snapshot is not None and self._fresh(snapshot, version):
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            record_cache_lookup("company_snapshot", True, tier="memory")
+            return snapshot
+
+        try:
+            client = await get_redis()
+            raw = await client.get(_snapshot_key(company_uuid, view)) if client else None
+            if raw:
+                cached = json.loads(raw)
+                snapshot = Snapshot(cached["version"], cached["etag"], cached["body"].encode(), cached["created_at"])
+                if self._fresh(snapshot, version):
+                    self._put(key, snapshot)
+                    self.redis_hits += 1
+                    record_cache_lookup("company_snapshot", True)
+                    return snapshot
+        except Exception as e:
+            logger.debug("Company snapshot read failed for %s/%s: %s", company_uuid, view, e)
+
+        self.misses += 1
+        record_cache_lookup("company_snapshot", False)
+        return None
+
+    async def store(self, company_uuid: str, view: str, snapshot: Snapshot) -> None:
+        self._put((company_uuid, view), snapshot)
+        try:
+            client = await get_redis()
+            if client is None:
+                return
+            await client.set(
+                _snapshot_key(company_uuid, view),
+                json.dumps({
+                    "version": snapshot.version,
+                    "etag": snapshot.etag,
+                    "body": snapshot.body.decode(),
+                    "created_at": snapshot.created_at,
+                }),
+                ex=self.ttl,
+            )
+        except Exception as e:
+            logger.debug("Company snapshot write failed for %s/%s: %s", company_uuid, view, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": COMPANY_SNAPSHOT_ENABLED,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """Get the process-wide snapshot cache."""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        _snapshot_cache = SnapshotCache()
+    return _snapshot_cache
+
+
+# =============================================================================
+# RESPONSES
+# =============================================================================
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    """JSON response for a snapshot, or 304 if the client already has it."""
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+async def serve_company_view(
+    request: Request,
+    company_uuid: str,
+    view: str,
+    build: Callable[[], Any],
+    version: Optional[int] = None,
+) -> Response:
+    """
+    Serve a company view from its snapshot, building it on a miss.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        company_uuid: Company the view belongs to
+        view: View name, including any filters (e.g. "team", "playbooks:sop")
+        build: Sync or async function returning the JSON-serializable payload
+        version: Company version if already fetched (see get_company_version)
+
+    Returns:
+        200 with the payload and ETag, or 304
+    """
+    if version is None:
+        version = await get_company_version(company_uuid)
+
+    cache = get_snapshot_cache()
+    snapshot = await cache.lookup(company_uuid, view, version) if version is not None else None
+
+    if snapshot is None:
+        payload = await build() if asyncio.iscoroutinefunction(build) else build()
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        snapshot = Snapshot(version, make_etag(body), body, time.time())
+        if version is not None:
+            await cache.store(company_uuid, view, snapshot)
+
+    return snapshot_response(request, snapshot)
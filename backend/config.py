@@ -72,6 +72,13 @@ REDIS_DEFAULT_TTL = int(os.getenv("REDIS_DEFAULT_TTL", "3600"))  # 1 hour defaul
 # LLM response cache TTL (longer since responses are expensive)
 REDIS_LLM_CACHE_TTL = int(os.getenv("REDIS_LLM_CACHE_TTL", "1800"))  # 30 minutes
 
+# Quota engine (quota.py): billing and company rate-limit counters live in
+# Redis with atomic Lua check-and-reserve; deltas reconcile to Postgres every
+# QUOTA_FLUSH_INTERVAL seconds. Falls back to the DB path if Redis is down.
+QUOTA_ENGINE_ENABLED = os.getenv("QUOTA_ENGINE_ENABLED", "true").lower() == "true"
+QUOTA_LIMITS_TTL = int(os.getenv("QUOTA_LIMITS_TTL", "300"))  # Re-read limits/subscription every 5 min
+QUOTA_FLUSH_INTERVAL = float(os.getenv("QUOTA_FLUSH_INTERVAL", "5"))  # 0 disables reconciliation
+
 # Mock Configuration - bypasses real OpenRouter API calls for testing
 # Set MOCK_LLM=true in .env to enable mock mode (saves money during development)
 MOCK_LLM = os.getenv("MOCK_LLM", "false").lower() == "true"
@@ -83,6 +90,36 @@ MOCK_LLM = os.getenv("MOCK_LLM", "false").lower() == "true"
 # - empty_ranking: Stage 2 has header but no ranking items
 MOCK_LLM_SCENARIO = os.getenv("MOCK_LLM_SCENARIO", "happy_path").lower()
 
+# Mock latency profiles (see mock_llm.py):
+# - default: fixed sleeps, plain 15-character chunks (original behaviour)
+# - zero: no delays; token-sized chunks through the real SSE parser
+#   (measures our own per-session CPU cost and max sessions per worker)
+# - realistic: per-model TTFT and tokens/sec measured from the recorded
+#   cassettes in OPENROUTER_CASSETTE_DIR
+# - stress: near-zero TTFT with bursty multi-token network chunks
+MOCK_LLM_LATENCY = os.getenv("MOCK_LLM_LATENCY", "default").lower()
+# Optional profile file (fake_openrouter.py format) for models without
+# recordings; unset means built-in defaults
+MOCK_LLM_PROFILES = os.getenv("MOCK_LLM_PROFILES", "")
+
+# Stream cassettes - record real OpenRouter SSE streams (with timings) and
+# replay them through the real stream parser for deterministic benchmarks.
+# - off: normal operation (default)
+# - record: save each streamed response to OPENROUTER_CASSETTE_DIR
+# - replay: serve streams from cassettes instead of calling OpenRouter
+# OPENROUTER_CASSETTE_DIR has no default; record/replay without it stay off.
+# OPENROUTER_CASSETTE_SPEED: "recorded" (1x), a multiplier like "4", or "instant"
+OPENROUTER_CASSETTE_MODE = os.getenv("OPENROUTER_CASSETTE_MODE", "off").lower()
+OPENROUTER_CASSETTE_DIR = os.getenv("OPENROUTER_CASSETTE_DIR", "")
+OPENROUTER_CASSETTE_SPEED = os.getenv("OPENROUTER_CASSETTE_SPEED", "recorded").lower()
+if OPENROUTER_CASSETTE_MODE in ("record", "replay") and not OPENROUTER_CASSETTE_DIR:
+    log_app_event("config_validation", level="ERROR", details={
+        "status": "invalid_value",
+        "variable": "OPENROUTER_CASSETTE_MODE",
+        "message": "OPENROUTER_CASSETTE_DIR is not set; cassettes stay off",
+    })
+    OPENROUTER_CASSETTE_MODE = "off"
+
 # Mock length override - allows testing different response lengths without
 # changing LLM Hub production settings. When None, mock uses actual request params.
 # Valid values: None (use LLM Hub settings), 512, 1024, 1536, 2048, 4096, 8192
@@ -239,12 +276,157 @@ HTTP_REQUEST_TIMEOUT = float(os.getenv("HTTP_REQUEST_TIMEOUT", str(float(STAGE1_
 # Connection establishment timeout
 HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "30.0"))
 
+# =============================================================================
+# MODEL TELEMETRY CONFIGURATION
+# =============================================================================
+# Rolling per-model/per-stage histograms (TTFT, latency, tokens/sec) plus
+# error and truncation rates. Memory is fixed: WINDOW_SLOTS buckets per series,
+# capped at MAX_SERIES series. Snapshots are flushed to model_telemetry_snapshots.
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+TELEMETRY_WINDOW_SECONDS = int(os.getenv("TELEMETRY_WINDOW_SECONDS", "3600"))  # 1 hour rolling window
+TELEMETRY_WINDOW_SLOTS = int(os.getenv("TELEMETRY_WINDOW_SLOTS", "12"))  # 5-minute slots
+TELEMETRY_MAX_SERIES = int(os.getenv("TELEMETRY_MAX_SERIES", "200"))
+TELEMETRY_FLUSH_INTERVAL = int(os.getenv("TELEMETRY_FLUSH_INTERVAL", "300"))  # 0 disables flushing
+
+# =============================================================================
+# PRE-FLIGHT COST ESTIMATOR
+# =============================================================================
+# estimator.py predicts a council's per-stage tokens, cost and ETA from the
+# assembled prompt plus model telemetry. COUNCIL_BUDGET_ENFORCEMENT decides what
+# happens when the estimate exceeds the company's remaining monthly budget:
+#   off       - estimate only (POST /conversations/{id}/estimate)
+#   reject    - refuse the session before any LLM call
+#   downgrade - retry with the "concise" modifier, reject if still over budget
+COUNCIL_BUDGET_ENFORCEMENT = os.getenv("COUNCIL_BUDGET_ENFORCEMENT", "off").lower()
+ESTIMATOR_MIN_SAMPLES = int(os.getenv("ESTIMATOR_MIN_SAMPLES", "5"))  # Telemetry needed before trusting it
+
+# =============================================================================
+# CONVERSATION HISTORY COMPACTION
+# =============================================================================
+# Council follow-ups send the last HISTORY_VERBATIM_TURNS turns verbatim (within
+# HISTORY_TOKEN_BUDGET) and older turns as a rolling summary that history.py
+# updates in the background after each turn. Disable to resend everything.
+HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "true").lower() == "true"
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "2"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))  # Summary + verbatim turns
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "800"))
+
+# =============================================================================
+# GDPR DATA EXPORT
+# =============================================================================
+# data_export.py streams each table in EXPORT_PAGE_SIZE keyset pages, so memory
+# stays bounded by one page. Background exports are spooled to EXPORT_SPOOL_DIR,
+# uploaded to the private EXPORT_STORAGE_BUCKET and downloaded through a signed
+# URL, with job state in Redis, so any worker can serve status and downloads.
+# Jobs and archives are kept for EXPORT_JOB_TTL_SECONDS; a sweep every
+# EXPORT_SWEEP_INTERVAL seconds deletes expired archives from the bucket.
+# Messages carry full council transcripts, so they page in smaller batches.
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+EXPORT_MESSAGES_PAGE_SIZE = int(os.getenv("EXPORT_MESSAGES_PAGE_SIZE", "25"))
+EXPORT_SPOOL_DIR = os.getenv("EXPORT_SPOOL_DIR", "")  # Empty = system temp dir
+EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+EXPORT_STORAGE_BUCKET = os.getenv("EXPORT_STORAGE_BUCKET", "data-exports")  # Empty = keep on local disk
+EXPORT_DOWNLOAD_URL_TTL = int(os.getenv("EXPORT_DOWNLOAD_URL_TTL", "300"))  # Signed URL lifetime (seconds)
+EXPORT_SWEEP_INTERVAL = int(os.getenv("EXPORT_SWEEP_INTERVAL", "300"))  # 0 = no scheduled sweep
+
+# =============================================================================
+# ANALYTICS INGESTION
+# =============================================================================
+# usage_events, session_usage and activity_logs rows are buffered per table by
+# ingest.py and written as multi-row inserts every INGEST_FLUSH_INTERVAL seconds
+# or once a table has INGEST_BATCH_SIZE rows. Buffered rows are appended to a
+# spool file in INGEST_SPOOL_DIR and replayed after a restart. Disable to
+# insert each row on the request path as before.
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "true").lower() == "true"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "2"))
+INGEST_MAX_BUFFERED = int(os.getenv("INGEST_MAX_BUFFERED", "50000"))  # Oldest rows dropped beyond this
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "")  # Empty = <system temp>/axcouncil-ingest; "off" disables
+
+# =============================================================================
+# CONVERSATION TRANSCRIPT CACHE
+# =============================================================================
+# Follow-up turns read the conversation from transcript_cache.py instead of
+# reloading it from the database. Transcripts are written through when messages
+# are added, kept in Redis (shared by all workers) and in a per-process LRU of
+# up to TRANSCRIPT_CACHE_MAX_BYTES. The per-process copy is only served while
+# its version matches Redis, so the cache is bypassed when Redis is unavailable.
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", "900"))  # 15 minutes
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TRANSCRIPT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024)))
+
+# =============================================================================
+# COMPANY VIEW SNAPSHOTS
+# =============================================================================
+# Team, overview, playbook and role views are served from serialized snapshots
+# (company_snapshots.py) keyed by a per-company version that company write
+# endpoints bump, with ETag / If-None-Match support. Snapshots expire after
+# COMPANY_SNAPSHOT_TTL seconds to pick up writes made outside those endpoints.
+COMPANY_SNAPSHOT_ENABLED = os.getenv("COMPANY_SNAPSHOT_ENABLED", "true").lower() == "true"
+COMPANY_SNAPSHOT_TTL = int(os.getenv("COMPANY_SNAPSHOT_TTL", "300"))  # 5 minutes
+COMPANY_SNAPSHOT_MAX_BYTES = int(os.getenv("COMPANY_SNAPSHOT_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# =============================================================================
+# IMAGE ANALYSIS
+# =============================================================================
+# Attached images are analyzed concurrently (image_analyzer.py), at most
+# IMAGE_ANALYSIS_CONCURRENCY vision requests at a time per message. With
+# IMAGE_ANALYSIS_BATCH enabled, models known to accept several images send up
+# to IMAGE_ANALYSIS_BATCH_SIZE images in one request; images the batched answer
+# doesn't cover are retried one by one.
+IMAGE_ANALYSIS_CONCURRENCY = int(os.getenv("IMAGE_ANALYSIS_CONCURRENCY", "4"))
+IMAGE_ANALYSIS_BATCH = os.getenv("IMAGE_ANALYSIS_BATCH", "false").lower() == "true"
+IMAGE_ANALYSIS_BATCH_SIZE = int(os.getenv("IMAGE_ANALYSIS_BATCH_SIZE", "4"))
+IMAGE_ANALYSIS_TIMEOUT = float(os.getenv("IMAGE_ANALYSIS_TIMEOUT", "60"))
+
+# =============================================================================
+# PROMETHEUS METRICS CONFIGURATION
+# =============================================================================
+# Metrics are exposed at /health/prometheus. The lag monitor wakes every
+# METRICS_LOOP_LAG_INTERVAL seconds and records how late it woke up.
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # 0 disables
+
+# =============================================================================
+# EVENT LOOP BLOCKING DETECTOR (OPT-IN)
+# =============================================================================
+# When enabled, a watchdog thread samples the loop thread's stack whenever a
+# single callback runs longer than the threshold, attributing the stall to the
+# request route and correlation ID. View at GET /admin/diagnostics/loop-stalls.
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+LOOP_MONITOR_THRESHOLD_MS = float(os.getenv("LOOP_MONITOR_THRESHOLD_MS", "100"))
+
+# =============================================================================
+# COUNCIL TRACING CONFIGURATION
+# =============================================================================
+# In-process spans (context build, model streams, ranking parse, synthesis,
+# validation, DB calls) grouped by correlation ID in a bounded ring buffer.
+# Export at GET /admin/diagnostics/traces/{trace_id}?format=json|chrome.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACING_MAX_TRACES = int(os.getenv("TRACING_MAX_TRACES", "200"))
+TRACING_MAX_SPANS_PER_TRACE = int(os.getenv("TRACING_MAX_SPANS_PER_TRACE", "500"))
+TRACING_SENTRY_FORWARD = os.getenv("TRACING_SENTRY_FORWARD", "false").lower() == "true"
+
+# =============================================================================
+# ON-DEMAND PROFILER CONFIGURATION
+# =============================================================================
+# Caps for POST /admin/diagnostics/profile so a profile is safe under
+# production load. One profile runs per worker at a time.
+PROFILER_MAX_DURATION_SECONDS = float(os.getenv("PROFILER_MAX_DURATION_SECONDS", "30"))
+PROFILER_MAX_SAMPLE_HZ = int(os.getenv("PROFILER_MAX_SAMPLE_HZ", "100"))
+
 # Require access_token for RLS-protected queries (recommended: true in production)
 # When false, falls back to service client (bypasses RLS) - only for backwards compat
 REQUIRE_ACCESS_TOKEN = os.getenv("REQUIRE_ACCESS_TOKEN", "false").lower() == "true"
 
-# OpenRouter API endpoint
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# OpenRouter API endpoints
+# Override to point at a local stand-in for load tests
+# (see backend/tests/load/fake_openrouter.py)
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_EMBEDDINGS_URL = os.getenv(
+    "OPENROUTER_EMBEDDINGS_URL",
+    OPENROUTER_API_URL.rsplit("/chat/completions", 1)[0] + "/embeddings",
+)
 
 # Data directory for conversation storage
 DATA_DIR = "data/conversations"
@@ -8,6 +8,7 @@ Now uses Supabase database for all context:
 
 from typing import Optional, List, Dict, Any
 import asyncio
+import math
 import re
 
 from . import storage
@@ -15,6 +16,7 @@ from . import knowledge
 from .database import get_supabase_service, get_supabase_with_auth
 from .utils.cache import company_cache, cache_key
 from .security import log_error, log_app_event
+from .tracing import traced
 
 
 # UUID v4 regex pattern for validation
@@ -42,9 +44,15 @@ MAX_SECTION_CHARS = 30000
 TOKEN_LIMIT_INSTRUCTION = """You have {{MAX_TOKENS}} tokens available for your response. Provide thorough, well-reasoned content that fully addresses the request within this constraint."""
 
 
-def estimate_tokens(text: str) -> int:
-    """Rough estimate of token count (approximately 4 chars per token)."""
-    return len(text) // 4
+# Shared by context truncation, history compaction and the cost estimator
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough estimate of token count (~4 chars per token, never zero for non-empty text)."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
 
 
 def truncate_to_limit(text: str, max_chars: int, label: str = "") -> str:
@@ -1268,6 +1276,7 @@ def format_decisions_for_prompt(decisions: List[Dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
+@traced("context_build")
 async def get_system_prompt_with_context(
     business_id: Optional[str] = None,
     department_id: Optional[str] = None,
@@ -24,6 +24,8 @@ from .model_registry import get_primary_model, get_models, get_models_sync
 from .security import log_app_event
 from .database import get_supabase_service
 from .llm_config import get_llm_config
+from .telemetry import telemetry_stage
+from .tracing import trace_span, record_span
 
 
 class QueryTooLongError(Exception):
@@ -46,6 +48,7 @@ class InsufficientCouncilError(Exception):
         )
 
 
+@telemetry_stage("stage1")
 async def stage1_collect_responses(
     user_query: str,
     business_id: Optional[str] = None
@@ -91,6 +94,7 @@ async def stage1_collect_responses(
     return stage1_results
 
 
+@telemetry_stage("stage1")
 async def stage1_stream_responses(
     user_query: str,
     business_id: Optional[str] = None,
@@ -236,6 +240,7 @@ async def stage1_stream_responses(
     yield {"type": "stage1_all_complete", "data": final_results}
 
 
+@telemetry_stage("stage2")
 async def stage2_stream_rankings(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -346,9 +351,11 @@ async def stage2_stream_rankings(
         yield event
 
     # 11. Build final results with parsed rankings
-    stage2_results = _build_stage2_results_with_parsing(
-        model_content, parse_ranking_from_text, business_id
-    )
+    with trace_span("ranking_parse", responses=len(model_content)) as span:
+        stage2_results = _build_stage2_results_with_parsing(
+            model_content, parse_ranking_from_text, business_id
+        )
+        span.set(parsed=len(stage2_results))
 
     # 12. Check minimum viable rankings threshold
     insufficient_error = _check_minimum_viable_rankings(
@@ -360,7 +367,8 @@ async def stage2_stream_rankings(
         return
 
     # 13. Calculate aggregate rankings
-    aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
+    with trace_span("ranking_aggregate"):
+        aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
 
     # 14. Detect ranking manipulation patterns (SECURITY)
     manipulation_warning = _check_ranking_manipulation(
@@ -377,6 +385,7 @@ async def stage2_stream_rankings(
     }
 
 
+@telemetry_stage("stage3")
 async def stage3_stream_synthesis(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -532,6 +541,7 @@ Provide a clear, well-reasoned final answer that represents the council's collec
     successful_chairman = None
     final_content = ""
     chairman_usage = None
+    synthesis_started = time.time()
 
     for chairman_index, chairman_model in enumerate(chairman_models):
         # AI-SEC-009: Check for stage timeout before trying next model
@@ -602,13 +612,25 @@ Provide a clear, well-reasoned final answer that represents the council's collec
         if chairman_index < len(chairman_models) - 1:
             yield {"type": "stage3_fallback", "failed_model": chairman_model, "next_model": chairman_models[chairman_index + 1]}
 
+    # Spans can't stay open across the yields above, so record synthesis after the fact
+    record_span(
+        "synthesis",
+        time.time() - synthesis_started,
+        status="ok" if successful_chairman else "error",
+        chairman=successful_chairman,
+        candidates=len(chairman_models),
+        response_chars=len(final_content),
+    )
+
     if not successful_chairman:
         final_content = "[Error: All chairman models failed. Please try again.]"
         successful_chairman = chairman_models[0] if chairman_models else "unknown"  # Report as primary for consistency
 
     # SECURITY: Validate Stage 3 output before returning to user
     # This catches system prompt leakage, harmful content, and injection echoes
-    output_validation = validate_llm_output(final_content)
+    with trace_span("validation") as span:
+        output_validation = validate_llm_output(final_content)
+        span.set(risk_level=output_validation['risk_level'], issues=len(output_validation['issues']))
 
     if output_validation['issues']:
         # Log security issues for monitoring
@@ -641,6 +663,7 @@ Provide a clear, well-reasoned final answer that represents the council's collec
     }
 
 
+@telemetry_stage("stage2")
 async def stage2_collect_rankings(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -742,6 +765,7 @@ Now provide your evaluation and ranking:"""
     return stage2_results, label_to_model
 
 
+@telemetry_stage("stage3")
 async def stage3_synthesize_final(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -977,6 +1001,7 @@ def calculate_aggregate_rankings(
     return aggregate
 
 
+@telemetry_stage("title")
 async def generate_conversation_title(
     user_query: str,
     company_id: str | None = None
@@ -1110,6 +1135,7 @@ async def run_full_council(
     return stage1_results, stage2_results, stage3_result, metadata
 
 
+@telemetry_stage("chat")
 async def chat_stream_response(
     conversation_history: List[Dict[str, Any]],
     business_id: Optional[str] = None,
@@ -0,0 +1,563 @@
+"""
+GDPR data export (Article 20 - right to data portability).
+
+Streams a user's data table by table in keyset pages, writing JSON, NDJSON or
+a zip archive on the fly, so memory is bounded by one page regardless of
+account size. Large exports can run as a background job that spools the
+archive to disk and uploads it to Supabase Storage. Job state lives in Redis
+and downloads go through a short-lived signed URL, so polling and downloading
+work from any worker. Uploaded archives are tracked in a Redis sorted set by
+expiry and deleted by a periodic sweep.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    from .config import (
+        EXPORT_PAGE_SIZE,
+        EXPORT_MESSAGES_PAGE_SIZE,
+        EXPORT_SPOOL_DIR,
+        EXPORT_JOB_TTL_SECONDS,
+        EXPORT_STORAGE_BUCKET,
+        EXPORT_DOWNLOAD_URL_TTL,
+        EXPORT_SWEEP_INTERVAL,
+    )
+    from .cache import get_redis
+    from .security import log_app_event
+except ImportError:
+    from backend.config import (
+        EXPORT_PAGE_SIZE,
+        EXPORT_MESSAGES_PAGE_SIZE,
+        EXPORT_SPOOL_DIR,
+        EXPORT_JOB_TTL_SECONDS,
+        EXPORT_STORAGE_BUCKET,
+        EXPORT_DOWNLOAD_URL_TTL,
+        EXPORT_SWEEP_INTERVAL,
+    )
+    from backend.cache import get_redis
+    from backend.security import log_app_event
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_VERSION = "2.0"
+
+# Flush streamed output in chunks of about this size
+CHUNK_BYTES = 64 * 1024
+
+PROFILE_FIELDS = ("id", "email", "full_name", "avatar_url", "created_at", "updated_at")
+
+# Internal columns that aren't user data
+_EXCLUDED_COLUMNS = ("search_vector",)
+
+
+# =============================================================================
+# SECTIONS
+# =============================================================================
+
+@dataclass(frozen=True)
+class ExportSection:
+    """
+    One exported table. scope is 'user' (rows owned by the user) or 'company'
+    (rows of owned companies). page_size caps the export's page size for
+    tables with large rows.
+    """
+    name: str
+    table: str
+    columns: str
+    scope: str
+    page_size: Optional[int] = None
+
+
+EXPORT_SECTIONS = (
+    ExportSection("companies", "companies", "id, name, context, created_at", "user"),
+    ExportSection("departments", "departments", "*", "company"),
+    ExportSection("roles", "roles", "*", "company"),
+    ExportSection("playbooks", "org_documents", "*", "company"),
+    ExportSection("conversations", "conversations",
+                  "id, title, created_at, updated_at, is_starred, is_archived, company_id", "user"),
+    ExportSection("messages", "messages", "*", "user", page_size=EXPORT_MESSAGES_PAGE_SIZE),
+    ExportSection("knowledge_entries", "knowledge_entries", "*", "user"),
+)
+
+
+class UserDataExport:
+    """
+    Pages through a user's data. Each section is read in id order with a
+    keyset cursor; only one page is held at a time.
+    """
+
+    def __init__(self, client, user_id: str, email: Optional[str] = None,
+                 page_size: int = EXPORT_PAGE_SIZE):
+        self.client = client
+        self.user_id = user_id
+        self.email = email
+        self.page_size = max(1, page_size)
+        self.export_date = datetime.now(timezone.utc).isoformat()
+        self.company_ids: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self.errors: List[str] = []
+
+    def metadata(self) -> Dict[str, Any]:
+        return {"export_version": EXPORT_VERSION, "export_date": self.export_date, "user_id": self.user_id}
+
+    async def profile(self) -> Dict[str, Any]:
+        """User profile without internal fields; falls back to id and email."""
+        query = self.client.table("profiles").select("*").eq("id", self.user_id).limit(1)
+        try:
+            rows = (await asyncio.to_thread(query.execute)).data or []
+        except Exception as e:
+            log_app_event("GDPR_EXPORT: Failed to load profile", level="WARNING",
+                          user_id=self.user_id, error=str(e))
+            rows = []
+        if not rows:
+            return {"id": self.user_id, "email": self.email}
+        return {key: rows[0].get(key) for key in PROFILE_FIELDS}
+
+    async def rows(self, section: ExportSection) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every row of a section. A failing section is logged and listed
+        in the summary rather than aborting the whole export.
+        """
+        self.counts[section.name] = 0
+        if section.scope == "company" and not self.company_ids:
+            return
+
+        page_size = min(self.page_size, max(1, section.page_size or self.page_size))
+        last_id = None
+        try:
+            while True:
+                query = self.client.table(section.table).select(section.columns)
+                if section.scope == "user":
+                    query = query.eq("user_id", self.user_id)
+                else:
+                    query = query.in_("company_id", self.company_ids)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+
+                page = (await asyncio.to_thread(query.order("id").limit(page_size).execute)).data or []
+                for row in page:
+                    for column in _EXCLUDED_COLUMNS:
+                        row.pop(column, None)
+                    if section.name == "companies":
+                        self.company_ids.append(row["id"])
+                    self.counts[section.name] += 1
+                    yield row
+
+                if len(page) < page_size:
+                    return
+                last_id = page[-1]["id"]
+        except Exception as e:
+            self.errors.append(section.name)
+            log_app_event("GDPR_EXPORT: Failed to export section", level="ERROR",
+                          user_id=self.user_id, section=section.name, error=str(e))
+
+    def finish(self) -> Dict[str, Any]:
+        """Summary record; also writes the audit log entry."""
+        log_app_event(
+            "GDPR_DATA_EXPORT",
+            level="INFO",
+            user_id=self.user_id,
+            conversations_count=self.counts.get("conversations", 0),
+            messages_count=self.counts.get("messages", 0),
+            companies_count=self.counts.get("companies", 0),
+            knowledge_count=self.counts.get("knowledge_entries", 0),
+            failed_sections=self.errors or None,
+        )
+        return {"counts": dict(self.counts), "failed_sections": list(self.errors)}
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+async def _chunked(parts: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Coalesce small string parts into ~CHUNK_BYTES byte chunks."""
+    buffer: List[bytes] = []
+    size = 0
+    async for part in parts:
+        data = part.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def stream_ndjson(export: UserDataExport) -> AsyncIterator[bytes]:
+    """One {"section": ..., "data": ...} object per line."""
+    async def parts():
+        yield _dumps({"section": "export", "data": export.metadata()}) + "\n"
+        yield _dumps({"section": "profile", "data": await export.profile()}) + "\n"
+        for section in EXPORT_SECTIONS:
+            async for row in export.rows(section):
+                yield _dumps({"section": section.name, "data": row}) + "\n"
+        yield _dumps({"section": "summary", "data": export.finish()}) + "\n"
+
+    async for chunk in _chunked(parts()):
+        yield chunk
+
+
+async def stream_json(export: UserDataExport) -> AsyncIterator[bytes]:
+    """A single JSON document with one array per section, written incrementally."""
+    async def parts():
+        head = dict(export.metadata(), user=await export.profile())
+        yield _dumps(head)[:-1]  # Leave the object open
+        for section in EXPORT_SECTIONS:
+            yield f', "{section.name}": ['
+            separator = ""
+            async for row in export.rows(section):
+                yield separator + _dumps(row)
+                separator = ", "
+            yield "]"
+        yield ', "summary": ' + _dumps(export.finish()) + "}"
+
+    async for chunk in _chunked(parts()):
+        yield chunk
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile streams into."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks, self.size = [], 0
+        return data
+
+
+async def stream_zip(export: UserDataExport) -> AsyncIterator[bytes]:
+    """Zip archive with export.json, one <section>.ndjson per section and summary.json."""
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+    head = dict(export.metadata(), user=await export.profile())
+    archive.writestr("export.json", json.dumps(head, default=str, ensure_ascii=False, indent=2))
+
+    for section in EXPORT_SECTIONS:
+        with archive.open(f"{section.name}.ndjson", "w", force_zip64=True) as entry:
+            async for row in export.rows(section):
+                entry.write((_dumps(row) + "\n").encode("utf-8"))
+                if sink.size >= CHUNK_BYTES:
+                    yield sink.drain()
+
+    archive.writestr("summary.json", json.dumps(export.finish(), indent=2))
+    archive.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS: Dict[str, tuple] = {
+    # format: (writer, media type, file extension)
+    "json": (stream_json, "application/json", "json"),
+    "ndjson": (stream_ndjson, "application/x-ndjson", "ndjson"),
+    "zip": (stream_zip, "application/zip", "zip"),
+}
+
+
+def export_filename(user_id: str, fmt: str) -> str:
+    return f"axcouncil-data-export-{user_id[:8]}.{EXPORT_FORMATS[fmt][2]}"
+
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+@dataclass
+class ExportJob:
+    """A background export, spooled to disk and then uploaded to storage."""
+    id: str
+    user_id: str
+    format: str
+    status: str = "pending"  # pending | running | complete | failed
+    created_at: float = field(default_factory=time.time)
+    path: Optional[str] = None  # Local spool, only on the worker that ran the job
+    storage_path: Optional[str] = None  # Object in EXPORT_STORAGE_BUCKET
+    size_bytes: int = 0
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "format": self.format,
+            "size_bytes": self.size_bytes,
+            "created_at": datetime.fromtimestamp(self.created_at, timezone.utc).isoformat(),
+            "expires_at": datetime.fromtimestamp(self.created_at + EXPORT_JOB_TTL_SECONDS, timezone.utc).isoformat(),
+            "error": self.error,
+        }
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "user_id": self.user_id, "format": self.format, "status": self.status,
+            "created_at": self.created_at, "storage_path": self.storage_path,
+            "size_bytes": self.size_bytes, "error": self.error,
+        }
+
+
+# Jobs started by this worker (they hold the local spool path and task)
+_jobs: Dict[str, ExportJob] = {}
+
+
+def _job_key(job_id: str) -> str:
+    return f"axcouncil:export:job:{job_id}"
+
+
+# Sorted set of uploaded archive paths, scored by expiry time
+STORED_EXPORTS_KEY = "axcouncil:export:stored"
+
+# Uploaded archives awaiting the sweep when Redis is unavailable
+_stored_local: Dict[str, float] = {}
+
+
+async def _save_job(job: ExportJob) -> None:
+    """Publish job state to Redis for the other workers."""
+    client = await get_redis()
+    if client is None:
+        return
+    ttl = int(job.created_at + EXPORT_JOB_TTL_SECONDS - time.time())
+    try:
+        if ttl > 0:
+            await client.set(_job_key(job.id), json.dumps(job._state()), ex=ttl)
+    except Exception as e:
+        logger.debug("Export job state write failed for %s: %s", job.id, e)
+
+
+async def _load_job(job_id: str) -> Optional[ExportJob]:
+    client = await get_redis()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(_job_key(job_id))
+    except Exception as e:
+        logger.debug("Export job state read failed for %s: %s", job_id, e)
+        return None
+    return ExportJob(**json.loads(raw)) if raw else None
+
+
+def _storage():
+    try:
+        from .database import get_supabase_service
+    except ImportError:
+        from backend.database import get_supabase_service
+    client = get_supabase_service()
+    return client.storage.from_(EXPORT_STORAGE_BUCKET) if client is not None else None
+
+
+def _remove_stored(paths: List[str]) -> None:
+    bucket = _storage()
+    if bucket is not None and paths:
+        bucket.remove(paths)
+
+
+def _prune_stored_exports(user_id: str) -> None:
+    """Remove a user's uploaded archives older than the job TTL that the sweep missed."""
+    bucket = _storage()
+    if bucket is None:
+        return
+    cutoff = datetime.fromtimestamp(time.time() - EXPORT_JOB_TTL_SECONDS, timezone.utc).isoformat()
+    expired = [
+        f"{user_id}/{item['name']}" for item in (bucket.list(user_id) or [])
+        if item.get("created_at") and item["created_at"] < cutoff
+    ]
+    _remove_stored(expired)
+
+
+async def _track_stored(storage_path: str, expires_at: float) -> None:
+    """Register an uploaded archive for the sweep."""
+    client = await get_redis()
+    if client is not None:
+        try:
+            await client.zadd(STORED_EXPORTS_KEY, {storage_path: expires_at})
+            return
+        except Exception as e:
+            logger.debug("Export archive tracking failed for %s: %s", storage_path, e)
+    _stored_local[storage_path] = expires_at
+
+
+async def sweep_stored_exports(now: Optional[float] = None) -> int:
+    """
+    Delete uploaded archives past their expiry, whether or not the user
+    exports again. Returns the number of archives removed.
+    """
+    now = now or time.time()
+    expired = [path for path, expires_at in _stored_local.items() if expires_at <= now]
+    client = await get_redis()
+    if client is not None:
+        try:
+            expired += [p for p in await client.zrangebyscore(STORED_EXPORTS_KEY, "-inf", now)
+                        if p not in expired]
+        except Exception as e:
+            logger.debug("Export sweep read failed: %s", e)
+    if not expired:
+        return 0
+
+    try:
+        await asyncio.to_thread(_remove_stored, expired)
+    except Exception as e:
+        log_app_event("GDPR_EXPORT: Archive sweep failed", level="WARNING",
+                      archives=len(expired), error=str(e))
+        return 0
+    for path in expired:
+        _stored_local.pop(path, None)
+    if client is not None:
+        try:
+            await client.zrem(STORED_EXPORTS_KEY, *expired)
+        except Exception as e:
+            logger.debug("Export sweep cleanup failed: %s", e)
+    return len(expired)
+
+
+_sweep_task: Optional[asyncio.Task] = None
+
+
+async def _sweep_loop(interval: int) -> None:
+    """Background loop that deletes expired archives every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep_stored_exports()
+        except Exception as e:
+            logger.debug("Export sweep loop error: %s", e)
+
+
+def start_export_sweeper(interval: int = EXPORT_SWEEP_INTERVAL) -> Optional[asyncio.Task]:
+    """Start the periodic archive sweep (no-op without a bucket or if running)."""
+    global _sweep_task
+    if not EXPORT_STORAGE_BUCKET or interval <= 0:
+        return None
+    if _sweep_task is None or _sweep_task.done():
+        _sweep_task = asyncio.create_task(_sweep_loop(interval))
+    return _sweep_task
+
+
+async def stop_export_sweeper() -> None:
+    """Stop the sweep task."""
+    global _sweep_task
+    if _sweep_task is not None and not _sweep_task.done():
+        _sweep_task.cancel()
+        try:
+            await _sweep_task
+        except asyncio.CancelledError:
+            pass
+    _sweep_task = None
+
+
+def _prune_jobs(now: Optional[float] = None) -> None:
+    """Drop expired local jobs and their spool files."""
+    now = now or time.time()
+    for job_id, job in list(_jobs.items()):
+        if now - job.created_at > EXPORT_JOB_TTL_SECONDS and job.status in ("complete", "failed"):
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+            del _jobs[job_id]
+
+
+async def _upload(job: ExportJob) -> None:
+    """Move the spooled archive to storage; on failure it stays on local disk."""
+    if not EXPORT_STORAGE_BUCKET or not job.path:
+        return
+    storage_path = f"{job.user_id}/{job.id}.{EXPORT_FORMATS[job.format][2]}"
+    try:
+        bucket = _storage()
+        if bucket is None:
+            return
+        await asyncio.to_thread(_prune_stored_exports, job.user_id)
+        await asyncio.to_thread(
+            bucket.upload, storage_path, job.path,
+            {"content-type": EXPORT_FORMATS[job.format][1]},
+        )
+    except Exception as e:
+        log_app_event("GDPR_EXPORT: Archive upload failed", level="WARNING",
+                      user_id=job.user_id, job_id=job.id, error=str(e))
+        return
+    job.storage_path = storage_path
+    os.remove(job.path)
+    job.path = None
+    await _track_stored(storage_path, job.created_at + EXPORT_JOB_TTL_SECONDS)
+
+
+async def _run_job(job: ExportJob, export: UserDataExport) -> None:
+    writer = EXPORT_FORMATS[job.format][0]
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=f".{EXPORT_FORMATS[job.format][2]}",
+                                dir=EXPORT_SPOOL_DIR or None)
+    job.path = path
+    job.status = "running"
+    await _save_job(job)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            async for chunk in writer(export):
+                spool.write(chunk)
+                job.size_bytes += len(chunk)
+        await _upload(job)
+        job.status = "complete"
+    except Exception as e:
+        job.status = "failed"
+        job.error = "Export failed"
+        log_app_event("GDPR_EXPORT: Background export failed", level="ERROR",
+                      user_id=job.user_id, job_id=job.id, error=str(e))
+        if os.path.exists(path):
+            os.remove(path)
+        job.path = None
+    await _save_job(job)
+
+
+async def start_export_job(export: UserDataExport, fmt: str) -> ExportJob:
+    """Start a background export and return its job."""
+    _prune_jobs()
+    job = ExportJob(id=str(uuid.uuid4()), user_id=export.user_id, format=fmt)
+    _jobs[job.id] = job
+    await _save_job(job)
+    job.task = asyncio.create_task(_run_job(job, export))
+    return job
+
+
+async def get_export_job(job_id: str, user_id: str) -> Optional[ExportJob]:
+    """Look up a job from any worker; other users' jobs are reported as missing."""
+    _prune_jobs()
+    job = _jobs.get(job_id) or await _load_job(job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+async def create_download_url(job: ExportJob) -> Optional[str]:
+    """Short-lived signed URL for an uploaded archive, or None if it isn't in storage."""
+    if not job.storage_path:
+        return None
+    bucket = _storage()
+    if bucket is None:
+        return None
+    response = await asyncio.to_thread(
+        bucket.create_signed_url, job.storage_path, EXPORT_DOWNLOAD_URL_TTL,
+        {"download": export_filename(job.user_id, job.format)},
+    )
+    return response.get("signedURL") or response.get("signed_url")
@@ -1,15 +1,22 @@
 """Supabase database connection with connection pooling."""
 
 import os
-import time
 import asyncio
 import threading
 import random
 import logging
 from pathlib import Path
+import httpx
 from supabase import create_client, Client
+from postgrest import SyncPostgrestClient
+from storage3 import SyncStorageClient
 from dotenv import load_dotenv
-from typing import Optional, Dict, Tuple, TypeVar, Callable
+from typing import Optional, TypeVar, Callable
+
+try:
+    from .metrics import instrument_supabase_client, instrument_http_session
+except ImportError:
+    from backend.metrics import instrument_supabase_client, instrument_http_session
 
 T = TypeVar('T')
 logger = logging.getLogger(__name__)
@@ -292,50 +299,138 @@ _supabase_client: Client = None
 _supabase_service_client: Client = None
 
 # =============================================================================
-# Connection Pool for authenticated clients
+# Shared transport for authenticated (RLS-scoped) clients
 # =============================================================================
-# Cache authenticated clients by token hash to avoid creating new clients per request
-# Each entry: (client, created_at)
-_auth_client_pool: Dict[str, Tuple[Client, float]] = {}
-_pool_lock = threading.Lock()
+# Every user-scoped client sends its PostgREST requests through one pooled
+# httpx transport. Each client gets its own thin httpx.Client over that
+# transport carrying the user's JWT as default headers, so no header state is
+# ever shared between tokens (postgrest writes the Authorization header into
+# the session it is given). Building a client per token allocates only that
+# wrapper, so there is no per-token cache to size or expire.
+AUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+AUTH_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+AUTH_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "120"))
+
+
+class _SharedTransport(httpx.HTTPTransport):
+    """Pooled transport that per-user clients cannot close out from under each other."""
+
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        super().close()
+
+
+_auth_transport: Optional[httpx.BaseTransport] = None
+_auth_http_lock = threading.Lock()
+
+
+def get_auth_transport() -> httpx.BaseTransport:
+    """Get or create the connection pool shared by all authenticated clients."""
+    global _auth_transport
+
+    if _auth_transport is None:
+        with _auth_http_lock:
+            if _auth_transport is None:
+                _auth_transport = _SharedTransport(
+                    limits=httpx.Limits(
+                        max_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=AUTH_HTTP_MAX_KEEPALIVE,
+                    ),
+                    http2=True,
+                )
+
+    return _auth_transport
+
+
+def get_auth_http_client(headers: dict) -> httpx.Client:
+    """Build one user's HTTP session over the shared pool, with their headers as defaults."""
+    session = httpx.Client(
+        headers=headers,
+        timeout=AUTH_HTTP_TIMEOUT,
+        follow_redirects=True,
+        transport=get_auth_transport(),
+    )
+    # Record PostgREST call durations (db_call_duration_seconds)
+    instrument_http_session(session)
+    return session
+
 
-# Pool configuration
-POOL_MAX_SIZE = 100  # Maximum number of cached clients
-POOL_TTL = 300  # Client TTL in seconds (5 minutes, matches typical JWT refresh)
-POOL_CLEANUP_INTERVAL = 60  # Cleanup expired entries every 60 seconds
-_last_cleanup = 0
+def close_auth_http_client() -> None:
+    """Close the shared connection pool (called on shutdown)."""
+    global _auth_transport
 
+    with _auth_http_lock:
+        if _auth_transport is not None:
+            _auth_transport.shutdown()
+            _auth_transport = None
 
-def _get_token_hash(token: str) -> str:
-    """Get a short hash of the token for cache key."""
-    import hashlib
-    return hashlib.sha256(token.encode()).hexdigest()[:16]
 
+class AuthenticatedClient:
+    """
+    Supabase client scoped to one user's JWT.
+
+    Exposes the same table/from_/rpc/schema/storage surface the routers use.
+    PostgREST calls share the pooled transport from get_auth_transport().
+    Anything else (auth, functions, realtime) falls back to a full supabase
+    Client, created on first use.
+    """
 
-def _cleanup_pool():
-    """Remove expired entries from the pool."""
-    global _last_cleanup
-    now = time.time()
+    def __init__(self, access_token: str):
+        self.access_token = access_token
+        self.headers = {
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {access_token}",
+        }
+        self._postgrest: Optional[SyncPostgrestClient] = None
+        self._storage: Optional[SyncStorageClient] = None
+        self._client: Optional[Client] = None
+
+    def _postgrest_client(self, schema: str = "public") -> SyncPostgrestClient:
+        # Each PostgREST client gets its own session: postgrest writes the auth
+        # and schema headers into the session's defaults, so a session must never
+        # be handed to a client for another token or schema.
+        return SyncPostgrestClient(
+            f"{SUPABASE_URL}/rest/v1",
+            schema=schema,
+            headers=self.headers,
+            http_client=get_auth_http_client(self.headers),
+        )
 
-    # Only cleanup periodically
-    if now - _last_cleanup < POOL_CLEANUP_INTERVAL:
-        return
+    @property
+    def postgrest(self) -> SyncPostgrestClient:
+        if self._postgrest is None:
+            self._postgrest = self._postgrest_client()
+        return self._postgrest
 
-    _last_cleanup = now
-    expired_keys = []
+    @property
+    def storage(self) -> SyncStorageClient:
+        # Storage uploads merge the session headers, so storage keeps its own
+        # session carrying the user's token (rarely used; service client is the norm)
+        if self._storage is None:
+            self._storage = SyncStorageClient(f"{SUPABASE_URL}/storage/v1", dict(self.headers))
+        return self._storage
 
-    for key, (_, created_at) in _auth_client_pool.items():
-        if now - created_at > POOL_TTL:
-            expired_keys.append(key)
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
 
-    for key in expired_keys:
-        _auth_client_pool.pop(key, None)
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
 
-    # If still over max size, remove oldest entries
-    if len(_auth_client_pool) > POOL_MAX_SIZE:
-        sorted_entries = sorted(_auth_client_pool.items(), key=lambda x: x[1][1])
-        for key, _ in sorted_entries[:len(_auth_client_pool) - POOL_MAX_SIZE]:
-            _auth_client_pool.pop(key, None)
+    def schema(self, schema: str) -> SyncPostgrestClient:
+        return self._postgrest_client(schema)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, count=None, head: bool = False, get: bool = False):
+        return self.postgrest.rpc(fn, params or {}, count, head, get)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._client is None:
+            self._client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            self._client.postgrest.auth(self.access_token)
+        return getattr(self._client, name)
 
 
 def get_supabase() -> Client:
@@ -349,6 +444,7 @@ def get_supabase() -> Client:
                 "Add them to your .env file."
             )
         _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        instrument_supabase_client(_supabase_client)
 
     return _supabase_client
 
@@ -365,14 +461,16 @@ def get_supabase_service() -> Optional[Client]:
         if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
             return None
         _supabase_service_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        instrument_supabase_client(_supabase_service_client)
 
     return _supabase_service_client
 
 
-def get_supabase_with_auth(access_token: str) -> Client:
+def get_supabase_with_auth(access_token: str) -> AuthenticatedClient:
     """
-    Get or create a Supabase client authenticated with a user's JWT token.
-    Uses connection pooling to reuse clients for the same token.
+    Get a Supabase client authenticated with a user's JWT token.
+    Requests go through the shared connection pool with the token attached
+    as a header, so this is cheap to call per request.
     This client will respect RLS policies using the user's identity.
 
     Args:
@@ -387,38 +485,7 @@ def get_supabase_with_auth(access_token: str) -> Client:
             "Add them to your .env file."
         )
 
-    token_hash = _get_token_hash(access_token)
-    now = time.time()
-
-    with _pool_lock:
-        # Cleanup expired entries periodically
-        _cleanup_pool()
-
-        # Check if we have a cached client for this token
-        if token_hash in _auth_client_pool:
-            client, created_at = _auth_client_pool[token_hash]
-            # Check if still valid (not expired)
-            if now - created_at < POOL_TTL:
-                return client
-            else:
-                # Expired, remove it
-                del _auth_client_pool[token_hash]
-
-        # Create a new client
-        client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-        # Set the auth header to use the user's token
-        # This makes auth.uid() return the user's ID in RLS policies
-        client.postgrest.auth(access_token)
-
-        # Also set auth for storage operations
-        # The storage client needs the Authorization header set
-        client.storage._client.headers["Authorization"] = f"Bearer {access_token}"
-
-        # Cache the client
-        _auth_client_pool[token_hash] = (client, now)
-
-        return client
+    return AuthenticatedClient(access_token)
 
 
 def is_supabase_configured() -> bool:
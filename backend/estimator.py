@@ -0,0 +1,346 @@
+"""
+Pre-flight council cost and latency estimator.
+
+Predicts what a council session will cost and how long each stage will take
+before any LLM call is made, so budgets can be enforced up front instead of
+after the spend has happened.
+
+HOW IT ESTIMATES:
+- Prompt tokens are counted from the assembled messages (system prompt,
+  conversation history, wrapped query) with context_loader.estimate_tokens,
+  plus fixed overhead for the stage 2 ranking and stage 3 chairman
+  instructions. Later stages include the predicted output of earlier ones.
+- Completion tokens come from each model's telemetry (mean completion length
+  for that stage, falling back to the model's other stages), capped at the
+  stage's max_tokens. Without enough telemetry a fixed fraction of
+  max_tokens is assumed.
+- Cost uses get_model_pricing() (live OpenRouter pricing, per 1M tokens).
+- Stage ETA is the slowest model's p50 TTFT plus completion tokens at its
+  p50 tokens/sec. Stage 3 only counts the primary chairman, which is the
+  only model that runs unless it fails.
+
+The estimate is deliberately simple - it's a budget guard, not a bill.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    from .config import ESTIMATOR_MIN_SAMPLES
+    from .context_loader import estimate_tokens
+    from .telemetry import TelemetryStore, get_telemetry_store
+except ImportError:
+    from backend.config import ESTIMATOR_MIN_SAMPLES
+    from backend.context_loader import estimate_tokens
+    from backend.telemetry import TelemetryStore, get_telemetry_store
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role/formatting tokens per chat message
+QUERY_WRAPPER_TOKENS = 60  # wrap_user_query() delimiters and instructions
+RANKING_PROMPT_TOKENS = 350  # Stage 2 ranking instructions
+CHAIRMAN_PROMPT_TOKENS = 450  # Stage 3 synthesis instructions
+
+# Without telemetry, assume a model uses this share of max_tokens
+DEFAULT_COMPLETION_RATIO = 0.25
+DEFAULT_TTFT_MS = 2000.0
+DEFAULT_TOKENS_PER_SEC = 50.0
+
+STAGES = ("stage1", "stage2", "stage3")
+
+
+# =============================================================================
+# RESULT TYPES
+# =============================================================================
+
+@dataclass
+class ModelEstimate:
+    """Predicted usage for one model call."""
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost_cents: float
+    eta_ms: float
+    source: str  # "telemetry" or "default"
+
+
+@dataclass
+class StageEstimate:
+    """Predicted usage for one council stage (models run in parallel)."""
+    stage: str
+    models: List[ModelEstimate] = field(default_factory=list)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(m.prompt_tokens for m in self.models)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(m.completion_tokens for m in self.models)
+
+    @property
+    def cost_cents(self) -> float:
+        return sum(m.cost_cents for m in self.models)
+
+    @property
+    def eta_ms(self) -> float:
+        return max((m.eta_ms for m in self.models), default=0.0)
+
+
+@dataclass
+class CouncilEstimate:
+    """Predicted usage for a full council session."""
+    stages: List[StageEstimate]
+
+    @property
+    def cost_cents(self) -> float:
+        return sum(s.cost_cents for s in self.stages)
+
+    @property
+    def eta_ms(self) -> float:
+        # Stages run sequentially
+        return sum(s.eta_ms for s in self.stages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": sum(s.prompt_tokens for s in self.stages),
+            "completion_tokens": sum(s.completion_tokens for s in self.stages),
+            "cost_cents": round(self.cost_cents, 2),
+            "eta_ms": round(self.eta_ms),
+            "stages": [
+                {
+                    "stage": s.stage,
+                    "prompt_tokens": s.prompt_tokens,
+                    "completion_tokens": s.completion_tokens,
+                    "cost_cents": round(s.cost_cents, 2),
+                    "eta_ms": round(s.eta_ms),
+                    "models": [
+                        {**asdict(m), "cost_cents": round(m.cost_cents, 2), "eta_ms": round(m.eta_ms)}
+                        for m in s.models
+                    ],
+                }
+                for s in self.stages
+            ],
+        }
+
+
+# =============================================================================
+# TOKEN COUNTING
+# =============================================================================
+
+def estimate_prompt_tokens(
+    system_prompt: Optional[str],
+    conversation_history: Optional[List[Dict[str, str]]],
+    user_query: str,
+) -> int:
+    """Approximate prompt tokens for the stage 1 messages array."""
+    tokens = estimate_tokens(user_query) + QUERY_WRAPPER_TOKENS + MESSAGE_OVERHEAD_TOKENS
+    if system_prompt:
+        tokens += estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+    for message in conversation_history or []:
+        tokens += estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
+
+
+# =============================================================================
+# TELEMETRY LOOKUP
+# =============================================================================
+
+def _model_profile(store: TelemetryStore, model: str, stage: str) -> Optional[Dict[str, Any]]:
+    """
+    Telemetry summary for a model, preferring the given stage.
+
+    Falls back to the model's busiest other stage, since completion length and
+    speed are mostly a property of the model. Returns None if no series has
+    at least ESTIMATOR_MIN_SAMPLES completion observations.
+    """
+    candidates = [
+        s for s in store.snapshot(model=model)
+        if s["completion_tokens"]["count"] >= ESTIMATOR_MIN_SAMPLES
+    ]
+    if not candidates:
+        return None
+    for snap in candidates:
+        if snap["stage"] == stage:
+            return snap
+    return max(candidates, key=lambda s: s["completion_tokens"]["count"])
+
+
+def _estimate_model(
+    model: str,
+    stage: str,
+    prompt_tokens: int,
+    max_tokens: int,
+    store: TelemetryStore,
+) -> ModelEstimate:
+    try:
+        from .routers.company.utils import get_model_pricing
+    except ImportError:
+        from backend.routers.company.utils import get_model_pricing
+
+    profile = _model_profile(store, model, stage)
+    if profile:
+        completion = profile["completion_tokens"]["mean"]
+        ttft_ms = profile["ttft_ms"]["p50"] or DEFAULT_TTFT_MS
+        tokens_per_sec = profile["tokens_per_sec"]["p50"] or DEFAULT_TOKENS_PER_SEC
+        source = "telemetry"
+    else:
+        completion = max_tokens * DEFAULT_COMPLETION_RATIO
+        ttft_ms = DEFAULT_TTFT_MS
+        tokens_per_sec = DEFAULT_TOKENS_PER_SEC
+        source = "default"
+
+    completion_tokens = int(min(completion, max_tokens))
+    pricing = get_model_pricing(model)
+    cost_dollars = (
+        prompt_tokens / 1_000_000 * pricing["input"]
+        + completion_tokens / 1_000_000 * pricing["output"]
+    )
+    return ModelEstimate(
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost_cents=cost_dollars * 100,
+        eta_ms=ttft_ms + completion_tokens / tokens_per_sec * 1000,
+        source=source,
+    )
+
+
+# =============================================================================
+# ESTIMATION
+# =============================================================================
+
+def estimate_council(
+    system_prompt: Optional[str],
+    conversation_history: Optional[List[Dict[str, str]]],
+    user_query: str,
+    stage_models: Dict[str, List[str]],
+    stage_max_tokens: Dict[str, int],
+    store: Optional[TelemetryStore] = None,
+) -> CouncilEstimate:
+    """
+    Estimate tokens, cost and ETA for each council stage.
+
+    Args:
+        system_prompt: Assembled stage 1 system prompt (reused for stages 2-3)
+        conversation_history: Council history from _build_council_conversation_history
+        user_query: The (image-enhanced) user query
+        stage_models: Models per stage; stage3 lists chairman models in fallback order
+        stage_max_tokens: max_tokens per stage from get_llm_config
+        store: Telemetry store (defaults to the global store)
+
+    Returns:
+        CouncilEstimate with per-stage, per-model predictions
+    """
+    store = store or get_telemetry_store()
+    system_tokens = estimate_tokens(system_prompt)
+    query_tokens = estimate_tokens(user_query)
+    history_tokens = sum(estimate_tokens(m.get("content", "")) for m in conversation_history or [])
+
+    # Stage 1: every council member sees the full prompt
+    stage1_prompt = estimate_prompt_tokens(system_prompt, conversation_history, user_query)
+    stage1 = StageEstimate("stage1", [
+        _estimate_model(model, "stage1", stage1_prompt, stage_max_tokens["stage1"], store)
+        for model in stage_models.get("stage1", [])
+    ])
+
+    # Stage 2: reviewers see the query plus every stage 1 response
+    stage2_prompt = system_tokens + query_tokens + stage1.completion_tokens + RANKING_PROMPT_TOKENS
+    stage2 = StageEstimate("stage2", [
+        _estimate_model(model, "stage2", stage2_prompt, stage_max_tokens["stage2"], store)
+        for model in stage_models.get("stage2", [])
+    ])
+
+    # Stage 3: the primary chairman sees history, responses and rankings
+    stage3_prompt = (
+        system_tokens + history_tokens + query_tokens
+        + stage1.completion_tokens + stage2.completion_tokens + CHAIRMAN_PROMPT_TOKENS
+    )
+    stage3 = StageEstimate("stage3", [
+        _estimate_model(model, "stage3", stage3_prompt, stage_max_tokens["stage3"], store)
+        for model in stage_models.get("stage3", [])[:1]
+    ])
+
+    return CouncilEstimate([stage1, stage2, stage3])
+
+
+async def estimate_council_session(
+    user_query: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    business_id: Optional[str] = None,
+    department_id: Optional[str] = None,
+    role_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    access_token: Optional[str] = None,
+    company_uuid: Optional[str] = None,
+    department_ids: Optional[List[str]] = None,
+    role_ids: Optional[List[str]] = None,
+    playbook_ids: Optional[List[str]] = None,
+    conversation_modifier: Optional[str] = None,
+    preset_override: Optional[str] = None,
+) -> CouncilEstimate:
+    """
+    Resolve models, LLM config and system prompt the way the council will,
+    then estimate the session.
+
+    Takes the same arguments as stage1_stream_responses.
+    """
+    try:
+        from .context_loader import get_system_prompt_with_context
+        from .llm_config import get_llm_config
+        from .model_registry import get_models, get_models_sync
+    except ImportError:
+        from backend.context_loader import get_system_prompt_with_context
+        from backend.llm_config import get_llm_config
+        from backend.model_registry import get_models, get_models_sync
+
+    effective_dept_id = department_ids[0] if department_ids else None
+    stage_max_tokens = {}
+    for stage in STAGES:
+        config = await get_llm_config(
+            department_id=effective_dept_id,
+            stage=stage,
+            # Only stage 1 applies the per-conversation modifier
+            conversation_modifier=conversation_modifier if stage == "stage1" else None,
+            preset_override=preset_override,
+        )
+        stage_max_tokens[stage] = config.get("max_tokens") or 0
+
+    stage_models = {
+        "stage1": await get_models("council_member") or get_models_sync("council_member"),
+        "stage2": (
+            await get_models("stage2_reviewer") or get_models_sync("stage2_reviewer")
+            or await get_models("council_member") or get_models_sync("council_member")
+        ),
+        "stage3": await get_models("chairman") or get_models_sync("chairman"),
+    }
+
+    system_prompt = await get_system_prompt_with_context(
+        business_id=business_id,
+        department_id=department_id,
+        role_id=role_id,
+        project_id=project_id,
+        access_token=access_token,
+        company_uuid=company_uuid,
+        department_ids=department_ids,
+        role_ids=role_ids,
+        playbook_ids=playbook_ids,
+        max_tokens=stage_max_tokens["stage1"],
+    )
+
+    return estimate_council(system_prompt, conversation_history, user_query, stage_models, stage_max_tokens)
+
+
+def remaining_budget_cents(rate_check: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    Remaining monthly budget from a check_rate_limits()-shaped result.
+
+    Returns None when the company has no budget limit.
+    """
+    budget = ((rate_check or {}).get("details") or {}).get("budget_monthly")
+    if not budget or not budget.get("limit"):
+        return None
+    return max(0.0, float(budget["limit"]) - float(budget.get("current") or 0))
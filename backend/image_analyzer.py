@@ -1,14 +1,21 @@
 """Image analysis using vision-capable models."""
 
 import base64
-import httpx
 import asyncio
 import logging
 import random
+import re
 
 logger = logging.getLogger(__name__)
-from typing import List, Dict, Any, Optional
-from .config import OPENROUTER_API_KEY, OPENROUTER_API_URL
+from typing import List, Dict, Any, Optional, AsyncIterator, Sequence
+from .config import (
+    OPENROUTER_API_KEY,
+    OPENROUTER_API_URL,
+    IMAGE_ANALYSIS_CONCURRENCY,
+    IMAGE_ANALYSIS_BATCH,
+    IMAGE_ANALYSIS_BATCH_SIZE,
+    IMAGE_ANALYSIS_TIMEOUT,
+)
 from . import openrouter  # Import to check MOCK_LLM at runtime
 from .model_registry import get_primary_model, get_primary_model_sync
 
@@ -21,6 +28,20 @@ async def _get_vision_model(company_id: Optional[str] = None) -> str:
     model = await get_primary_model('vision_analyzer', company_id)
     return model or VISION_MODEL
 
+
+# Vision models known to accept several images in one request (prefix match)
+MULTI_IMAGE_MODEL_PREFIXES = (
+    "openai/gpt-4o",
+    "openai/gpt-4.1",
+    "google/gemini",
+    "anthropic/claude",
+)
+
+
+def supports_multi_image(model: Optional[str]) -> bool:
+    """Whether a vision model can analyze several images in one request."""
+    return bool(model) and model.startswith(MULTI_IMAGE_MODEL_PREFIXES)
+
 # Mock mode delay range (seconds)
 MOCK_DELAY_MIN = 0.3
 MOCK_DELAY_MAX = 0.8
@@ -116,12 +137,48 @@ Be thorough but concise. This description will be used by other AI models that c
 """
 
 
+def _image_part(image: Dict[str, Any]) -> Dict[str, Any]:
+    base64_image = base64.b64encode(image['data']).decode('utf-8')
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{image.get('type', 'image/png')};base64,{base64_image}"
+        }
+    }
+
+
+async def _request_vision(model: str, content: List[Dict[str, Any]]) -> str:
+    """Send one vision request over the shared OpenRouter connection pool."""
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": content}],
+        "max_tokens": 2048,
+    }
+
+    client = openrouter.get_http_client()
+    response = await client.post(
+        OPENROUTER_API_URL,
+        headers=headers,
+        json=payload,
+        timeout=IMAGE_ANALYSIS_TIMEOUT,
+    )
+    response.raise_for_status()
+
+    data = response.json()
+    return data['choices'][0]['message'].get('content', '')
+
+
 async def analyze_image(
     image_data: bytes,
     image_type: str = "image/png",
     custom_prompt: Optional[str] = None,
     image_name: str = "image",
     company_id: Optional[str] = None,
+    model: Optional[str] = None,
 ) -> Optional[str]:
     """
     Analyze a single image using a vision-capable model.
@@ -132,6 +189,7 @@ async def analyze_image(
         custom_prompt: Optional custom analysis prompt
         image_name: Name of the image (for mock mode logging)
         company_id: Optional company ID for company-specific model selection
+        model: Vision model to use (resolved from the registry if not given)
 
     Returns:
         Text description of the image, or None if analysis failed
@@ -140,104 +198,99 @@ async def analyze_image(
     if openrouter.MOCK_LLM:
         return await _mock_analyze_image(image_name)
 
-    # Convert image to base64
-    base64_image = base64.b64encode(image_data).decode('utf-8')
-
-    # Build the message with image
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": custom_prompt or IMAGE_ANALYSIS_PROMPT
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:{image_type};base64,{base64_image}"
-                    }
-                }
-            ]
-        }
-    ]
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
     # Get vision model from registry (company-specific or global)
-    vision_model = await _get_vision_model(company_id)
+    vision_model = model or await _get_vision_model(company_id)
 
-    payload = {
-        "model": vision_model,
-        "messages": messages,
-        "max_tokens": 2048,
-    }
+    content = [
+        {"type": "text", "text": custom_prompt or IMAGE_ANALYSIS_PROMPT},
+        _image_part({"data": image_data, "type": image_type}),
+    ]
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            content = data['choices'][0]['message'].get('content', '')
-            return content
-
+        return await _request_vision(vision_model, content)
     except Exception as e:
-        logger.warning("Image analysis failed for model %s: %s", model, e)
+        logger.warning("Image analysis failed for model %s: %s", vision_model, e)
         return None
 
 
-async def analyze_images(
-    images: List[Dict[str, Any]],
+def _image_prompt(user_query: str, index: int) -> str:
+    return f"""The user is asking: "{user_query}"
+
+Analyze this image (Image {index}) in detail. Focus on aspects relevant to the user's question.
+Describe what you see, including any text, data, diagrams, or visual elements.
+Be thorough so that other AI models can understand the image without seeing it."""
+
+
+def _batch_prompt(user_query: str, indexes: Sequence[int]) -> str:
+    numbers = ", ".join(str(i) for i in indexes)
+    return f"""The user is asking: "{user_query}"
+
+You are given {len(indexes)} images, labelled Image {numbers}. Analyze each image separately and in detail.
+Focus on aspects relevant to the user's question.
+Describe what you see, including any text, data, diagrams, or visual elements.
+Be thorough so that other AI models can understand each image without seeing it.
+
+Start the analysis of each image with a line containing only "### Image <number>"."""
+
+
+_IMAGE_HEADING = re.compile(r"^#{1,6}\s*\**\s*Image\s+(\d+)\b.*$", re.MULTILINE | re.IGNORECASE)
+
+
+def _split_batch_response(content: str, indexes: Sequence[int]) -> Dict[int, str]:
+    """Split a batched answer into per-image descriptions by its headings."""
+    sections: Dict[int, str] = {}
+    headings = list(_IMAGE_HEADING.finditer(content or ""))
+    for n, heading in enumerate(headings):
+        index = int(heading.group(1))
+        end = headings[n + 1].start() if n + 1 < len(headings) else len(content)
+        text = content[heading.end():end].strip().strip("-").strip()
+        if index in indexes and text and index not in sections:
+            sections[index] = text
+    return sections
+
+
+async def _analyze_batch(
+    images: Dict[int, Dict[str, Any]],
     user_query: str,
-    company_id: Optional[str] = None,
-) -> str:
+    model: str,
+) -> Dict[int, str]:
     """
-    Analyze multiple images and create a combined context.
-
-    Args:
-        images: List of image dicts with 'data' (bytes), 'type' (MIME type), 'name' (filename)
-        user_query: The user's question to provide context for analysis
-        company_id: Optional company ID for company-specific model selection
+    Analyze several images in one multimodal request.
 
     Returns:
-        Combined text description of all images for the council
+        Descriptions by image number; images missing from the answer are omitted
     """
-    if not images:
-        return ""
+    indexes = sorted(images)
+    try:
+        # Inside the try: an unreadable image fails the batch, and each image is retried alone
+        content: List[Dict[str, Any]] = [{"type": "text", "text": _batch_prompt(user_query, indexes)}]
+        for i in indexes:
+            content.append({"type": "text", "text": f"Image {i}:"})
+            content.append(_image_part(images[i]))
+        return _split_batch_response(await _request_vision(model, content), indexes)
+    except Exception as e:
+        logger.warning("Batched image analysis failed for model %s: %s", model, e)
+        return {}
 
-    descriptions = []
 
-    for i, img in enumerate(images, 1):
-        # Create a contextual prompt
-        prompt = f"""The user is asking: "{user_query}"
+def _plan_requests(count: int, model: Optional[str], batch: bool) -> List[List[int]]:
+    """Group image numbers (1-based) into vision requests."""
+    indexes = list(range(1, count + 1))
+    size = max(1, IMAGE_ANALYSIS_BATCH_SIZE)
+    if not batch or size == 1 or not supports_multi_image(model):
+        return [[i] for i in indexes]
+    return [indexes[n:n + size] for n in range(0, count, size)]
 
-Analyze this image (Image {i}) in detail. Focus on aspects relevant to the user's question.
-Describe what you see, including any text, data, diagrams, or visual elements.
-Be thorough so that other AI models can understand the image without seeing it."""
 
-        description = await analyze_image(
-            image_data=img['data'],
-            image_type=img.get('type', 'image/png'),
-            custom_prompt=prompt,
-            image_name=img.get('name', f'image_{i}'),
-            company_id=company_id
-        )
+def _image_label(index: int, image: Dict[str, Any]) -> str:
+    return f"**[Image {index}: {image.get('name', 'Attached Image')}]**"
 
-        if description:
-            descriptions.append(f"**[Image {i}: {img.get('name', 'Attached Image')}]**\n{description}")
-        else:
-            descriptions.append(f"**[Image {i}: {img.get('name', 'Attached Image')}]**\n(Unable to analyze this image)")
 
-    # Combine all descriptions
-    combined = "\n\n---\n\n".join(descriptions)
+def _combine_descriptions(images: List[Dict[str, Any]], descriptions: Dict[int, Optional[str]]) -> str:
+    combined = "\n\n---\n\n".join(
+        f"{_image_label(i, img)}\n{descriptions.get(i) or '(Unable to analyze this image)'}"
+        for i, img in enumerate(images, 1)
+    )
 
     return f"""
 ## Attached Images Analysis
@@ -252,6 +305,129 @@ Please consider these image descriptions when responding to the user's question.
 """
 
 
+async def stream_image_analysis(
+    images: List[Dict[str, Any]],
+    user_query: str,
+    company_id: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    batch: Optional[bool] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze multiple images concurrently, yielding each result as it lands.
+
+    The vision model is resolved once, and at most `concurrency` vision
+    requests run at a time. In batch mode, models that accept several images
+    get up to IMAGE_ANALYSIS_BATCH_SIZE per request.
+
+    Args:
+        images: List of image dicts with 'data' (bytes), 'type' (MIME type), 'name' (filename)
+        user_query: The user's question to provide context for analysis
+        company_id: Optional company ID for company-specific model selection
+        concurrency: Max parallel vision requests (default IMAGE_ANALYSIS_CONCURRENCY)
+        batch: Send several images per request (default IMAGE_ANALYSIS_BATCH)
+
+    Yields:
+        {"type": "image_analysis_progress", "index", "name", "success",
+         "description", "completed", "total"} per image, in completion order,
+        then {"type": "image_analysis_result", "analysis", "analyzed", "failed"}
+        with the combined text for the council
+    """
+    if not images:
+        yield {"type": "image_analysis_result", "analysis": "", "analyzed": 0, "failed": 0}
+        return
+
+    model = None if openrouter.MOCK_LLM else await _get_vision_model(company_id)
+    semaphore = asyncio.Semaphore(max(1, concurrency or IMAGE_ANALYSIS_CONCURRENCY))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def analyze_one(i: int) -> None:
+        img = images[i - 1]
+        try:
+            async with semaphore:
+                description = await analyze_image(
+                    image_data=img['data'],
+                    image_type=img.get('type', 'image/png'),
+                    custom_prompt=_image_prompt(user_query, i),
+                    image_name=img.get('name', f'image_{i}'),
+                    company_id=company_id,
+                    model=model,
+                )
+        except Exception as e:
+            logger.warning("Image analysis failed for image %d: %s", i, e)
+            description = None
+        finished.put_nowait((i, description))
+
+    async def analyze_group(indexes: List[int]) -> None:
+        if len(indexes) == 1:
+            await analyze_one(indexes[0])
+            return
+        async with semaphore:
+            sections = await _analyze_batch({i: images[i - 1] for i in indexes}, user_query, model)
+        for i in indexes:
+            if i in sections:
+                finished.put_nowait((i, sections[i]))
+        # Retry whatever the batched answer didn't cover one by one
+        await asyncio.gather(*(analyze_one(i) for i in indexes if i not in sections))
+
+    use_batch = IMAGE_ANALYSIS_BATCH if batch is None else batch
+    tasks = [
+        asyncio.create_task(analyze_group(group))
+        for group in _plan_requests(len(images), model, use_batch)
+    ]
+
+    descriptions: Dict[int, Optional[str]] = {}
+    try:
+        for completed in range(1, len(images) + 1):
+            i, description = await finished.get()
+            # Empty answers count as failures everywhere (progress, totals, combined text)
+            description = description or None
+            descriptions[i] = description
+            yield {
+                "type": "image_analysis_progress",
+                "index": i,
+                "name": images[i - 1].get('name', 'Attached Image'),
+                "success": description is not None,
+                "description": description,
+                "completed": completed,
+                "total": len(images),
+            }
+    finally:
+        # Client disconnected or analysis finished - don't leave requests running
+        for task in tasks:
+            task.cancel()
+
+    analyzed = sum(1 for d in descriptions.values() if d is not None)
+    yield {
+        "type": "image_analysis_result",
+        "analysis": _combine_descriptions(images, descriptions),
+        "analyzed": analyzed,
+        "failed": len(images) - analyzed,
+    }
+
+
+async def analyze_images(
+    images: List[Dict[str, Any]],
+    user_query: str,
+    company_id: Optional[str] = None,
+) -> str:
+    """
+    Analyze multiple images and create a combined context.
+
+    Args:
+        images: List of image dicts with 'data' (bytes), 'type' (MIME type), 'name' (filename)
+        user_query: The user's question to provide context for analysis
+        company_id: Optional company ID for company-specific model selection
+
+    Returns:
+        Combined text description of all images for the council
+    """
+    analysis = ""
+    async for event in stream_image_analysis(images, user_query, company_id=company_id):
+        if event["type"] == "image_analysis_result":
+            analysis = event["analysis"]
+    return analysis
+
+
 def format_query_with_images(
     original_query: str,
     image_analysis: str,
@@ -0,0 +1,445 @@
+"""
+Batched ingestion for analytics rows (usage_events, session_usage, activity_logs).
+
+Each council run, title generation, summary and write-assist call used to do
+a single-row insert on the request path. Rows are now buffered per table and
+written as multi-row inserts:
+
+1. BUFFER - enqueue() appends to an in-memory per-table buffer and returns
+   immediately. A table is flushed once it reaches INGEST_BATCH_SIZE rows,
+   and every INGEST_FLUSH_INTERVAL seconds by the background flusher.
+2. SPOOL - Enqueued rows are also appended to a per-process NDJSON spool file.
+   The spool is rewritten with whatever is still buffered after each flush,
+   and on startup spool files left by dead processes are claimed and replayed.
+3. RETRY - A transient failure (network, 5xx, connection/serialization
+   errors) puts the batch back at the front of the buffer; the next flush
+   retries it with exponential backoff. Beyond INGEST_MAX_BUFFERED rows the
+   oldest are dropped and counted.
+4. REJECT - A batch refused for a permanent reason (constraint, bad column,
+   invalid data) is bisected until the offending rows are isolated. Those are
+   logged as INGEST_ROW_REJECTED and counted; the rest are written.
+
+Backlog, flushed, failed, rejected and dropped counts are exposed via stats() for
+/health/metrics and Prometheus.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+try:
+    from .config import (
+        INGEST_ENABLED,
+        INGEST_BATCH_SIZE,
+        INGEST_FLUSH_INTERVAL,
+        INGEST_MAX_BUFFERED,
+        INGEST_SPOOL_DIR,
+    )
+    from .security import log_app_event
+except ImportError:
+    from backend.config import (
+        INGEST_ENABLED,
+        INGEST_BATCH_SIZE,
+        INGEST_FLUSH_INTERVAL,
+        INGEST_MAX_BUFFERED,
+        INGEST_SPOOL_DIR,
+    )
+    from backend.security import log_app_event
+
+logger = logging.getLogger(__name__)
+
+# Tables that may be ingested in batches
+INGEST_TABLES = ("usage_events", "session_usage", "activity_logs")
+
+# Longest wait between retries after repeated flush failures (seconds)
+MAX_RETRY_BACKOFF = 60.0
+
+# SQLSTATE classes worth retrying: connection exception, transaction rollback
+# (serialization failure, deadlock), insufficient resources, operator
+# intervention, system error
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57", "58")
+# PostgREST codes for an unreachable or overloaded database
+TRANSIENT_POSTGREST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def _default_spool_dir() -> Optional[str]:
+    if INGEST_SPOOL_DIR.lower() == "off":
+        return None
+    return INGEST_SPOOL_DIR or os.path.join(tempfile.gettempdir(), "axcouncil-ingest")
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Whether a failed insert is worth retrying as-is.
+
+    Errors without a database error code (network failures, timeouts,
+    unexpected exceptions) are treated as transient; errors the database
+    attributes to the rows themselves are not.
+    """
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    code = getattr(error, "code", None)
+    if not isinstance(code, str) or not code:
+        return True
+    if code.isdigit() and len(code) == 3:
+        # HTTP status from a non-JSON error response
+        return int(code) >= 500 or code == "429"
+    if code.startswith("PGRST"):
+        return code in TRANSIENT_POSTGREST_CODES
+    return code[:2] in TRANSIENT_SQLSTATE_CLASSES
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+# =============================================================================
+# INGESTER
+# =============================================================================
+
+class BatchIngester:
+    """Per-table row buffers flushed as multi-row inserts."""
+
+    def __init__(
+        self,
+        batch_size: int = INGEST_BATCH_SIZE,
+        max_buffered: int = INGEST_MAX_BUFFERED,
+        spool_dir: Optional[str] = None,
+        client_factory=None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_buffered = max(self.batch_size, max_buffered)
+        self.spool_dir = spool_dir
+        self._client_factory = client_factory
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {table: deque() for table in INGEST_TABLES}
+        self._flush_lock = asyncio.Lock()
+        self._pending_flush: Optional[asyncio.Task] = None
+        self._spool = None
+        self._retry_at = 0.0
+        self._consecutive_failures = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+        self.rejected_rows = 0
+        self.last_flush_at: Optional[float] = None
+
+    # -------------------------------------------------------------------------
+    # Spool
+    # -------------------------------------------------------------------------
+
+    @property
+    def spool_path(self) -> Optional[str]:
+        if not self.spool_dir:
+            return None
+        return os.path.join(self.spool_dir, f"ingest-{os.getpid()}.ndjson")
+
+    def _spool_write(self, lines: List[str], truncate: bool = False) -> None:
+        path = self.spool_path
+        if path is None:
+            return
+        try:
+            if truncate and self._spool is not None:
+                self._spool.close()
+                self._spool = None
+            if self._spool is None:
+                os.makedirs(self.spool_dir, exist_ok=True)
+                self._spool = open(path, "w" if truncate else "a", encoding="utf-8")
+            if lines:
+                self._spool.write("".join(lines))
+            self._spool.flush()
+        except OSError as e:
+            logger.debug("Ingest spool write failed: %s", e)
+
+    def _rewrite_spool(self) -> None:
+        """Replace the spool with the rows still buffered."""
+        self._spool_write(
+            [json.dumps({"table": table, "row": row}, default=str) + "\n"
+             for table, buffer in self._buffers.items() for row in buffer],
+            truncate=True,
+        )
+
+    def recover(self) -> int:
+        """
+        Load rows from spool files of processes that are no longer running.
+
+        Each file is renamed before reading so only one worker claims it.
+
+        Returns:
+            Number of rows recovered
+        """
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+
+        recovered = 0
+        for path in glob.glob(os.path.join(self.spool_dir, "ingest-*.ndjson")):
+            pid_part = os.path.basename(path)[len("ingest-"):-len(".ndjson")]
+            if not pid_part.isdigit():
+                continue
+            pid = int(pid_part)
+            # Our own pid is a previous container run unless we've opened the spool
+            if (pid == os.getpid() and self._spool is not None) or (pid != os.getpid() and _pid_alive(pid)):
+                continue
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # Another worker got it first
+            try:
+                with open(claimed, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # Torn final line from a crash
+                        if entry.get("table") in self._buffers and isinstance(entry.get("row"), dict):
+                            self._append(entry["table"], entry["row"])
+                            recovered += 1
+            finally:
+                os.remove(claimed)
+
+        if recovered:
+            self._rewrite_spool()
+            log_app_event("INGEST_SPOOL_RECOVERED", level="INFO", rows=recovered)
+        return recovered
+
+    # -------------------------------------------------------------------------
+    # Buffering
+    # -------------------------------------------------------------------------
+
+    def _append(self, table: str, row: Dict[str, Any]) -> None:
+        self._buffers[table].append(row)
+        while self.backlog() > self.max_buffered:
+            largest = max(self._buffers.values(), key=len)
+            largest.popleft()
+            self.dropped_rows += 1
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> None:
+        """
+        Buffer a row for insertion. Never blocks on the database.
+
+        Raises:
+            ValueError: If the table isn't batch-ingested
+        """
+        if table not in self._buffers:
+            raise ValueError(f"Table {table} is not batch-ingested")
+
+        self._append(table, row)
+        self._spool_write([json.dumps({"table": table, "row": row}, default=str) + "\n"])
+
+        if len(self._buffers[table]) >= self.batch_size and time.time() >= self._retry_at:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._pending_flush is not None and not self._pending_flush.done():
+            return
+        try:
+            self._pending_flush = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass  # No loop (sync caller); the background flusher will pick it up
+
+    def backlog(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    # -------------------------------------------------------------------------
+    # Flushing
+    # -------------------------------------------------------------------------
+
+    def _client(self):
+        if self._client_factory is not None:
+            return self._client_factory()
+        try:
+            from .database import get_supabase_service
+        except ImportError:
+            from backend.database import get_supabase_service
+        return get_supabase_service()
+
+    async def _insert(self, client, table: str, rows: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(
+            lambda: client.table(table).insert(
+                rows, returning="minimal", default_to_null=False
+            ).execute()
+        )
+
+    def _reject(self, table: str, row: Dict[str, Any], error: Exception) -> None:
+        """Give up on a row the database refuses on its own."""
+        self.rejected_rows += 1
+        log_app_event("INGEST_ROW_REJECTED", level="WARNING",
+                      table=table, error=str(error), row=json.dumps(row, default=str)[:2000])
+
+    async def flush(self, force: bool = False) -> int:
+        """
+        Write buffered rows in batches of batch_size.
+
+        Batches refused for a permanent reason are bisected so only the bad
+        rows are rejected. Transient failures put the rest back for a retry,
+        which is skipped while backing off unless force is set.
+
+        Returns:
+            Number of rows written
+        """
+        if not force and time.time() < self._retry_at:
+            return 0
+
+        async with self._flush_lock:
+            written = 0
+            rejected = 0
+            failed = False
+            client = None
+            for table, buffer in self._buffers.items():
+                table_failed = False
+                while buffer and not table_failed:
+                    # Chunks still to write, in buffer order
+                    pending = [[buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]]
+                    while pending:
+                        rows = pending.pop(0)
+                        try:
+                            client = client or self._client()
+                            await self._insert(client, table, rows)
+                            written += len(rows)
+                        except Exception as e:
+                            if _is_transient(e):
+                                buffer.extendleft(reversed([row for chunk in [rows] + pending for row in chunk]))
+                                table_failed = failed = True
+                                self.failed_flushes += 1
+                                log_app_event("INGEST_FLUSH_FAILED", level="WARNING",
+                                              table=table, rows=len(rows), error=str(e))
+                                break
+                            if len(rows) == 1:
+                                self._reject(table, rows[0], e)
+                                rejected += 1
+                            else:
+                                middle = len(rows) // 2
+                                pending[:0] = [rows[:middle], rows[middle:]]
+
+            if failed:
+                self._consecutive_failures += 1
+                self._retry_at = time.time() + min(
+                    MAX_RETRY_BACKOFF, INGEST_FLUSH_INTERVAL * 2 ** self._consecutive_failures
+                )
+            else:
+                self._consecutive_failures = 0
+                self._retry_at = 0.0
+
+            if written:
+                self.flushed_rows += written
+                self.last_flush_at = time.time()
+            if written or rejected:
+                self._rewrite_spool()
+            return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": INGEST_ENABLED,
+            "backlog": self.backlog(),
+            "backlog_by_table": {table: len(buffer) for table, buffer in self._buffers.items()},
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "dropped_rows": self.dropped_rows,
+            "rejected_rows": self.rejected_rows,
+            "retrying": time.time() < self._retry_at,
+            "last_flush_at": self.last_flush_at,
+            "spool_path": self.spool_path,
+        }
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+_ingester: Optional[BatchIngester] = None
+
+
+def get_ingester() -> BatchIngester:
+    """Get the process-wide ingester."""
+    global _ingester
+    if _ingester is None:
+        _ingester = BatchIngester(spool_dir=_default_spool_dir())
+    return _ingester
+
+
+async def ingest_row(table: str, row: Dict[str, Any], raise_errors: bool = False) -> bool:
+    """
+    Queue a row for batched insertion, or insert it directly when ingestion is
+    disabled.
+
+    Args:
+        raise_errors: Re-raise a failed direct insert so the caller can report
+            the cause (usage and billing rows); otherwise it is only logged
+
+    Returns:
+        True if the row was queued or written
+    """
+    if INGEST_ENABLED:
+        get_ingester().enqueue(table, row)
+        return True
+
+    try:
+        client = get_ingester()._client()
+        await asyncio.to_thread(lambda: client.table(table).insert(row).execute())
+        return True
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.debug("%s insert failed: %s", table, e)
+        return False
+
+
+# =============================================================================
+# BACKGROUND FLUSHER
+# =============================================================================
+
+_flush_task: Optional[asyncio.Task] = None
+
+
+async def _flush_loop(interval: float) -> None:
+    """Background loop that flushes buffered rows every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await get_ingester().flush()
+        except Exception as e:
+            logger.debug("Ingest flush loop error: %s", e)
+
+
+def start_ingest_flusher(interval: float = INGEST_FLUSH_INTERVAL) -> Optional[asyncio.Task]:
+    """Replay orphaned spool files and start the flush task (no-op if disabled or running)."""
+    global _flush_task
+    if not INGEST_ENABLED or interval <= 0:
+        return None
+    get_ingester().recover()
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop(interval))
+    return _flush_task
+
+
+async def stop_ingest_flusher(final_flush: bool = True) -> None:
+    """Stop the flush task, optionally writing what's buffered first."""
+    global _flush_task
+    if _flush_task is not None and not _flush_task.done():
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+    _flush_task = None
+    if final_flush and INGEST_ENABLED:
+        ingester = get_ingester()
+        await ingester.flush(force=True)
+        ingester.close()
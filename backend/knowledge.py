@@ -2,7 +2,7 @@
 
 from typing import Optional, List, Dict, Any
 from .database import get_supabase_service, get_supabase_with_auth
-from .security import verify_user_company_access, verify_user_entry_access, log_security_event, log_app_event, escape_sql_like_pattern
+from .security import verify_user_company_access, verify_user_entry_access, log_security_event, log_app_event
 
 
 def create_knowledge_entry(
@@ -165,15 +165,13 @@ def get_knowledge_entries(
     if category:
         query = query.eq("category", category)
 
-    # Search in title, problem_statement, and decision_text
+    # Search in title, problem_statement, and decision_text (GIN-indexed search_vector)
     if search:
-        escaped_search = escape_sql_like_pattern(search)
-        search_pattern = f"%{escaped_search}%"
-        query = query.or_(
-            f"title.ilike.{search_pattern},"
-            f"problem_statement.ilike.{search_pattern},"
-            f"decision_text.ilike.{search_pattern}"
-        )
+        from .search import prefix_tsquery
+        tsquery = prefix_tsquery(search)
+        if tsquery is None:
+            return []
+        query = query.filter("search_vector", "fts(simple)", tsquery)
 
     result = query.execute()
     return result.data or []
@@ -357,6 +355,22 @@ def get_knowledge_count_for_conversation(
     return result.count if result.count is not None else 0
 
 
+def get_knowledge_entry_company_id(
+    entry_id: str,
+    access_token: Optional[str] = None
+) -> Optional[str]:
+    """Company of a knowledge entry (RLS-scoped when a token is given), or None."""
+    client = get_supabase_with_auth(access_token) if access_token else get_supabase_service()
+    result = (client
+        .table("knowledge_entries")
+        .select("company_id")
+        .eq("id", entry_id)
+        .limit(1)
+        .execute())
+
+    return result.data[0].get("company_id") if result.data else None
+
+
 def deactivate_knowledge_entry(
     entry_id: str,
     user_id: str,
@@ -1,7 +1,8 @@
 """Model performance leaderboard storage and analytics using Supabase."""
 
-from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
 from .database import get_supabase_service
 from .security import log_error
 
@@ -26,7 +27,9 @@ def record_session_rankings(
 
     supabase = get_supabase_service()
 
-    # Insert each model's ranking as a separate row
+    # Insert each model's ranking as a separate row, in one statement so the
+    # rollup trigger sees the whole session (and its winner) at once
+    created_at = datetime.now(timezone.utc).isoformat()
     records = []
     for ranking in aggregate_rankings:
         records.append({
@@ -36,126 +39,132 @@ def record_session_rankings(
             "model": ranking["model"],
             "average_rank": ranking["average_rank"],
             "rankings_count": ranking.get("rankings_count", 1),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": created_at
         })
 
     try:
         supabase.table('model_rankings').insert(records).execute()
+        invalidate_leaderboard_cache()
     except Exception as e:
         log_error("record_session_rankings", e, resource_id=conversation_id)
 
 
-def _aggregate_leaderboard_data(data: List[Dict]) -> List[Dict[str, Any]]:
+# =============================================================================
+# ROLLUP SNAPSHOTS
+# =============================================================================
+# Leaderboards read pre-aggregated rollups (model_leaderboard_rollups, updated
+# by a trigger on model_rankings). Each window's rows are cached per process
+# and dropped when this process records a session.
+
+LEADERBOARD_WINDOWS: Dict[str, Optional[int]] = {"7d": 7, "30d": 30, "all": None}
+
+_LEADERBOARD_CACHE_TTL = 60  # seconds
+_leaderboard_cache: Dict[str, Tuple[List[Dict[str, Any]], float]] = {}
+
+
+def _window_since(window: str) -> Optional[str]:
+    """First UTC day included in a window, or None for all time."""
+    if window not in LEADERBOARD_WINDOWS:
+        raise ValueError(f"Unknown leaderboard window: {window}")
+    days = LEADERBOARD_WINDOWS[window]
+    if days is None:
+        return None
+    return (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+
+
+def _load_rollups(window: str) -> List[Dict[str, Any]]:
+    """
+    Per (department, model) sums for a window, from the cached snapshot.
+
+    Raises:
+        ValueError: If the window is unknown
+    """
+    since = _window_since(window)
+    cached = _leaderboard_cache.get(window)
+    if cached and time.time() < cached[1]:
+        return cached[0]
+
+    supabase = get_supabase_service()
+    rows = supabase.rpc('get_model_leaderboard', {'p_since': since}).execute().data or []
+    _leaderboard_cache[window] = (rows, time.time() + _LEADERBOARD_CACHE_TTL)
+    return rows
+
+
+def invalidate_leaderboard_cache() -> None:
+    """Drop cached snapshots so the next read sees new sessions."""
+    _leaderboard_cache.clear()
+
+
+def _rollup_leaderboard(rows: List[Dict]) -> List[Dict[str, Any]]:
     """
-    Efficient single-pass aggregation of ranking data.
+    Combine rollup rows into a leaderboard sorted by average rank (lower is better).
 
     Args:
-        data: List of ranking rows from database
+        rows: Rollup rows with model, rank_sum, rank_count, sessions and wins
 
     Returns:
-        Sorted leaderboard list
+        List of {model, avg_rank, sessions, wins, win_rate}
     """
-    if not data:
-        return []
+    totals: Dict[str, Dict[str, float]] = {}
+    for row in rows:
+        stats = totals.setdefault(row['model'], {"rank_sum": 0.0, "rank_count": 0, "sessions": 0, "wins": 0})
+        for key in stats:
+            stats[key] += row.get(key) or 0
 
-    # Single pass: collect all stats
-    model_stats: Dict[str, Dict] = {}
-    conversation_rankings: Dict[str, List] = {}
-
-    for row in data:
-        model = row['model']
-        conv_id = row['conversation_id']
-        avg_rank = float(row['average_rank'])
-
-        # Initialize model stats
-        if model not in model_stats:
-            model_stats[model] = {
-                "total_rank": 0.0,
-                "count": 0,
-                "conversations": set(),
-                "wins": 0
-            }
-
-        # Accumulate stats
-        model_stats[model]["total_rank"] += avg_rank
-        model_stats[model]["count"] += 1
-        model_stats[model]["conversations"].add(conv_id)
-
-        # Track rankings per conversation for win calculation
-        if conv_id not in conversation_rankings:
-            conversation_rankings[conv_id] = []
-        conversation_rankings[conv_id].append((model, avg_rank))
-
-    # Count wins: lowest average_rank in each conversation
-    for conv_id, rankings in conversation_rankings.items():
-        if rankings:
-            # Find minimum rank model
-            winner = min(rankings, key=lambda x: x[1])[0]
-            if winner in model_stats:
-                model_stats[winner]["wins"] += 1
-
-    # Build final leaderboard
     leaderboard = []
-    for model, stats in model_stats.items():
-        sessions = len(stats["conversations"])
-        if sessions > 0:
-            avg_rank = stats["total_rank"] / stats["count"]
-            win_rate = (stats["wins"] / sessions) * 100
+    for model, stats in totals.items():
+        if stats["rank_count"] > 0 and stats["sessions"] > 0:
             leaderboard.append({
                 "model": model,
-                "avg_rank": round(avg_rank, 2),
-                "sessions": sessions,
-                "wins": stats["wins"],
-                "win_rate": round(win_rate, 1)
+                "avg_rank": round(stats["rank_sum"] / stats["rank_count"], 2),
+                "sessions": int(stats["sessions"]),
+                "wins": int(stats["wins"]),
+                "win_rate": round(stats["wins"] / stats["sessions"] * 100, 1)
             })
 
-    # Sort by avg_rank (lower is better)
     leaderboard.sort(key=lambda x: x["avg_rank"])
     return leaderboard
 
 
-def get_overall_leaderboard() -> List[Dict[str, Any]]:
+def get_overall_leaderboard(window: str = "all") -> List[Dict[str, Any]]:
     """
     Get the overall leaderboard sorted by average rank (lower is better).
 
+    Args:
+        window: Time window - "7d", "30d" or "all"
+
     Returns:
         List of {model, avg_rank, sessions, wins, win_rate}
-    """
-    supabase = get_supabase_service()
 
+    Raises:
+        ValueError: If the window is unknown
+    """
+    _window_since(window)
     try:
-        # Only select needed columns (not *)
-        result = supabase.table('model_rankings').select(
-            'model, conversation_id, average_rank'
-        ).execute()
-
-        return _aggregate_leaderboard_data(result.data or [])
-
+        return _rollup_leaderboard(_load_rollups(window))
     except Exception as e:
         log_error("get_global_leaderboard", e)
         return []
 
 
-def get_department_leaderboard(department: str) -> List[Dict[str, Any]]:
+def get_department_leaderboard(department: str, window: str = "all") -> List[Dict[str, Any]]:
     """
     Get the leaderboard for a specific department.
 
     Args:
         department: The department to filter by
+        window: Time window - "7d", "30d" or "all"
 
     Returns:
         List of {model, avg_rank, sessions, wins, win_rate}
-    """
-    supabase = get_supabase_service()
 
+    Raises:
+        ValueError: If the window is unknown
+    """
+    _window_since(window)
     try:
-        # Only select needed columns with department filter
-        result = supabase.table('model_rankings').select(
-            'model, conversation_id, average_rank'
-        ).eq('department', department).execute()
-
-        return _aggregate_leaderboard_data(result.data or [])
-
+        rows = [row for row in _load_rollups(window) if row['department'] == department]
+        return _rollup_leaderboard(rows)
     except Exception as e:
         log_error("get_department_leaderboard", e, resource_id=department)
         return []
@@ -209,44 +218,37 @@ def _resolve_department_names_batch(supabase, dept_ids: List[str]) -> Dict[str,
     return result
 
 
-def get_all_department_leaderboards() -> Dict[str, List[Dict[str, Any]]]:
+def get_all_department_leaderboards(window: str = "all") -> Dict[str, List[Dict[str, Any]]]:
     """
     Get leaderboards for all departments.
-    Optimized to fetch all data in one query and aggregate in Python.
+
+    Args:
+        window: Time window - "7d", "30d" or "all"
 
     Returns:
         Dict mapping department name to leaderboard list
-    """
-    supabase = get_supabase_service()
 
+    Raises:
+        ValueError: If the window is unknown
+    """
+    _window_since(window)
     try:
-        # Fetch all ranking data in one query
-        result = supabase.table('model_rankings').select(
-            'model, conversation_id, average_rank, department'
-        ).execute()
-
-        if not result.data:
+        rows = _load_rollups(window)
+        if not rows:
             return {}
 
-        # Group data by department
+        # Group rollups by department
         dept_data: Dict[str, List] = {}
-        all_dept_ids = set()
-
-        for row in result.data:
-            dept = row['department']
-            all_dept_ids.add(dept)
-            if dept not in dept_data:
-                dept_data[dept] = []
-            dept_data[dept].append(row)
+        for row in rows:
+            dept_data.setdefault(row['department'], []).append(row)
 
         # Batch resolve department names
-        name_map = _resolve_department_names_batch(supabase, list(all_dept_ids))
+        name_map = _resolve_department_names_batch(get_supabase_service(), list(dept_data))
 
-        # Build leaderboards using aggregation helper
         leaderboards = {}
-        for dept_id, rows in dept_data.items():
+        for dept_id, dept_rows in dept_data.items():
             display_name = name_map.get(dept_id, dept_id)
-            leaderboards[display_name] = _aggregate_leaderboard_data(rows)
+            leaderboards[display_name] = _rollup_leaderboard(dept_rows)
 
         return leaderboards
 
@@ -255,15 +257,21 @@ def get_all_department_leaderboards() -> Dict[str, List[Dict[str, Any]]]:
         return {}
 
 
-def get_leaderboard_summary() -> Dict[str, Any]:
+def get_leaderboard_summary(window: str = "all") -> Dict[str, Any]:
     """
     Get a summary of the leaderboard with overall and per-department winners.
 
+    Args:
+        window: Time window - "7d", "30d" or "all"
+
     Returns:
         Dict with overall winner and department winners
+
+    Raises:
+        ValueError: If the window is unknown
     """
-    overall = get_overall_leaderboard()
-    departments = get_all_department_leaderboards()
+    overall = get_overall_leaderboard(window)
+    departments = get_all_department_leaderboards(window)
 
     # Total sessions = max sessions of any single model (since all models should
     # participate in the same sessions, the max is the most accurate count)
@@ -277,7 +285,8 @@ def get_leaderboard_summary() -> Dict[str, Any]:
             "total_sessions": total_sessions,
             "leaderboard": overall
         },
-        "departments": {}
+        "departments": {},
+        "window": window
     }
 
     for dept, leaderboard in departments.items():
@@ -22,6 +22,11 @@ Usage:
 from typing import Dict, Any, Optional
 import logging
 
+try:
+    from .log_pipeline import should_log_event
+except ImportError:
+    from backend.log_pipeline import should_log_event
+
 # Use module-level logger for debug output
 _logger = logging.getLogger(__name__)
 
@@ -88,8 +93,10 @@ async def get_llm_config(
     # Normalize preset_override (lowercase, strip whitespace)
     normalized_preset = (preset_override.lower().strip() if preset_override else None)
 
-    # DEBUG: Log config selection logic
-    _logger.info(f"[CONFIG_DEBUG] {stage}: preset_override={preset_override} (normalized={normalized_preset}), department_id={department_id}")
+    # DEBUG: Log config selection logic (sampled: this runs for every stage of every council)
+    debug_log = should_log_event("CONFIG_DEBUG")
+    if debug_log:
+        _logger.info(f"[CONFIG_DEBUG] {stage}: preset_override={preset_override} (normalized={normalized_preset}), department_id={department_id}")
 
     # If preset_override is provided, use fallback configs directly
     # This bypasses the department lookup entirely
@@ -97,7 +104,8 @@ async def get_llm_config(
         preset_config = FALLBACK_CONFIGS[normalized_preset]
         if stage in preset_config:
             config = preset_config[stage].copy()
-            _logger.info(f"[CONFIG_DEBUG] Using preset_override '{normalized_preset}' for {stage}: max_tokens={config.get('max_tokens')}")
+            if debug_log:
+                _logger.info(f"[CONFIG_DEBUG] Using preset_override '{normalized_preset}' for {stage}: max_tokens={config.get('max_tokens')}")
     elif department_id:
         try:
             from .database import get_supabase_service
@@ -119,15 +127,17 @@ async def get_llm_config(
             _logger.warning(f"get_llm_config failed for {department_id}: {type(e).__name__} - using fallback")
 
     # DEBUG: Log final config if still using default
-    if config.get('max_tokens') == DEFAULT_STAGE_CONFIG.get('max_tokens'):
+    if debug_log and config.get('max_tokens') == DEFAULT_STAGE_CONFIG.get('max_tokens'):
         _logger.info(f"[CONFIG_DEBUG] Using DEFAULT_STAGE_CONFIG for {stage}: max_tokens={config.get('max_tokens')}")
 
     # Apply conversation modifier (bounded adjustment)
     if conversation_modifier:
         config = _apply_modifier(config, conversation_modifier)
-        _logger.info(f"[CONFIG_DEBUG] Applied modifier '{conversation_modifier}' for {stage}: max_tokens={config.get('max_tokens')}")
+        if debug_log:
+            _logger.info(f"[CONFIG_DEBUG] Applied modifier '{conversation_modifier}' for {stage}: max_tokens={config.get('max_tokens')}")
 
-    _logger.info(f"[CONFIG_DEBUG] Final config for {stage}: {config}")
+    if debug_log:
+        _logger.info(f"[CONFIG_DEBUG] Final config for {stage}: {config}")
     return config
 
 
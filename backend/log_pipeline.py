@@ -0,0 +1,250 @@
+"""
+Logging pipeline: non-blocking handlers, fast JSON encoding and event sampling.
+
+log_app_event() runs dozens of times per council session. This module keeps
+that cheap on the request path:
+
+1. QUEUE HANDLERS - Loggers enqueue records; a QueueListener thread does the
+   formatting and stream writes, so log I/O never blocks the event loop.
+   The queue is bounded; when full, records are dropped and counted rather
+   than blocking the caller.
+2. FAST JSON - orjson when installed, stdlib json otherwise, with non-JSON
+   values stringified by the encoder instead of a trial json.dumps per field.
+3. SAMPLING - High-frequency INFO/DEBUG events can be sampled (keep a
+   fraction) and rate limited per second. Only the listed event types are
+   rate limited, so audit and security events (e.g. "ADMIN: ...") are never
+   dropped. WARNING and ERROR are never dropped either.
+
+Configured via environment (read here rather than config.py, which itself
+imports the security logger):
+    LOG_ASYNC=true                     Queue-based handlers (default on)
+    LOG_QUEUE_SIZE=10000               Max records waiting to be written
+    LOG_EVENT_SAMPLING=EVENT:rate,...  Per-event keep ratio (0.0-1.0)
+    LOG_EVENT_MAX_PER_SECOND=50        Per-event cap for INFO/DEBUG (0 = off)
+    LOG_EVENT_RATE_LIMITED=EVENT,...   Event types the cap applies to
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ASYNC_LOGGING = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Chatty events logged on every council run. Override with LOG_EVENT_SAMPLING.
+DEFAULT_EVENT_SAMPLING = "TITLE_GEN_CHECK:0.1,TITLE_FINAL_CHECK:0.1,STAGE3_CONFIG_REQUEST:0.1,CONFIG_DEBUG:0.05"
+LOG_EVENT_SAMPLING = os.getenv("LOG_EVENT_SAMPLING", DEFAULT_EVENT_SAMPLING)
+LOG_EVENT_MAX_PER_SECOND = int(os.getenv("LOG_EVENT_MAX_PER_SECOND", "50"))
+
+# Per-session events that can burst under load; nothing else is capped.
+DEFAULT_RATE_LIMITED_EVENTS = (
+    "TITLE_GEN_CHECK,TITLE_FINAL_CHECK,STAGE3_CONFIG_REQUEST,CONFIG_DEBUG,"
+    "TITLE_LLM_CALL,TITLE_LLM_RESPONSE,COUNCIL_CACHE_HIT,COUNCIL_CACHE_STORED"
+)
+LOG_EVENT_RATE_LIMITED = os.getenv("LOG_EVENT_RATE_LIMITED", DEFAULT_RATE_LIMITED_EVENTS)
+
+
+# =============================================================================
+# JSON ENCODING
+# =============================================================================
+
+def json_dumps(data: Dict[str, Any]) -> str:
+    """Serialize a log payload; values that aren't JSON types are stringified."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str).decode()
+        except TypeError:
+            # e.g. non-string dict keys or ints beyond 64 bits
+            pass
+    return json.dumps(data, default=str)
+
+
+# =============================================================================
+# SAMPLING AND RATE LIMITS
+# =============================================================================
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse 'EVENT:0.1,OTHER:0.5' into a dict, ignoring malformed entries."""
+    rates: Dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition(":")
+        if not name or not rate:
+            continue
+        try:
+            rates[name] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class LogSampler:
+    """
+    Decides whether an event should be logged.
+
+    Sampling keeps a random fraction of an event type; the rate limit caps
+    each rate_limited event type per one-second window. Both only apply to
+    INFO/DEBUG.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None,
+                 max_per_second: int = LOG_EVENT_MAX_PER_SECOND,
+                 rate_limited: Optional[Iterable[str]] = None):
+        self.sample_rates = dict(sample_rates if sample_rates is not None else _parse_sampling(LOG_EVENT_SAMPLING))
+        self.max_per_second = max_per_second
+        self.rate_limited = frozenset(
+            rate_limited if rate_limited is not None
+            else (name.strip() for name in LOG_EVENT_RATE_LIMITED.split(",") if name.strip())
+        )
+        self._windows: Dict[str, List[float]] = {}  # event -> [window_start, count]
+        self._sampled_out: Dict[str, int] = {}
+        self._rate_limited: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def should_log(self, event: str, level: str = "INFO") -> bool:
+        if level in ("WARNING", "ERROR", "CRITICAL"):
+            return True
+
+        rate = self.sample_rates.get(event)
+        if rate is not None and rate < 1.0 and random.random() >= rate:
+            with self._lock:
+                self._sampled_out[event] = self._sampled_out.get(event, 0) + 1
+            return False
+
+        if self.max_per_second <= 0 or event not in self.rate_limited:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(event)
+            if window is None or now - window[0] >= 1.0:
+                self._windows[event] = [now, 1]
+                return True
+            if window[1] >= self.max_per_second:
+                self._rate_limited[event] = self._rate_limited.get(event, 0) + 1
+                return False
+            window[1] += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sample_rates": dict(self.sample_rates),
+                "max_per_second": self.max_per_second,
+                "rate_limited_events": sorted(self.rate_limited),
+                "sampled_out": dict(self._sampled_out),
+                "rate_limited": dict(self._rate_limited),
+            }
+
+
+# Global singleton
+_sampler = LogSampler()
+
+
+def get_log_sampler() -> LogSampler:
+    """Get the global log sampler."""
+    return _sampler
+
+
+def should_log_event(event: str, level: str = "INFO") -> bool:
+    """Check sampling/rate limits before building a log message."""
+    return _sampler.should_log(event, level)
+
+
+# =============================================================================
+# QUEUE HANDLERS
+# =============================================================================
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of erroring."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Snapshot the record for the listener thread without formatting it.
+
+        The stdlib version runs the formatter here, on the logging thread, and
+        folds the traceback into msg. Only msg % args is merged (args may be
+        mutated after the call returns); exc_info and stack_info are kept so
+        the formatter on the listener thread renders them.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listeners: List[logging.handlers.QueueListener] = []
+_queue_handlers: List[DroppingQueueHandler] = []
+_listeners_lock = threading.Lock()
+
+
+def make_async_handler(handler: logging.Handler) -> logging.Handler:
+    """
+    Wrap a handler so records are written on a background thread.
+
+    Returns the handler unchanged when LOG_ASYNC is off.
+    """
+    if not ASYNC_LOGGING:
+        return handler
+
+    q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(q)
+    listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+    listener.start()
+    queue_handler.listener = listener
+    with _listeners_lock:
+        _listeners.append(listener)
+        _queue_handlers.append(queue_handler)
+    return queue_handler
+
+
+def stop_log_listeners() -> None:
+    """Flush queued records and stop listener threads (runs at exit)."""
+    with _listeners_lock:
+        listeners = list(_listeners)
+        _listeners.clear()
+    for listener in listeners:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def get_pipeline_stats() -> Dict[str, Any]:
+    """Queue depth, drops and sampling counters for /health/metrics."""
+    with _listeners_lock:
+        handlers = list(_queue_handlers)
+    return {
+        "async": ASYNC_LOGGING,
+        "encoder": "orjson" if orjson is not None else "json",
+        "queue_depth": sum(h.queue.qsize() for h in handlers),
+        "dropped": sum(h.dropped for h in handlers),
+        **_sampler.stats(),
+    }
+
+
+atexit.register(stop_log_listeners)
@@ -0,0 +1,340 @@
+"""
+Event-loop blocking detector (opt-in).
+
+Finds sync work (Supabase, Stripe, PIL, Qdrant calls...) that stalls the event
+loop and makes SSE streams choppy under load.
+
+HOW IT WORKS:
+- A heartbeat coroutine wakes every few milliseconds and stamps the time.
+- A watchdog thread checks the stamp. When the loop hasn't ticked for longer
+  than the threshold, the loop is blocked in some callback: the watchdog grabs
+  the loop thread's Python stack (sys._current_frames) and the running task.
+- When the heartbeat next runs, the stall's duration is known and the
+  incident is recorded.
+
+ATTRIBUTION:
+A task factory records the route and correlation ID (set by
+CorrelationIdMiddleware) that were active when each task was created, keyed
+weakly by task. The watchdog looks up the running task to attribute the
+stall. This works with both the default asyncio loop and uvloop.
+
+Enable with LOOP_MONITOR_ENABLED=true. Results are served by
+GET /admin/diagnostics/loop-stalls.
+"""
+
+import asyncio
+import re
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .config import (
+        LOOP_MONITOR_ENABLED,
+        LOOP_MONITOR_THRESHOLD_MS,
+    )
+    from .security import log_app_event
+except ImportError:
+    from backend.config import (
+        LOOP_MONITOR_ENABLED,
+        LOOP_MONITOR_THRESHOLD_MS,
+    )
+    from backend.security import log_app_event
+
+
+# Path segments that look like identifiers are collapsed to keep routes bounded
+_ID_SEGMENT = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+|[0-9a-fA-F]{16,})(?=/|$)"
+)
+
+MAX_STACK_FRAMES = 25
+RECENT_INCIDENTS = 100
+MAX_OFFENDERS = 500
+
+
+def normalize_route(route: str) -> str:
+    """Collapse ID-like path segments: 'GET /conversations/<uuid>' -> 'GET /conversations/{id}'."""
+    return _ID_SEGMENT.sub("/{id}", route)
+
+
+def _format_stack(frame) -> List[str]:
+    """Format a frame's stack (outermost first), keeping the innermost frames."""
+    summary = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+    return [f"{f.filename}:{f.lineno} in {f.name}" for f in summary]
+
+
+def _blocking_site(stack: List[str]) -> str:
+    """
+    Pick the frame to blame: the innermost frame in our own code, since the
+    frames below it are usually library internals (httpx, ssl, PIL...).
+    """
+    for entry in reversed(stack):
+        if "/backend/" in entry and "loop_monitor.py" not in entry:
+            return entry.split("/backend/", 1)[1]
+    return stack[-1] if stack else "unknown"
+
+
+class LoopBlockingMonitor:
+    """
+    Watchdog for event-loop stalls with route/correlation attribution.
+
+    Keeps a ring buffer of recent incidents and aggregate stats per
+    (route, blocking site) so the worst offenders can be listed.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_MONITOR_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000.0
+        # Heartbeat often enough to measure stalls near the threshold
+        self.interval = max(0.005, self.threshold / 4)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self._last_tick = 0.0
+        self._pending: Optional[Dict[str, Any]] = None
+        self._attribution: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[str, str]]" = weakref.WeakKeyDictionary()
+        self._previous_factory = None
+        self._context_getters: Tuple[Callable[[], str], Callable[[], str]] = (lambda: "", lambda: "")
+
+        self._recent: deque = deque(maxlen=RECENT_INCIDENTS)
+        self._offenders: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._total_stalls = 0
+        self._untracked_stalls = 0  # Stalls at new sites once MAX_OFFENDERS is reached
+        self._started_at: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._heartbeat_task is not None and not self._heartbeat_task.done()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self, route_getter: Callable[[], str], correlation_getter: Callable[[], str]) -> None:
+        """
+        Start monitoring the running loop.
+
+        Args:
+            route_getter: Returns the current request route (context variable)
+            correlation_getter: Returns the current correlation ID
+        """
+        if self.is_running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._context_getters = (route_getter, correlation_getter)
+        self._started_at = time.time()
+        self._stop.clear()
+
+        log_app_event(
+            "LOOP_MONITOR_STARTED",
+            level="INFO",
+            threshold_ms=round(self.threshold * 1000),
+            interval_ms=round(self.interval * 1000),
+        )
+
+        # Remember who created each task so stalls can be attributed
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+
+        self._last_tick = time.perf_counter()
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and watchdog and restore the task factory."""
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+        if self._heartbeat_task is not None and not self._heartbeat_task.done():
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        self._heartbeat_task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        correlation_id = self._context_getters[1]()
+        if correlation_id:
+            self._attribution[task] = (self._context_getters[0](), correlation_id)
+        return task
+
+    # -------------------------------------------------------------------------
+    # Heartbeat (event loop) and watchdog (thread)
+    # -------------------------------------------------------------------------
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                pending = self._pending
+                self._pending = None
+                self._last_tick = now
+            if pending is not None:
+                self._finalize(pending, now)
+
+    def _watch(self) -> None:
+        poll = self.interval / 2
+        while not self._stop.wait(poll):
+            now = time.perf_counter()
+            with self._lock:
+                last_tick = self._last_tick
+                already_sampled = self._pending is not None
+            if already_sampled or now - last_tick - self.interval < self.threshold:
+                continue
+            sample = self._sample(last_tick)
+            with self._lock:
+                # Only keep the sample if the loop is still stuck on the same tick
+                if self._last_tick == last_tick and self._pending is None:
+                    self._pending = sample
+
+    def _sample(self, last_tick: float) -> Dict[str, Any]:
+        """Capture the loop thread's stack and the running task's attribution."""
+        stack: List[str] = []
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is not None:
+            stack = _format_stack(frame)
+
+        route, correlation_id = "unattributed", ""
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+        if isinstance(current_tasks, dict) and self._loop is not None:
+            task = current_tasks.get(self._loop)
+            if task is not None:
+                route, correlation_id = self._attribution.get(task, (route, correlation_id))
+
+        return {
+            "started": last_tick,
+            "stack": stack,
+            "route": normalize_route(route) if route else "unattributed",
+            "correlation_id": correlation_id,
+        }
+
+    # -------------------------------------------------------------------------
+    # Aggregation
+    # -------------------------------------------------------------------------
+
+    def _finalize(self, pending: Dict[str, Any], now: float) -> None:
+        duration_ms = round((now - pending["started"] - self.interval) * 1000, 1)
+        if duration_ms < self.threshold * 1000:
+            return
+
+        site = _blocking_site(pending["stack"])
+        incident = {
+            "timestamp": time.time(),
+            "duration_ms": duration_ms,
+            "route": pending["route"],
+            "correlation_id": pending["correlation_id"],
+            "site": site,
+            "stack": pending["stack"],
+        }
+
+        with self._lock:
+            self._total_stalls += 1
+            self._recent.append(incident)
+            key = (pending["route"], site)
+            entry = self._offenders.get(key)
+            if entry is None and len(self._offenders) >= MAX_OFFENDERS:
+                # Still counted and logged; only the new offender entry is skipped
+                self._untracked_stalls += 1
+            elif entry is None:
+                entry = {
+                    "route": pending["route"],
+                    "site": site,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "correlation_ids": deque(maxlen=5),
+                    "example_stack": pending["stack"],
+                }
+                self._offenders[key] = entry
+            if entry is not None:
+                entry["count"] += 1
+                entry["total_ms"] += duration_ms
+                if duration_ms > entry["max_ms"]:
+                    entry["max_ms"] = duration_ms
+                    entry["example_stack"] = pending["stack"]
+                if pending["correlation_id"]:
+                    entry["correlation_ids"].append(pending["correlation_id"])
+
+        log_app_event(
+            "EVENT_LOOP_STALL",
+            level="WARNING",
+            duration_ms=duration_ms,
+            route=pending["route"],
+            site=site,
+        )
+
+    def top_offenders(self, limit: int = 20, sort_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """Offenders sorted by total, max or count, with average duration."""
+        with self._lock:
+            entries = [
+                {
+                    "route": e["route"],
+                    "site": e["site"],
+                    "count": e["count"],
+                    "total_ms": round(e["total_ms"], 1),
+                    "avg_ms": round(e["total_ms"] / e["count"], 1) if e["count"] else 0.0,
+                    "max_ms": e["max_ms"],
+                    "recent_correlation_ids": list(e["correlation_ids"]),
+                    "example_stack": list(e["example_stack"]),
+                }
+                for e in self._offenders.values()
+            ]
+        key = sort_by if sort_by in ("total_ms", "max_ms", "count") else "total_ms"
+        entries.sort(key=lambda e: e[key], reverse=True)
+        return entries[:limit]
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent incidents, newest first."""
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def reset(self) -> None:
+        """Clear collected incidents."""
+        with self._lock:
+            self._recent.clear()
+            self._offenders.clear()
+            self._total_stalls = 0
+            self._untracked_stalls = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Monitor status for the admin endpoint."""
+        with self._lock:
+            return {
+                "enabled": LOOP_MONITOR_ENABLED,
+                "running": self.is_running,
+                "threshold_ms": round(self.threshold * 1000),
+                "interval_ms": round(self.interval * 1000),
+                "total_stalls": self._total_stalls,
+                "tracked_offenders": len(self._offenders),
+                "untracked_stalls": self._untracked_stalls,
+                "started_at": self._started_at,
+            }
+
+
+# Global singleton
+_loop_monitor = LoopBlockingMonitor()
+
+
+def get_loop_monitor() -> LoopBlockingMonitor:
+    """Get the global event-loop blocking monitor."""
+    return _loop_monitor
@@ -4,7 +4,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi import Request
 import re
 import os
@@ -187,6 +187,16 @@ def set_correlation_id(correlation_id: str) -> contextvars.Token:
     """Set correlation ID for the current async context."""
     return _correlation_id.set(correlation_id)
 
+
+# Request route ("METHOD /path") for attributing background diagnostics
+# (e.g. event-loop stalls) to the request that caused them
+_request_route: contextvars.ContextVar[str] = contextvars.ContextVar('request_route', default='')
+
+
+def get_request_route() -> str:
+    """Get the current request's method and path."""
+    return _request_route.get()
+
 # =============================================================================
 # SENTRY: Initialize error tracking FIRST (before anything else)
 # =============================================================================
@@ -254,11 +264,27 @@ try:
     from .auth import get_current_user, get_effective_user
     from .routers import v1_router
     from .schemas import error_response, ErrorCodes
+    from .config import METRICS_LOOP_LAG_INTERVAL, LOOP_MONITOR_ENABLED
+    from .loop_monitor import get_loop_monitor
+    from .metrics import (
+        get_metrics_registry,
+        observe_request,
+        start_event_loop_lag_monitor,
+        stop_event_loop_lag_monitor,
+    )
 except ImportError:
     from backend.context_loader import list_available_businesses
     from backend.auth import get_current_user, get_effective_user
     from backend.routers import v1_router
     from backend.schemas import error_response, ErrorCodes
+    from backend.config import METRICS_LOOP_LAG_INTERVAL, LOOP_MONITOR_ENABLED
+    from backend.loop_monitor import get_loop_monitor
+    from backend.metrics import (
+        get_metrics_registry,
+        observe_request,
+        start_event_loop_lag_monitor,
+        stop_event_loop_lag_monitor,
+    )
 
 
 # =============================================================================
@@ -289,6 +315,48 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         log_app_event("MODEL_PRICING_LOAD_FAILED", level="WARNING", error=str(e))
 
+    # Start periodic model telemetry snapshot flushing
+    try:
+        from .telemetry import start_telemetry_flusher
+    except ImportError:
+        from backend.telemetry import start_telemetry_flusher
+    start_telemetry_flusher()
+
+    # Reconcile Redis quota counters to Postgres in batches
+    try:
+        from .quota import start_quota_reconciler
+    except ImportError:
+        from backend.quota import start_quota_reconciler
+    start_quota_reconciler()
+
+    # Batch analytics inserts (usage_events, session_usage, activity_logs)
+    try:
+        from .ingest import start_ingest_flusher
+    except ImportError:
+        from backend.ingest import start_ingest_flusher
+    start_ingest_flusher()
+
+    # Delete expired GDPR export archives from storage
+    try:
+        from .data_export import start_export_sweeper
+    except ImportError:
+        from backend.data_export import start_export_sweeper
+    start_export_sweeper()
+
+    # Transcript cache updates from worker threads are applied on this loop
+    try:
+        from .transcript_cache import get_transcript_cache
+    except ImportError:
+        from backend.transcript_cache import get_transcript_cache
+    get_transcript_cache().bind(asyncio.get_running_loop())
+
+    # Sample event-loop lag for the Prometheus endpoint
+    start_event_loop_lag_monitor(METRICS_LOOP_LAG_INTERVAL)
+
+    # Opt-in event-loop blocking detector (LOOP_MONITOR_ENABLED=true)
+    if LOOP_MONITOR_ENABLED:
+        get_loop_monitor().start(get_request_route, _correlation_id.get)
+
     # Set up signal handlers for graceful shutdown (Unix only)
     if sys.platform != "win32":
         loop = asyncio.get_event_loop()
@@ -466,6 +534,7 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
 
         # Set in context variable for logging
         token = set_correlation_id(correlation_id)
+        route_token = _request_route.set(f"{request.method} {request.url.path}")
 
         try:
             response = await call_next(request)
@@ -473,7 +542,8 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
             response.headers["X-Correlation-ID"] = correlation_id
             return response
         finally:
-            # Reset context variable
+            # Reset context variables
+            _request_route.reset(route_token)
             _correlation_id.reset(token)
 
 
@@ -481,6 +551,7 @@ class RequestDurationMiddleware(BaseHTTPMiddleware):
     """
     Track request duration for performance monitoring.
 
+    - Records http_request_duration_seconds by route template (Prometheus)
     - Logs slow requests (>1s warning, >5s error)
     - Adds X-Response-Time header to all responses
     - Excludes health check and LLM-heavy endpoints from slow request logging
@@ -528,6 +599,15 @@ class RequestDurationMiddleware(BaseHTTPMiddleware):
         # Add timing header
         response.headers["X-Response-Time"] = f"{duration_ms}ms"
 
+        # Label by route template (bounded cardinality), not the raw path
+        route = request.scope.get("route")
+        observe_request(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            response.status_code,
+            duration,
+        )
+
         # Log slow requests (except health checks and LLM endpoints)
         path = request.url.path
         if path not in self.EXCLUDED_PATHS and not self._is_llm_endpoint(path):
@@ -848,9 +928,59 @@ async def _cleanup_resources():
     except ImportError:
         from backend.cache import close_redis
 
+    await stop_event_loop_lag_monitor()
+    await get_loop_monitor().stop()
+
+    # Flush final telemetry snapshot and stop the flusher
+    try:
+        from .telemetry import stop_telemetry_flusher
+    except ImportError:
+        from backend.telemetry import stop_telemetry_flusher
+
+    try:
+        await stop_telemetry_flusher()
+    except Exception as e:
+        logger.debug("Telemetry flush on shutdown failed: %s", e)
+
+    # Write pending quota deltas before Redis goes away
+    try:
+        from .quota import stop_quota_reconciler
+    except ImportError:
+        from backend.quota import stop_quota_reconciler
+
+    try:
+        await stop_quota_reconciler()
+    except Exception as e:
+        logger.debug("Quota flush on shutdown failed: %s", e)
+
+    # Write buffered analytics rows (anything left stays in the spool file)
+    try:
+        from .ingest import stop_ingest_flusher
+    except ImportError:
+        from backend.ingest import stop_ingest_flusher
+
+    try:
+        await stop_ingest_flusher()
+    except Exception as e:
+        logger.debug("Ingest flush on shutdown failed: %s", e)
+
+    try:
+        from .data_export import stop_export_sweeper
+    except ImportError:
+        from backend.data_export import stop_export_sweeper
+    await stop_export_sweeper()
+
     await close_redis()
     log_app_event("SHUTDOWN_REDIS_CLOSED", level="INFO")
 
+    # Close the connection pool shared by user-scoped Supabase clients
+    try:
+        from .database import close_auth_http_client
+    except ImportError:
+        from backend.database import close_auth_http_client
+
+    close_auth_http_client()
+
     # Close Qdrant connection
     try:
         from .vector_store import close_qdrant
@@ -1102,6 +1232,7 @@ async def metrics_endpoint():
     Returns Prometheus-compatible metrics for:
     - Circuit breaker states (per-model)
     - Cache hit rates and sizes
+    - Per-model/per-stage TTFT, latency, tokens/sec, error and truncation rates
     - Request counts
 
     Use this for monitoring dashboards and alerting.
@@ -1116,6 +1247,19 @@ async def metrics_endpoint():
     except ImportError:
         from backend.utils.cache import user_cache, company_cache
 
+    try:
+        from .telemetry import get_telemetry_store
+        from .log_pipeline import get_pipeline_stats
+        from .ingest import get_ingester
+        from .transcript_cache import get_transcript_cache
+        from .company_snapshots import get_snapshot_cache
+    except ImportError:
+        from backend.telemetry import get_telemetry_store
+        from backend.log_pipeline import get_pipeline_stats
+        from backend.ingest import get_ingester
+        from backend.transcript_cache import get_transcript_cache
+        from backend.company_snapshots import get_snapshot_cache
+
     # Get circuit breaker states
     cb_statuses = get_all_circuit_breaker_statuses()
 
@@ -1131,6 +1275,9 @@ async def metrics_endpoint():
     user_stats = user_cache.stats()
     company_stats = company_cache.stats()
 
+    # Per-model/per-stage rolling latency, throughput and error rates
+    telemetry_store = get_telemetry_store()
+
     return {
         "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         "circuit_breakers": {
@@ -1148,7 +1295,15 @@ async def metrics_endpoint():
                 "max_size": company_stats["max_size"],
                 "metrics": company_stats["metrics"],
             },
+            "transcript_cache": get_transcript_cache().stats(),
+            "company_snapshots": get_snapshot_cache().stats(),
         },
+        "model_telemetry": {
+            **telemetry_store.stats(),
+            "models": telemetry_store.snapshot(),
+        },
+        "logging": get_pipeline_stats(),
+        "ingest": get_ingester().stats(),
         "server": {
             "is_shutting_down": _shutdown_manager.is_shutting_down,
             "active_requests": _shutdown_manager.active_requests,
@@ -1156,6 +1311,22 @@ async def metrics_endpoint():
     }
 
 
+@app.get("/health/prometheus", response_class=PlainTextResponse)
+async def prometheus_metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+
+    Exposes counters and histograms in the Prometheus text format:
+    request duration by route, council stage durations, TTFT per model,
+    SSE frames sent, cache hit/miss per namespace, Supabase call durations,
+    event-loop lag and circuit breaker states.
+    """
+    return PlainTextResponse(
+        get_metrics_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.get("/api/v1/businesses")
 async def get_businesses(
     user: dict = Depends(get_effective_user),  # Supports impersonation via X-Impersonate-User header
@@ -0,0 +1,552 @@
+"""
+Prometheus metrics for the backend.
+
+A small in-process metrics registry (counters, gauges, histograms with labels)
+rendered in the Prometheus text exposition format at /health/prometheus.
+Implemented here rather than via prometheus_client to keep the dependency
+footprint unchanged and recording cost to a dict lookup plus an add.
+
+METRICS:
+- http_request_duration_seconds{method,route,status}   RequestDurationMiddleware
+- council_stage_duration_seconds{stage}                 conversations.send_message
+- llm_time_to_first_token_seconds{model}                openrouter_stream
+- sse_frames_sent_total{endpoint}                       instrument_sse_stream()
+- cache_lookups_total{namespace,tier,result}            Redis lookups + TTLCache stats
+- db_call_duration_seconds{method,resource,status}      Supabase PostgREST HTTP hooks
+- event_loop_lag_seconds                                 background lag monitor
+- ingest_backlog_rows{table} (+ flushed/failed/dropped)  ingest.py batched inserts
+
+CARDINALITY:
+Routes are labelled with the matched route template (e.g. /conversations/{id}),
+never the raw path. Each metric caps its number of label sets; overflow is
+dropped and reported via metrics_dropped_series_total.
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Maximum label combinations per metric before new series are dropped
+MAX_SERIES_PER_METRIC = 2000
+
+# Default latency buckets (seconds)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Long-running LLM work (seconds)
+LLM_BUCKETS: Tuple[float, ...] = (
+    0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0,
+)
+# Event-loop lag (seconds)
+LAG_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+# =============================================================================
+# METRIC TYPES
+# =============================================================================
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value per the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: named metric with a fixed set of label names."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self.dropped = 0
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _slot(self, key: Tuple[str, ...], factory: Callable[[], Any]) -> Optional[Any]:
+        """Get or create the value slot for a label set (caller holds the lock)."""
+        slot = self._values.get(key)
+        if slot is None:
+            if len(self._values) >= MAX_SERIES_PER_METRIC:
+                self.dropped += 1
+                return None
+            slot = factory()
+            self._values[key] = slot
+        return slot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.dropped = 0
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = list(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value[0])}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            slot = self._slot(key, lambda: [0.0])
+            if slot is not None:
+                slot[0] += amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            slot = self._values.get(self._key(labels))
+            return slot[0] if slot else 0.0
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            slot = self._slot(key, lambda: [0.0])
+            if slot is not None:
+                slot[0] = value
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            slot = self._values.get(self._key(labels))
+            return slot[0] if slot else 0.0
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket upper bounds."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Slot layout: [per-bucket counts..., +Inf count, sum]
+            slot = self._slot(key, lambda: [0] * (len(self.buckets) + 1) + [0.0])
+            if slot is not None:
+                slot[index] += 1
+                slot[-1] += value
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            slot = self._values.get(self._key(labels))
+            return sum(slot[:-1]) if slot else 0
+
+    def _render_samples(self, items) -> List[str]:
+        lines = []
+        for key, slot in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), slot[:-1]):
+                cumulative += count
+                le = _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', le))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(slot[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class MetricsRegistry:
+    """
+    Holds metrics plus scrape-time collectors.
+
+    Collectors are callables returning Prometheus text lines; they let
+    existing stats (circuit breakers, TTLCache metrics) be exported without
+    double-counting on the hot path.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics and collectors in Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        dropped = []
+        for metric in metrics:
+            lines.extend(metric.render())
+            if metric.dropped:
+                dropped.append((metric.name, metric.dropped))
+
+        for collector in collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.debug("Metrics collector failed: %s", e)
+
+        lines.append("# HELP metrics_dropped_series_total Label sets dropped by the per-metric series cap")
+        lines.append("# TYPE metrics_dropped_series_total counter")
+        for name, count in dropped:
+            lines.append(f'metrics_dropped_series_total{{metric="{name}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Global singleton
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the global metrics registry."""
+    return _registry
+
+
+# =============================================================================
+# APPLICATION METRICS
+# =============================================================================
+
+HTTP_REQUEST_DURATION = _registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration until response headers are sent, by route template",
+    ("method", "route", "status"),
+)
+
+COUNCIL_STAGE_DURATION = _registry.histogram(
+    "council_stage_duration_seconds",
+    "Wall-clock duration of each council stage",
+    ("stage",),
+    buckets=LLM_BUCKETS,
+)
+
+LLM_TTFT = _registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time to first streamed token per model",
+    ("model",),
+    buckets=LLM_BUCKETS,
+)
+
+SSE_FRAMES_SENT = _registry.counter(
+    "sse_frames_sent_total",
+    "Server-sent event frames written to clients",
+    ("endpoint",),
+)
+
+CACHE_LOOKUPS = _registry.counter(
+    "cache_lookups_total",
+    "Cache lookups by namespace and result (hit/miss)",
+    ("namespace", "tier", "result"),
+)
+
+DB_CALL_DURATION = _registry.histogram(
+    "db_call_duration_seconds",
+    "Supabase PostgREST call duration by HTTP method and table/RPC",
+    ("method", "resource", "status"),
+)
+
+EVENT_LOOP_LAG = _registry.histogram(
+    "event_loop_lag_seconds",
+    "Extra delay observed by a periodic sleep on the event loop",
+    buckets=LAG_BUCKETS,
+)
+
+EVENT_LOOP_LAG_LAST = _registry.gauge(
+    "event_loop_lag_last_seconds",
+    "Most recent event-loop lag sample",
+)
+
+
+# =============================================================================
+# RECORDING HELPERS
+# =============================================================================
+
+def observe_request(method: str, route: str, status: int, duration: float) -> None:
+    """Record an HTTP request duration."""
+    HTTP_REQUEST_DURATION.observe(duration, method=method, route=route, status=str(status))
+
+
+def observe_stage(stage: str, duration: float) -> None:
+    """Record a council stage duration."""
+    COUNCIL_STAGE_DURATION.observe(duration, stage=stage)
+
+
+def observe_ttft(model: str, ttft_seconds: float) -> None:
+    """Record time to first token for a model."""
+    LLM_TTFT.observe(ttft_seconds, model=model)
+
+
+def record_cache_lookup(namespace: str, hit: bool, tier: str = "redis") -> None:
+    """Record a cache hit or miss for a namespace."""
+    CACHE_LOOKUPS.inc(namespace=namespace, tier=tier, result="hit" if hit else "miss")
+
+
+async def instrument_sse_stream(gen: AsyncGenerator[str, None], endpoint: str) -> AsyncGenerator[str, None]:
+    """
+    Wrap an SSE generator, counting frames as they are sent.
+
+    The wrapped generator is always closed so its own disconnect handling
+    still runs when the client goes away.
+    """
+    try:
+        async for frame in gen:
+            SSE_FRAMES_SENT.inc(endpoint=endpoint)
+            yield frame
+    finally:
+        await gen.aclose()
+
+
+# =============================================================================
+# DATABASE INSTRUMENTATION
+# =============================================================================
+
+def _resource_from_path(path: str) -> str:
+    """Map a PostgREST URL path to a bounded label: table name or rpc/<fn>."""
+    marker = "/rest/v1/"
+    idx = path.find(marker)
+    if idx == -1:
+        return "other"
+    parts = path[idx + len(marker):].strip("/").split("/")
+    if parts and parts[0] == "rpc" and len(parts) > 1:
+        return f"rpc/{parts[1]}"
+    return parts[0] if parts and parts[0] else "other"
+
+
+def _on_db_request(request) -> None:
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+def _on_db_response(response) -> None:
+    start = response.request.extensions.get("metrics_start")
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    method = response.request.method
+    resource = _resource_from_path(response.request.url.path)
+    DB_CALL_DURATION.observe(duration, method=method, resource=resource, status=str(response.status_code))
+
+    from .tracing import record_span
+    record_span(
+        f"db.{method.lower()}",
+        duration,
+        status="error" if response.status_code >= 400 else "ok",
+        resource=resource,
+        status_code=response.status_code,
+    )
+
+
+def instrument_http_session(session) -> None:
+    """
+    Attach timing hooks to an httpx session used for PostgREST calls.
+
+    Safe to call repeatedly; hooks are only added once per session.
+    """
+    try:
+        hooks = session.event_hooks
+        if _on_db_request in hooks.get("request", []):
+            return
+        session.event_hooks = {
+            "request": list(hooks.get("request", [])) + [_on_db_request],
+            "response": list(hooks.get("response", [])) + [_on_db_response],
+        }
+    except Exception as e:
+        logger.debug("Could not instrument HTTP session: %s", e)
+
+
+def instrument_supabase_client(client) -> None:
+    """Attach timing hooks to a Supabase client's PostgREST HTTP session."""
+    try:
+        instrument_http_session(client.postgrest.session)
+    except Exception as e:
+        logger.debug("Could not instrument Supabase client: %s", e)
+
+
+# =============================================================================
+# EVENT LOOP LAG MONITOR
+# =============================================================================
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+async def _lag_monitor_loop(interval: float) -> None:
+    """Sleep for `interval` and record how late the wake-up was."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+
+
+def start_event_loop_lag_monitor(interval: float = 0.5) -> Optional[asyncio.Task]:
+    """Start the event-loop lag sampler (no-op if already running)."""
+    global _lag_task
+    if interval <= 0:
+        return None
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.create_task(_lag_monitor_loop(interval))
+    return _lag_task
+
+
+async def stop_event_loop_lag_monitor() -> None:
+    """Stop the event-loop lag sampler."""
+    global _lag_task
+    if _lag_task is not None and not _lag_task.done():
+        _lag_task.cancel()
+        try:
+            await _lag_task
+        except asyncio.CancelledError:
+            pass
+    _lag_task = None
+
+
+# =============================================================================
+# SCRAPE-TIME COLLECTORS
+# =============================================================================
+
+def _collect_memory_caches() -> List[str]:
+    """Export TTLCache hit/miss counters and sizes."""
+    try:
+        from .utils.cache import get_all_cache_metrics
+    except ImportError:
+        from backend.utils.cache import get_all_cache_metrics
+
+    lines = [
+        "# HELP memory_cache_lookups_total In-memory TTLCache lookups by namespace and result",
+        "# TYPE memory_cache_lookups_total counter",
+    ]
+    sizes = [
+        "# HELP memory_cache_entries Current entries in each in-memory TTLCache",
+        "# TYPE memory_cache_entries gauge",
+    ]
+    for namespace, stats in get_all_cache_metrics().items():
+        m = stats.get("metrics", {})
+        ns = _escape_label_value(namespace)
+        lines.append(f'memory_cache_lookups_total{{namespace="{ns}",result="hit"}} {m.get("hits", 0)}')
+        lines.append(f'memory_cache_lookups_total{{namespace="{ns}",result="miss"}} {m.get("misses", 0)}')
+        sizes.append(f'memory_cache_entries{{namespace="{ns}"}} {stats.get("size", 0)}')
+    return lines + sizes
+
+
+def _collect_circuit_breakers() -> List[str]:
+    """Export circuit breaker state per model (0=closed, 1=half_open, 2=open)."""
+    try:
+        from .openrouter import get_all_circuit_breaker_statuses
+    except ImportError:
+        from backend.openrouter import get_all_circuit_breaker_statuses
+
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    lines = [
+        "# HELP circuit_breaker_state Circuit breaker state per model (0=closed, 1=half_open, 2=open)",
+        "# TYPE circuit_breaker_state gauge",
+    ]
+    for model, status in get_all_circuit_breaker_statuses().items():
+        value = states.get(status.get("state"), 0)
+        lines.append(f'circuit_breaker_state{{model="{_escape_label_value(model)}"}} {value}')
+    return lines
+
+
+def _collect_ingest() -> List[str]:
+    """Export the batched analytics ingester's backlog and flush counters."""
+    try:
+        from .ingest import get_ingester
+    except ImportError:
+        from backend.ingest import get_ingester
+
+    stats = get_ingester().stats()
+    lines = [
+        "# HELP ingest_backlog_rows Analytics rows buffered for batched insert",
+        "# TYPE ingest_backlog_rows gauge",
+    ]
+    for table, size in stats["backlog_by_table"].items():
+        lines.append(f'ingest_backlog_rows{{table="{table}"}} {size}')
+    lines += [
+        "# HELP ingest_rows_flushed_total Analytics rows written by batched inserts",
+        "# TYPE ingest_rows_flushed_total counter",
+        f"ingest_rows_flushed_total {stats['flushed_rows']}",
+        "# HELP ingest_flush_failures_total Transient insert failures (rows are retried)",
+        "# TYPE ingest_flush_failures_total counter",
+        f"ingest_flush_failures_total {stats['failed_flushes']}",
+        "# HELP ingest_rows_dropped_total Analytics rows dropped because the buffer was full",
+        "# TYPE ingest_rows_dropped_total counter",
+        f"ingest_rows_dropped_total {stats['dropped_rows']}",
+        "# HELP ingest_rows_rejected_total Analytics rows the database refused permanently",
+        "# TYPE ingest_rows_rejected_total counter",
+        f"ingest_rows_rejected_total {stats['rejected_rows']}",
+    ]
+    return lines
+
+
+_registry.register_collector(_collect_memory_caches)
+_registry.register_collector(_collect_ingest)
+_registry.register_collector(_collect_circuit_breakers)
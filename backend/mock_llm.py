@@ -17,12 +17,29 @@ Length categories (matching LLM Hub presets):
 - SHORT: ≤512 tokens (~100 words) - "1 paragraph"
 - MEDIUM: 1024-2048 tokens (~375 words) - "half page" to "1-2 pages"
 - LONG: ≥4096 tokens (~1250 words) - "2-3 pages" or "4+ pages"
+
+Latency Profiles (MOCK_LLM_LATENCY):
+- default: fixed sleeps and 15-character chunks
+- zero: no delays at all, so load tests measure only our own overhead
+- realistic: per-model TTFT and tokens/sec measured from the recorded
+  cassettes in OPENROUTER_CASSETTE_DIR; models without recordings use the
+  optional MOCK_LLM_PROFILES file, then built-in defaults
+- stress: near-zero TTFT with bursty multi-token network chunks
+Every profile except default streams token-sized OpenRouter SSE events
+through the real stream parser, so usage events and telemetry take the
+same code path as production streams.
 """
 
 import asyncio
+import fnmatch
+import functools
+import json
+import math
 import os
 import random
-from typing import List, Dict, Optional, AsyncGenerator
+import re
+from pathlib import Path
+from typing import List, Dict, Optional, AsyncGenerator, Tuple
 import logging
 from .config import MOCK_LLM_SCENARIO
 
@@ -1715,6 +1732,218 @@ def _estimate_mock_usage(content: str, messages: List[Dict]) -> Dict:
     }
 
 
+# =============================================================================
+# LATENCY PROFILES
+# =============================================================================
+
+MOCK_LATENCY_MODES = ("default", "zero", "realistic", "stress")
+
+# Used for the realistic profile when a model has no recordings and no
+# MOCK_LLM_PROFILES entry
+DEFAULT_REALISTIC_PROFILE: Dict = {"ttft_ms": {"p50": 900, "p95": 2500}, "tokens_per_second": 60}
+
+# Stress profile: tiny TTFT, then bursts of several tokens per network chunk
+STRESS_TTFT_MS = (5, 50)
+STRESS_BURST_TOKENS = (1, 32)
+STRESS_BURST_GAP_MS = (0, 5)
+
+_Z95 = 1.6448536269514722
+
+# Roughly BPE-sized pieces: short word runs (with their leading space),
+# single punctuation marks, whitespace runs. Joining them restores the text.
+_TOKEN_RE = re.compile(r"\s?\w{1,6}|\s?[^\w\s]|\s+")
+
+
+def _get_latency_mode() -> str:
+    """Current MOCK_LLM_LATENCY (read at runtime); unknown values mean default."""
+    from . import config
+    mode = config.MOCK_LLM_LATENCY
+    return mode if mode in MOCK_LATENCY_MODES else "default"
+
+
+@functools.lru_cache(maxsize=1)
+def _load_realistic_profiles(path: str) -> Dict:
+    """Read an optional profile file (default entry plus per-model globs)."""
+    config = {}
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            _logger.warning(f"[MOCK] Can't read latency profiles from {path}: {e}; using defaults")
+    return {
+        "default": {**DEFAULT_REALISTIC_PROFILE, **config.get("default", {})},
+        "models": config.get("models", {}),
+    }
+
+
+def _measure_cassette(cassette) -> Optional[Tuple[float, float]]:
+    """
+    (ttft_ms, tokens_per_second) of one recorded stream, or None without content.
+
+    Matches the telemetry store: TTFT is the time to the first content
+    delta, and tokens/sec is completion tokens (from the usage event, else
+    content events) over the rest of the stream.
+    """
+    from .cassettes import _LineSplitter
+
+    splitter = _LineSplitter()
+    elapsed = 0.0
+    first_token_at = None
+    content_events = 0
+    completion_tokens = None
+    for delay, text in cassette.chunks:
+        elapsed += delay
+        for line in splitter.feed(text):
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            try:
+                event = json.loads(line[len("data: "):])
+            except ValueError:
+                continue
+            choices = event.get("choices") or [{}]
+            if (choices[0].get("delta") or {}).get("content"):
+                content_events += 1
+                if first_token_at is None:
+                    first_token_at = elapsed
+            usage = event.get("usage") or {}
+            if usage.get("completion_tokens"):
+                completion_tokens = usage["completion_tokens"]
+
+    tokens = completion_tokens or content_events
+    if first_token_at is None or elapsed <= first_token_at or not tokens:
+        return None
+    return first_token_at * 1000, tokens / (elapsed - first_token_at)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+@functools.lru_cache(maxsize=4)
+def _recorded_profiles(directory: str) -> Dict[str, Dict]:
+    """Per-model realistic profiles measured from the cassettes in directory."""
+    from .cassettes import Cassette
+
+    samples: Dict[str, List[Tuple[float, float]]] = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            cassette = Cassette.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            _logger.warning(f"[MOCK] Skipping unreadable cassette {path.name}: {e}")
+            continue
+        measured = _measure_cassette(cassette) if cassette.status_code < 400 else None
+        if measured:
+            samples.setdefault(cassette.model, []).append(measured)
+
+    profiles = {}
+    for model, measured in samples.items():
+        ttfts = sorted(ttft for ttft, _ in measured)
+        rates = sorted(rate for _, rate in measured)
+        profiles[model] = {
+            "ttft_ms": {"p50": _percentile(ttfts, 50), "p95": _percentile(ttfts, 95)},
+            "tokens_per_second": _percentile(rates, 50),
+        }
+    return profiles
+
+
+def _realistic_profile(model: str) -> Dict:
+    """
+    Recorded timings for the model if it has cassettes; otherwise the
+    profile file's default merged with its exact or first glob-matching entry.
+    """
+    from . import config
+    profiles = _load_realistic_profiles(config.MOCK_LLM_PROFILES)
+    if config.OPENROUTER_CASSETTE_DIR:
+        recorded = _recorded_profiles(config.OPENROUTER_CASSETTE_DIR).get(model)
+        if recorded:
+            return {**profiles["default"], **recorded}
+    models = profiles["models"]
+    override = models.get(model)
+    if override is None:
+        override = next(
+            (entry for pattern, entry in models.items() if fnmatch.fnmatchcase(model, pattern)),
+            {},
+        )
+    return {**profiles["default"], **override}
+
+
+def _sample_ttft(model: str, mode: str) -> float:
+    """Seconds before the first token for the given profile."""
+    if mode == "realistic":
+        ttft = _realistic_profile(model)["ttft_ms"]
+        p50, p95 = ttft["p50"], max(ttft.get("p95", ttft["p50"]), ttft["p50"])
+        sigma = math.log(p95 / p50) / _Z95
+        return random.lognormvariate(math.log(p50), sigma) / 1000
+    if mode == "stress":
+        return random.uniform(*STRESS_TTFT_MS) / 1000
+    return 0.0
+
+
+def _tokenize(content: str) -> List[str]:
+    return _TOKEN_RE.findall(content)
+
+
+def _sse_event(data: Dict) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _build_mock_stream(model: str, messages: List[Dict], content: str, mode: str):
+    """
+    Render content as an OpenRouter SSE stream (a cassette) for the profile.
+
+    One event per token; the final event carries finish_reason and usage,
+    as OpenRouter sends it. Delays are per network chunk.
+    """
+    from .cassettes import Cassette
+
+    tokens = _tokenize(content)
+    usage = _estimate_mock_usage(content, messages)
+    usage["completion_tokens"] = len(tokens)
+    usage["total_tokens"] = usage["prompt_tokens"] + len(tokens)
+
+    events = [
+        _sse_event({"model": model, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        for token in tokens
+    ]
+    events.append(_sse_event({
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": ""}, "finish_reason": "stop"}],
+        "usage": usage,
+    }))
+    events.append("data: [DONE]\n\n")
+
+    chunks: List[Tuple[float, str]] = []
+    if mode == "realistic":
+        per_token = 1.0 / _realistic_profile(model)["tokens_per_second"]
+        chunks = [(per_token * random.uniform(0.5, 1.5), event) for event in events]
+    elif mode == "stress":
+        i = 0
+        while i < len(events):
+            burst = random.randint(*STRESS_BURST_TOKENS)
+            chunks.append((random.uniform(*STRESS_BURST_GAP_MS) / 1000, "".join(events[i:i + burst])))
+            i += burst
+    else:
+        chunks = [(0.0, event) for event in events]
+
+    if chunks:
+        chunks[0] = (_sample_ttft(model, mode), chunks[0][1])
+    return Cassette(model=model, chunks=chunks)
+
+
+async def _stream_with_profile(
+    model: str, messages: List[Dict], content: str, mode: str
+) -> AsyncGenerator[str, None]:
+    """Stream mock content through the real SSE parser (cassette replay path)."""
+    from .cassettes import replay_stream
+
+    cassette = _build_mock_stream(model, messages, content, mode)
+    speed = 0 if mode == "zero" else 1
+    async for chunk in replay_stream(model, messages, speed=speed, cassette=cassette):
+        yield chunk
+
+
 async def generate_mock_response(
     model: str,
     messages: List[Dict],
@@ -1731,8 +1960,13 @@ async def generate_mock_response(
     Returns:
         dict with 'content', 'reasoning_details', and 'usage' keys, or None for simulated failure
     """
+    mode = _get_latency_mode()
+
     # Simulate network latency
-    await asyncio.sleep(random.uniform(MOCK_DELAY_MIN, MOCK_DELAY_MAX))
+    if mode == "default":
+        await asyncio.sleep(random.uniform(MOCK_DELAY_MIN, MOCK_DELAY_MAX))
+    elif mode != "zero":
+        await asyncio.sleep(_sample_ttft(model, mode))
 
     # Simulate model failure in failure scenario
     if MOCK_LLM_SCENARIO == "one_model_fails":
@@ -1762,6 +1996,11 @@ async def generate_mock_response(
     else:
         content = _stage1_content(model, length)
 
+    if mode == "realistic":
+        # Non-streaming calls wait for the whole generation
+        tokens_per_second = _realistic_profile(model)["tokens_per_second"]
+        await asyncio.sleep(len(_tokenize(content)) / tokens_per_second)
+
     return {
         "content": content,
         "reasoning_details": None,
@@ -1787,13 +2026,18 @@ async def generate_mock_response_stream(
     Yields:
         Text chunks simulating streaming response
     """
-    # Simulate initial connection latency
-    await asyncio.sleep(random.uniform(0.1, 0.3))
+    mode = _get_latency_mode()
+
+    # Simulate initial connection latency (other profiles bake TTFT into the stream)
+    if mode == "default":
+        await asyncio.sleep(random.uniform(0.1, 0.3))
 
     # Simulate model failure in failure scenario
     if MOCK_LLM_SCENARIO == "one_model_fails":
         if "gpt" in model.lower() or random.random() < 0.2:
             _debug(f"[MOCK STREAM FAIL] Simulating failure for {model}")
+            if mode != "default":
+                await asyncio.sleep(_sample_ttft(model, mode))
             yield "[Error: Model overloaded (mock failure)]"
             return
 
@@ -1801,7 +2045,8 @@ async def generate_mock_response_stream(
     effective_tokens = _get_effective_max_tokens(max_tokens)
     length = _get_length_category(max_tokens)
     override_info = f", override={effective_tokens}" if effective_tokens != max_tokens else ""
-    _debug(f"[MOCK STREAM] {model} -> {stage} (length={length}, max_tokens={max_tokens}{override_info})")
+    _debug(f"[MOCK STREAM] {model} -> {stage} (length={length}, max_tokens={max_tokens}{override_info}, "
+           f"latency={mode})")
 
     if stage == "stage1":
         content = _stage1_content(model, length)
@@ -1818,6 +2063,11 @@ async def generate_mock_response_stream(
     else:
         content = _stage1_content(model, length)
 
+    if mode != "default":
+        async for chunk in _stream_with_profile(model, messages, content, mode):
+            yield chunk
+        return
+
     # Stream content in chunks (simulating token-by-token delivery)
     # Use larger chunks for faster testing, smaller for more realistic streaming
     chunk_size = 15  # characters per chunk
@@ -73,6 +73,7 @@ ROLE_ALIASES = {
     'sarah': 'utility',
     'ai_write_assist': 'utility',
     'ai_polish': 'utility',
+    'history_summarizer': 'utility',
 }
 
 
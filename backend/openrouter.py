@@ -12,6 +12,7 @@ logger = logging.getLogger(__name__)
 from typing import List, Dict, Any, Optional, AsyncGenerator
 from .config import OPENROUTER_API_KEY, OPENROUTER_API_URL
 from .config import MOCK_LLM as _MOCK_LLM_INITIAL
+from .config import OPENROUTER_CASSETTE_MODE
 from .config import CACHE_SUPPORTED_MODELS
 from .config import REDIS_ENABLED, REDIS_LLM_CACHE_TTL
 from .config import (
@@ -21,6 +22,7 @@ from .config import (
     HTTP_REQUEST_TIMEOUT,
     HTTP_CONNECT_TIMEOUT,
 )
+from .telemetry import get_telemetry_store
 
 
 # =============================================================================
@@ -552,6 +554,13 @@ def convert_to_cached_messages(
     return cached_messages
 
 
+def _record_query_error(model: str, request_start_time: float) -> None:
+    """Record a failed non-streaming request in the telemetry store."""
+    get_telemetry_store().record_error(
+        model, latency_ms=round((time.time() - request_start_time) * 1000)
+    )
+
+
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
@@ -655,37 +664,47 @@ async def query_model(
         usage = data.get('usage', {})
         total_latency = time.time() - request_start_time
 
+        usage_data = {
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'total_tokens': usage.get('total_tokens', 0),
+            # Cache-specific metrics (Anthropic/Gemini)
+            'cache_creation_input_tokens': usage.get('cache_creation_input_tokens', 0),
+            'cache_read_input_tokens': usage.get('cache_read_input_tokens', 0),
+            # Timing metrics for observability
+            'total_latency_ms': round(total_latency * 1000),
+        }
+        get_telemetry_store().record_usage(
+            {**usage_data, 'model': model},
+            truncated=data['choices'][0].get('finish_reason') == 'length',
+        )
+
         return {
             'content': message.get('content'),
             'reasoning_details': message.get('reasoning_details'),
-            'usage': {
-                'prompt_tokens': usage.get('prompt_tokens', 0),
-                'completion_tokens': usage.get('completion_tokens', 0),
-                'total_tokens': usage.get('total_tokens', 0),
-                # Cache-specific metrics (Anthropic/Gemini)
-                'cache_creation_input_tokens': usage.get('cache_creation_input_tokens', 0),
-                'cache_read_input_tokens': usage.get('cache_read_input_tokens', 0),
-                # Timing metrics for observability
-                'total_latency_ms': round(total_latency * 1000),
-            },
+            'usage': usage_data,
             'model': model,
         }
 
     except httpx.TimeoutException:
         await breaker.record_failure()
+        _record_query_error(model, request_start_time)
         return None
     except httpx.HTTPStatusError as e:
         # Only count 5xx errors as failures (server issues)
         # 4xx errors are client issues, not service failures
         if e.response.status_code >= 500:
             await breaker.record_failure()
+        _record_query_error(model, request_start_time)
         return None
     except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
         # Connection errors indicate service issues
         await breaker.record_failure()
+        _record_query_error(model, request_start_time)
         return None
     except Exception as e:
         logger.warning("Unexpected error querying model %s: %s", model, e)
+        _record_query_error(model, request_start_time)
         return None
 
 
@@ -722,7 +741,8 @@ async def query_model_stream(
         _build_streaming_payload,
         _should_retry_connection_error,
         _handle_http_error_response,
-        _process_sse_stream
+        _process_sse_stream,
+        _record_stream_telemetry,
     )
 
     # 1. Timing instrumentation
@@ -734,6 +754,13 @@ async def query_model_stream(
             yield chunk
         return
 
+    # 2b. Cassette replay: recorded OpenRouter streams through the real parser
+    if OPENROUTER_CASSETTE_MODE == "replay":
+        from .cassettes import replay_stream
+        async for chunk in replay_stream(model, messages):
+            yield chunk
+        return
+
     # 3. Circuit breaker check
     breaker = await _circuit_breaker_registry.get_breaker(model)
     if not await breaker.can_execute():
@@ -757,6 +784,7 @@ async def query_model_stream(
     client = get_http_client(timeout)
 
     while retries <= max_retries:
+        attempt_start_time = time.time()  # Cassettes time the first chunk from this attempt's request
         try:
             async with client.stream("POST", OPENROUTER_API_URL, headers=headers, json=payload) as response:
                 # Handle HTTP errors before reading stream
@@ -779,6 +807,7 @@ async def query_model_stream(
                         error_body=error_body
                     )
 
+                    _record_stream_telemetry(model, request_start_time, None, None, error=True)
                     error_msg, _ = _handle_http_error_response(response.status_code, breaker)
                     # Include truncated error body in user-facing message
                     if error_body:
@@ -786,6 +815,13 @@ async def query_model_stream(
                     yield error_msg
                     return
 
+                # Optionally record the raw stream to a cassette
+                recorder = None
+                if OPENROUTER_CASSETTE_MODE == "record":
+                    from .cassettes import RecordingResponse
+                    response = recorder = RecordingResponse(response, model, payload, messages,
+                                                            started_at=attempt_start_time)
+
                 # Process SSE stream (core streaming logic)
                 should_retry = False
                 async for chunk_or_signal in _process_sse_stream(response, model, breaker, request_start_time, retries, max_retries):
@@ -795,16 +831,21 @@ async def query_model_stream(
                         break
                     yield chunk_or_signal
 
+                if recorder is not None and not should_retry:
+                    await recorder.save()
+
                 if not should_retry:
                     return
 
         except httpx.TimeoutException:
             await breaker.record_failure()
+            _record_stream_telemetry(model, request_start_time, None, None, error=True)
             yield f"[Error: Timeout after {timeout}s]"
             return
         except httpx.HTTPStatusError as e:
             if e.response.status_code >= 500:
                 await breaker.record_failure()
+            _record_stream_telemetry(model, request_start_time, None, None, error=True)
             yield f"[Error: Status {e.response.status_code}]"
             return
         except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
@@ -814,10 +855,12 @@ async def query_model_stream(
                 retries += 1
                 continue
             await breaker.record_failure()
+            _record_stream_telemetry(model, request_start_time, None, None, error=True)
             yield "[Error: Connection failed]"
             return
         except Exception as e:
             logger.warning("Unexpected error streaming model %s: %s", model, e)
+            _record_stream_telemetry(model, request_start_time, None, None, error=True)
             yield "[Error: Request failed]"
             return
 
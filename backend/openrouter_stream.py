@@ -255,6 +255,61 @@ def _handle_http_error_response(status_code: int, breaker) -> Tuple[str, bool]:
     return error_msg, should_record
 
 
+def _record_stream_telemetry(
+    model: str,
+    request_start_time: float,
+    time_to_first_token: Optional[float],
+    usage_data: Optional[Dict[str, Any]],
+    error: bool = False,
+    truncated: bool = False
+) -> None:
+    """
+    Feed the outcome of a streamed request into the telemetry store.
+
+    Uses the usage dict from _extract_usage_data when the provider sent one,
+    otherwise falls back to locally measured timings.
+
+    Args:
+        model: Model identifier
+        request_start_time: Request start timestamp
+        time_to_first_token: Seconds until first content token (optional)
+        usage_data: Usage dict from _extract_usage_data (optional)
+        error: Request ended in an error
+        truncated: Response hit max_tokens
+    """
+    from .telemetry import get_telemetry_store, get_telemetry_stage
+    from .metrics import observe_ttft
+    from .tracing import record_span
+
+    if time_to_first_token:
+        observe_ttft(model, time_to_first_token)
+
+    record_span(
+        "llm.stream",
+        time.time() - request_start_time,
+        status="error" if error else "ok",
+        model=model,
+        stage=get_telemetry_stage(),
+        ttft_ms=round(time_to_first_token * 1000) if time_to_first_token else None,
+        completion_tokens=(usage_data or {}).get("completion_tokens"),
+        prompt_tokens=(usage_data or {}).get("prompt_tokens"),
+        truncated=truncated,
+    )
+
+    store = get_telemetry_store()
+    if usage_data and not error:
+        store.record_usage(usage_data, truncated=truncated)
+        return
+
+    store.record(
+        model,
+        ttft_ms=round(time_to_first_token * 1000) if time_to_first_token else None,
+        latency_ms=round((time.time() - request_start_time) * 1000),
+        error=error,
+        truncated=truncated,
+    )
+
+
 async def _process_sse_stream(
     response,
     model: str,
@@ -293,6 +348,7 @@ async def _process_sse_stream(
         data_str = line[6:]  # Remove "data: " prefix
         if data_str.strip() == "[DONE]":
             await breaker.record_success()
+            _record_stream_telemetry(model, request_start_time, time_to_first_token, usage_data)
             if usage_data:
                 yield _format_usage_event(usage_data)
             yield (False, retries)  # Signal done
@@ -306,6 +362,7 @@ async def _process_sse_stream(
         if 'error' in data:
             error_msg = data['error'].get('message', 'Unknown error')
             error_code = data['error'].get('code', 0)
+            _record_stream_telemetry(model, request_start_time, time_to_first_token, None, error=True)
 
             if _is_retryable_error(error_msg, error_code) and retries < max_retries:
                 should_retry = True
@@ -330,6 +387,7 @@ async def _process_sse_stream(
         if finish_reason == 'length':
             yield "[TRUNCATED]"
             await breaker.record_success()
+            _record_stream_telemetry(model, request_start_time, time_to_first_token, usage_data, truncated=True)
             if usage_data:
                 yield _format_usage_event(usage_data)
             yield (False, retries)  # Signal done
@@ -342,4 +400,5 @@ async def _process_sse_stream(
             yield content
 
     # Stream ended naturally
+    _record_stream_telemetry(model, request_start_time, time_to_first_token, usage_data)
     yield (should_retry, retries)
@@ -0,0 +1,257 @@
+"""
+On-demand sampling profiler for a running worker.
+
+Hosted workers can't have a profiler attached, so an admin can run a short
+statistical profile through POST /admin/diagnostics/profile and get back a
+collapsed-stack profile ("frame;frame;frame count" per line) that feeds
+straight into flamegraph.pl, speedscope or Perfetto.
+
+TWO KINDS OF SAMPLES:
+- thread: a daemon thread reads sys._current_frames() at the sample rate.
+  Shows where Python is executing (CPU and sync I/O) on every thread,
+  including the event-loop thread and asyncio.to_thread workers. Samples
+  land where threads yield the GIL, so an idle loop shows up as select().
+- task: a coroutine on the event loop walks each asyncio task's await stack.
+  Shows where requests are waiting (LLM streams, DB calls, locks).
+
+FILTERING:
+While a profile runs, a task factory records the route and correlation ID
+of each new task. With a route or correlation filter, only loop-thread
+samples taken while a matching task was running, and stacks of matching
+tasks, are kept. Requests that started before the profile can't be
+attributed, so start the profile first, then reproduce.
+
+SAFETY:
+Duration and sample rate are capped (PROFILER_MAX_DURATION_SECONDS,
+PROFILER_MAX_SAMPLE_HZ), only one profile runs per worker, stacks are depth
+limited and the number of distinct stacks is bounded.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .config import PROFILER_MAX_DURATION_SECONDS, PROFILER_MAX_SAMPLE_HZ
+    from .loop_monitor import normalize_route
+except ImportError:
+    from backend.config import PROFILER_MAX_DURATION_SECONDS, PROFILER_MAX_SAMPLE_HZ
+    from backend.loop_monitor import normalize_route
+
+
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 5000
+# Task stacks are more expensive to walk (on the loop), so sample them less often
+TASK_SAMPLE_DIVISOR = 5
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is already running on this worker."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse_frame(frame, prefix: str) -> str:
+    """Collapse a frame chain into 'prefix;outer;...;inner'."""
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join([prefix] + labels)
+
+
+def _collapse_task(task: asyncio.Task) -> Optional[str]:
+    """Collapse a task's await stack (outermost coroutine first)."""
+    frames = task.get_stack(limit=MAX_STACK_DEPTH)
+    if not frames:
+        return None
+    name = task.get_name()
+    # Auto-generated names ("Task-123") would make every stack unique
+    if name.startswith("Task-"):
+        name = "task"
+    return ";".join([f"task:{name}"] + [_frame_label(f) for f in frames])
+
+
+class SamplingProfiler:
+    """A single time-bounded profiling run."""
+
+    def __init__(
+        self,
+        duration: float,
+        sample_hz: int,
+        route: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        include_tasks: bool = True,
+        route_getter: Callable[[], str] = lambda: "",
+        correlation_getter: Callable[[], str] = lambda: "",
+    ):
+        self.duration = max(0.1, min(duration, PROFILER_MAX_DURATION_SECONDS))
+        self.sample_hz = max(1, min(sample_hz, PROFILER_MAX_SAMPLE_HZ))
+        self.route = route
+        self.correlation_id = correlation_id
+        self.include_tasks = include_tasks
+        self._getters = (route_getter, correlation_getter)
+
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread_samples = 0
+        self._task_samples = 0
+        self._truncated = 0
+        self._attribution: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[str, str]]" = weakref.WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._previous_factory = None
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.route or self.correlation_id)
+
+    # -------------------------------------------------------------------------
+    # Attribution
+    # -------------------------------------------------------------------------
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        self._attribution[task] = (self._getters[0](), self._getters[1]())
+        return task
+
+    def _matches(self, task: Optional[asyncio.Task]) -> bool:
+        if not self.filtered:
+            return True
+        if task is None:
+            return False
+        route, correlation_id = self._attribution.get(task, ("", ""))
+        if self.correlation_id and correlation_id != self.correlation_id:
+            return False
+        if self.route and self.route not in normalize_route(route):
+            return False
+        return True
+
+    def _record(self, stack: str) -> None:
+        with self._lock:
+            if stack not in self._stacks and len(self._stacks) >= MAX_DISTINCT_STACKS:
+                self._truncated += 1
+                return
+            self._stacks[stack] += 1
+
+    # -------------------------------------------------------------------------
+    # Sampling
+    # -------------------------------------------------------------------------
+
+    def _sample_threads(self, stop: threading.Event) -> None:
+        interval = 1.0 / self.sample_hz
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+
+        while not stop.wait(interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                is_loop_thread = thread_id == self._loop_thread_id
+                if self.filtered:
+                    # Only the loop thread can be attributed to a request
+                    if not is_loop_thread or not isinstance(current_tasks, dict):
+                        continue
+                    if not self._matches(current_tasks.get(self._loop)):
+                        continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                prefix = "thread:event-loop" if is_loop_thread else f"thread:{names.get(thread_id, thread_id)}"
+                self._record(_collapse_frame(frame, prefix))
+                self._thread_samples += 1
+
+    async def _sample_tasks(self, stop: threading.Event) -> None:
+        interval = TASK_SAMPLE_DIVISOR / self.sample_hz
+        me = asyncio.current_task()
+        while not stop.is_set():
+            await asyncio.sleep(interval)
+            for task in asyncio.all_tasks():
+                if task is me or task.done() or not self._matches(task):
+                    continue
+                stack = _collapse_task(task)
+                if stack:
+                    self._record(stack)
+                    self._task_samples += 1
+
+    async def run(self) -> Dict[str, Any]:
+        """Profile for `duration` seconds and return the result."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample_threads, args=(stop,), name="profiler", daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+        task_sampler = asyncio.create_task(self._sample_tasks(stop)) if self.include_tasks else None
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            stop.set()
+            self._loop.set_task_factory(self._previous_factory)
+            if task_sampler is not None:
+                task_sampler.cancel()
+                try:
+                    await task_sampler
+                except asyncio.CancelledError:
+                    pass
+            # The sampler wakes within one interval of stop being set
+            await asyncio.to_thread(sampler.join, 1.0)
+
+        return self.result(time.perf_counter() - started)
+
+    # -------------------------------------------------------------------------
+    # Output
+    # -------------------------------------------------------------------------
+
+    def collapsed(self) -> str:
+        """Profile in collapsed-stack format, heaviest stacks first."""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def result(self, elapsed: float) -> Dict[str, Any]:
+        with self._lock:
+            top = [{"stack": stack, "count": count} for stack, count in self._stacks.most_common(20)]
+            distinct = len(self._stacks)
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "sample_hz": self.sample_hz,
+            "filter": {"route": self.route, "correlation_id": self.correlation_id},
+            "thread_samples": self._thread_samples,
+            "task_samples": self._task_samples,
+            "distinct_stacks": distinct,
+            "truncated_samples": self._truncated,
+            "top_stacks": top,
+            "collapsed": self.collapsed(),
+        }
+
+
+# One profile per worker at a time
+_profile_lock = asyncio.Lock()
+
+
+async def run_profile(**kwargs) -> Dict[str, Any]:
+    """
+    Run a SamplingProfiler with the given options.
+
+    Raises:
+        ProfilerBusyError: if another profile is already running
+    """
+    if _profile_lock.locked():
+        raise ProfilerBusyError("A profile is already running on this worker")
+    async with _profile_lock:
+        return await SamplingProfiler(**kwargs).run()
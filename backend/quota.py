@@ -0,0 +1,928 @@
+"""
+Quota engine: per-message billing and company rate-limit checks in Redis.
+
+Every council message used to make up to five blocking Postgres round-trips
+for quota purposes (check_can_query, check_rate_limits, increment_query_usage,
+increment_rate_counters and a second check_rate_limits). This module keeps the
+same counters in Redis and answers "may this user run a session?" with one
+atomic Lua check-and-reserve, which also closes the over-admission window
+where concurrent requests all passed the check before any of them incremented.
+
+KEYS (all under axcouncil:quota:):
+- u:{user_id}                      hash: used, limit, active, period (TTL QUOTA_LIMITS_TTL)
+- c:{company_id}:limits            hash: sph, spd, tpm, bpm, alert (TTL QUOTA_LIMITS_TTL)
+- c:{company_id}:h:{YYYYMMDDHH}    hash: sessions (hourly window)
+- c:{company_id}:d:{YYYYMMDD}      hash: sessions (daily window)
+- c:{company_id}:m:{YYYYMM}        hash: tokens, cost (monthly window)
+- pending                          hash of deltas not yet written to Postgres;
+                                   company deltas are bucketed by hour
+                                   (c:{id}:{metric}:{YYYYMMDDHH}) and user
+                                   queries by billing period (u:{id}:queries:{period})
+- flush-lock                       held by the worker currently reconciling
+- flush-gen                        bumped when a flush starts and ends, and
+                                   when cached hashes are invalidated
+
+Missing keys are seeded from Postgres (the same RPCs as the DB path) plus any
+still-pending deltas of the same window, so a cold or expired key costs one
+DB read, not one per message. Deltas are written back to Postgres in batches
+by the reconciler (QUOTA_FLUSH_INTERVAL) and only removed from pending once
+their write succeeds, so a failed write or a crashed worker never loses
+usage. Company deltas are written to the Postgres windows of the hour they
+were counted in, and user queries only apply while Postgres is still in the
+billing period they were counted in (usage from before a Stripe period reset
+is dropped). A seed read while a flush was running could count a delta in
+both Postgres and pending, or in neither, so seeding is refused unless no
+flush overlapped it (flush-gen unchanged, no lock) and the request takes the
+DB path instead. Billing webhooks and rate-limit settings invalidate the
+cached hashes (invalidate_user_quota, invalidate_company_limits). When Redis
+is unavailable every call falls back to the original DB path, so behaviour
+degrades to what it was before.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    from .config import QUOTA_ENGINE_ENABLED, QUOTA_LIMITS_TTL, QUOTA_FLUSH_INTERVAL
+    from .cache import get_redis
+    from .security import log_app_event
+    from . import billing
+except ImportError:
+    from backend.config import QUOTA_ENGINE_ENABLED, QUOTA_LIMITS_TTL, QUOTA_FLUSH_INTERVAL
+    from backend.cache import get_redis
+    from backend.security import log_app_event
+    from backend import billing
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "axcouncil:quota"
+PENDING_KEY = f"{KEY_PREFIX}:pending"
+FLUSH_LOCK_KEY = f"{KEY_PREFIX}:flush-lock"
+FLUSH_GEN_KEY = f"{KEY_PREFIX}:flush-gen"
+FLUSH_LOCK_TTL = 60
+
+HOUR_TTL = 3600 + 300
+DAY_TTL = 86400 + 300
+MONTH_TTL = 32 * 86400
+
+# Order and names match the check_rate_limits RPC
+LIMIT_TYPES = ("sessions_hourly", "sessions_daily", "tokens_monthly", "budget_monthly")
+
+# Same defaults as check_rate_limits when a company has no rate_limits row
+DEFAULT_LIMITS = {
+    "sessions_hourly": 20,
+    "sessions_daily": 100,
+    "tokens_monthly": 10_000_000,
+    "budget_monthly": 10_000,
+}
+DEFAULT_ALERT_PERCENT = 80
+
+
+# =============================================================================
+# LUA SCRIPTS
+# =============================================================================
+
+# KEYS: 1 user, 2 hourly, 3 daily, 4 monthly, 5 company limits, 6 pending,
+#       7 flush lock, 8 flush generation
+# ARGV: 1 user pending prefix, 2 company pending prefix, 3 has_company,
+#       4 check_rate, 5 count_query, 6 count_session,
+#       7 limits_ttl, 8 hour_ttl, 9 day_ttl, 10 month_ttl,
+#       11 seed_user, 12 used, 13 limit, 14 active, 15 billing period,
+#       16 seed_company, 17 hourly sessions, 18 daily sessions, 19 monthly tokens,
+#       20 monthly cost, 21 sph, 22 spd, 23 tpm, 24 bpm, 25 alert percent,
+#       26 hour stamp (YYYYMMDDHH), 27 user seed generation,
+#       28 company seed generation
+# Returns the user's billing period after the remaining count on OK/RATE.
+RESERVE_SCRIPT = """
+local has_company = ARGV[3] == '1'
+local hour = ARGV[26]
+local day = string.sub(hour, 1, 8)
+local month = string.sub(hour, 1, 6)
+
+local function pending(field)
+    return tonumber(redis.call('HGET', KEYS[6], field) or '0')
+end
+
+-- Sum of a company metric's hourly buckets for the given days of this month
+local function pending_hours(metric, stamps)
+    local total = 0
+    for _, stamp in ipairs(stamps) do
+        for h = 0, 23 do
+            total = total + pending(ARGV[2] .. metric .. ':' .. stamp .. string.format('%02d', h))
+        end
+    end
+    return total
+end
+
+-- Hashes seeded before periods were tracked keep the unbucketed field
+local function queries_field(period)
+    if period then
+        return ARGV[1] .. 'queries:' .. period
+    end
+    return ARGV[1] .. 'queries'
+end
+
+local function seed(key, ttl, ...)
+    if redis.call('EXISTS', key) == 0 then
+        redis.call('HSET', key, ...)
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+
+-- A seed is Postgres + pending; both must be read with no flush in between
+local function can_seed(gen)
+    return redis.call('EXISTS', KEYS[7]) == 0 and (redis.call('GET', KEYS[8]) or '0') == gen
+end
+
+-- Seed missing keys (another worker may have seeded them first)
+if ARGV[11] == '1' and can_seed(ARGV[27]) then
+    seed(KEYS[1], ARGV[7], 'used', tonumber(ARGV[12]) + pending(queries_field(ARGV[15])),
+         'limit', ARGV[13], 'active', ARGV[14], 'period', ARGV[15])
+end
+if has_company and ARGV[16] == '1' and can_seed(ARGV[28]) then
+    local days = {}
+    for d = 1, 31 do
+        table.insert(days, month .. string.format('%02d', d))
+    end
+    seed(KEYS[2], ARGV[8], 'sessions', tonumber(ARGV[17]) + pending(ARGV[2] .. 'sessions:' .. hour))
+    seed(KEYS[3], ARGV[9], 'sessions', tonumber(ARGV[18]) + pending_hours('sessions', {day}))
+    seed(KEYS[4], ARGV[10], 'tokens', tonumber(ARGV[19]) + pending_hours('tokens', days),
+         'cost', tonumber(ARGV[20]) + pending_hours('cost', days))
+    seed(KEYS[5], ARGV[7], 'sph', ARGV[21], 'spd', ARGV[22], 'tpm', ARGV[23], 'bpm', ARGV[24], 'alert', ARGV[25])
+end
+
+local missing = {}
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    table.insert(missing, 'user')
+end
+if has_company and redis.call('EXISTS', KEYS[2], KEYS[3], KEYS[4], KEYS[5]) < 4 then
+    table.insert(missing, 'company')
+end
+if #missing > 0 then
+    return {'MISS', table.concat(missing, ',')}
+end
+
+-- Billing
+local used = tonumber(redis.call('HGET', KEYS[1], 'used'))
+local limit = tonumber(redis.call('HGET', KEYS[1], 'limit'))
+if redis.call('HGET', KEYS[1], 'active') ~= '1' then
+    return {'BILLING', 'inactive', 0, limit}
+end
+if limit ~= -1 and used >= limit then
+    return {'BILLING', 'limit', 0, limit}
+end
+local remaining = -1
+if limit ~= -1 then
+    remaining = limit - used
+end
+local period = redis.call('HGET', KEYS[1], 'period')
+
+-- Company rate limits: [current, limit] per LIMIT_TYPES entry
+local values = {}
+local exceeded = {}
+local warnings = {}
+if has_company then
+    local lim = redis.call('HMGET', KEYS[5], 'sph', 'spd', 'tpm', 'bpm', 'alert')
+    local current = {
+        tonumber(redis.call('HGET', KEYS[2], 'sessions') or '0'),
+        tonumber(redis.call('HGET', KEYS[3], 'sessions') or '0'),
+        tonumber(redis.call('HGET', KEYS[4], 'tokens') or '0'),
+        tonumber(redis.call('HGET', KEYS[4], 'cost') or '0'),
+    }
+    local names = {'sessions_hourly', 'sessions_daily', 'tokens_monthly', 'budget_monthly'}
+    local alert = tonumber(lim[5])
+    for i = 1, 4 do
+        local cap = tonumber(lim[i])
+        table.insert(values, current[i])
+        table.insert(values, cap)
+        if current[i] >= cap then
+            table.insert(exceeded, names[i])
+        elseif current[i] >= math.floor(cap * alert / 100) then
+            table.insert(warnings, names[i])
+        end
+    end
+    if ARGV[4] == '1' and #exceeded > 0 then
+        return {'RATE', remaining, period or '', table.concat(exceeded, ','), table.concat(warnings, ','),
+                unpack(values)}
+    end
+end
+
+-- Reserve
+if ARGV[5] == '1' then
+    redis.call('HINCRBY', KEYS[1], 'used', 1)
+    redis.call('HINCRBY', KEYS[6], queries_field(period), 1)
+end
+if has_company and ARGV[6] == '1' then
+    redis.call('HINCRBY', KEYS[2], 'sessions', 1)
+    redis.call('HINCRBY', KEYS[3], 'sessions', 1)
+    redis.call('HINCRBY', KEYS[6], ARGV[2] .. 'sessions:' .. hour, 1)
+end
+return {'OK', remaining, period or '', table.concat(exceeded, ','), table.concat(warnings, ','), unpack(values)}
+"""
+
+# Settle a reservation: add tokens/cost, or undo a reserved query/session.
+# Counters are only touched if they exist, so a partial key is never
+# created (which would skip seeding); pending deltas are always recorded,
+# in the reservation's hour and billing period. A query given back after the
+# user's period changed only adjusts the old period's pending delta.
+# KEYS: 1 user, 2 hourly, 3 daily, 4 monthly, 5 company limits, 6 pending
+# ARGV: 1 user pending prefix, 2 company pending prefix,
+#       3 tokens, 4 cost, 5 query delta, 6 session delta,
+#       7 hour stamp of the reservation, 8 billing period of the reservation
+SETTLE_SCRIPT = """
+local function incr(key, field, delta)
+    if delta ~= 0 and redis.call('EXISTS', key) == 1 then
+        redis.call('HINCRBY', key, field, delta)
+    end
+end
+
+local tokens, cost = tonumber(ARGV[3]), tonumber(ARGV[4])
+local queries, sessions = tonumber(ARGV[5]), tonumber(ARGV[6])
+local hour, period = ARGV[7], ARGV[8]
+local queries_field = ARGV[1] .. 'queries'
+if period ~= '' then
+    queries_field = queries_field .. ':' .. period
+end
+
+if (redis.call('HGET', KEYS[1], 'period') or '') == period then
+    incr(KEYS[1], 'used', queries)
+end
+incr(KEYS[2], 'sessions', sessions)
+incr(KEYS[3], 'sessions', sessions)
+incr(KEYS[4], 'tokens', tokens)
+incr(KEYS[4], 'cost', cost)
+if queries ~= 0 then redis.call('HINCRBY', KEYS[6], queries_field, queries) end
+if sessions ~= 0 then redis.call('HINCRBY', KEYS[6], ARGV[2] .. 'sessions:' .. hour, sessions) end
+if tokens ~= 0 then redis.call('HINCRBY', KEYS[6], ARGV[2] .. 'tokens:' .. hour, tokens) end
+if cost ~= 0 then redis.call('HINCRBY', KEYS[6], ARGV[2] .. 'cost:' .. hour, cost) end
+
+local lim = redis.call('HMGET', KEYS[5], 'sph', 'spd', 'tpm', 'bpm', 'alert')
+return {
+    redis.call('HGET', KEYS[2], 'sessions') or false,
+    redis.call('HGET', KEYS[3], 'sessions') or false,
+    redis.call('HGET', KEYS[4], 'tokens') or false,
+    redis.call('HGET', KEYS[4], 'cost') or false,
+    lim[1], lim[2], lim[3], lim[4], lim[5],
+}
+"""
+
+# Subtract deltas that reached Postgres from pending. Anything added since
+# the snapshot stays behind for the next flush.
+# KEYS: 1 pending; ARGV: field, delta pairs
+ACK_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1])) == 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+# Take the flush lock and bump the generation, so seeds read before this
+# flush are refused
+# KEYS: 1 lock, 2 generation; ARGV: 1 token, 2 lock ttl
+LOCK_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    redis.call('INCR', KEYS[2])
+    return 1
+end
+return 0
+"""
+
+# Bump the generation again (seeds read during the flush are refused) and
+# release the flush lock only if this worker still holds it
+# KEYS: 1 lock, 2 generation; ARGV: 1 token
+UNLOCK_SCRIPT = """
+redis.call('INCR', KEYS[2])
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Drop cached hashes after Postgres changed. Bumping the generation first
+# refuses seeds read before the change, so they can't restore stale values.
+# KEYS: 1 generation, 2.. hashes to drop
+INVALIDATE_SCRIPT = """
+redis.call('INCR', KEYS[1])
+return redis.call('DEL', unpack(KEYS, 2))
+"""
+
+
+# =============================================================================
+# RESERVATIONS
+# =============================================================================
+
+@dataclass
+class QuotaReservation:
+    """Outcome of reserve_session; pass it to commit_session or release_session."""
+    user_id: str
+    company_id: Optional[str]
+    allowed: bool = True
+    billing_blocked: bool = False
+    reason: Optional[str] = None
+    remaining: int = -1
+    # Same shape as check_rate_limits(): allowed, exceeded, warnings, details
+    rate_check: Dict[str, Any] = field(default_factory=lambda: _empty_rate_check())
+    backend: str = "db"
+    reserved_query: bool = False
+    reserved_session: bool = False
+    access_token: Optional[str] = field(default=None, repr=False)
+    settled: bool = False
+    # Windows and billing period the reservation was counted in; settling undoes it there
+    reserved_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    billing_period: str = ""
+
+
+class QuotaSeedDeferred(RuntimeError):
+    """A cold key could not be seeded because a flush overlapped the read."""
+
+
+def _empty_rate_check() -> Dict[str, Any]:
+    return {"allowed": True, "exceeded": [], "warnings": [], "details": {}}
+
+
+def _window_keys(company_id: str, now: Optional[datetime] = None) -> Tuple[str, str, str, str]:
+    now = now or datetime.now(timezone.utc)
+    base = f"{KEY_PREFIX}:c:{company_id}"
+    return (
+        f"{base}:h:{now:%Y%m%d%H}",
+        f"{base}:d:{now:%Y%m%d}",
+        f"{base}:m:{now:%Y%m}",
+        f"{base}:limits",
+    )
+
+
+def _keys(user_id: str, company_id: Optional[str], now: datetime) -> List[str]:
+    # Without a company the window keys are placeholders the scripts never touch
+    company_keys = _window_keys(company_id, now) if company_id else (f"{KEY_PREFIX}:none",) * 4
+    return [f"{KEY_PREFIX}:u:{user_id}", *company_keys, PENDING_KEY]
+
+
+def _hour_stamp(now: datetime) -> str:
+    return f"{now:%Y%m%d%H}"
+
+
+def _hour_start(stamp: str) -> datetime:
+    return datetime.strptime(stamp, "%Y%m%d%H").replace(tzinfo=timezone.utc)
+
+
+def _period_stamp(period_end: Optional[str]) -> str:
+    """
+    Billing period as a compact UTC stamp of its end ('0' without one); the
+    increment_query_usage_for_period RPC formats subscription_period_end the same way.
+    """
+    if not period_end:
+        return "0"
+    try:
+        end = datetime.fromisoformat(str(period_end).replace("Z", "+00:00"))
+    except ValueError:
+        return "0"
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return f"{end.astimezone(timezone.utc):%Y%m%d%H%M%S}"
+
+
+def _prefixes(user_id: str, company_id: Optional[str]) -> Tuple[str, str]:
+    return f"u:{user_id}:", f"c:{company_id}:"
+
+
+def _mock_mode() -> bool:
+    # increment_rate_counters skips company counters in mock mode; so do we
+    from . import openrouter
+    return openrouter.MOCK_LLM
+
+
+def _billing_reason(kind: str, limit: int) -> str:
+    if kind == "inactive":
+        return "Subscription is not active"
+    return f"Monthly query limit reached ({limit} queries). Upgrade to continue."
+
+
+def _rate_check_from_values(values: List[Any], alert_percent: Optional[int] = None,
+                            exceeded: Optional[List[str]] = None,
+                            warnings: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Build a check_rate_limits-shaped dict from [current, limit] pairs."""
+    details = {}
+    computed_exceeded, computed_warnings = [], []
+    for i, limit_type in enumerate(LIMIT_TYPES):
+        current, limit = int(values[2 * i]), int(values[2 * i + 1])
+        details[limit_type] = {"current": current, "limit": limit}
+        if current >= limit:
+            computed_exceeded.append(limit_type)
+        elif alert_percent is not None and current >= limit * alert_percent // 100:
+            computed_warnings.append(limit_type)
+    exceeded = computed_exceeded if exceeded is None else exceeded
+    warnings = computed_warnings if warnings is None else warnings
+    return {"allowed": not exceeded, "exceeded": exceeded, "warnings": warnings, "details": details}
+
+
+# =============================================================================
+# SEEDING (Postgres -> Redis on a cold key)
+# =============================================================================
+
+_seed_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _load_seed(client, loader) -> Tuple[List[Any], str]:
+    """Run a seed loader, noting the flush generation read before Postgres is."""
+    generation = await client.get(FLUSH_GEN_KEY) or "0"
+    return await loader(), generation
+
+
+async def _load_once(key: str, loader):
+    """Share one in-flight seed load per key so a cold key isn't loaded by every request."""
+    task = _seed_tasks.get(key)
+    if task is None:
+        task = asyncio.ensure_future(loader())
+        _seed_tasks[key] = task
+        task.add_done_callback(lambda _: _seed_tasks.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _load_user_seed(user_id: str, access_token: Optional[str]) -> List[Any]:
+    subscription = await asyncio.to_thread(billing.get_user_subscription, user_id, access_token=access_token)
+    active = "1" if subscription["status"] in ("active", "trialing") else "0"
+    return [1, int(subscription.get("queries_used") or 0), int(subscription["queries_limit"]), active,
+            _period_stamp(subscription.get("period_end"))]
+
+
+async def _load_company_seed(company_id: str) -> List[Any]:
+    try:
+        from .routers.company.utils import check_rate_limits, get_rate_limit_config
+    except ImportError:
+        from backend.routers.company.utils import check_rate_limits, get_rate_limit_config
+
+    status, limits_config = await asyncio.gather(
+        check_rate_limits(company_id), get_rate_limit_config(company_id)
+    )
+    if not status["details"]:
+        # check_rate_limits fails open with no details; don't cache zeros
+        raise RuntimeError("rate limit counters unavailable")
+    current = {name: status["details"].get(name, {}).get("current", 0) for name in LIMIT_TYPES}
+    limit = {name: status["details"].get(name, {}).get("limit", DEFAULT_LIMITS[name]) for name in LIMIT_TYPES}
+    alert = limits_config.get("alert_threshold_percent") or DEFAULT_ALERT_PERCENT
+    return [
+        1,
+        current["sessions_hourly"], current["sessions_daily"],
+        current["tokens_monthly"], current["budget_monthly"],
+        limit["sessions_hourly"], limit["sessions_daily"],
+        limit["tokens_monthly"], limit["budget_monthly"],
+        int(alert),
+    ]
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+async def reserve_session(
+    user_id: str,
+    company_id: Optional[str] = None,
+    access_token: Optional[str] = None,
+    count_query: bool = True,
+    check_rate: bool = True,
+) -> QuotaReservation:
+    """
+    Check billing and company rate limits and, if allowed, reserve one query
+    (count_query) and one company session in the same atomic step.
+
+    check_rate=False still counts the session but doesn't enforce company
+    limits (chat mode). Rejections reserve nothing.
+    """
+    client = await get_redis() if QUOTA_ENGINE_ENABLED else None
+    if client is not None:
+        try:
+            return await _reserve_redis(client, user_id, company_id, access_token, count_query, check_rate)
+        except QuotaSeedDeferred:
+            pass
+        except Exception as e:
+            log_app_event("QUOTA_REDIS_FALLBACK", level="WARNING", operation="reserve", error=str(e))
+    return await _reserve_db(user_id, company_id, access_token, count_query, check_rate)
+
+
+async def commit_session(
+    reservation: QuotaReservation,
+    tokens: int = 0,
+    cost_cents: int = 0,
+    count_session: bool = True,
+) -> Dict[str, Any]:
+    """
+    Record a finished session's tokens and cost.
+
+    Returns the post-session rate status (check_rate_limits shape) so callers
+    can raise budget alerts without another DB round-trip; empty details if
+    there's no company or the counters weren't updated. count_session=False
+    gives back the reserved company session (e.g. cache hits, which the
+    company rate counters never counted).
+    """
+    if reservation.settled:
+        return _empty_rate_check()
+    reservation.settled = True
+
+    if reservation.backend == "redis":
+        try:
+            return await _settle_redis(
+                reservation, tokens, cost_cents,
+                queries=0, sessions=0 if count_session else -int(reservation.reserved_session),
+            )
+        except Exception as e:
+            log_app_event("QUOTA_REDIS_FALLBACK", level="WARNING", operation="commit", error=str(e))
+            # The reservation itself is already pending in Redis; only add tokens/cost
+            if reservation.company_id and (tokens or cost_cents) and not _mock_mode():
+                await _increment_rate_counters_db(reservation.company_id, 0, tokens, cost_cents)
+            return _empty_rate_check()
+    return await _commit_db(reservation, tokens, cost_cents, count_session)
+
+
+async def release_session(reservation: QuotaReservation) -> None:
+    """Give back a reservation for a session that didn't complete."""
+    if reservation.settled:
+        return
+    reservation.settled = True
+    if reservation.backend != "redis" or not (reservation.reserved_query or reservation.reserved_session):
+        return
+    try:
+        await _settle_redis(
+            reservation, 0, 0,
+            queries=-int(reservation.reserved_query), sessions=-int(reservation.reserved_session),
+        )
+    except Exception as e:
+        log_app_event("QUOTA_RELEASE_FAILED", level="WARNING", user_id=reservation.user_id, error=str(e))
+
+
+async def get_rate_status(
+    user_id: str,
+    company_id: Optional[str],
+    access_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Company rate status (check_rate_limits shape) from the counters that
+    reserve_session enforces, including deltas not yet flushed to Postgres.
+    Reserves nothing.
+    """
+    if not company_id:
+        return _empty_rate_check()
+    client = await get_redis() if QUOTA_ENGINE_ENABLED else None
+    if client is not None:
+        try:
+            reservation = await _reserve_redis(client, user_id, company_id, access_token,
+                                               count_query=False, check_rate=False, count_session=False)
+            # Billing rejections return before the rate values are read
+            if not reservation.billing_blocked:
+                return reservation.rate_check
+        except QuotaSeedDeferred:
+            pass
+        except Exception as e:
+            log_app_event("QUOTA_REDIS_FALLBACK", level="WARNING", operation="status", error=str(e))
+    try:
+        from .routers.company.utils import check_rate_limits
+    except ImportError:
+        from backend.routers.company.utils import check_rate_limits
+    return await check_rate_limits(company_id)
+
+
+async def hold_for_stream(reservation: QuotaReservation, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Tie a reservation to a streaming response body.
+
+    A StreamingResponse body that never starts (client gone before the first
+    chunk) never runs its finally block, so a release there would leak the
+    reservation. The returned stream is already started: however it ends -
+    exhausted, closed, or dropped and finalized by the event loop - the
+    reservation is released (a no-op once committed).
+    """
+    async def held():
+        try:
+            yield None
+            async for event in events:
+                yield event
+        finally:
+            try:
+                await events.aclose()
+            finally:
+                await release_session(reservation)
+
+    stream = held()
+    await stream.__anext__()
+    return stream
+
+
+# =============================================================================
+# REDIS PATH
+# =============================================================================
+
+async def _reserve_redis(client, user_id: str, company_id: Optional[str], access_token: Optional[str],
+                         count_query: bool, check_rate: bool, count_session: bool = True) -> QuotaReservation:
+    now = datetime.now(timezone.utc)
+    keys = [*_keys(user_id, company_id, now), FLUSH_LOCK_KEY, FLUSH_GEN_KEY]
+    user_prefix, company_prefix = _prefixes(user_id, company_id)
+    count_session = count_session and bool(company_id) and not _mock_mode()
+    base_args = [
+        user_prefix, company_prefix, int(bool(company_id)), int(check_rate),
+        int(count_query), int(count_session),
+        QUOTA_LIMITS_TTL, HOUR_TTL, DAY_TTL, MONTH_TTL,
+    ]
+    user_seed: List[Any] = [0, 0, 0, 0, ""]
+    company_seed: List[Any] = [0] * 10
+    user_gen = company_gen = ""
+
+    def run():
+        return client.eval(RESERVE_SCRIPT, len(keys), *keys, *base_args, *user_seed, *company_seed,
+                           _hour_stamp(now), user_gen, company_gen)
+
+    result = await run()
+    if result[0] == "MISS":
+        missing = result[1].split(",")
+        if "user" in missing:
+            user_seed, user_gen = await _load_once(
+                f"u:{user_id}", lambda: _load_seed(client, lambda: _load_user_seed(user_id, access_token)))
+        if "company" in missing:
+            company_seed, company_gen = await _load_once(
+                f"c:{company_id}", lambda: _load_seed(client, lambda: _load_company_seed(company_id)))
+        result = await run()
+        if result[0] == "MISS":
+            # A flush overlapped the seed read; the DB path answers this one
+            raise QuotaSeedDeferred(f"quota keys not seeded: {result[1]}")
+
+    reservation = QuotaReservation(user_id=user_id, company_id=company_id, backend="redis",
+                                   access_token=access_token, reserved_at=now)
+    status = result[0]
+    if status == "BILLING":
+        reservation.allowed = False
+        reservation.billing_blocked = True
+        reservation.remaining = 0
+        reservation.reason = _billing_reason(result[1], int(result[3]))
+        return reservation
+
+    reservation.remaining = int(result[1])
+    reservation.billing_period = result[2]
+    if company_id:
+        exceeded = [name for name in result[3].split(",") if name]
+        warnings = [name for name in result[4].split(",") if name]
+        reservation.rate_check = _rate_check_from_values(result[5:], exceeded=exceeded, warnings=warnings)
+    if status == "RATE":
+        reservation.allowed = False
+        return reservation
+
+    reservation.reserved_query = count_query
+    reservation.reserved_session = count_session
+    return reservation
+
+
+async def _settle_redis(reservation: QuotaReservation, tokens: int, cost_cents: int,
+                        queries: int, sessions: int) -> Dict[str, Any]:
+    client = await get_redis()
+    if client is None:
+        raise RuntimeError("redis unavailable")
+    if reservation.company_id is None or _mock_mode():
+        tokens, cost_cents = 0, 0
+    keys = _keys(reservation.user_id, reservation.company_id, reservation.reserved_at)
+    user_prefix, company_prefix = _prefixes(reservation.user_id, reservation.company_id)
+    result = await client.eval(
+        SETTLE_SCRIPT, len(keys), *keys,
+        user_prefix, company_prefix, int(tokens), int(cost_cents), queries, sessions,
+        _hour_stamp(reservation.reserved_at), reservation.billing_period,
+    )
+    if not reservation.company_id or any(value is None for value in result):
+        return _empty_rate_check()
+    current, limits, alert = result[0:4], result[4:8], int(result[8])
+    values = [v for pair in zip(current, limits) for v in pair]
+    return _rate_check_from_values(values, alert_percent=alert)
+
+
+# =============================================================================
+# DATABASE PATH (Redis unavailable)
+# =============================================================================
+
+async def _increment_rate_counters_db(company_id: str, sessions: int, tokens: int, cost_cents: int,
+                                     window: Optional[datetime] = None) -> dict:
+    try:
+        from .routers.company.utils import increment_rate_counters
+    except ImportError:
+        from backend.routers.company.utils import increment_rate_counters
+    if window is not None:
+        return await increment_rate_counters(company_id=company_id, sessions=sessions,
+                                             tokens=tokens, cost_cents=cost_cents, window=window)
+    return await increment_rate_counters(company_id=company_id, sessions=sessions,
+                                         tokens=tokens, cost_cents=cost_cents)
+
+
+async def _reserve_db(user_id: str, company_id: Optional[str], access_token: Optional[str],
+                      count_query: bool, check_rate: bool) -> QuotaReservation:
+    try:
+        from .routers.company.utils import check_rate_limits
+    except ImportError:
+        from backend.routers.company.utils import check_rate_limits
+
+    reservation = QuotaReservation(user_id=user_id, company_id=company_id, backend="db",
+                                   access_token=access_token)
+    can_query = billing.check_can_query(user_id, access_token=access_token)
+    reservation.remaining = can_query["remaining"]
+    if not can_query["can_query"]:
+        reservation.allowed = False
+        reservation.billing_blocked = True
+        reservation.reason = can_query["reason"]
+        return reservation
+
+    if company_id and check_rate:
+        reservation.rate_check = await check_rate_limits(company_id)
+        reservation.allowed = reservation.rate_check["allowed"]
+    if reservation.allowed:
+        # Nothing is held in the DB path; commit_session does the increments
+        reservation.reserved_query = count_query
+        reservation.reserved_session = bool(company_id)
+    return reservation
+
+
+async def _commit_db(reservation: QuotaReservation, tokens: int, cost_cents: int,
+                     count_session: bool) -> Dict[str, Any]:
+    try:
+        from .routers.company.utils import check_rate_limits
+    except ImportError:
+        from backend.routers.company.utils import check_rate_limits
+
+    if reservation.reserved_query:
+        billing.increment_query_usage(reservation.user_id, access_token=reservation.access_token)
+    if not (reservation.reserved_session and count_session):
+        return _empty_rate_check()
+    counters = await _increment_rate_counters_db(reservation.company_id, 1, tokens, cost_cents)
+    if not counters:
+        return _empty_rate_check()
+    return await check_rate_limits(reservation.company_id)
+
+
+# =============================================================================
+# RECONCILIATION (Redis -> Postgres)
+# =============================================================================
+
+def _group_pending(data: Dict[str, Any]) -> Tuple[Dict[Tuple[str, Optional[str]], Dict[str, Any]],
+                                                  Dict[Tuple[str, Optional[str]], int]]:
+    """
+    Split drained pending fields into company deltas per (company, hour) and
+    user deltas per (user, billing period).
+
+    Each company entry carries its summed sessions/tokens/cost and the
+    snapshot fields to ack once they are written. Fields written before
+    bucketing have no hour or period (None).
+    """
+    companies: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+    users: Dict[Tuple[str, Optional[str]], int] = {}
+    for key, value in data.items():
+        kind, entity_id, metric = key.split(":", 2)
+        name, _, bucket = metric.partition(":")
+        if kind == "c" and name in ("sessions", "tokens", "cost") and int(value):
+            delta = companies.setdefault((entity_id, bucket or None),
+                                         {"sessions": 0, "tokens": 0, "cost": 0, "fields": {}})
+            delta[name] += int(value)
+            delta["fields"][key] = int(value)
+        elif kind == "u" and name == "queries":
+            users[(entity_id, bucket or None)] = int(value)
+    return companies, users
+
+
+def _increment_query_usage_by(user_id: str, count: int, period: Optional[str] = None) -> bool:
+    """
+    Apply a batched query delta. With a period it only applies while the
+    user's profile is still in that billing period; returns False if it was
+    dropped because the period has since been reset.
+    """
+    try:
+        from .database import get_supabase_service
+    except ImportError:
+        from backend.database import get_supabase_service
+
+    client = get_supabase_service()
+    if client is None:
+        raise RuntimeError("service client unavailable")
+    if period is None:
+        client.rpc("increment_query_usage_by", {"p_user_id": user_id, "p_count": count}).execute()
+        return True
+    result = client.rpc("increment_query_usage_for_period",
+                        {"p_user_id": user_id, "p_count": count, "p_period": period}).execute()
+    return result.data is not None
+
+
+async def flush_pending() -> int:
+    """
+    Write pending Redis deltas to Postgres in one batch.
+
+    Reads a snapshot of the pending deltas and subtracts each entity's deltas
+    only after its write succeeds; failed writes stay pending for the next
+    flush. Seeding keeps counting un-acked deltas in the meantime. One worker
+    flushes at a time, and taking or releasing the lock bumps the flush
+    generation so seeds that overlap the flush are refused. Company deltas
+    are written to the windows of the hour they were counted in; queries
+    from a billing period that has since been reset are dropped.
+    Returns the number of (entity, bucket) deltas written.
+    """
+    client = await get_redis() if QUOTA_ENGINE_ENABLED else None
+    if client is None:
+        return 0
+
+    token = uuid.uuid4().hex
+    if not await client.eval(LOCK_SCRIPT, 2, FLUSH_LOCK_KEY, FLUSH_GEN_KEY, token, FLUSH_LOCK_TTL):
+        return 0
+    try:
+        data = await client.hgetall(PENDING_KEY)
+        if not data:
+            return 0
+        companies, users = _group_pending(data)
+
+        written = 0
+        failed = 0
+        for (company_id, hour), delta in companies.items():
+            counters = await _increment_rate_counters_db(
+                company_id, delta["sessions"], delta["tokens"], delta["cost"],
+                _hour_start(hour) if hour else None,
+            )
+            if counters:
+                await _ack(client, delta["fields"])
+                written += 1
+            else:
+                failed += 1
+        for (user_id, period), count in users.items():
+            if not count:
+                continue
+            try:
+                applied = await asyncio.to_thread(_increment_query_usage_by, user_id, count, period)
+            except Exception as e:
+                log_app_event("QUOTA_FLUSH_USER_FAILED", level="WARNING", user_id=user_id, error=str(e))
+                failed += 1
+                continue
+            if not applied:
+                log_app_event("QUOTA_FLUSH_STALE_PERIOD", level="INFO", user_id=user_id, queries=count)
+            await _ack(client, {f"u:{user_id}:queries" + (f":{period}" if period else ""): count})
+            written += 1
+
+        if failed:
+            log_app_event("QUOTA_FLUSH_PARTIAL", level="WARNING", retained=failed)
+        return written
+    finally:
+        await client.eval(UNLOCK_SCRIPT, 2, FLUSH_LOCK_KEY, FLUSH_GEN_KEY, token)
+
+
+async def _ack(client, fields: Dict[str, int]) -> None:
+    args = [item for pair in fields.items() for item in pair]
+    await client.eval(ACK_SCRIPT, 1, PENDING_KEY, *args)
+
+
+async def _invalidate(keys: List[str]) -> None:
+    client = await get_redis() if QUOTA_ENGINE_ENABLED else None
+    if client is None:
+        return
+    try:
+        await client.eval(INVALIDATE_SCRIPT, len(keys) + 1, FLUSH_GEN_KEY, *keys)
+    except Exception as e:
+        log_app_event("QUOTA_INVALIDATE_FAILED", level="WARNING", keys=keys, error=str(e))
+
+
+async def invalidate_user_quota(user_id: str) -> None:
+    """Drop a user's cached billing hash after a subscription change (Stripe webhooks)."""
+    await _invalidate([f"{KEY_PREFIX}:u:{user_id}"])
+
+
+async def invalidate_company_limits(company_id: str) -> None:
+    """Drop a company's cached rate limits after its settings change."""
+    await _invalidate([_window_keys(company_id)[3]])
+
+
+_flush_task: Optional[asyncio.Task] = None
+
+
+async def _flush_loop(interval: float) -> None:
+    """Background loop that reconciles pending deltas every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_pending()
+        except Exception as e:
+            logger.debug("Quota flush loop error: %s", e)
+
+
+def start_quota_reconciler(interval: float = QUOTA_FLUSH_INTERVAL) -> Optional[asyncio.Task]:
+    """Start the periodic reconcile task (no-op if disabled or running)."""
+    global _flush_task
+    if not QUOTA_ENGINE_ENABLED or interval <= 0:
+        return None
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop(interval))
+    return _flush_task
+
+
+async def stop_quota_reconciler(final_flush: bool = True) -> None:
+    """Stop the reconcile task, optionally flushing what's pending first."""
+    global _flush_task
+    if _flush_task is not None and not _flush_task.done():
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+    _flush_task = None
+    if final_flush and QUOTA_ENGINE_ENABLED:
+        await flush_pending()
@@ -13,12 +13,14 @@ from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Path
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Literal
+import os
 import uuid
 
 from ..auth import get_current_user
 from ..database import get_supabase_service, get_supabase_with_auth, with_retry, DatabaseRetryError
 from ..security import SecureHTTPException, log_app_event, escape_sql_like_pattern
 from ..services.email import send_invitation_email
+from ..storage import encode_cursor, decode_cursor, keyset_filter
 from .. import leaderboard as leaderboard_module
 from ..i18n import t, get_locale_from_request
 
@@ -43,6 +45,18 @@ AuditActionCategory = Literal[
 ]
 
 
+# =============================================================================
+# USER INDEX
+# =============================================================================
+
+# admin_user_index columns returned by the user list
+_USER_INDEX_COLUMNS = "user_id, email, created_at, last_sign_in_at, email_confirmed_at, user_metadata"
+
+# Keyset order of the user list (both DESC)
+_USER_LIST_SORT_KEYS = ("created_at", "user_id")
+_USER_LIST_CURSOR_SCOPE = "admin_users"
+
+
 # =============================================================================
 # PYDANTIC MODELS
 # =============================================================================
@@ -78,6 +92,7 @@ class ListUsersResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class CompanyInfo(BaseModel):
@@ -359,14 +374,20 @@ async def check_admin_access(request: Request, user: dict = Depends(get_current_
 async def list_users(
     request: Request,
     user: dict = Depends(get_current_user),
-    page: int = 1,
-    page_size: int = 50,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
     search: Optional[str] = None,
     include_test: bool = Query(False, description="Include test/demo users"),
+    cursor: Optional[str] = Query(None, max_length=500, description="next_cursor from the previous page"),
 ):
     """
     List all users on the platform (admin only).
     Supports pagination and search by email.
+
+    Reads admin_user_index (trigger-synced from auth.users), newest first.
+    Pass next_cursor as cursor for keyset pagination; page is the legacy
+    offset and is ignored when a cursor is given. The total is counted on
+    requests without a cursor and carried in the cursor after that.
     """
     user_id = user.get("id")
 
@@ -377,73 +398,66 @@ async def list_users(
         raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
 
     try:
-        supabase = get_supabase_service()
-
-        # Calculate offset
-        offset = (page - 1) * page_size
+        # Cursor values: the sort keys of the last row, then the total
+        cursor_values = decode_cursor(cursor, _USER_LIST_CURSOR_SCOPE, len(_USER_LIST_SORT_KEYS) + 1) if cursor else None
+        if cursor_values is not None and not isinstance(cursor_values[-1], int):
+            raise ValueError("Malformed cursor")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=t("errors.invalid_field", locale, field="cursor"))
 
-        # Get soft-deleted user IDs to filter them out
-        # Soft-deleted users have a record in user_deletions with permanently_deleted_at IS NULL
-        deleted_users_result = supabase.table("user_deletions").select("user_id").is_(
-            "permanently_deleted_at", "null"
-        ).execute()
-        soft_deleted_user_ids = {
-            d["user_id"] for d in (deleted_users_result.data or [])
-        }
-
-        # Query auth.users via admin API
-        # Note: This requires service role key
-        response = supabase.auth.admin.list_users()
+    try:
+        supabase = get_supabase_service()
 
-        # Handle both list response and paginated response object
-        # (Supabase SDK version differences)
-        if isinstance(response, list):
-            all_users = response
-        elif hasattr(response, 'users'):
-            all_users = response.users
+        # Soft-deleted users only appear in the "Deleted Users" section
+        # Keyset pages reuse the first page's total instead of recounting
+        if cursor_values is None:
+            query = supabase.table("admin_user_index").select(_USER_INDEX_COLUMNS, count="exact")
         else:
-            all_users = list(response) if response else []
+            query = supabase.table("admin_user_index").select(_USER_INDEX_COLUMNS)
+        query = query.is_("deleted_at", "null")
 
-        # Helper to convert datetime to string
-        def to_str(value):
-            if value is None:
-                return None
-            if hasattr(value, 'isoformat'):
-                return value.isoformat()
-            return str(value)
+        if search:
+            query = query.ilike("email", f"%{escape_sql_like_pattern(search)}%")
 
-        # Filter by search and exclude soft-deleted users
-        users_list = []
-        for u in all_users:
-            # Skip soft-deleted users - they should only appear in the "Deleted Users" section
-            if u.id in soft_deleted_user_ids:
-                continue
-
-            user_data = {
-                "id": u.id,
-                "email": u.email or "",
-                "created_at": to_str(u.created_at) or "",
-                "last_sign_in_at": to_str(getattr(u, "last_sign_in_at", None)),
-                "email_confirmed_at": to_str(getattr(u, "email_confirmed_at", None)),
-                "user_metadata": getattr(u, "user_metadata", None),
-            }
+        # UXH-168: Filter out test/demo users (marked via migration)
+        if not include_test:
+            query = query.eq("is_test", False)
 
-            # Apply search filter
-            if search:
-                if search.lower() not in user_data["email"].lower():
-                    continue
+        if cursor_values is not None:
+            query = query.or_(keyset_filter(_USER_LIST_SORT_KEYS, cursor_values[:-1]))
 
-            # UXH-168: Filter out test/demo users (marked via migration)
-            if not include_test:
-                metadata = user_data.get("user_metadata") or {}
-                if metadata.get("is_test"):
-                    continue
+        for key in _USER_LIST_SORT_KEYS:
+            query = query.order(key, desc=True)
 
-            users_list.append(PlatformUser(**user_data))
+        # Fetch one extra row to know whether there is a next page
+        if cursor_values is None and page > 1:
+            offset = (page - 1) * page_size
+            query = query.range(offset, offset + page_size)
+        else:
+            query = query.limit(page_size + 1)
 
-        # Apply pagination
-        total = len(users_list)
-        paginated_users = users_list[offset:offset + page_size]
+        result = query.execute()
+        rows = result.data or []
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        total = cursor_values[-1] if cursor_values is not None else result.count or 0
+
+        paginated_users = [
+            PlatformUser(
+                id=row["user_id"],
+                email=row.get("email") or "",
+                created_at=row.get("created_at") or "",
+                last_sign_in_at=row.get("last_sign_in_at"),
+                email_confirmed_at=row.get("email_confirmed_at"),
+                user_metadata=row.get("user_metadata"),
+            )
+            for row in rows
+        ]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor(
+                _USER_LIST_CURSOR_SCOPE, [rows[-1][key] for key in _USER_LIST_SORT_KEYS] + [total]
+            )
 
         log_app_event(
             "ADMIN: Listed users",
@@ -470,7 +484,8 @@ async def list_users(
             users=paginated_users,
             total=total,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            next_cursor=next_cursor
         )
 
     except HTTPException:
@@ -1412,33 +1427,9 @@ async def get_platform_stats(request: Request, user: dict = Depends(get_current_
     try:
         supabase = get_supabase_service()
 
-        # Get total users from auth
-        response = supabase.auth.admin.list_users()
-        # Handle both list response and paginated response object
-        if isinstance(response, list):
-            all_users = response
-        elif hasattr(response, 'users'):
-            all_users = response.users
-        else:
-            all_users = list(response) if response else []
-        total_users = len(all_users)
-
-        # Get total companies
-        companies_result = supabase.table("companies").select("id", count="exact").execute()
-        total_companies = companies_result.count or 0
-
-        # Get total conversations
-        conv_result = supabase.table("conversations").select("id", count="exact").execute()
-        total_conversations = conv_result.count or 0
-
-        # Get total messages
-        msg_result = supabase.table("messages").select("id", count="exact").execute()
-        total_messages = msg_result.count or 0
-
-        # Active users (approximation - users who signed in recently)
-        # Note: This is a simplified version; real implementation would track activity
-        active_24h = min(total_users, 5)  # Placeholder
-        active_7d = min(total_users, 10)  # Placeholder
+        # Counters are trigger-maintained; active users come from the
+        # last_sign_in_at index on admin_user_index
+        stats = supabase.rpc("get_platform_stats", {}).execute().data or {}
 
         log_app_event(
             "ADMIN: Fetched platform stats",
@@ -1457,14 +1448,7 @@ async def get_platform_stats(request: Request, user: dict = Depends(get_current_
             ip_address=client_ip,
         )
 
-        return PlatformStats(
-            total_users=total_users,
-            total_companies=total_companies,
-            total_conversations=total_conversations,
-            total_messages=total_messages,
-            active_users_24h=active_24h,
-            active_users_7d=active_7d
-        )
+        return PlatformStats(**{field: stats.get(field) or 0 for field in PlatformStats.model_fields})
 
     except HTTPException:
         raise
@@ -1757,36 +1741,16 @@ async def create_invitation(
     try:
         supabase = get_supabase_service()
 
-        # Check if user already exists (paginate to handle >50 users)
+        # Check if user already exists
         try:
-            target_email = invitation_data.email.lower()
-            page = 1
-            per_page = 1000  # Use larger page size to minimize API calls
-            user_found = False
-
-            while not user_found:
-                existing_users = supabase.auth.admin.list_users(page=page, per_page=per_page)
-                if isinstance(existing_users, list):
-                    all_users = existing_users
-                elif hasattr(existing_users, 'users'):
-                    all_users = existing_users.users
-                else:
-                    all_users = list(existing_users) if existing_users else []
-
-                if not all_users:
-                    break  # No more users to check
-
-                for u in all_users:
-                    if u.email and u.email.lower() == target_email:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=t("errors.user_already_exists", locale, email=invitation_data.email)
-                        )
-
-                # If we got fewer users than per_page, we've reached the end
-                if len(all_users) < per_page:
-                    break
-                page += 1
+            existing_user = supabase.table("admin_user_index").select("user_id").ilike(
+                "email", escape_sql_like_pattern(invitation_data.email.lower())
+            ).limit(1).execute()
+            if existing_user.data:
+                raise HTTPException(
+                    status_code=400,
+                    detail=t("errors.user_already_exists", locale, email=invitation_data.email)
+                )
         except HTTPException:
             raise
         except Exception as e:
@@ -2739,7 +2703,11 @@ def _calculate_duration_minutes(started_at_str: str) -> float:
 
 @router.get("/model-analytics")
 @limiter.limit("60/minute;300/hour")
-async def get_model_analytics(request: Request, user: dict = Depends(get_current_user)):
+async def get_model_analytics(
+    request: Request,
+    user: dict = Depends(get_current_user),
+    window: Literal["7d", "30d", "all"] = Query("all", description="Time window: 7d, 30d or all"),
+):
     """
     Get model performance analytics for admin dashboard.
 
@@ -2758,7 +2726,7 @@ async def get_model_analytics(request: Request, user: dict = Depends(get_current
 
     try:
         # Get leaderboard summary which includes both overall and department data
-        summary = leaderboard_module.get_leaderboard_summary()
+        summary = leaderboard_module.get_leaderboard_summary(window)
 
         # Transform overall leaderboard
         overall_data = summary.get("overall", {})
@@ -2841,3 +2809,206 @@ async def get_model_analytics(request: Request, user: dict = Depends(get_current
             error=str(e)
         )
         raise SecureHTTPException.internal_error("Failed to get model analytics")
+
+
+# =============================================================================
+# EVENT LOOP DIAGNOSTICS
+# =============================================================================
+
+@router.get("/diagnostics/loop-stalls")
+@limiter.limit("30/minute;200/hour")
+async def get_loop_stalls(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: Literal["total_ms", "max_ms", "count"] = Query("total_ms"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    List the worst event-loop stalls recorded by the blocking detector.
+
+    Offenders are grouped by (route, blocking site) where the site is the
+    innermost backend frame on the sampled stack. Requires
+    LOOP_MONITOR_ENABLED=true; otherwise returns status with empty lists.
+    """
+    from ..loop_monitor import get_loop_monitor
+
+    locale = get_locale_from_request(request)
+    user_id = user.get("id")
+
+    is_admin, role = await check_is_platform_admin(user_id)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
+
+    monitor = get_loop_monitor()
+    return {
+        "status": monitor.get_status(),
+        "top_offenders": monitor.top_offenders(limit=limit, sort_by=sort_by),
+        "recent": monitor.recent(limit=limit),
+    }
+
+
+@router.delete("/diagnostics/loop-stalls")
+@limiter.limit("10/minute;50/hour")
+async def reset_loop_stalls(request: Request, user: dict = Depends(get_current_user)):
+    """Clear recorded event-loop stalls (e.g. after deploying a fix)."""
+    from ..loop_monitor import get_loop_monitor
+
+    locale = get_locale_from_request(request)
+    user_id = user.get("id")
+
+    is_admin, role = await check_is_platform_admin(user_id)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
+
+    get_loop_monitor().reset()
+
+    log_app_event("ADMIN: Reset loop stall diagnostics", user_id=user_id)
+
+    return {"success": True}
+
+
+# =============================================================================
+# COUNCIL TRACES
+# =============================================================================
+
+@router.get("/diagnostics/traces")
+@limiter.limit("30/minute;200/hour")
+async def list_traces(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    user: dict = Depends(get_current_user)
+):
+    """
+    List recent request traces (newest first) with span counts and durations.
+
+    Trace IDs are request correlation IDs (X-Request-ID), so a slow request
+    seen in the logs can be looked up directly.
+    """
+    from ..tracing import get_tracer
+
+    locale = get_locale_from_request(request)
+    user_id = user.get("id")
+
+    is_admin, role = await check_is_platform_admin(user_id)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
+
+    tracer = get_tracer()
+    return {
+        "status": tracer.stats(),
+        "traces": tracer.list_traces(limit=limit),
+    }
+
+
+@router.get("/diagnostics/traces/{trace_id}")
+@limiter.limit("30/minute;200/hour")
+async def export_trace(
+    request: Request,
+    trace_id: str = Path(..., max_length=128),
+    format: Literal["json", "chrome"] = Query("json"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Export one trace.
+
+    format=json returns spans with attributes (model, TTFT, tokens, resource...).
+    format=chrome returns the Chrome Trace Event format for chrome://tracing
+    or Perfetto, with one lane per model.
+    """
+    from ..tracing import get_tracer, to_chrome_trace
+
+    locale = get_locale_from_request(request)
+    user_id = user.get("id")
+
+    is_admin, role = await check_is_platform_admin(user_id)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
+
+    trace = get_tracer().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=t("errors.not_found", locale))
+
+    if format == "chrome":
+        return to_chrome_trace(trace)
+    return trace
+
+
+# =============================================================================
+# ON-DEMAND PROFILER
+# =============================================================================
+
+class ProfileRequest(BaseModel):
+    """Options for an on-demand profile of this worker."""
+    duration_seconds: float = Field(10.0, gt=0, le=60)
+    sample_hz: int = Field(50, ge=1, le=1000)
+    route: Optional[str] = Field(None, max_length=200, description="Substring of the normalized route, e.g. /conversations/{id}/messages")
+    correlation_id: Optional[str] = Field(None, max_length=128)
+    include_tasks: bool = True
+    format: Literal["json", "collapsed"] = "json"
+
+
+@router.post("/diagnostics/profile")
+@limiter.limit("5/minute;20/hour")
+async def run_worker_profile(
+    request: Request,
+    profile_request: ProfileRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Run a time-bounded sampling profile on the worker serving this request.
+
+    Returns collapsed stacks (flamegraph-ready). Duration and sample rate are
+    clamped to PROFILER_MAX_DURATION_SECONDS / PROFILER_MAX_SAMPLE_HZ. With
+    multiple workers, only the worker that receives this request is profiled.
+    """
+    from fastapi.responses import PlainTextResponse
+    from ..profiler import run_profile, ProfilerBusyError
+    from ..main import get_request_route, get_correlation_id
+
+    locale = get_locale_from_request(request)
+    user_id = user.get("id")
+
+    is_admin, role = await check_is_platform_admin(user_id)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=t("errors.admin_access_required", locale))
+
+    options = {
+        "duration": profile_request.duration_seconds,
+        "sample_hz": profile_request.sample_hz,
+        "route": profile_request.route,
+        "correlation_id": profile_request.correlation_id,
+    }
+    client_ip = request.client.host if request.client else None
+    await log_platform_audit(
+        action="run_profiler",
+        action_category="admin",
+        actor_id=user_id,
+        actor_email=user.get("email"),
+        actor_type="admin",
+        resource_type="worker",
+        resource_id=str(os.getpid()),
+        ip_address=client_ip,
+        metadata=options,
+    )
+
+    try:
+        result = await run_profile(
+            **options,
+            include_tasks=profile_request.include_tasks,
+            route_getter=get_request_route,
+            correlation_getter=get_correlation_id,
+        )
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail=t("errors.profile_in_progress", locale))
+
+    log_app_event(
+        "ADMIN: Ran worker profile",
+        user_id=user_id,
+        duration_seconds=result["duration_seconds"],
+        thread_samples=result["thread_samples"],
+        task_samples=result["task_samples"],
+    )
+
+    if profile_request.format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return {"worker_pid": os.getpid(), **result}
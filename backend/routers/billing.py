@@ -19,7 +19,7 @@ from pydantic import BaseModel, field_validator
 logger = logging.getLogger(__name__)
 
 from ..auth import get_current_user
-from .. import billing
+from .. import billing, quota
 from ..security import SecureHTTPException, log_security_event
 
 
@@ -225,4 +225,8 @@ async def stripe_webhook(request: Request):
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error", "Webhook failed"))
 
+    # Subscription status, tier and period resets take effect on the next request
+    if result.get("user_id"):
+        await quota.invalidate_user_quota(result["user_id"])
+
     return {"received": True}
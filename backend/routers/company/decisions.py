@@ -33,6 +33,8 @@ from .utils import (
     PromoteDecision,
 )
 
+from ...company_snapshots import bump_company_version
+
 # Import shared rate limiter (ensures limits are tracked globally)
 from ...rate_limit import limiter
 
@@ -202,6 +204,8 @@ async def create_decision(request: Request, company_id: ValidCompanyId, data: De
     if not result.data:
         raise HTTPException(status_code=400, detail=t('errors.decision_save_failed', locale))
 
+    await bump_company_version(company_uuid)
+
     entry = result.data[0]
     decision_id = entry.get("id")
 
@@ -337,6 +341,8 @@ async def archive_decision(request: Request, company_id: ValidCompanyId, decisio
     if not result.data:
         raise HTTPException(status_code=400, detail=t('errors.decision_archive_failed', locale))
 
+    await bump_company_version(company_uuid)
+
     if project_id:
         try:
             remaining = client.table("knowledge_entries") \
@@ -387,6 +393,8 @@ async def delete_decision(request: Request, company_id: ValidCompanyId, decision
         .eq("id", decision_id) \
         .execute()
 
+    await bump_company_version(company_uuid)
+
     await log_activity(
         company_id=company_uuid,
         event_type="decision",
@@ -478,6 +486,8 @@ async def promote_decision(request: Request, company_id: ValidCompanyId, decisio
         "promoted_to_type": data.doc_type
     }).eq("id", decision_id).execute()
 
+    await bump_company_version(company_uuid)
+
     playbook = doc_result.data[0]
     playbook["content"] = content
     playbook["version"] = 1
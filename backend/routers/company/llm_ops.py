@@ -26,6 +26,7 @@ from .utils import (
     check_rate_limits,
 )
 from ...security import log_app_event
+from ...quota import invalidate_company_limits
 from ...i18n import t, get_locale_from_request
 
 # Import shared rate limiter (ensures limits are tracked globally)
@@ -408,6 +409,7 @@ async def update_rate_limits(request: Request, company_id: ValidCompanyId,
             'company_id': company_uuid,
             **update_data
         }).execute()
+        await invalidate_company_limits(company_uuid)
 
         log_app_event(
             "RATE_LIMITS_UPDATED",
@@ -960,6 +962,68 @@ async def delete_model_registry_entry(request: Request, company_id: ValidCompany
         raise HTTPException(status_code=500, detail=t('errors.model_delete_failed', locale))
 
 
+# =============================================================================
+# MODEL TELEMETRY
+# =============================================================================
+# Rolling per-model/per-stage performance data used to choose council members
+# and tune timeouts. Live data comes from the in-process telemetry store;
+# history comes from the periodically flushed model_telemetry_snapshots table.
+
+@router.get("/{company_id}/llm-hub/telemetry")
+@limiter.limit("100/minute;500/hour")
+async def get_model_telemetry(request: Request, company_id: ValidCompanyId,
+    model: Optional[str] = Query(None, max_length=200),
+    stage: Optional[str] = Query(None, max_length=50),
+    history_hours: int = Query(0, ge=0, le=168, description="Include persisted snapshots from the last N hours"),
+    user: dict = Depends(get_effective_user)
+):
+    """
+    Get model performance telemetry (TTFT, latency, tokens/sec, error and truncation rates).
+
+    Returns the live rolling window for this process, plus persisted snapshots
+    when history_hours > 0. Only accessible by company owners and admins.
+    """
+    from ...telemetry import get_telemetry_store
+
+    locale = get_locale_from_request(request)
+    client = get_service_client()
+
+    try:
+        company_uuid = resolve_company_id(client, company_id)
+    except HTTPException:
+        raise HTTPException(status_code=404, detail=t('errors.company_not_found', locale))
+
+    verify_admin_access(client, company_uuid, user, locale)
+
+    store = get_telemetry_store()
+    response: Dict[str, Any] = {
+        'window_seconds': store.window_seconds,
+        'models': store.snapshot(model=model, stage=stage),
+        'history': [],
+    }
+
+    if history_hours:
+        since = datetime.fromtimestamp(
+            datetime.now(timezone.utc).timestamp() - history_hours * 3600, timezone.utc
+        ).isoformat()
+        try:
+            query = client.table("model_telemetry_snapshots") \
+                .select("captured_at, model, stage, requests, error_rate, truncation_rate, "
+                        "ttft_p50_ms, ttft_p90_ms, latency_p50_ms, latency_p90_ms, tokens_per_sec_p50") \
+                .gte("captured_at", since) \
+                .order("captured_at", desc=True) \
+                .limit(1000)
+            if model:
+                query = query.eq("model", model)
+            if stage:
+                query = query.eq("stage", stage)
+            response['history'] = query.execute().data or []
+        except Exception as e:
+            log_app_event("TELEMETRY_HISTORY_FAILED", level="WARNING", error=str(e))
+
+    return response
+
+
 # =============================================================================
 # AI PERSONAS - Prompt Management
 # =============================================================================
@@ -29,6 +29,7 @@ from .utils import (
     MemberUpdate,
 )
 from ...services.email import send_company_member_invitation_email
+from ...company_snapshots import bump_company_version
 
 # Import shared rate limiter (ensures limits are tracked globally)
 from ...rate_limit import limiter
@@ -358,6 +359,8 @@ async def update_company_member(request: Request, company_id: ValidCompanyId,
     if not result.data:
         raise HTTPException(status_code=500, detail=t('errors.member_update_failed', locale))
 
+    await bump_company_version(company_uuid)
+
     await log_activity(
         company_id=company_uuid,
         event_type="member_updated",
@@ -436,6 +439,8 @@ async def remove_company_member(request: Request, company_id: ValidCompanyId,
         .eq("id", member_id) \
         .execute()
 
+    await bump_company_version(company_uuid)
+
     await log_activity(
         company_id=company_uuid,
         event_type="member_removed",
@@ -21,11 +21,14 @@ from ... import model_registry
 from .utils import (
     get_service_client,
     verify_company_access,
+    verify_company_access_cached,
     resolve_company_id,
     save_internal_llm_usage,
     ValidCompanyId,
 )
 
+from ...company_snapshots import get_company_version, bump_company_version, serve_company_view
+
 # Import shared rate limiter (ensures limits are tracked globally)
 from ...rate_limit import limiter
 
@@ -59,23 +62,8 @@ class StructureCompanyContextRequest(BaseModel):
 # ENDPOINTS
 # =============================================================================
 
-@router.get("/{company_id}/overview")
-@limiter.limit("100/minute;500/hour")
-async def get_company_overview(request: Request, company_id: ValidCompanyId, user=Depends(get_effective_user)):
-    """
-    Get company overview with stats from DATABASE.
-    Returns company info + counts of departments, roles, playbooks, decisions.
-    Supports impersonation via X-Impersonate-User header.
-    """
-    client = get_service_client()
-
-    try:
-        company_uuid = resolve_company_id(client, company_id)
-    except HTTPException:
-        raise HTTPException(status_code=404, detail="Resource not found")
-
-    verify_company_access(client, company_uuid, user)
-
+def _build_overview(client, company_uuid: str, company_id: str) -> dict:
+    """Company info plus department/role/playbook/decision counts."""
     company_result = client.table("companies") \
         .select("*") \
         .eq("id", company_uuid) \
@@ -132,6 +120,30 @@ async def get_company_overview(request: Request, company_id: ValidCompanyId, use
     }
 
 
+@router.get("/{company_id}/overview")
+@limiter.limit("100/minute;500/hour")
+async def get_company_overview(request: Request, company_id: ValidCompanyId, user=Depends(get_effective_user)):
+    """
+    Get company overview with stats from DATABASE.
+    Returns company info + counts of departments, roles, playbooks, decisions.
+    Supports impersonation via X-Impersonate-User header.
+    Served from a versioned snapshot; supports If-None-Match (304).
+    """
+    client = get_service_client()
+
+    try:
+        company_uuid = resolve_company_id(client, company_id)
+    except HTTPException:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
+    version = await get_company_version(company_uuid)
+    await verify_company_access_cached(client, company_uuid, user, version)
+
+    return await serve_company_view(
+        request, company_uuid, "overview", lambda: _build_overview(client, company_uuid, company_id), version
+    )
+
+
 @router.put("/{company_id}/context")
 @limiter.limit("30/minute;100/hour")
 async def update_company_context(request: Request, company_id: ValidCompanyId, data: CompanyContextUpdate, user=Depends(get_current_user)):
@@ -156,6 +168,7 @@ async def update_company_context(request: Request, company_id: ValidCompanyId, d
     if not result.data:
         raise HTTPException(status_code=404, detail="Resource not found")
 
+    await bump_company_version(company_uuid)
     return {"company": result.data[0]}
 
 
@@ -191,6 +204,7 @@ async def merge_company_context(request: Request, company_id: ValidCompanyId,
         client.table("companies").update({
             "context_md": merged
         }).eq("id", company_uuid).execute()
+        await bump_company_version(company_uuid)
         return {"merged_context": merged}
 
     persona = WRITE_ASSIST_PERSONAS.get("company-context", {})
@@ -270,6 +284,7 @@ Do not include any explanation or commentary - just the document."""
         "context_md": merged
     }).eq("id", company_uuid).execute()
 
+    await bump_company_version(company_uuid)
     return {"merged_context": merged}
 
 
@@ -23,6 +23,7 @@ from .utils import (
     get_client,
     get_service_client,
     resolve_company_id,
+    verify_company_access_cached,
     log_activity,
     save_internal_llm_usage,
     ValidCompanyId,
@@ -31,6 +32,8 @@ from .utils import (
     PlaybookUpdate,
 )
 
+from ...company_snapshots import get_company_version, bump_company_version, serve_company_view
+
 # Import shared rate limiter (ensures limits are tracked globally)
 from ...rate_limit import limiter
 
@@ -72,6 +75,7 @@ async def get_playbooks(request: Request, company_id: str,
     """
     Get all playbooks with current version content.
     Optional filters: doc_type, department_id, tag.
+    Members are served from a versioned snapshot; supports If-None-Match (304).
     """
     client = get_client(user)
     service_client = get_service_client()
@@ -81,6 +85,25 @@ async def get_playbooks(request: Request, company_id: str,
     except HTTPException:
         return {"playbooks": [], "departments": []}
 
+    version = await get_company_version(company_uuid)
+    try:
+        await verify_company_access_cached(service_client, company_uuid, user, version)
+    except HTTPException:
+        # Not a member - whatever RLS lets this user see isn't shared
+        return _build_playbooks(client, service_client, company_uuid, doc_type, department_id, tag)
+
+    return await serve_company_view(
+        request,
+        company_uuid,
+        f"playbooks:{doc_type or ''}:{department_id or ''}:{tag or ''}",
+        lambda: _build_playbooks(client, service_client, company_uuid, doc_type, department_id, tag),
+        version,
+    )
+
+
+def _build_playbooks(client, service_client, company_uuid: str, doc_type: Optional[str],
+                     department_id: Optional[str], tag: Optional[str]) -> dict:
+    """Playbooks with current version content plus the company's departments."""
     doc_query = client.table("org_documents") \
         .select("*") \
         .eq("company_id", company_uuid)
@@ -306,6 +329,7 @@ async def create_playbook(request: Request, company_id: ValidCompanyId, data: Pl
         related_type="playbook"
     )
 
+    await bump_company_version(company_uuid)
     return {"playbook": playbook}
 
 
@@ -407,6 +431,7 @@ async def update_playbook(request: Request, company_id: ValidCompanyId, playbook
 
     playbook["additional_departments"] = [d["department_id"] for d in (dept_result.data or [])]
 
+    await bump_company_version(company_uuid)
     return {"playbook": playbook}
 
 
@@ -444,6 +469,8 @@ async def delete_playbook(request: Request, company_id: ValidCompanyId, playbook
         .eq("id", playbook_id) \
         .execute()
 
+    await bump_company_version(company_uuid)
+
     await log_activity(
         company_id=company_uuid,
         event_type="playbook",
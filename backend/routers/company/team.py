@@ -22,7 +22,7 @@ logger = logging.getLogger(__name__)
 from .utils import (
     get_client,
     get_service_client,
-    verify_company_access,
+    verify_company_access_cached,
     resolve_company_id,
     save_internal_llm_usage,
     ValidCompanyId,
@@ -34,6 +34,8 @@ from .utils import (
     RoleUpdate,
 )
 
+from ...company_snapshots import get_company_version, bump_company_version, serve_company_view
+
 # Import shared rate limiter (ensures limits are tracked globally)
 from ...rate_limit import limiter
 
@@ -373,23 +375,8 @@ router = APIRouter(prefix="/company", tags=["company-team"])
 # ENDPOINTS
 # =============================================================================
 
-@router.get("/{company_id}/team")
-@limiter.limit("100/minute;500/hour")
-async def get_team(request: Request, company_id: ValidCompanyId, user=Depends(get_effective_user)):
-    """
-    Get all departments with their roles from DATABASE.
-    Returns hierarchical structure: departments → roles.
-    """
-    locale = get_locale_from_request(request)
-    client = get_service_client()
-
-    try:
-        company_uuid = resolve_company_id(client, company_id)
-    except HTTPException:
-        raise HTTPException(status_code=404, detail=t('errors.company_not_found', locale))
-
-    verify_company_access(client, company_uuid, user)
-
+def _build_team(client, company_uuid: str) -> Dict[str, Any]:
+    """Departments with their roles (the /team payload)."""
     # Get departments from database
     dept_result = client.table("departments") \
         .select("*") \
@@ -448,6 +435,30 @@ async def get_team(request: Request, company_id: ValidCompanyId, user=Depends(ge
     return {"departments": result}
 
 
+@router.get("/{company_id}/team")
+@limiter.limit("100/minute;500/hour")
+async def get_team(request: Request, company_id: ValidCompanyId, user=Depends(get_effective_user)):
+    """
+    Get all departments with their roles from DATABASE.
+    Returns hierarchical structure: departments → roles.
+    Served from a versioned snapshot; supports If-None-Match (304).
+    """
+    locale = get_locale_from_request(request)
+    client = get_service_client()
+
+    try:
+        company_uuid = resolve_company_id(client, company_id)
+    except HTTPException:
+        raise HTTPException(status_code=404, detail=t('errors.company_not_found', locale))
+
+    version = await get_company_version(company_uuid)
+    await verify_company_access_cached(client, company_uuid, user, version)
+
+    return await serve_company_view(
+        request, company_uuid, "team", lambda: _build_team(client, company_uuid), version
+    )
+
+
 @router.post("/{company_id}/departments")
 @limiter.limit("30/minute;100/hour")
 async def create_department(request: Request, company_id: ValidCompanyId, data: DepartmentCreate, user=Depends(get_effective_user)):
@@ -478,6 +489,7 @@ async def create_department(request: Request, company_id: ValidCompanyId, data:
     if not result.data:
         raise HTTPException(status_code=400, detail=t('errors.department_create_failed', locale))
 
+    await bump_company_version(company_uuid)
     return {"department": result.data[0]}
 
 
@@ -501,6 +513,7 @@ async def update_department(request: Request, company_id: ValidCompanyId, dept_i
     if not result.data:
         raise HTTPException(status_code=404, detail=t('errors.department_not_found', locale))
 
+    await bump_company_version(company_uuid)
     return {"department": result.data[0]}
 
 
@@ -536,6 +549,7 @@ async def create_role(request: Request, company_id: ValidCompanyId, dept_id: Val
     if not result.data:
         raise HTTPException(status_code=400, detail=t('errors.role_create_failed', locale))
 
+    await bump_company_version(company_uuid)
     return {"role": result.data[0]}
 
 
@@ -545,6 +559,7 @@ async def update_role(request: Request, company_id: ValidCompanyId, dept_id: Val
     """Update a role."""
     locale = get_locale_from_request(request)
     client = get_client(user)
+    company_uuid = resolve_company_id(client, company_id)
 
     update_data = {k: v for k, v in data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
@@ -558,27 +573,39 @@ async def update_role(request: Request, company_id: ValidCompanyId, dept_id: Val
     if not result.data:
         raise HTTPException(status_code=404, detail=t('errors.role_not_found', locale))
 
+    await bump_company_version(company_uuid)
     return {"role": result.data[0]}
 
 
 @router.get("/{company_id}/departments/{dept_id}/roles/{role_id}")
 @limiter.limit("100/minute;500/hour")
 async def get_role(request: Request, company_id: ValidCompanyId, dept_id: ValidDeptId, role_id: ValidRoleId, user=Depends(get_effective_user)):
-    """Get a single role with full details including system prompt."""
+    """
+    Get a single role with full details including system prompt.
+    Served from a versioned snapshot; supports If-None-Match (304).
+    """
     locale = get_locale_from_request(request)
     client = get_client(user)
+    company_uuid = resolve_company_id(client, company_id)
 
-    result = client.table("roles") \
-        .select("*") \
-        .eq("id", role_id) \
-        .eq("department_id", dept_id) \
-        .single() \
-        .execute()
+    version = await get_company_version(company_uuid)
+    await verify_company_access_cached(get_service_client(), company_uuid, user, version)
 
-    if not result.data:
-        raise HTTPException(status_code=404, detail=t('errors.role_not_found', locale))
+    def build():
+        result = client.table("roles") \
+            .select("*") \
+            .eq("id", role_id) \
+            .eq("department_id", dept_id) \
+            .eq("company_id", company_uuid) \
+            .single() \
+            .execute()
 
-    return {"role": result.data}
+        if not result.data:
+            raise HTTPException(status_code=404, detail=t('errors.role_not_found', locale))
+
+        return {"role": result.data}
+
+    return await serve_company_view(request, company_uuid, f"role:{dept_id}:{role_id}", build, version)
 
 
 # =============================================================================
@@ -649,6 +676,7 @@ async def delete_department(
         company_id=str(company_uuid)
     )
 
+    await bump_company_version(company_uuid)
     return {
         "success": True,
         "deleted_department": dept_name,
@@ -670,6 +698,7 @@ async def delete_role(
 
     locale = get_locale_from_request(request)
     client = get_client(user)
+    company_uuid = resolve_company_id(client, company_id)
 
     # Get role info for logging
     role_result = client.table("roles") \
@@ -701,6 +730,7 @@ async def delete_role(
         department_id=dept_id
     )
 
+    await bump_company_version(company_uuid)
     return {
         "success": True,
         "deleted_role": role_name
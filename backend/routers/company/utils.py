@@ -15,6 +15,8 @@ import logging
 
 from ...database import get_supabase_with_auth, get_supabase_service
 from ...security import SecureHTTPException, log_app_event
+from ...ingest import ingest_row
+from ...utils.cache import user_cache, cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -124,6 +126,25 @@ def verify_company_access(client, company_uuid: str, user: dict) -> bool:
     )
 
 
+async def verify_company_access_cached(client, company_uuid: str, user: dict, version: Optional[int]) -> bool:
+    """
+    verify_company_access, remembered per user while the company version is
+    unchanged (member removals bump it). Falls back to a full check when the
+    version is unknown.
+    """
+    if version is None:
+        return verify_company_access(client, company_uuid, user)
+
+    user_id = user.get('id') if isinstance(user, dict) else user.id
+    key = cache_key("user", user_id, "company_access", company_uuid, version)
+    if await user_cache.get(key):
+        return True
+
+    verify_company_access(client, company_uuid, user)
+    await user_cache.set(key, True)
+    return True
+
+
 def resolve_company_id(client, company_id: str) -> str:
     """
     Resolve company_id to UUID.
@@ -170,9 +191,8 @@ async def log_activity(
     """
     Helper function to log an activity event.
     Call this from other endpoints when something notable happens.
+    The row is queued for a batched insert (see ingest.py).
     """
-    client = get_service_client()
-
     data = {
         "company_id": company_id,
         "event_type": event_type,
@@ -189,10 +209,7 @@ async def log_activity(
     if promoted_to_type:
         data["promoted_to_type"] = promoted_to_type
 
-    try:
-        client.table("activity_logs").insert(data).execute()
-    except Exception as e:
-        logger.debug("Activity log insert failed: %s", e)
+    await ingest_row("activity_logs", data)
 
 
 async def log_usage_event(
@@ -209,14 +226,13 @@ async def log_usage_event(
     IMPORTANT: Does NOT log user_id - privacy by design.
 
     NOTE: Automatically skips in mock mode (MOCK_LLM=true).
+    The row is queued for a batched insert (see ingest.py).
     """
     # Skip in mock mode - no real API calls were made
     from ... import openrouter
     if openrouter.MOCK_LLM:
         return
 
-    client = get_service_client()
-
     data = {
         "company_id": company_id,
         "event_type": event_type,
@@ -227,10 +243,7 @@ async def log_usage_event(
         "metadata": metadata or {}
     }
 
-    try:
-        client.table("usage_events").insert(data).execute()
-    except Exception as e:
-        logger.debug("Usage event insert failed: %s", e)
+    await ingest_row("usage_events", data)
 
 
 # =============================================================================
@@ -418,7 +431,7 @@ async def save_internal_llm_usage(
         related_id: Optional related resource ID (conversation_id, project_id, decision_id)
 
     Returns:
-        True if saved successfully, False if skipped (mock mode) or failed
+        True if queued (or saved), False if skipped (mock mode) or failed
     """
     # Skip in mock mode - no real API calls were made
     from ... import openrouter
@@ -428,8 +441,6 @@ async def save_internal_llm_usage(
     if not company_id or not usage:
         return False
 
-    client = get_service_client()
-
     # Calculate cost for this single model call
     pricing = get_model_pricing(model)
     prompt_tokens = usage.get('prompt_tokens', 0)
@@ -466,7 +477,7 @@ async def save_internal_llm_usage(
     }
 
     try:
-        client.table('session_usage').insert(data).execute()
+        await ingest_row('session_usage', data, raise_errors=True)
         log_app_event(
             "INTERNAL_LLM_USAGE_SAVED",
             level="DEBUG",
@@ -501,15 +512,13 @@ async def save_session_usage(
         session_type: 'council', 'chat', 'triage', or 'document'
 
     Returns:
-        True if saved successfully, False if skipped (mock mode) or failed
+        True if queued (or saved), False if skipped (mock mode) or failed
     """
     # Skip in mock mode - no real API calls were made
     from ... import openrouter
     if openrouter.MOCK_LLM:
         return False
 
-    client = get_service_client()
-
     # Calculate cost
     cost_cents = calculate_cost_cents(usage_data)
 
@@ -534,6 +543,7 @@ async def save_session_usage(
         'tokens_total': usage_data.get('total_tokens', 0),
         'cache_creation_tokens': usage_data.get('cache_creation_input_tokens', 0),
         'cache_read_tokens': usage_data.get('cache_read_input_tokens', 0),
+        'history_tokens': usage_data.get('history_tokens', 0),
         'estimated_cost_cents': cost_cents,
         'model_breakdown': model_breakdown,
         'session_type': session_type,
@@ -541,7 +551,7 @@ async def save_session_usage(
     }
 
     try:
-        client.table('session_usage').insert(data).execute()
+        await ingest_row('session_usage', data, raise_errors=True)
         log_app_event(
             "SESSION_USAGE_SAVED",
             level="DEBUG",
@@ -604,11 +614,15 @@ async def increment_rate_counters(
     company_id: str,
     sessions: int = 1,
     tokens: int = 0,
-    cost_cents: int = 0
+    cost_cents: int = 0,
+    window: Optional[datetime] = None
 ) -> dict:
     """
     Increment rate limit counters after a session.
 
+    window writes to the hour/day/month windows containing that time instead
+    of the current ones (batched quota reconciliation).
+
     NOTE: Automatically skips in mock mode (MOCK_LLM=true).
 
     Returns current counter values, or empty dict if skipped.
@@ -621,12 +635,17 @@ async def increment_rate_counters(
     client = get_service_client()
 
     try:
-        result = client.rpc('increment_rate_limit_counter', {
+        params = {
             'p_company_id': company_id,
             'p_sessions': sessions,
             'p_tokens': tokens,
             'p_cost_cents': cost_cents
-        }).execute()
+        }
+        if window is not None:
+            params['p_window'] = window.isoformat()
+            result = client.rpc('increment_rate_limit_counter_at', params).execute()
+        else:
+            result = client.rpc('increment_rate_limit_counter', params).execute()
 
         if result.data and len(result.data) > 0:
             row = result.data[0]
@@ -10,20 +10,24 @@ Endpoints for managing conversations:
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import StreamingResponse, Response, JSONResponse, FileResponse, RedirectResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Literal
 import asyncio
 from contextlib import asynccontextmanager
 import json
 import logging
+import time
 import uuid
 
 from ..auth import get_current_user, get_effective_user
 from .. import storage
-from .. import billing
+from .. import quota
+from .. import estimator
 from .. import leaderboard
 from .. import attachments
+from .. import data_export
+from .. import transcript_cache
 from .. import image_analyzer
 from ..i18n import t, get_locale_from_request
 from ..council import (
@@ -36,11 +40,13 @@ from ..council import (
     cache_council_response,
 )
 from ..context_loader import load_business_context
+from ..history import build_compacted_history, render_history_message, schedule_summary_update
+from ..config import COUNCIL_BUDGET_ENFORCEMENT
 from ..security import log_app_event
+from ..metrics import observe_stage, instrument_sse_stream
+from ..tracing import trace_span, record_span
 from .company.utils import (
     save_session_usage,
-    check_rate_limits,
-    increment_rate_counters,
     calculate_cost_cents,
     create_budget_alert,
     log_activity
@@ -184,65 +190,86 @@ def _verify_conversation_ownership(conversation: dict, user: dict, locale: str =
 
 def _build_council_conversation_history(conversation: dict) -> List[Dict[str, str]]:
     """
-    Build conversation history for council follow-up queries.
+    Build the full (uncompacted) conversation history for council follow-ups.
 
     Includes previous user questions and comprehensive council responses
-    (Stage 1 expert insights + Stage 3 synthesis) so the council can
-    provide contextual follow-up analysis.
+    (Stage 1 expert insights + Stage 3 synthesis). Council sessions use
+    history.build_compacted_history, which sends this verbatim only for the
+    most recent turns.
 
     Returns:
         List of {"role": "user/assistant", "content": "..."} messages
     """
-    history = []
+    return [
+        rendered for msg in conversation.get("messages", [])
+        if (rendered := render_history_message(msg))
+    ]
 
-    for msg in conversation.get("messages", []):
-        if msg.get("role") == "user":
-            content = msg.get("content", "")
 
-            # Reconstruct enhanced content from cached image analysis
-            if msg.get("image_analysis"):
-                content = image_analyzer.format_query_with_images(
-                    content,
-                    msg["image_analysis"]
-                )
+async def _estimate_send_message(
+    body: SendMessageRequest,
+    query: str,
+    council_history: List[Dict[str, str]],
+    company_uuid: Optional[str],
+    access_token: Optional[str],
+    modifier: Optional[str] = None,
+) -> "estimator.CouncilEstimate":
+    """Estimate a council session for a send_message request."""
+    return await estimator.estimate_council_session(
+        query,
+        conversation_history=council_history,
+        business_id=body.business_id,
+        department_id=body.department,
+        role_id=body.role,
+        project_id=body.project_id,
+        access_token=access_token,
+        company_uuid=company_uuid,
+        department_ids=body.departments,
+        role_ids=body.roles,
+        playbook_ids=body.playbooks,
+        conversation_modifier=modifier,
+        preset_override=body.preset_override,
+    )
 
-            history.append({
-                "role": "user",
-                "content": content
-            })
-        elif msg.get("role") == "assistant":
-            # Build comprehensive council response summary
-            parts = []
 
-            # Include Stage 1 expert responses (summarized)
-            stage1 = msg.get("stage1", [])
-            if stage1:
-                parts.append("## Previous Council Expert Responses\n")
-                for expert in stage1:
-                    model_name = expert.get("model", "Unknown Expert")
-                    # Use a friendly name for the model
-                    friendly_name = model_name.split("/")[-1] if "/" in model_name else model_name
-                    response = expert.get("response", "")
-                    if response:
-                        # Include full response for context (truncate if extremely long)
-                        if len(response) > 3000:
-                            response = response[:3000] + "... [truncated]"
-                        parts.append(f"### {friendly_name}\n{response}\n")
-
-            # Include Stage 3 synthesis (the chairman's final answer)
-            stage3 = msg.get("stage3", {})
-            synthesis = stage3.get("response") or stage3.get("content", "")
-            if synthesis:
-                parts.append("## Previous Council Synthesis (Final Answer)\n")
-                parts.append(synthesis)
+async def _preflight_budget_check(
+    body: SendMessageRequest,
+    query: str,
+    council_history: List[Dict[str, str]],
+    company_uuid: str,
+    access_token: Optional[str],
+    rate_check: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Decide whether a council session fits the company's remaining budget.
 
-            if parts:
-                history.append({
-                    "role": "assistant",
-                    "content": "\n".join(parts)
-                })
+    Returns:
+        {'action': 'allow'|'downgrade'|'reject', 'modifier', 'estimate', 'remaining_cents'}
+    """
+    remaining = estimator.remaining_budget_cents(rate_check)
+    decision: Dict[str, Any] = {
+        'action': 'allow', 'modifier': body.modifier, 'estimate': None, 'remaining_cents': remaining,
+    }
+    if remaining is None:
+        return decision
 
-    return history
+    estimate = await _estimate_send_message(
+        body, query, council_history, company_uuid, access_token, modifier=body.modifier
+    )
+    decision['estimate'] = estimate.to_dict()
+    if estimate.cost_cents <= remaining:
+        return decision
+
+    if COUNCIL_BUDGET_ENFORCEMENT == "downgrade" and body.modifier != "concise":
+        downgraded = await _estimate_send_message(
+            body, query, council_history, company_uuid, access_token, modifier="concise"
+        )
+        if downgraded.cost_cents <= remaining:
+            decision.update(action='downgrade', modifier='concise', estimate=downgraded.to_dict())
+            return decision
+
+    decision['action'] = 'reject'
+    return decision
 
 
 # =============================================================================
@@ -252,7 +279,8 @@ def _build_council_conversation_history(conversation: dict) -> List[Dict[str, st
 @router.get("")
 @limiter.limit("100/minute;500/hour")
 async def list_conversations(request: Request, limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated: use cursor"),
+    cursor: Optional[str] = Query(None, max_length=500, description="next_cursor from the previous page"),
     sort_by: str = Query("date"),
     department: Optional[str] = None,
     search: Optional[str] = None,
@@ -264,26 +292,32 @@ async def list_conversations(request: Request, limit: int = Query(50, ge=1, le=1
     """
     List conversations for the current user with pagination, filtering, and search.
     When impersonating, returns the impersonated user's conversations.
+
+    Pass the returned next_cursor as cursor to fetch the next page.
     """
+    locale = get_locale_from_request(request)
     access_token = user.get("access_token")
-    result = storage.list_conversations(
-        user_id=user["id"],
-        limit=limit,
-        offset=offset,
-        sort_by=sort_by,
-        search=search,
-        company_id=company_id,
-        include_archived=archived if archived is not None else False,
-        access_token=access_token
-    )
-    # Filter by department and starred client-side if specified
-    # (storage function doesn't support these filters yet)
-    conversations = result.get("conversations", [])
-    if department:
-        conversations = [c for c in conversations if c.get("department") == department]
-    if starred is not None:
-        conversations = [c for c in conversations if c.get("is_starred") == starred]
-    return {"conversations": conversations, "has_more": result.get("has_more", False)}
+    try:
+        result = storage.list_conversations(
+            user_id=user["id"],
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            sort_by=sort_by,
+            search=search,
+            company_id=company_id,
+            include_archived=archived if archived is not None else False,
+            department=department,
+            starred=starred,
+            access_token=access_token
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=t('errors.invalid_field', locale, field='cursor'))
+    return {
+        "conversations": result.get("conversations", []),
+        "has_more": result.get("has_more", False),
+        "next_cursor": result.get("next_cursor"),
+    }
 
 
 @router.post("")
@@ -306,11 +340,28 @@ async def create_conversation(request: Request, create_request: CreateConversati
 
 @router.get("/{conversation_id}")
 @limiter.limit("100/minute;500/hour")
-async def get_conversation(request: Request, conversation_id: str, user: dict = Depends(get_effective_user)):
-    """Get a specific conversation by ID. Supports impersonation."""
+async def get_conversation(
+    request: Request,
+    conversation_id: str,
+    stages: Literal["summary", "full"] = Query(
+        default="summary",
+        description="'summary' returns Stage 3 plus a per-message stage summary; "
+                    "'full' also returns Stage 1/2 payloads"
+    ),
+    user: dict = Depends(get_effective_user)
+):
+    """
+    Get a specific conversation by ID. Supports impersonation.
+
+    Loaded in a single round trip. By default assistant messages are marked
+    stages_deferred; fetch their Stage 1/2 payloads from
+    GET /{conversation_id}/messages/{message_id}/stages.
+    """
     locale = get_locale_from_request(request)
     access_token = user.get("access_token")
-    conversation = storage.get_conversation(conversation_id, access_token=access_token)
+    conversation = storage.get_conversation(
+        conversation_id, access_token=access_token, include_stages=stages == "full"
+    )
     if conversation is None:
         raise HTTPException(status_code=404, detail=t('errors.conversation_not_found', locale))
 
@@ -318,6 +369,82 @@ async def get_conversation(request: Request, conversation_id: str, user: dict =
     return conversation
 
 
+@router.get("/{conversation_id}/messages/{message_id}/stages")
+@limiter.limit("300/minute;3000/hour")
+async def get_message_stages(
+    request: Request,
+    conversation_id: str,
+    message_id: str,
+    user: dict = Depends(get_effective_user)
+):
+    """Get the full Stage 1/2 payloads of one assistant message. Supports impersonation."""
+    locale = get_locale_from_request(request)
+    access_token = user.get("access_token")
+
+    # Ownership check without pulling the message page
+    conversation = storage.get_conversation(
+        conversation_id, access_token=access_token, message_limit=1, include_stages=False
+    )
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=t('errors.conversation_not_found', locale))
+    _verify_conversation_ownership(conversation, user, locale)
+
+    stages = storage.get_message_stages(conversation_id, message_id, access_token=access_token)
+    if stages is None:
+        raise HTTPException(status_code=404, detail=t('errors.message_not_found', locale))
+    return stages
+
+
+@router.post("/{conversation_id}/estimate")
+@limiter.limit("30/minute;300/hour")
+async def estimate_message(
+    request: Request,
+    conversation_id: str,
+    body: SendMessageRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Estimate the cost and duration of sending a message to the council.
+
+    Takes the same body as POST /messages and returns predicted tokens, cost
+    (cents) and ETA (ms) per stage, plus the company's remaining monthly
+    budget. Image attachments are not analyzed, so their text isn't counted.
+    """
+    locale = get_locale_from_request(request)
+    access_token = user.get("access_token")
+
+    conversation = await transcript_cache.get_transcript(conversation_id, access_token, user["id"])
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=t('errors.conversation_not_found', locale))
+
+    _verify_conversation_ownership(conversation, user, locale)
+
+    company_uuid = None
+    if body.business_id:
+        try:
+            company_uuid = storage.resolve_company_id(body.business_id, access_token)
+        except Exception as e:
+            logger.warning(f"Failed to resolve company_id for {body.business_id}: {e}")
+
+    council_history, _ = build_compacted_history(conversation)
+    estimate = await _estimate_send_message(
+        body, body.content, council_history, company_uuid, access_token, modifier=body.modifier
+    )
+
+    remaining = None
+    if company_uuid:
+        # Same counters send_message reserves against (pending deltas included)
+        rate_status = await quota.get_rate_status(user["id"], company_uuid, access_token=access_token)
+        remaining = estimator.remaining_budget_cents(rate_status)
+
+    return {
+        **estimate.to_dict(),
+        'remaining_budget_cents': remaining,
+        'within_budget': remaining is None or estimate.cost_cents <= remaining,
+        'enforcement': COUNCIL_BUDGET_ENFORCEMENT,
+    }
+
+
 @router.post("/{conversation_id}/messages")
 @limiter.limit("60/minute;300/hour")
 async def send_message(
@@ -333,22 +460,31 @@ async def send_message(
     locale = get_locale_from_request(request)
     access_token = user.get("access_token")
 
-    # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id, access_token=access_token)
+    # Check if conversation exists (follow-up turns are usually cached)
+    conversation = await transcript_cache.get_transcript(conversation_id, access_token, user["id"])
     if conversation is None:
         raise HTTPException(status_code=404, detail=t('errors.conversation_not_found', locale))
 
     _verify_conversation_ownership(conversation, user, locale)
 
-    # Check billing limits before running council
-    can_query_result = billing.check_can_query(user["id"], access_token=access_token)
-    if not can_query_result["can_query"]:
+    # Resolve company UUID early for quota checks and LLM model selection (vision, title gen, etc.)
+    company_uuid = None
+    if body.business_id:
+        try:
+            company_uuid = storage.resolve_company_id(body.business_id, access_token)
+        except Exception as e:
+            logger.warning(f"Failed to resolve company_id for {body.business_id}: {e}")
+
+    # Check billing and company rate limits before running council, reserving
+    # this session's quota atomically (released if the session doesn't finish)
+    reservation = await quota.reserve_session(user["id"], company_uuid, access_token=access_token)
+    if reservation.billing_blocked:
         raise HTTPException(
             status_code=402,
             detail={
-                "error": can_query_result["reason"],
+                "error": reservation.reason,
                 "action": "upgrade_required",
-                "remaining": can_query_result["remaining"]
+                "remaining": reservation.remaining
             }
         )
 
@@ -361,14 +497,6 @@ async def send_message(
         from ..byok import get_user_api_key
         from ..routers import company as company_router
 
-        # Resolve company UUID early for LLM model selection (vision, title gen, etc.)
-        company_uuid = None
-        if body.business_id:
-            try:
-                company_uuid = storage.resolve_company_id(body.business_id, access_token)
-            except Exception as e:
-                logger.warning(f"Failed to resolve company_id for {body.business_id}: {e}")
-
         api_key_token = None
         try:
             # Get user's BYOK key if available
@@ -411,7 +539,12 @@ async def send_message(
 
                 # Analyze images with vision model (use company-specific model if configured)
                 elif images:
-                    image_analysis = await image_analyzer.analyze_images(images, body.content, company_id=company_uuid)
+                    image_analysis = ""
+                    async for event in image_analyzer.stream_image_analysis(images, body.content, company_id=company_uuid):
+                        if event["type"] == "image_analysis_progress":
+                            yield f"data: {json.dumps(event)}\n\n"
+                        else:
+                            image_analysis = event["analysis"]
                     image_analysis_result = image_analysis  # Cache for database storage
                     enhanced_query = image_analyzer.format_query_with_images(body.content, image_analysis)
 
@@ -427,14 +560,15 @@ async def send_message(
                     yield f"data: {json.dumps({'type': 'image_analysis_complete', 'analyzed': 0})}\n\n"
 
             # Add user message with attachments and analysis (after processing)
-            storage.add_user_message(
-                conversation_id,
-                body.content,
-                user_id,
-                access_token=access_token,
-                attachment_ids=body.attachment_ids,
-                image_analysis=image_analysis_result
-            )
+            with trace_span("persist.user_message"):
+                storage.add_user_message(
+                    conversation_id,
+                    body.content,
+                    user_id,
+                    access_token=access_token,
+                    attachment_ids=body.attachment_ids,
+                    image_analysis=image_analysis_result
+                )
 
             # Start title generation in parallel (don't await yet)
             # Pass company_uuid for internal LLM usage tracking
@@ -459,9 +593,9 @@ async def send_message(
                         title_emitted = True
                 return None
 
-            # Check rate limits before starting council session
+            # Rate limits were checked (and the session reserved) with the billing check
             if company_uuid:
-                rate_check = await check_rate_limits(company_uuid)
+                rate_check = reservation.rate_check
                 if not rate_check['allowed']:
                     exceeded = rate_check['exceeded']
                     details = rate_check['details']
@@ -500,10 +634,11 @@ async def send_message(
                 total_usage['by_model'][model]['completion_tokens'] += usage_data.get('completion_tokens', 0)
                 total_usage['by_model'][model]['total_tokens'] += usage_data.get('total_tokens', 0)
 
-            # Build conversation history for follow-up council queries
-            # This includes previous questions and council responses so
-            # the experts can provide contextual follow-up analysis
-            council_history = _build_council_conversation_history(conversation)
+            # Build conversation history for follow-up council queries: the
+            # rolling summary of older turns plus the most recent turns verbatim,
+            # so the experts can provide contextual follow-up analysis
+            council_history, history_stats = build_compacted_history(conversation)
+            total_usage.update(history_stats)
 
             # =========================================================================
             # REDIS CACHE CHECK - Return cached response if available
@@ -557,9 +692,11 @@ async def send_message(
                         aggregate_rankings=cached_aggregate_rankings,
                         access_token=access_token
                     )
+                    schedule_summary_update(conversation_id, access_token, company_uuid)
 
-                    # Still increment query usage (cached responses still count as a query)
-                    billing.increment_query_usage(user_id, access_token=access_token)
+                    # Still count the query (cached responses still count as a query),
+                    # but not a rate-limited session - no LLM calls were made
+                    await quota.commit_session(reservation, count_session=False)
 
                     # Final title check
                     if title_task and not title_emitted:
@@ -577,8 +714,29 @@ async def send_message(
                     yield f"data: {json.dumps({'type': 'complete', 'cached': True})}\n\n"
                     return  # Exit early - cached response served
 
+            # Pre-flight budget check: reject or downgrade sessions whose
+            # estimated cost exceeds the company's remaining monthly budget
+            conversation_modifier = body.modifier
+            if company_uuid and COUNCIL_BUDGET_ENFORCEMENT in ("reject", "downgrade"):
+                decision = await _preflight_budget_check(
+                    body, enhanced_query, council_history, company_uuid, access_token, reservation.rate_check
+                )
+                if decision['action'] == 'reject':
+                    log_app_event("COUNCIL_BUDGET_REJECTED", level="WARNING", company_id=company_uuid,
+                                  estimated_cents=decision['estimate']['cost_cents'],
+                                  remaining_cents=decision['remaining_cents'])
+                    yield f"data: {json.dumps({'type': 'error', 'message': 'Estimated cost exceeds remaining monthly budget', 'budget_exceeded': True, 'estimate': decision['estimate'], 'remaining_cents': decision['remaining_cents']})}\n\n"
+                    return
+                if decision['action'] == 'downgrade':
+                    conversation_modifier = decision['modifier']
+                    log_app_event("COUNCIL_BUDGET_DOWNGRADED", level="INFO", company_id=company_uuid,
+                                  estimated_cents=decision['estimate']['cost_cents'],
+                                  remaining_cents=decision['remaining_cents'])
+                    yield f"data: {json.dumps({'type': 'budget_downgrade', 'modifier': conversation_modifier, 'estimate': decision['estimate'], 'remaining_cents': decision['remaining_cents']})}\n\n"
+
             # Stage 1: Collect responses with streaming
             yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
+            stage_started = time.perf_counter()
             stage1_results = []
             async for event in stage1_stream_responses(
                 enhanced_query,
@@ -592,7 +750,7 @@ async def send_message(
                 department_ids=body.departments,
                 role_ids=body.roles,
                 playbook_ids=body.playbooks,
-                conversation_modifier=body.modifier,
+                conversation_modifier=conversation_modifier,
                 preset_override=body.preset_override,
             ):
                 title_event = await check_and_emit_title()
@@ -611,8 +769,12 @@ async def send_message(
                     stage1_results = event['data']
                     yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
 
+            observe_stage("stage1", time.perf_counter() - stage_started)
+            record_span("stage1", time.perf_counter() - stage_started)
+
             # Stage 2: Collect rankings with streaming
             yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
+            stage_started = time.perf_counter()
             stage2_results = []
             label_to_model = {}
             aggregate_rankings = []
@@ -635,8 +797,12 @@ async def send_message(
                     aggregate_rankings = event['aggregate_rankings']
                     yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})}\n\n"
 
+            observe_stage("stage2", time.perf_counter() - stage_started)
+            record_span("stage2", time.perf_counter() - stage_started)
+
             # Stage 3: Synthesize final answer with streaming
             yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
+            stage_started = time.perf_counter()
             stage3_result = {}
             async for event in stage3_stream_synthesis(
                 enhanced_query,
@@ -666,6 +832,9 @@ async def send_message(
                     aggregate_usage(event['data'].get('usage'))
                     yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
 
+            observe_stage("stage3", time.perf_counter() - stage_started)
+            record_span("stage3", time.perf_counter() - stage_started)
+
             # Final check for title if not emitted yet
             log_app_event("TITLE_FINAL_CHECK", level="INFO", has_task=bool(title_task), title_emitted=title_emitted)
             if title_task and not title_emitted:
@@ -684,23 +853,31 @@ async def send_message(
             # Save complete assistant message with metadata
             try:
                 log_app_event("COUNCIL_SAVE_START", level="INFO", conversation_id=conversation_id, stage1_count=len(stage1_results), stage2_count=len(stage2_results), has_stage3=bool(stage3_result))
-                storage.add_assistant_message(
-                    conversation_id,
-                    stage1_results,
-                    stage2_results,
-                    stage3_result,
-                    user_id,
-                    label_to_model=label_to_model,
-                    aggregate_rankings=aggregate_rankings,
-                    access_token=access_token
-                )
+                with trace_span("persist.assistant_message"):
+                    storage.add_assistant_message(
+                        conversation_id,
+                        stage1_results,
+                        stage2_results,
+                        stage3_result,
+                        user_id,
+                        label_to_model=label_to_model,
+                        aggregate_rankings=aggregate_rankings,
+                        access_token=access_token
+                    )
                 log_app_event("COUNCIL_SAVE_SUCCESS", level="INFO", conversation_id=conversation_id)
+                # Fold older turns into the rolling history summary in the background
+                schedule_summary_update(conversation_id, access_token, company_uuid)
             except Exception as save_error:
                 log_app_event("COUNCIL_SAVE_ERROR", level="ERROR", conversation_id=conversation_id, error=str(save_error), stage1_count=len(stage1_results), stage2_count=len(stage2_results), has_stage3=bool(stage3_result))
                 raise
 
-            # Increment query usage after successful council run
-            billing.increment_query_usage(user_id, access_token=access_token)
+            # Settle the quota reservation with this session's tokens and cost
+            with trace_span("persist.query_usage"):
+                rate_status = await quota.commit_session(
+                    reservation,
+                    tokens=total_usage.get('total_tokens', 0),
+                    cost_cents=calculate_cost_cents(total_usage),
+                )
 
             # =========================================================================
             # REDIS CACHE STORE - Cache successful council response for future queries
@@ -767,29 +944,18 @@ async def send_message(
                 except Exception as e:
                     logger.warning(f"Failed to log activity for {conversation_id}: {e}")
 
-                # Increment rate limit counters and check for budget alerts
+                # Create budget alerts for limits past their warning threshold
                 try:
-                    cost_cents = calculate_cost_cents(total_usage)
-                    counters = await increment_rate_counters(
-                        company_id=company_uuid,
-                        sessions=1,
-                        tokens=total_usage.get('total_tokens', 0),
-                        cost_cents=cost_cents
-                    )
-
-                    # Check for warning thresholds and create alerts (only if counters returned)
-                    if counters:
-                        rate_check = await check_rate_limits(company_uuid)
-                        for warning in rate_check.get('warnings', []):
-                            details = rate_check['details'].get(warning, {})
-                            await create_budget_alert(
-                                company_id=company_uuid,
-                                alert_type=f"{warning}_warning",
-                                current_value=details.get('current', 0),
-                                limit_value=details.get('limit', 0)
-                            )
+                    for warning in rate_status.get('warnings', []):
+                        details = rate_status['details'].get(warning, {})
+                        await create_budget_alert(
+                            company_id=company_uuid,
+                            alert_type=f"{warning}_warning",
+                            current_value=details.get('current', 0),
+                            limit_value=details.get('limit', 0)
+                        )
                 except Exception as e:
-                    logger.warning(f"Failed to increment rate counters for {company_uuid}: {e}")
+                    logger.warning(f"Failed to create budget alerts for {company_uuid}: {e}")
 
             # Log token usage summary
             if total_usage['total_tokens'] > 0:
@@ -801,6 +967,7 @@ async def send_message(
                     completion_tokens=total_usage['completion_tokens'],
                     cache_read_tokens=total_usage['cache_read_input_tokens'],
                     cache_creation_tokens=total_usage['cache_creation_input_tokens'],
+                    history_tokens=total_usage['history_tokens'],
                     models_used=list(total_usage['by_model'].keys())
                 )
 
@@ -850,8 +1017,10 @@ async def send_message(
             if api_key_token:
                 reset_request_api_key(api_key_token)
 
+    # Hand the reservation to the stream so it's released even if the body never runs
+    events = await quota.hold_for_stream(reservation, event_generator())
     return StreamingResponse(
-        event_generator(),
+        instrument_sse_stream(events, "council"),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -877,7 +1046,7 @@ async def chat_with_chairman(
     locale = get_locale_from_request(request)
     access_token = user.get("access_token")
 
-    conversation = storage.get_conversation(conversation_id, access_token=access_token)
+    conversation = await transcript_cache.get_transcript(conversation_id, access_token, user["id"])
     if conversation is None:
         raise HTTPException(status_code=404, detail=t('errors.conversation_not_found', locale))
 
@@ -891,9 +1060,11 @@ async def chat_with_chairman(
         except Exception as e:
             logger.warning(f"Failed to resolve company_id for {body.business_id}: {e}")
 
-    # Check billing limits
-    can_query_result = billing.check_can_query(user["id"], access_token=access_token)
-    if can_query_result["remaining"] == 0 and can_query_result["remaining"] != -1:
+    # Check billing limits (chat doesn't use a query, but counts as a company session)
+    reservation = await quota.reserve_session(
+        user["id"], company_uuid, access_token=access_token, count_query=False, check_rate=False
+    )
+    if reservation.billing_blocked:
         raise HTTPException(
             status_code=402,
             detail={
@@ -977,7 +1148,12 @@ async def chat_with_chairman(
 
                 # Analyze images with vision model (use company-specific model if configured)
                 elif images:
-                    image_analysis = await image_analyzer.analyze_images(images, body.content, company_id=company_uuid)
+                    image_analysis = ""
+                    async for event in image_analyzer.stream_image_analysis(images, body.content, company_id=company_uuid):
+                        if event["type"] == "image_analysis_progress":
+                            yield f"data: {json.dumps(event)}\n\n"
+                        else:
+                            image_analysis = event["analysis"]
                     image_analysis_result = image_analysis  # Cache for database storage
                     enhanced_content = image_analyzer.format_query_with_images(body.content, image_analysis)
 
@@ -1044,6 +1220,7 @@ async def chat_with_chairman(
                 user_id=user_id,
                 access_token=access_token
             )
+            schedule_summary_update(conversation_id, access_token, company_uuid)
 
             # Track chat usage for analytics (mirrors council session tracking)
             if chat_usage and company_uuid:
@@ -1087,27 +1264,23 @@ async def chat_with_chairman(
                 except Exception as e:
                     log_app_event("CHAT_USAGE: Failed to save session usage", level="WARNING", error=str(e))
 
-                # Increment rate limit counters
+                # Settle the quota reservation and check for budget alerts
                 try:
-                    cost_cents = calculate_cost_cents(total_usage)
-                    counters = await increment_rate_counters(
-                        company_id=company_uuid,
-                        sessions=1,
+                    rate_status = await quota.commit_session(
+                        reservation,
                         tokens=total_usage.get('total_tokens', 0),
-                        cost_cents=cost_cents
+                        cost_cents=calculate_cost_cents(total_usage),
                     )
 
-                    # Check for warning thresholds and create alerts
-                    if counters:
-                        rate_check = await check_rate_limits(company_uuid)
-                        for warning in rate_check.get('warnings', []):
-                            details = rate_check['details'].get(warning, {})
-                            await create_budget_alert(
-                                company_id=company_uuid,
-                                alert_type=f"{warning}_warning",
-                                current_value=details.get('current', 0),
-                                limit_value=details.get('limit', 0)
-                            )
+                    # Create alerts for limits past their warning threshold
+                    for warning in rate_status.get('warnings', []):
+                        details = rate_status['details'].get(warning, {})
+                        await create_budget_alert(
+                            company_id=company_uuid,
+                            alert_type=f"{warning}_warning",
+                            current_value=details.get('current', 0),
+                            limit_value=details.get('limit', 0)
+                        )
                 except Exception as e:
                     log_app_event("CHAT_USAGE: Failed to increment rate counters", level="WARNING", error=str(e))
 
@@ -1152,8 +1325,10 @@ async def chat_with_chairman(
             if api_key_token:
                 reset_request_api_key(api_key_token)
 
+    # Hand the reservation to the stream so it's released even if the body never runs
+    events = await quota.hold_for_stream(reservation, event_generator())
     return StreamingResponse(
-        event_generator(),
+        instrument_sse_stream(events, "chat"),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -1397,16 +1572,18 @@ async def export_conversation_markdown(request: Request, conversation_id: str,
 @router.get("/export/all")
 @limiter.limit("5/minute;10/hour")
 async def export_all_user_data(request: Request, user: dict = Depends(get_current_user),
-    format: Literal["json", "zip"] = Query(default="json", description="Export format")
+    format: Literal["json", "ndjson", "zip"] = Query(default="json", description="Export format"),
+    background: bool = Query(default=False, description="Spool the export to a file for later download")
 ):
     """
     Export ALL user data for GDPR Article 20 compliance (right to data portability).
 
-    Returns a comprehensive JSON export of:
-    - All conversations with messages
-    - All knowledge entries
-    - User profile information
-    - Company memberships
+    Streams the user profile, owned companies (with departments, roles and
+    playbooks), conversations, messages and knowledge entries. Each table is
+    paged with a keyset cursor, so memory stays bounded for any account size.
+
+    With background=true, returns 202 with a job to poll at
+    GET /export/jobs/{job_id} and download when complete.
 
     This endpoint is rate-limited to prevent abuse.
     """
@@ -1422,139 +1599,57 @@ async def export_all_user_data(request: Request, user: dict = Depends(get_curren
     except ImportError:
         from backend.database import get_supabase_with_auth
 
-    supabase = get_supabase_with_auth(access_token)
+    export = data_export.UserDataExport(get_supabase_with_auth(access_token), user_id, email=user.get("email"))
 
-    export_data: Dict[str, Any] = {
-        "export_version": "1.0",
-        "export_date": None,
-        "user": {},
-        "companies": [],
-        "conversations": [],
-        "knowledge_entries": [],
-    }
+    if background:
+        job = await data_export.start_export_job(export, format)
+        return JSONResponse(status_code=202, content=job.to_dict())
 
-    # Get current timestamp
-    from datetime import datetime, timezone
-    export_data["export_date"] = datetime.now(timezone.utc).isoformat()
-
-    # 1. Export user profile
-    try:
-        user_result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-        if user_result.data:
-            # Exclude sensitive fields
-            profile = user_result.data
-            export_data["user"] = {
-                "id": profile.get("id"),
-                "email": profile.get("email"),
-                "full_name": profile.get("full_name"),
-                "avatar_url": profile.get("avatar_url"),
-                "created_at": profile.get("created_at"),
-                "updated_at": profile.get("updated_at"),
-            }
-    except Exception as e:
-        # Profile table might not exist or user might not have profile
-        logger.warning(f"GDPR export: failed to load user profile for {user_id}: {e}")
-        export_data["user"] = {"id": user_id, "email": user.get("email")}
+    writer, media_type, _ = data_export.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        writer(export),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{data_export.export_filename(user_id, format)}"'
+        }
+    )
 
-    # 2. Export companies the user owns (M9: batched queries instead of N+1)
-    try:
-        companies_result = supabase.table("companies").select("*").eq("user_id", user_id).execute()
-        if companies_result.data:
-            company_ids = [c["id"] for c in companies_result.data]
-
-            # Batch-fetch all related data in 3 queries (not N*3)
-            all_depts = []
-            all_roles = []
-            all_playbooks = []
-            try:
-                dept_result = supabase.table("departments").select("*").in_("company_id", company_ids).execute()
-                all_depts = dept_result.data or []
-            except Exception as e:
-                logger.warning(f"GDPR export: failed to load departments: {e}")
-            try:
-                roles_result = supabase.table("roles").select("*").in_("company_id", company_ids).execute()
-                all_roles = roles_result.data or []
-            except Exception as e:
-                logger.warning(f"GDPR export: failed to load roles: {e}")
-            try:
-                playbooks_result = supabase.table("org_documents").select("*").in_("company_id", company_ids).execute()
-                all_playbooks = playbooks_result.data or []
-            except Exception as e:
-                logger.warning(f"GDPR export: failed to load playbooks: {e}")
-
-            # Group by company_id
-            depts_by_company: Dict[str, list] = {}
-            for d in all_depts:
-                depts_by_company.setdefault(d.get("company_id"), []).append(d)
-            roles_by_company: Dict[str, list] = {}
-            for r in all_roles:
-                roles_by_company.setdefault(r.get("company_id"), []).append(r)
-            playbooks_by_company: Dict[str, list] = {}
-            for p in all_playbooks:
-                playbooks_by_company.setdefault(p.get("company_id"), []).append(p)
-
-            for company in companies_result.data:
-                cid = company.get("id")
-                company_export = {
-                    "id": cid,
-                    "name": company.get("name"),
-                    "context": company.get("context"),
-                    "created_at": company.get("created_at"),
-                    "departments": depts_by_company.get(cid, []),
-                    "roles": roles_by_company.get(cid, []),
-                    "playbooks": playbooks_by_company.get(cid, []),
-                }
-                export_data["companies"].append(company_export)
-    except Exception as e:
-        logger.error(f"GDPR export: failed to load companies for user {user_id}: {e}")
 
-    # 3. Export all conversations
-    try:
-        # Get conversations owned by user
-        convs_result = supabase.table("conversations").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-        if convs_result.data:
-            for conv in convs_result.data:
-                conv_export = {
-                    "id": conv.get("id"),
-                    "title": conv.get("title"),
-                    "created_at": conv.get("created_at"),
-                    "updated_at": conv.get("updated_at"),
-                    "is_starred": conv.get("is_starred"),
-                    "is_archived": conv.get("is_archived"),
-                    "company_id": conv.get("company_id"),
-                    "messages": conv.get("messages", []),
-                }
-                export_data["conversations"].append(conv_export)
-    except Exception as e:
-        logger.error(f"GDPR export: failed to load conversations for user {user_id}: {e}")
+@router.get("/export/jobs/{job_id}")
+@limiter.limit("60/minute")
+async def get_export_job(request: Request, job_id: str, user: dict = Depends(get_current_user)):
+    """Get the status of a background data export."""
+    locale = get_locale_from_request(request)
+    job = await data_export.get_export_job(job_id, user["id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail=t('errors.not_found', locale))
+    return job.to_dict()
 
-    # 4. Export knowledge entries
-    try:
-        knowledge_result = supabase.table("knowledge_entries").select("*").eq("user_id", user_id).execute()
-        if knowledge_result.data:
-            export_data["knowledge_entries"] = knowledge_result.data
-    except Exception as e:
-        logger.error(f"GDPR export: failed to load knowledge entries for user {user_id}: {e}")
-
-    # Log the export for audit purposes
-    log_app_event(
-        "GDPR_DATA_EXPORT",
-        level="INFO",
-        user_id=user_id,
-        conversations_count=len(export_data["conversations"]),
-        companies_count=len(export_data["companies"]),
-        knowledge_count=len(export_data["knowledge_entries"]),
-    )
 
-    # Return as JSON
-    export_json = json.dumps(export_data, indent=2, default=str)
+@router.get("/export/jobs/{job_id}/download")
+@limiter.limit("10/minute")
+async def download_export_job(request: Request, job_id: str, user: dict = Depends(get_current_user)):
+    """Download a completed background data export.
 
-    return Response(
-        content=export_json,
-        media_type="application/json",
-        headers={
-            "Content-Disposition": f'attachment; filename="axcouncil-data-export-{user_id[:8]}.json"'
-        }
+    Uploaded archives redirect to a short-lived signed storage URL; archives
+    that stayed on local disk (upload disabled or failed) are served directly.
+    """
+    locale = get_locale_from_request(request)
+    job = await data_export.get_export_job(job_id, user["id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail=t('errors.not_found', locale))
+    if job.status != "complete":
+        raise HTTPException(status_code=409, detail=job.to_dict())
+
+    url = await data_export.create_download_url(job)
+    if url:
+        return RedirectResponse(url, status_code=307)
+    if not job.path:
+        raise HTTPException(status_code=404, detail=t('errors.not_found', locale))
+    return FileResponse(
+        job.path,
+        media_type=data_export.EXPORT_FORMATS[job.format][1],
+        filename=data_export.export_filename(user["id"], job.format),
     )
 
 
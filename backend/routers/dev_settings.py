@@ -59,6 +59,7 @@ async def get_mock_mode(request: Request, user: dict = Depends(get_current_user)
     return {
         "enabled": openrouter.MOCK_LLM,
         "scenario": config.MOCK_LLM_SCENARIO,
+        "latency": config.MOCK_LLM_LATENCY,
         "length_override": config.MOCK_LLM_LENGTH_OVERRIDE,
     }
 
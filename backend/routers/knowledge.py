@@ -18,6 +18,7 @@ from ..auth import get_current_user
 from .. import storage
 from .. import knowledge
 from ..security import SecureHTTPException
+from ..company_snapshots import bump_company_version
 from .. import model_registry
 from ..i18n import t, get_locale_from_request
 
@@ -290,6 +291,8 @@ async def create_knowledge_entry(request: Request, entry_request: CreateKnowledg
         )
 
         if result:
+            # Decision counts show on the cached company overview
+            await bump_company_version(company_uuid)
             await company_router.log_activity(
                 company_id=company_uuid,
                 event_type="decision",
@@ -515,13 +518,17 @@ async def update_knowledge_entry(request: Request, entry_id: str,
     locale = get_locale_from_request(request)
     validate_uuid(entry_id, "entry_id", locale)
     try:
+        access_token = user.get("access_token")
+        company_uuid = knowledge.get_knowledge_entry_company_id(entry_id, access_token)
         result = knowledge.update_knowledge_entry(
             entry_id=entry_id,
             user_id=user["id"],
             updates=update_request.model_dump(exclude_unset=True),
-            access_token=user.get("access_token")
+            access_token=access_token
         )
         if result:
+            if company_uuid:
+                await bump_company_version(company_uuid)
             return result
         raise HTTPException(status_code=404, detail=t('errors.knowledge_entry_not_found', locale))
     except Exception as e:
@@ -537,12 +544,16 @@ async def delete_knowledge_entry(request: Request, entry_id: str,
     locale = get_locale_from_request(request)
     validate_uuid(entry_id, "entry_id", locale)
     try:
+        access_token = user.get("access_token")
+        company_uuid = knowledge.get_knowledge_entry_company_id(entry_id, access_token)
         success = knowledge.deactivate_knowledge_entry(
             entry_id=entry_id,
             user_id=user["id"],
-            access_token=user.get("access_token")
+            access_token=access_token
         )
         if success:
+            if company_uuid:
+                await bump_company_version(company_uuid)
             return {"success": True}
         raise HTTPException(status_code=404, detail=t('errors.not_found', locale))
     except Exception as e:
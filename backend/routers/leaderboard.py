@@ -7,7 +7,9 @@ Endpoints for model rankings:
 - Get department-specific leaderboard
 """
 
-from fastapi import APIRouter, Depends, Request
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
 
 from ..auth import get_current_user
 from .. import leaderboard
@@ -18,6 +20,8 @@ from ..rate_limit import limiter
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
+LeaderboardWindow = Literal["7d", "30d", "all"]
+
 
 # =============================================================================
 # ENDPOINTS
@@ -25,20 +29,33 @@ router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
 @router.get("")
 @limiter.limit("60/minute")
-async def get_leaderboard_summary(request: Request, user: dict = Depends(get_current_user)):
+async def get_leaderboard_summary(
+    request: Request,
+    window: LeaderboardWindow = Query("all", description="Time window: 7d, 30d or all"),
+    user: dict = Depends(get_current_user)
+):
     """Get full leaderboard summary with overall and per-department rankings."""
-    return leaderboard.get_leaderboard_summary()
+    return leaderboard.get_leaderboard_summary(window)
 
 
 @router.get("/overall")
 @limiter.limit("60/minute")
-async def get_overall_leaderboard(request: Request, user: dict = Depends(get_current_user)):
+async def get_overall_leaderboard(
+    request: Request,
+    window: LeaderboardWindow = Query("all", description="Time window: 7d, 30d or all"),
+    user: dict = Depends(get_current_user)
+):
     """Get overall model leaderboard across all sessions."""
-    return leaderboard.get_overall_leaderboard()
+    return leaderboard.get_overall_leaderboard(window)
 
 
 @router.get("/department/{department}")
 @limiter.limit("60/minute")
-async def get_department_leaderboard(request: Request, department: str, user: dict = Depends(get_current_user)):
+async def get_department_leaderboard(
+    request: Request,
+    department: str,
+    window: LeaderboardWindow = Query("all", description="Time window: 7d, 30d or all"),
+    user: dict = Depends(get_current_user)
+):
     """Get leaderboard for a specific department."""
-    return leaderboard.get_department_leaderboard(department)
+    return leaderboard.get_department_leaderboard(department, window)
@@ -9,6 +9,8 @@ import logging
 import re
 from typing import Optional, Dict, Any, List, Tuple
 
+from ..company_snapshots import bump_company_version
+
 logger = logging.getLogger(__name__)
 
 
@@ -132,6 +134,8 @@ async def _save_decision_to_knowledge(
 
     result = client.table("knowledge_entries").insert(insert_data).execute()
     if result.data and len(result.data) > 0:
+        # Decision counts show on the cached company overview
+        await bump_company_version(company_uuid)
         return result.data[0].get("id")
 
     return None
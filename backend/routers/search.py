@@ -0,0 +1,73 @@
+"""
+Search Router
+
+Full-text search endpoint:
+- Ranked search over conversations, messages, knowledge entries and playbooks
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+
+from ..auth import get_current_user
+from .. import storage
+from .. import search
+from ..i18n import t, get_locale_from_request
+
+# Import shared rate limiter (ensures limits are tracked globally)
+from ..rate_limit import limiter
+
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
+@router.get("")
+@limiter.limit("60/minute;600/hour")
+async def search_content(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text (websearch syntax)"),
+    company_id: str = Query(..., description="Company UUID or slug"),
+    types: Optional[str] = Query(
+        None, description="Comma-separated subset of: conversation, message, knowledge, playbook"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=500, description="next_cursor from the previous page"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Ranked full-text search with highlighted snippets.
+
+    Snippets are HTML-escaped with matches wrapped in <mark>. Pass the
+    returned next_cursor as cursor to fetch the next page.
+    """
+    locale = get_locale_from_request(request)
+    access_token = user.get("access_token")
+
+    try:
+        company_uuid = storage.resolve_company_id(company_id, access_token, create_if_missing=False)
+    except ValueError:
+        raise HTTPException(status_code=404, detail=t('errors.company_not_found', locale))
+
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else None
+    if kinds and not set(kinds) <= set(search.SEARCH_KINDS):
+        raise HTTPException(status_code=400, detail=t('errors.invalid_field', locale, field='types'))
+
+    try:
+        result = search.search_content(
+            company_id=company_uuid,
+            user_id=user["id"],
+            query=q,
+            kinds=kinds,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=t('errors.invalid_field', locale, field='cursor'))
+
+    if result is None:
+        raise HTTPException(status_code=403, detail=t('errors.forbidden', locale))
+    return result
@@ -0,0 +1,137 @@
+"""Full-text search across conversations, messages, knowledge entries and playbooks."""
+
+import html
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from .database import get_supabase_service
+from .security import verify_user_company_access, log_security_event
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+SEARCH_KINDS = ("conversation", "message", "knowledge", "playbook")
+
+MAX_SEARCH_LIMIT = 100
+MAX_QUERY_TERMS = 8
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CURSOR_SCOPE = "search"
+
+
+# =============================================================================
+# QUERY HELPERS
+# =============================================================================
+
+def prefix_tsquery(text: Optional[str]) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery() prefix query: "exp plan" -> "exp:* & plan:*".
+
+    Used for as-you-type filters (sidebar, knowledge list), where partial
+    words should match like the old ilike search did. Only word characters
+    survive, so the result is always valid tsquery syntax.
+
+    Returns:
+        Query string, or None if the text has no searchable words
+    """
+    words = _WORD_RE.findall((text or "").lower())[:MAX_QUERY_TERMS]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    """Escape a ts_headline snippet as HTML, keeping only its <mark> tags."""
+    escaped = html.escape(snippet or "", quote=False)
+    return escaped.replace("&lt;mark&gt;", "<mark>").replace("&lt;/mark&gt;", "</mark>")
+
+
+# =============================================================================
+# SEARCH
+# =============================================================================
+
+def search_content(
+    company_id: str,
+    user_id: str,
+    query: str,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Ranked full-text search with highlighted snippets.
+
+    Conversations and messages are limited to the user's own; knowledge
+    entries and playbooks to the company. Messages are collapsed to the best
+    hit per conversation.
+
+    Args:
+        company_id: Company UUID
+        user_id: Requesting user's ID (access is verified)
+        query: Search text (websearch syntax: "quoted phrases", -exclusions, OR)
+        kinds: Subset of SEARCH_KINDS (default: all)
+        limit: Page size (max 100)
+        cursor: next_cursor from the previous page
+
+    Returns:
+        Dict with 'results', 'has_more' and 'next_cursor', or None if the
+        user has no access to the company
+
+    Raises:
+        ValueError: If kinds or the cursor are invalid
+    """
+    from .storage import decode_cursor, encode_cursor
+
+    kinds = list(kinds or SEARCH_KINDS)
+    unknown = set(kinds) - set(SEARCH_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown search kinds: {', '.join(sorted(unknown))}")
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    cursor_rank, cursor_kind, cursor_id = decode_cursor(cursor, _CURSOR_SCOPE, 3) if cursor else (None, None, None)
+
+    if not verify_user_company_access(user_id, company_id):
+        log_security_event("READ_BLOCKED", user_id=user_id,
+                           resource_type="search", resource_id=company_id,
+                           severity="WARNING")
+        return None
+
+    if not _WORD_RE.search(query or ""):
+        return {"results": [], "has_more": False, "next_cursor": None}
+
+    client = get_supabase_service()
+    result = client.rpc("search_content", {
+        "p_company_id": company_id,
+        "p_user_id": user_id,
+        "p_query": query,
+        "p_kinds": kinds,
+        "p_limit": limit + 1,
+        "p_cursor_rank": cursor_rank,
+        "p_cursor_kind": cursor_kind,
+        "p_cursor_id": cursor_id,
+    }).execute()
+
+    rows: List[Dict[str, Any]] = result.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    results = [
+        {
+            "type": row["kind"],
+            "id": row["id"],
+            "conversation_id": row.get("conversation_id"),
+            "title": row.get("title") or "",
+            "snippet": _highlight(row.get("snippet")),
+            "rank": row["rank"],
+            "updated_at": row.get("updated_at"),
+        }
+        for row in rows
+    ]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(_CURSOR_SCOPE, [last["rank"], last["kind"], last["id"]])
+
+    return {"results": results, "has_more": has_more, "next_cursor": next_cursor}
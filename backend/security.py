@@ -10,7 +10,6 @@ This module provides:
 
 import logging
 import hashlib
-import json
 import os
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
@@ -19,8 +18,10 @@ from fastapi import HTTPException, Request
 # Import i18n - must be here to avoid circular imports
 try:
     from .i18n import t
+    from .log_pipeline import json_dumps, make_async_handler, should_log_event
 except ImportError:
     from backend.i18n import t
+    from backend.log_pipeline import json_dumps, make_async_handler, should_log_event
 
 # =============================================================================
 # STRUCTURED JSON LOGGING
@@ -39,7 +40,8 @@ class StructuredJsonFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            # record.created, not now(): records may be formatted later on the log thread
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -57,18 +59,18 @@ class StructuredJsonFormatter(logging.Formatter):
 
         for key, value in record.__dict__.items():
             if key not in standard_attrs and not key.startswith("_"):
-                # Ensure value is JSON serializable
-                try:
-                    json.dumps(value)
-                    log_data[key] = value
-                except (TypeError, ValueError):
-                    log_data[key] = str(value)
+                log_data[key] = value
 
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+        if record.stack_info:
+            log_data["stack_info"] = self.formatStack(record.stack_info)
 
-        return json.dumps(log_data)
+        # Non-serializable values are stringified by the encoder
+        return json_dumps(log_data)
 
 
 def get_log_formatter() -> logging.Formatter:
@@ -80,17 +82,23 @@ def get_log_formatter() -> logging.Formatter:
 # =============================================================================
 # CORRELATION ID HELPER
 # =============================================================================
+_correlation_id_getter = None
+
+
 def _get_correlation_id() -> str:
     """Get correlation ID from main module context, with fallback."""
-    try:
-        from .main import get_correlation_id
-        return get_correlation_id()
-    except ImportError:
+    global _correlation_id_getter
+    # Resolve main.get_correlation_id once; the import lookup used to run per log call
+    if _correlation_id_getter is None:
         try:
-            from backend.main import get_correlation_id
-            return get_correlation_id()
+            from .main import get_correlation_id
         except ImportError:
-            return "no-ctx"
+            try:
+                from backend.main import get_correlation_id
+            except ImportError:
+                return "no-ctx"
+        _correlation_id_getter = get_correlation_id
+    return _correlation_id_getter()
 
 
 # =============================================================================
@@ -110,6 +118,8 @@ if not security_logger.handlers:
         handler.setFormatter(logging.Formatter(
             '[SECURITY] %(asctime)s - %(levelname)s - [%(correlation_id)s] %(message)s'
         ))
+    # Write from a background thread so logging never blocks the event loop
+    handler = make_async_handler(handler)
     security_logger.addHandler(handler)
 
 
@@ -529,6 +539,8 @@ if not app_logger.handlers:
         handler.setFormatter(logging.Formatter(
             '[APP] %(asctime)s - %(levelname)s - [%(correlation_id)s] %(message)s'
         ))
+    # Write from a background thread so logging never blocks the event loop
+    handler = make_async_handler(handler)
     app_logger.addHandler(handler)
 
 
@@ -588,7 +600,13 @@ def log_app_event(
     Usage:
         log_app_event("context_load_failed", user_id=user_id, error=str(e))
         log_app_event("project_created", user_id=user_id, resource_id=project_id)
+
+    High-frequency INFO/DEBUG events are sampled and rate limited
+    (see log_pipeline.py); WARNING and ERROR are always logged.
     """
+    if not should_log_event(event, level):
+        return
+
     masked_user = mask_id(user_id) if user_id else None
     masked_resource = mask_id(resource_id) if resource_id else None
 
@@ -209,3 +209,27 @@ def capture_message(message: str, level: str = "info", **context):
         for key, value in context.items():
             scope.set_extra(key, value)
         sentry_sdk.capture_message(message, level=level)
+
+
+def record_span(op: str, description: str, start_timestamp: float, end_timestamp: float, **data):
+    """
+    Attach a finished span to the current Sentry transaction (if any).
+
+    Timestamps are epoch seconds. Used by tracing.py to forward council spans.
+    """
+    if not SENTRY_AVAILABLE or not SENTRY_DSN:
+        return
+
+    parent = sentry_sdk.get_current_span()
+    if parent is None:
+        return
+
+    from datetime import datetime, timezone
+    child = parent.start_child(
+        op=op,
+        description=description,
+        start_timestamp=datetime.fromtimestamp(start_timestamp, tz=timezone.utc),
+    )
+    for key, value in data.items():
+        child.set_data(key, value)
+    child.finish(end_timestamp=datetime.fromtimestamp(end_timestamp, tz=timezone.utc))
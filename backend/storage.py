@@ -1,10 +1,13 @@
 """Supabase-based storage for conversations."""
 
+import base64
+import json
 import logging
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 from .database import get_supabase, get_supabase_with_auth, get_supabase_service, with_retry_sync, DatabaseRetryError
-from .security import log_app_event, escape_sql_like_pattern, verify_user_company_access, log_security_event
+from .security import log_app_event, verify_user_company_access, log_security_event
+from .transcript_cache import record_message, record_fields, invalidate_transcript
 
 logger = logging.getLogger(__name__)
 
@@ -172,16 +175,23 @@ def create_conversation(conversation_id: str, user_id: str, access_token: Option
 def get_conversation(
     conversation_id: str,
     access_token: Optional[str] = None,
-    message_limit: int = 200
+    message_limit: int = 200,
+    include_stages: bool = True
 ) -> Optional[Dict[str, Any]]:
     """
     Load a conversation from storage.
 
+    Metadata, total message count and the most recent page of messages come
+    back in a single get_conversation_page RPC call.
+
     Args:
         conversation_id: Unique identifier for the conversation
         access_token: User's JWT access token for RLS authentication
         message_limit: Maximum number of messages to return (default 200, max 1000)
                       Set to 0 for unlimited (use with caution).
+        include_stages: Include full Stage 1/2 payloads on assistant messages.
+                        When False, assistant messages carry a small 'stage_summary'
+                        and 'stages_deferred' instead (see get_message_stages).
 
     Returns:
         Conversation dict or None if not found.
@@ -197,57 +207,43 @@ def get_conversation(
     def _fetch():
         supabase = _get_client(access_token)
 
-        # First get conversation metadata
-        conv_result = supabase.table('conversations').select('*').eq('id', conversation_id).execute()
+        page = supabase.rpc('get_conversation_page', {
+            'p_conversation_id': conversation_id,
+            'p_message_limit': message_limit,
+            'p_include_stages': include_stages,
+        }).execute()
 
-        if not conv_result.data:
+        if not page.data:
             return None
 
-        conv = conv_result.data[0]
-
-        # Get messages separately with limit and order
-        # This prevents unbounded queries on conversations with thousands of messages
-        messages_query = supabase.table('messages').select('*').eq(
-            'conversation_id', conversation_id
-        ).order('created_at', desc=False)  # Oldest first
-
-        if message_limit > 0:
-            # Get total count for pagination info
-            count_result = supabase.table('messages').select(
-                'id', count='exact'
-            ).eq('conversation_id', conversation_id).execute()
-            total_messages = count_result.count if hasattr(count_result, 'count') else len(count_result.data or [])
-
-            # For limit, we want the MOST RECENT messages, so order desc and take limit, then reverse
-            messages_result = supabase.table('messages').select('*').eq(
-                'conversation_id', conversation_id
-            ).order('created_at', desc=True).limit(message_limit).execute()
-
-            raw_messages = messages_result.data or []
-            # Reverse to get chronological order (oldest first)
-            raw_messages.reverse()
-            messages_truncated = total_messages > message_limit
-        else:
-            messages_result = messages_query.execute()
-            raw_messages = messages_result.data or []
-            total_messages = len(raw_messages)
-            messages_truncated = False
+        conv = page.data['conversation']
+        raw_messages = page.data.get('messages') or []
+        total_messages = page.data.get('message_count') or len(raw_messages)
+        messages_truncated = message_limit > 0 and total_messages > len(raw_messages)
 
         messages = []
         for msg in raw_messages:
             if msg['role'] == 'user':
-                messages.append({
+                message = {
+                    "id": msg.get('id'),
                     "role": "user",
                     "content": msg['content']
-                })
+                }
+                if msg.get('image_analysis'):
+                    message['image_analysis'] = msg['image_analysis']
+                messages.append(message)
             else:
                 # Assistant message
                 message = {
+                    "id": msg.get('id'),
                     "role": "assistant",
                     "stage1": msg.get('stage1') or [],
                     "stage2": msg.get('stage2') or [],
                     "stage3": msg.get('stage3') or {}
                 }
+                if not include_stages:
+                    message['stages_deferred'] = True
+                    message['stage_summary'] = msg.get('stage_summary') or {"stage1": [], "stage2": []}
                 if msg.get('label_to_model'):
                     message['label_to_model'] = msg['label_to_model']
                 if msg.get('aggregate_rankings'):
@@ -258,12 +254,14 @@ def get_conversation(
             "id": conv['id'],
             "created_at": conv['created_at'],
             "last_updated": conv['updated_at'],
-            "title": conv.get('title', 'New Conversation'),
+            "title": conv.get('title') or 'New Conversation',
             "archived": conv.get('archived', False),
             "messages": messages,
             "curator_history": conv.get('curator_history') or [],
             "user_id": conv.get('user_id'),
             "message_count": total_messages,
+            "history_summary": conv.get('history_summary'),
+            "history_summary_messages": conv.get('history_summary_messages') or 0,
         }
 
         # Only include truncation info if messages were limited
@@ -290,6 +288,53 @@ def get_conversation(
         raise  # Re-raise to trigger 500 error in router
 
 
+def _inserted_id(result) -> Optional[str]:
+    """Id of the first row returned by an insert, if any."""
+    rows = getattr(result, 'data', None)
+    if isinstance(rows, list) and rows and isinstance(rows[0], dict):
+        return rows[0].get('id')
+    return None
+
+
+def get_message_stages(
+    conversation_id: str,
+    message_id: str,
+    access_token: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the full Stage 1/2 payloads of one assistant message.
+
+    Companion to get_conversation(include_stages=False), which only returns
+    a stage summary for each message.
+
+    Args:
+        conversation_id: Conversation the message belongs to
+        message_id: Message identifier
+        access_token: User's JWT access token for RLS authentication
+
+    Returns:
+        Dict with id, stage1, stage2, label_to_model and aggregate_rankings,
+        or None if the message doesn't exist in this conversation.
+    """
+    supabase = _get_client(access_token)
+
+    result = supabase.table('messages').select(
+        'id, role, stage1, stage2, label_to_model, aggregate_rankings'
+    ).eq('id', message_id).eq('conversation_id', conversation_id).execute()
+
+    if not result.data or result.data[0].get('role') != 'assistant':
+        return None
+
+    msg = result.data[0]
+    return {
+        "id": msg['id'],
+        "stage1": msg.get('stage1') or [],
+        "stage2": msg.get('stage2') or [],
+        "label_to_model": msg.get('label_to_model') or {},
+        "aggregate_rankings": msg.get('aggregate_rankings') or [],
+    }
+
+
 def save_conversation(conversation: Dict[str, Any], access_token: Optional[str] = None):
     """
     Save a conversation to storage.
@@ -308,6 +353,63 @@ def save_conversation(conversation: Dict[str, Any], access_token: Optional[str]
         'curator_history': conversation.get('curator_history')
     }).eq('id', conversation['id']).execute()
 
+    invalidate_transcript(conversation['id'])
+
+
+# Keyset sort keys for the conversation list, all descending
+_LIST_SORT_KEYS = {
+    "date": ("is_starred", "last_message_at", "id"),
+    "activity": ("is_starred", "message_count", "last_message_at", "id"),
+}
+
+
+def encode_cursor(scope: str, values: List[Any]) -> str:
+    """Encode keyset values as an opaque, URL-safe pagination cursor."""
+    raw = json.dumps([scope, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, scope: str, size: int) -> List[Any]:
+    """
+    Decode a cursor from encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another scope
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_scope, values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if cursor_scope != scope or not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor does not match this query")
+    return values
+
+
+def encode_list_cursor(sort_by: str, conversation: Dict[str, Any]) -> str:
+    """Encode the sort-key values of the last listed conversation as a cursor."""
+    return encode_cursor(sort_by, [conversation[key] for key in _LIST_SORT_KEYS[sort_by]])
+
+
+def keyset_filter(keys: tuple, values: List[Any]) -> str:
+    """
+    PostgREST or-filter selecting rows after the cursor in (k1 DESC, k2 DESC, ...) order.
+
+    k1 < v1 OR (k1 = v1 AND (k2 < v2 OR (k2 = v2 AND ...)))
+    """
+    def _literal(value: Any) -> str:
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, (int, float)):
+            return str(value)
+        # Quote strings (timestamps contain ':' and '+')
+        return '"' + str(value).replace('"', '') + '"'
+
+    key, value = keys[0], _literal(values[0])
+    if len(keys) == 1:
+        return f"{key}.lt.{value}"
+    return f"{key}.lt.{value},and({key}.eq.{value},or({keyset_filter(keys[1:], values[1:])}))"
+
 
 def list_conversations(
     user_id: str,
@@ -317,30 +419,48 @@ def list_conversations(
     search: Optional[str] = None,
     include_archived: bool = False,
     sort_by: str = "date",
-    company_id: Optional[str] = None
+    company_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    department: Optional[str] = None,
+    starred: Optional[bool] = None
 ) -> Dict[str, Any]:
     """
     List conversations for a specific user with at least one message (metadata only).
 
+    Reads the denormalized message_count/last_message_at columns and paginates
+    with a keyset cursor, so pages are always full and ordered globally.
+
     Args:
         user_id: ID of the user to list conversations for
         access_token: User's JWT access token for RLS authentication
         limit: Maximum number of conversations to return (default 10)
-        offset: Number of conversations to skip for pagination
+        offset: Number of conversations to skip (legacy; ignored when cursor is given)
         search: Optional search string to filter by title
         include_archived: Whether to include archived conversations (default False)
-        sort_by: Sort order - "date" (most recent first) or "activity" (most messages first)
+        sort_by: Sort order - "date" (most recent message first) or "activity"
+                 (most messages first). Starred conversations come first in both.
         company_id: Optional company ID to filter conversations by
+        cursor: Opaque cursor from a previous page's 'next_cursor'
+        department: Optional department to filter conversations by
+        starred: Optional starred status to filter conversations by
 
     Returns:
-        Dict with 'conversations' list and 'has_more' boolean for pagination
+        Dict with 'conversations' list, 'has_more' boolean and 'next_cursor'
+        (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed or doesn't match sort_by
     """
+    if sort_by not in _LIST_SORT_KEYS:
+        sort_by = "date"
+    sort_keys = _LIST_SORT_KEYS[sort_by]
+    cursor_values = decode_cursor(cursor, sort_by, len(sort_keys)) if cursor else None
+
     supabase = _get_client(access_token)
 
-    # Build query - get conversations with message count
     query = supabase.table('conversations').select(
-        '*, messages(count)'
-    ).eq('user_id', user_id)
+        'id, created_at, updated_at, title, message_count, last_message_at, is_starred, is_archived, department'
+    ).eq('user_id', user_id).gt('message_count', 0)
 
     # Filter by company if provided
     if company_id:
@@ -350,65 +470,56 @@ def list_conversations(
     if not include_archived:
         query = query.eq('is_archived', False)
 
-    # Apply search filter if provided (case-insensitive title search)
+    # Department and starred filters run before the keyset so pages stay full
+    if department:
+        query = query.eq('department', department)
+    if starred is not None:
+        query = query.eq('is_starred', starred)
+
+    # Title search: prefix full-text match on the GIN-indexed search_vector
     if search:
-        escaped_search = escape_sql_like_pattern(search)
-        query = query.ilike('title', f'%{escaped_search}%')
+        from .search import prefix_tsquery
+        tsquery = prefix_tsquery(search)
+        if tsquery is None:
+            return {"conversations": [], "has_more": False, "next_cursor": None}
+        query = query.filter('search_vector', 'fts(simple)', tsquery)
 
-    # Order: starred first (descending so True comes first), then by updated_at (recent first)
-    # Note: For "activity" sort, we still need to re-sort non-starred by message count in Python
-    # since Supabase can't sort by aggregated count in the same query
-    query = query.order('is_starred', desc=True).order('updated_at', desc=True)
+    if cursor_values is not None:
+        query = query.or_(keyset_filter(sort_keys, cursor_values))
 
-    # Fetch limit + 1 to check if there are more (minimal over-fetch)
-    # We add a small buffer (+5) to account for potential 0-message conversations being filtered
-    query = query.range(offset, offset + limit + 5)
+    for key in sort_keys:
+        query = query.order(key, desc=True)
 
-    result = query.execute()
+    # Fetch limit + 1 to check if there are more
+    if cursor_values is None and offset > 0:
+        query = query.range(offset, offset + limit)
+    else:
+        query = query.limit(limit + 1)
 
-    conversations = []
-    for conv in result.data or []:
-        # Get message count from the joined data
-        messages_data = conv.get('messages', [])
-        message_count = messages_data[0].get('count', 0) if messages_data else 0
+    result = query.execute()
+    rows = result.data or []
 
-        # Skip conversations with 0 messages (but don't auto-delete - they might be in progress)
-        if message_count == 0:
-            continue
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-        conversations.append({
+    conversations = [
+        {
             "id": conv['id'],
             "created_at": conv['created_at'],
-            "last_updated": conv['updated_at'],
-            "title": conv.get('title', 'New Conversation'),
-            "message_count": message_count,
+            "last_updated": conv.get('last_message_at') or conv['updated_at'],
+            "title": conv.get('title') or 'New Conversation',
+            "message_count": conv.get('message_count', 0),
             "is_starred": conv.get('is_starred', False),
             "is_archived": conv.get('is_archived', False),
             "department": conv.get('department', 'standard')
-        })
-
-    # Only re-sort if using "activity" sort mode (by message count)
-    # For "date" mode, the DB ordering is already correct
-    if sort_by == "activity":
-        # Separate starred and non-starred
-        starred = [c for c in conversations if c['is_starred']]
-        non_starred = [c for c in conversations if not c['is_starred']]
-
-        # Starred stay sorted by date (already correct from DB)
-        # Non-starred sort by message count (most messages first), then by date
-        non_starred.sort(key=lambda c: (c['message_count'], c['last_updated']), reverse=True)
-
-        conversations = starred + non_starred
-
-    # Check if there are more conversations
-    has_more = len(conversations) > limit
-
-    # Apply limit
-    conversations = conversations[:limit]
+        }
+        for conv in rows
+    ]
 
     return {
         "conversations": conversations,
-        "has_more": has_more
+        "has_more": has_more,
+        "next_cursor": encode_list_cursor(sort_by, rows[-1]) if has_more else None
     }
 
 
@@ -468,13 +579,19 @@ def add_user_message(
         message_data['image_analysis'] = image_analysis
 
     # Insert message with user_id
-    supabase.table('messages').insert(message_data).execute()
+    result = supabase.table('messages').insert(message_data).execute()
 
     # Update conversation last_updated
     supabase.table('conversations').update({
         'updated_at': now
     }).eq('id', conversation_id).execute()
 
+    # Write through to the transcript cache (same shape as get_conversation)
+    message = {"id": _inserted_id(result), "role": "user", "content": content}
+    if image_analysis:
+        message['image_analysis'] = image_analysis
+    record_message(conversation_id, message, now)
+
 
 def add_assistant_message(
     conversation_id: str,
@@ -519,13 +636,26 @@ def add_assistant_message(
         message_data['aggregate_rankings'] = aggregate_rankings
 
     # Insert message
-    supabase.table('messages').insert(message_data).execute()
+    result = supabase.table('messages').insert(message_data).execute()
 
     # Update conversation last_updated
     supabase.table('conversations').update({
         'updated_at': now
     }).eq('id', conversation_id).execute()
 
+    message = {
+        "id": _inserted_id(result),
+        "role": "assistant",
+        "stage1": stage1 or [],
+        "stage2": stage2 or [],
+        "stage3": stage3 or {},
+    }
+    if label_to_model:
+        message['label_to_model'] = label_to_model
+    if aggregate_rankings:
+        message['aggregate_rankings'] = aggregate_rankings
+    record_message(conversation_id, message, now)
+
 
 def update_conversation_title(conversation_id: str, title: str, access_token: Optional[str] = None):
     """
@@ -544,6 +674,44 @@ def update_conversation_title(conversation_id: str, title: str, access_token: Op
         'updated_at': now
     }).eq('id', conversation_id).execute()
 
+    record_fields(conversation_id, title=title, last_updated=now)
+
+
+def update_conversation_history_summary(
+    conversation_id: str,
+    summary: str,
+    summarized_messages: int,
+    access_token: Optional[str] = None
+) -> bool:
+    """
+    Store the rolling history summary of a conversation.
+
+    Doesn't touch updated_at - the summary is background bookkeeping, not
+    user activity. The write only applies if the stored summary covers fewer
+    messages, so when updates race (e.g. on different workers) an older one
+    never replaces a newer one.
+
+    Args:
+        conversation_id: Conversation identifier
+        summary: Summary text covering the oldest summarized_messages messages
+        summarized_messages: Number of messages folded into the summary
+        access_token: User's JWT access token for RLS authentication
+
+    Returns:
+        True if the summary was stored, False if a newer one already was
+    """
+    supabase = _get_client(access_token)
+
+    result = supabase.table('conversations').update({
+        'history_summary': summary,
+        'history_summary_messages': summarized_messages,
+    }).eq('id', conversation_id).lt('history_summary_messages', summarized_messages).execute()
+    if not result.data:
+        return False
+
+    record_fields(conversation_id, history_summary=summary, history_summary_messages=summarized_messages)
+    return True
+
 
 def archive_conversation(conversation_id: str, archived: bool = True, access_token: Optional[str] = None):
     """
@@ -562,6 +730,8 @@ def archive_conversation(conversation_id: str, archived: bool = True, access_tok
         'updated_at': now
     }).eq('id', conversation_id).execute()
 
+    invalidate_transcript(conversation_id)
+
 
 def update_conversation_department(conversation_id: str, department: str, access_token: Optional[str] = None):
     """
@@ -605,6 +775,7 @@ def delete_conversation(conversation_id: str, access_token: Optional[str] = None
     # Delete conversation
     supabase.table('conversations').delete().eq('id', conversation_id).execute()
 
+    invalidate_transcript(conversation_id)
     return True
 
 
@@ -661,6 +832,9 @@ def bulk_delete_conversations(
     # Delete conversations - batch delete
     supabase.table('conversations').delete().in_('id', conversation_ids).execute()
 
+    for conversation_id in conversation_ids:
+        invalidate_transcript(conversation_id)
+
     return len(conversation_ids)
 
 
@@ -0,0 +1,605 @@
+"""
+Model performance telemetry store.
+
+Keeps fixed-memory rolling histograms per (model, stage) for:
+- Time to first token (ms)
+- Total latency (ms)
+- Output throughput (completion tokens per second)
+- Completion length (tokens), used by the pre-flight cost estimator
+
+plus request, error and truncation counters, so council membership and
+per-model timeouts can be tuned from real data instead of guesses.
+
+DESIGN:
+- Each series is a ring of TELEMETRY_WINDOW_SLOTS slots covering
+  TELEMETRY_WINDOW_SECONDS. A slot is reset lazily when its time bucket
+  comes around again, so old data ages out without a background sweeper.
+- Histograms use fixed bucket bounds, so memory per series is constant and
+  percentiles are estimated by interpolating within a bucket.
+- The number of series is capped (TELEMETRY_MAX_SERIES); new series beyond
+  the cap are dropped and counted rather than growing unbounded.
+- The stage is carried in a context variable (set by the council stages) so
+  the OpenRouter client can record without every call site threading it.
+
+Snapshots are periodically flushed to the model_telemetry_snapshots table by
+a background task started in the application lifespan.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .config import (
+        TELEMETRY_ENABLED,
+        TELEMETRY_WINDOW_SECONDS,
+        TELEMETRY_WINDOW_SLOTS,
+        TELEMETRY_MAX_SERIES,
+        TELEMETRY_FLUSH_INTERVAL,
+    )
+    from .security import log_app_event
+except ImportError:
+    from backend.config import (
+        TELEMETRY_ENABLED,
+        TELEMETRY_WINDOW_SECONDS,
+        TELEMETRY_WINDOW_SLOTS,
+        TELEMETRY_MAX_SERIES,
+        TELEMETRY_FLUSH_INTERVAL,
+    )
+    from backend.security import log_app_event
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# HISTOGRAM BUCKETS
+# =============================================================================
+# Upper bounds (inclusive). The final implicit bucket catches everything above.
+
+TTFT_MS_BUCKETS: Tuple[float, ...] = (
+    100, 250, 500, 1000, 2000, 3000, 5000, 8000, 13000, 20000, 30000, 60000,
+)
+LATENCY_MS_BUCKETS: Tuple[float, ...] = (
+    500, 1000, 2500, 5000, 10000, 20000, 30000, 45000, 60000, 90000, 120000, 180000,
+)
+TOKENS_PER_SEC_BUCKETS: Tuple[float, ...] = (
+    5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500,
+)
+COMPLETION_TOKENS_BUCKETS: Tuple[float, ...] = (
+    64, 128, 256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192, 16384,
+)
+
+HISTOGRAM_BUCKETS: Dict[str, Tuple[float, ...]] = {
+    "ttft_ms": TTFT_MS_BUCKETS,
+    "latency_ms": LATENCY_MS_BUCKETS,
+    "tokens_per_sec": TOKENS_PER_SEC_BUCKETS,
+    "completion_tokens": COMPLETION_TOKENS_BUCKETS,
+}
+
+DEFAULT_STAGE = "direct"
+
+
+# =============================================================================
+# STAGE CONTEXT
+# =============================================================================
+
+_telemetry_stage: contextvars.ContextVar[str] = contextvars.ContextVar(
+    'telemetry_stage', default=DEFAULT_STAGE
+)
+
+
+def set_telemetry_stage(stage: str) -> contextvars.Token:
+    """
+    Tag LLM calls made from the current context with a pipeline stage.
+
+    Tasks created after this call inherit the stage, so setting it before
+    spawning per-model tasks is enough.
+
+    Returns:
+        Token for reset_telemetry_stage()
+    """
+    return _telemetry_stage.set(stage)
+
+
+def reset_telemetry_stage(token: contextvars.Token) -> None:
+    """Restore the previous stage using the token from set_telemetry_stage."""
+    _telemetry_stage.reset(token)
+
+
+def telemetry_stage(stage: str):
+    """
+    Decorator tagging LLM calls made by a coroutine or async generator.
+
+    The stage is reset when the function returns, and for async generators it
+    is only set while the generator body runs, so it never leaks into the
+    caller between yields or into later calls in the same task. Tasks created
+    inside the function inherit it.
+    """
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(*args, **kwargs):
+                agen = func(*args, **kwargs)
+                try:
+                    while True:
+                        token = _telemetry_stage.set(stage)
+                        try:
+                            item = await agen.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            _telemetry_stage.reset(token)
+                        yield item
+                finally:
+                    await agen.aclose()
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _telemetry_stage.set(stage)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _telemetry_stage.reset(token)
+        return wrapper
+    return decorator
+
+
+def get_telemetry_stage() -> str:
+    """Get the stage tag for the current context."""
+    return _telemetry_stage.get()
+
+
+# =============================================================================
+# ROLLING HISTOGRAM
+# =============================================================================
+
+def estimate_percentile(bounds: Tuple[float, ...], counts: List[int], pct: float) -> Optional[float]:
+    """
+    Estimate a percentile from bucketed counts using linear interpolation.
+
+    Args:
+        bounds: Bucket upper bounds (len(counts) == len(bounds) + 1)
+        counts: Observation count per bucket
+        pct: Percentile in [0, 100]
+
+    Returns:
+        Estimated value, or None if there are no observations
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = max(1.0, pct / 100.0 * total)
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if count == 0:
+            continue
+        if cumulative + count >= rank:
+            lower = bounds[i - 1] if i > 0 else 0.0
+            if i >= len(bounds):
+                # Overflow bucket has no upper bound - report its floor
+                return float(lower)
+            upper = bounds[i]
+            fraction = (rank - cumulative) / count
+            return round(lower + (upper - lower) * fraction, 1)
+        cumulative += count
+    return float(bounds[-1])
+
+
+class _Slot:
+    """One time slice of a rolling series."""
+
+    __slots__ = ("epoch", "requests", "errors", "truncations", "histograms", "sums")
+
+    def __init__(self):
+        self.epoch = -1
+        self.requests = 0
+        self.errors = 0
+        self.truncations = 0
+        self.histograms = {name: [0] * (len(b) + 1) for name, b in HISTOGRAM_BUCKETS.items()}
+        self.sums = {name: 0.0 for name in HISTOGRAM_BUCKETS}
+
+    def reset(self, epoch: int) -> None:
+        self.epoch = epoch
+        self.requests = 0
+        self.errors = 0
+        self.truncations = 0
+        for counts in self.histograms.values():
+            for i in range(len(counts)):
+                counts[i] = 0
+        for name in self.sums:
+            self.sums[name] = 0.0
+
+
+class RollingSeries:
+    """
+    Fixed-memory rolling statistics for one (model, stage) pair.
+
+    Observations land in the slot for the current time bucket; reads merge
+    every slot still inside the window.
+    """
+
+    def __init__(self, window_seconds: int = TELEMETRY_WINDOW_SECONDS, slots: int = TELEMETRY_WINDOW_SLOTS):
+        self.window_seconds = window_seconds
+        self.num_slots = max(1, slots)
+        self.slot_seconds = max(1.0, window_seconds / self.num_slots)
+        self._slots = [_Slot() for _ in range(self.num_slots)]
+
+    def _current_slot(self, now: float) -> _Slot:
+        epoch = int(now // self.slot_seconds)
+        slot = self._slots[epoch % self.num_slots]
+        if slot.epoch != epoch:
+            slot.reset(epoch)
+        return slot
+
+    def _live_slots(self, now: float) -> List[_Slot]:
+        current = int(now // self.slot_seconds)
+        return [s for s in self._slots if s.epoch >= 0 and current - s.epoch < self.num_slots]
+
+    def record(
+        self,
+        now: float,
+        ttft_ms: Optional[float] = None,
+        latency_ms: Optional[float] = None,
+        tokens_per_sec: Optional[float] = None,
+        completion_tokens: Optional[int] = None,
+        error: bool = False,
+        truncated: bool = False,
+    ) -> None:
+        """Record a single request outcome."""
+        slot = self._current_slot(now)
+        slot.requests += 1
+        if error:
+            slot.errors += 1
+        if truncated:
+            slot.truncations += 1
+
+        for name, value in (
+            ("ttft_ms", ttft_ms),
+            ("latency_ms", latency_ms),
+            ("tokens_per_sec", tokens_per_sec),
+            ("completion_tokens", completion_tokens),
+        ):
+            if value is None:
+                continue
+            bounds = HISTOGRAM_BUCKETS[name]
+            slot.histograms[name][bisect.bisect_left(bounds, value)] += 1
+            slot.sums[name] += value
+
+    def summary(self, now: float, include_buckets: bool = False) -> Dict[str, Any]:
+        """
+        Merge live slots into a summary dict.
+
+        Args:
+            now: Current time (time.time())
+            include_buckets: Include raw bucket counts (for persistence)
+
+        Returns:
+            Dict with counters, rates and per-histogram p50/p90/p99/mean
+        """
+        live = self._live_slots(now)
+        requests = sum(s.requests for s in live)
+        errors = sum(s.errors for s in live)
+        truncations = sum(s.truncations for s in live)
+
+        result: Dict[str, Any] = {
+            "requests": requests,
+            "errors": errors,
+            "truncations": truncations,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "truncation_rate": round(truncations / requests, 4) if requests else 0.0,
+        }
+
+        for name, bounds in HISTOGRAM_BUCKETS.items():
+            counts = [0] * (len(bounds) + 1)
+            total = 0.0
+            for s in live:
+                for i, c in enumerate(s.histograms[name]):
+                    counts[i] += c
+                total += s.sums[name]
+            observations = sum(counts)
+            stats: Dict[str, Any] = {
+                "count": observations,
+                "mean": round(total / observations, 1) if observations else None,
+                "p50": estimate_percentile(bounds, counts, 50),
+                "p90": estimate_percentile(bounds, counts, 90),
+                "p99": estimate_percentile(bounds, counts, 99),
+            }
+            if include_buckets:
+                stats["buckets"] = counts
+            result[name] = stats
+
+        return result
+
+
+# =============================================================================
+# TELEMETRY STORE
+# =============================================================================
+
+class TelemetryStore:
+    """
+    Registry of rolling series keyed by (model, stage).
+
+    Recording is synchronous and guarded by a threading lock (held for a few
+    microseconds) so it can be called from both sync and async code paths.
+    """
+
+    def __init__(
+        self,
+        window_seconds: int = TELEMETRY_WINDOW_SECONDS,
+        slots: int = TELEMETRY_WINDOW_SLOTS,
+        max_series: int = TELEMETRY_MAX_SERIES,
+    ):
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, str], RollingSeries] = {}
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._last_flush: Optional[float] = None
+
+    def record(
+        self,
+        model: str,
+        stage: Optional[str] = None,
+        ttft_ms: Optional[float] = None,
+        latency_ms: Optional[float] = None,
+        completion_tokens: Optional[int] = None,
+        error: bool = False,
+        truncated: bool = False,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        Record one LLM request outcome.
+
+        Tokens/sec is derived from completion tokens over the generation time
+        (latency minus TTFT when available, so queueing isn't counted).
+
+        Args:
+            model: Model identifier
+            stage: Pipeline stage (defaults to the context stage)
+            ttft_ms: Time to first token in ms
+            latency_ms: Total request latency in ms
+            completion_tokens: Output tokens produced
+            error: Request failed
+            truncated: Response hit max_tokens
+            now: Override timestamp (tests)
+        """
+        if not TELEMETRY_ENABLED or not model:
+            return
+
+        stage = stage or get_telemetry_stage()
+        now = now if now is not None else time.time()
+
+        tokens_per_sec = None
+        if completion_tokens and latency_ms:
+            generation_ms = latency_ms - (ttft_ms or 0)
+            if generation_ms <= 0:
+                generation_ms = latency_ms
+            tokens_per_sec = completion_tokens / (generation_ms / 1000.0)
+
+        key = (model, stage)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    self._dropped += 1
+                    return
+                series = RollingSeries(self.window_seconds, self.slots)
+                self._series[key] = series
+            series.record(
+                now,
+                ttft_ms=ttft_ms,
+                latency_ms=latency_ms,
+                tokens_per_sec=tokens_per_sec,
+                completion_tokens=completion_tokens or None,
+                error=error,
+                truncated=truncated,
+            )
+
+    def record_usage(
+        self,
+        usage: Dict[str, Any],
+        stage: Optional[str] = None,
+        truncated: bool = False,
+    ) -> None:
+        """Record a successful request from an _extract_usage_data() dict."""
+        self.record(
+            usage.get("model", ""),
+            stage=stage,
+            ttft_ms=usage.get("time_to_first_token_ms"),
+            latency_ms=usage.get("total_latency_ms"),
+            completion_tokens=usage.get("completion_tokens"),
+            truncated=truncated,
+        )
+
+    def record_error(self, model: str, stage: Optional[str] = None, latency_ms: Optional[float] = None) -> None:
+        """Record a failed request."""
+        self.record(model, stage=stage, latency_ms=latency_ms, error=True)
+
+    def snapshot(
+        self,
+        model: Optional[str] = None,
+        stage: Optional[str] = None,
+        include_buckets: bool = False,
+        now: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Summaries for every series with data in the current window.
+
+        Args:
+            model: Optional model filter
+            stage: Optional stage filter
+            include_buckets: Include raw histogram bucket counts
+            now: Override timestamp (tests)
+
+        Returns:
+            List of summary dicts sorted by model, then stage
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            items = list(self._series.items())
+            results = []
+            for (series_model, series_stage), series in items:
+                if model and series_model != model:
+                    continue
+                if stage and series_stage != stage:
+                    continue
+                summary = series.summary(now, include_buckets=include_buckets)
+                if summary["requests"] == 0:
+                    continue
+                results.append({"model": series_model, "stage": series_stage, **summary})
+        results.sort(key=lambda r: (r["model"], r["stage"]))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Store-level stats for /health/metrics."""
+        with self._lock:
+            return {
+                "enabled": TELEMETRY_ENABLED,
+                "series": len(self._series),
+                "max_series": self.max_series,
+                "dropped_series": self._dropped,
+                "window_seconds": self.window_seconds,
+                "last_flush": (
+                    datetime.fromtimestamp(self._last_flush, timezone.utc).isoformat()
+                    if self._last_flush else None
+                ),
+            }
+
+    def clear(self) -> None:
+        """Drop all series (tests / admin reset)."""
+        with self._lock:
+            self._series.clear()
+            self._dropped = 0
+
+    def mark_flushed(self, when: Optional[float] = None) -> None:
+        """Record the time of the last successful flush."""
+        self._last_flush = when if when is not None else time.time()
+
+
+# Global singleton
+_telemetry_store = TelemetryStore()
+
+
+def get_telemetry_store() -> TelemetryStore:
+    """Get the global telemetry store."""
+    return _telemetry_store
+
+
+# =============================================================================
+# PERSISTENCE
+# =============================================================================
+
+def _build_snapshot_rows(snapshots: List[Dict[str, Any]], window_seconds: int) -> List[Dict[str, Any]]:
+    """Convert store snapshots into model_telemetry_snapshots rows."""
+    captured_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for snap in snapshots:
+        ttft = snap["ttft_ms"]
+        latency = snap["latency_ms"]
+        tps = snap["tokens_per_sec"]
+        rows.append({
+            "captured_at": captured_at,
+            "model": snap["model"],
+            "stage": snap["stage"],
+            "window_seconds": window_seconds,
+            "requests": snap["requests"],
+            "errors": snap["errors"],
+            "truncations": snap["truncations"],
+            "error_rate": snap["error_rate"],
+            "truncation_rate": snap["truncation_rate"],
+            "ttft_p50_ms": ttft["p50"],
+            "ttft_p90_ms": ttft["p90"],
+            "ttft_p99_ms": ttft["p99"],
+            "latency_p50_ms": latency["p50"],
+            "latency_p90_ms": latency["p90"],
+            "latency_p99_ms": latency["p99"],
+            "tokens_per_sec_p50": tps["p50"],
+            "tokens_per_sec_mean": tps["mean"],
+            "histograms": {
+                name: snap[name].get("buckets", []) for name in HISTOGRAM_BUCKETS
+            },
+        })
+    return rows
+
+
+async def flush_telemetry_snapshots() -> int:
+    """
+    Persist current window summaries to model_telemetry_snapshots.
+
+    Runs the (sync) Supabase insert in a worker thread so the event loop
+    isn't blocked.
+
+    Returns:
+        Number of rows written (0 if nothing to write or DB unavailable)
+    """
+    try:
+        from .database import get_supabase_service
+    except ImportError:
+        from backend.database import get_supabase_service
+
+    store = get_telemetry_store()
+    snapshots = store.snapshot(include_buckets=True)
+    if not snapshots:
+        return 0
+
+    client = get_supabase_service()
+    if not client:
+        return 0
+
+    rows = _build_snapshot_rows(snapshots, store.window_seconds)
+    try:
+        await asyncio.to_thread(
+            lambda: client.table("model_telemetry_snapshots").insert(rows).execute()
+        )
+        store.mark_flushed()
+        return len(rows)
+    except Exception as e:
+        log_app_event("TELEMETRY_FLUSH_FAILED", level="WARNING", error=str(e), rows=len(rows))
+        return 0
+
+
+_flush_task: Optional[asyncio.Task] = None
+
+
+async def _flush_loop(interval: int) -> None:
+    """Background loop that flushes snapshots every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_telemetry_snapshots()
+        except Exception as e:
+            logger.debug("Telemetry flush loop error: %s", e)
+
+
+def start_telemetry_flusher(interval: int = TELEMETRY_FLUSH_INTERVAL) -> Optional[asyncio.Task]:
+    """Start the periodic snapshot flush task (no-op if disabled or running)."""
+    global _flush_task
+    if not TELEMETRY_ENABLED or interval <= 0:
+        return None
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop(interval))
+    return _flush_task
+
+
+async def stop_telemetry_flusher(final_flush: bool = True) -> None:
+    """Stop the flush task, optionally writing one last snapshot."""
+    global _flush_task
+    if _flush_task is not None and not _flush_task.done():
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+    _flush_task = None
+    if final_flush and TELEMETRY_ENABLED:
+        await flush_telemetry_snapshots()
@@ -0,0 +1,5 @@
+"""
+Micro-benchmarks for council hot-path functions.
+
+Run with `python -m backend.tests.benchmarks` (see runner.py).
+"""
@@ -0,0 +1,271 @@
+"""
+Benchmark cases for council hot-path functions.
+
+Input sizes mirror production worst-normal cases: 50KB model responses,
+5 council models, 20-turn conversation histories. Inputs are generated
+deterministically so runs are comparable across commits.
+"""
+
+import itertools
+import random
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from .runner import benchmark
+
+COUNCIL_MODELS = [
+    "openai/gpt-5.1",
+    "anthropic/claude-opus-4.5",
+    "google/gemini-3-pro-preview",
+    "x-ai/grok-4",
+    "deepseek/deepseek-chat-v3-0324",
+]
+RESPONSE_BYTES = 50_000
+HISTORY_TURNS = 20
+
+_SENTENCES = [
+    "Revenue growth in the core segment slowed to 14% year over year while gross margin held at 71%.",
+    "The team should validate demand with a two-region pilot before committing to a national rollout.",
+    "Hiring two senior account executives adds roughly $380k in annual cost including ramp time.",
+    "Customer acquisition cost payback currently sits at 17 months, above the 12-month target.",
+    "A price increase of 8% on the Growth tier would likely churn fewer than 3% of accounts.",
+    "Integration complexity is the main delivery risk, particularly the legacy billing migration.",
+    "Cash runway is 22 months at current burn, or 15 months if the expansion plan is approved.",
+    "Competitors have matched the reporting feature, so differentiation now rests on onboarding speed.",
+]
+
+
+def _rng() -> random.Random:
+    return random.Random(42)
+
+
+def make_llm_response(size: int = RESPONSE_BYTES, rng: random.Random = None) -> str:
+    """Markdown-shaped advisory text of roughly `size` characters."""
+    rng = rng or _rng()
+    parts: List[str] = ["**Recommendation:** Run a focused pilot before expanding.\n"]
+    length = len(parts[0])
+    section = 0
+    while length < size:
+        section += 1
+        heading = f"\n## Consideration {section}\n\n"
+        paragraph = " ".join(rng.choice(_SENTENCES) for _ in range(5))
+        bullets = "".join(f"- {rng.choice(_SENTENCES)}\n" for _ in range(3))
+        block = f"{heading}{paragraph}\n\n{bullets}"
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[:size]
+
+
+def make_ranking_text(labels: List[str], rng: random.Random) -> str:
+    """Stage 2 evaluation ending in a FINAL RANKING section."""
+    evaluations = "\n\n".join(
+        f"Response {label} makes a reasonable case. " + " ".join(rng.choice(_SENTENCES) for _ in range(12))
+        for label in labels
+    )
+    order = labels[:]
+    rng.shuffle(order)
+    ranking = "\n".join(f"{i}. Response {label}" for i, label in enumerate(order, start=1))
+    return f"{evaluations}\n\nFINAL RANKING:\n{ranking}"
+
+
+def make_stage2(rng: random.Random = None) -> Dict[str, Any]:
+    rng = rng or _rng()
+    labels = [chr(ord("A") + i) for i in range(len(COUNCIL_MODELS))]
+    results = [{"model": model, "ranking": make_ranking_text(labels, rng)} for model in COUNCIL_MODELS]
+    label_to_model = {f"Response {label}": model for label, model in zip(labels, COUNCIL_MODELS)}
+    return {"results": results, "label_to_model": label_to_model}
+
+
+def make_conversation(turns: int = HISTORY_TURNS, rng: random.Random = None) -> Dict[str, Any]:
+    """A conversation with `turns` council exchanges (user + assistant each)."""
+    rng = rng or _rng()
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Follow-up {turn}: " + rng.choice(_SENTENCES)})
+        messages.append({
+            "role": "assistant",
+            "stage1": [
+                {"model": model, "response": make_llm_response(rng.randint(3_000, 8_000), rng)}
+                for model in COUNCIL_MODELS
+            ],
+            "stage2": [],
+            "stage3": {"model": COUNCIL_MODELS[0], "response": make_llm_response(6_000, rng)},
+        })
+    return {"id": "bench", "messages": messages}
+
+
+# =============================================================================
+# PROMPT SECURITY (context_loader.py)
+# =============================================================================
+
+@benchmark("context.sanitize_user_content[50KB]")
+def bench_sanitize_user_content():
+    from backend.context_loader import sanitize_user_content
+
+    content = make_llm_response()
+    return lambda: sanitize_user_content(content)
+
+
+@benchmark("context.wrap_user_query[4KB]")
+def bench_wrap_user_query():
+    from backend.context_loader import wrap_user_query
+
+    query = make_llm_response(4_000)
+    return lambda: wrap_user_query(query)
+
+
+@benchmark("context.detect_suspicious_query[4KB]")
+def bench_detect_suspicious_query():
+    from backend.context_loader import detect_suspicious_query
+
+    query = make_llm_response(4_000)
+    return lambda: detect_suspicious_query(query)
+
+
+@benchmark("context.validate_llm_output[50KB]")
+def bench_validate_llm_output():
+    from backend.context_loader import validate_llm_output
+
+    output = make_llm_response()
+    return lambda: validate_llm_output(output)
+
+
+# =============================================================================
+# RANKINGS (council.py)
+# =============================================================================
+
+@benchmark("council.parse_ranking_from_text[5 models]")
+def bench_parse_ranking():
+    from backend.council import parse_ranking_from_text
+
+    texts = [r["ranking"] for r in make_stage2()["results"]]
+
+    def run():
+        for text in texts:
+            parse_ranking_from_text(text)
+    return run
+
+
+@benchmark("council.calculate_aggregate_rankings[5 models]")
+def bench_aggregate_rankings():
+    from backend.council import calculate_aggregate_rankings
+
+    stage2 = make_stage2()
+    return lambda: calculate_aggregate_rankings(stage2["results"], stage2["label_to_model"])
+
+
+# =============================================================================
+# HISTORY (routers/conversations.py)
+# =============================================================================
+
+@benchmark("conversations.build_council_history[20 turns]")
+def bench_build_council_history():
+    from backend.routers.conversations import _build_council_conversation_history
+
+    conversation = make_conversation()
+    return lambda: _build_council_conversation_history(conversation)
+
+
+# =============================================================================
+# CACHES
+# =============================================================================
+
+@benchmark("cache.ttl_cache_set_get[1000 keys]")
+def bench_ttl_cache():
+    from backend.utils.cache import TTLCache
+
+    cache = TTLCache(default_ttl=300, max_size=1000, name="bench")
+    batches = itertools.count()
+
+    async def run():
+        # Once warm-up has filled the cache, every set evicts the LRU entry
+        # and every get reorders the access list
+        start = next(batches) * 100
+        keys = [f"key:{i}" for i in range(start, start + 100)]
+        for key in keys:
+            await cache.set(key, key)
+        for key in keys:
+            await cache.get(key)
+    return run
+
+
+@benchmark("cache.make_cache_key[20-turn messages]")
+def bench_make_cache_key():
+    from backend.cache import make_cache_key
+    from backend.routers.conversations import _build_council_conversation_history
+
+    messages = _build_council_conversation_history(make_conversation())
+    return lambda: make_cache_key("llm", "company-uuid", COUNCIL_MODELS[0], messages=messages)
+
+
+# =============================================================================
+# STREAMING (openrouter_stream.py)
+# =============================================================================
+
+@benchmark("stream.process_sse_stream[50KB]")
+def bench_process_sse_stream():
+    import json
+    import time
+    from backend.cassettes import Cassette, ReplayResponse, _NullBreaker
+    from backend.openrouter_stream import _process_sse_stream
+
+    # One SSE event per ~4-character token, grouped into network chunks
+    text = make_llm_response()
+    tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+    events = [
+        "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}) + "\n\n"
+        for token in tokens
+    ]
+    events.append("data: " + json.dumps({
+        "choices": [{"index": 0, "delta": {"content": ""}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 4000, "completion_tokens": len(tokens), "total_tokens": 4000 + len(tokens)},
+    }) + "\n\n")
+    events.append("data: [DONE]\n\n")
+    chunks = [(0.0, "".join(events[i:i + 3])) for i in range(0, len(events), 3)]
+    cassette = Cassette(model=COUNCIL_MODELS[0], chunks=chunks)
+    breaker = _NullBreaker()
+
+    async def run():
+        response = ReplayResponse(cassette, speed=0)
+        async for _ in _process_sse_stream(response, COUNCIL_MODELS[0], breaker, time.time(), 0, 0):
+            pass
+    return run
+
+
+# =============================================================================
+# CONTEXT BUILD (context_loader.py, DB mocked)
+# =============================================================================
+
+def _context_build(clear_cache: bool):
+    from backend import context_loader
+    from backend.utils.cache import company_cache
+
+    company_context = make_llm_response(20_000)
+    role_infos = [
+        {"id": f"role-{i}", "name": f"Role {i}", "system_prompt": make_llm_response(2_000)}
+        for i in range(2)
+    ]
+
+    async def run():
+        if clear_cache:
+            await company_cache.clear()
+        await context_loader.get_system_prompt_with_context(
+            company_uuid="00000000-0000-0000-0000-000000000001",
+            role_ids=["role-0", "role-1"],
+            max_tokens=8192,
+        )
+
+    with patch.object(context_loader, "load_company_context_from_db", lambda *a, **k: company_context), \
+         patch.object(context_loader, "load_role_prompts_batch", lambda *a, **k: role_infos):
+        yield run
+    company_cache._cache.clear()
+
+
+@benchmark("context.get_system_prompt_with_context[warm cache]")
+def bench_context_build_warm():
+    yield from _context_build(clear_cache=False)
+
+
+@benchmark("context.get_system_prompt_with_context[cold cache]")
+def bench_context_build_cold():
+    yield from _context_build(clear_cache=True)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark runner with in-repo baselines and regression gating.
+
+Each benchmark is a setup function registered with @benchmark(name) that
+builds its inputs and returns a zero-argument callable (sync or async) to
+time. Setups that need teardown (e.g. patches) yield the callable instead,
+pytest-fixture style. Timing follows timeit: calibrate the loop count so a round takes at
+least --min-time, run --rounds rounds with GC disabled, and report per-call
+min / median / mean. Comparisons use the median.
+
+Usage:
+    python -m backend.tests.benchmarks                    # run and print
+    python -m backend.tests.benchmarks --compare          # fail on regressions
+    python -m backend.tests.benchmarks --save-baseline    # refresh baseline.json
+    python -m backend.tests.benchmarks -k ranking         # name filter
+
+Options:
+    --threshold F   Allowed slowdown vs baseline before failing (default: 0.25)
+    --rounds N      Timing rounds per benchmark (default: 7)
+    --min-time S    Minimum seconds per round (default: 0.05)
+    --json PATH     Also write results to PATH
+
+Baselines are machine-specific: regenerate baseline.json on the machine
+(or CI runner class) that runs --compare.
+"""
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+MAX_LOOPS = 1_000_000
+
+# name -> setup function returning the callable to time
+_REGISTRY: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function under `name`."""
+    def decorator(setup: Callable[[], Callable[[], Any]]):
+        if name in _REGISTRY:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        _REGISTRY[name] = setup
+        return setup
+    return decorator
+
+
+def get_benchmarks(pattern: Optional[str] = None) -> Dict[str, Callable[[], Callable[[], Any]]]:
+    """Registered benchmarks, optionally filtered by substring."""
+    from . import cases  # noqa: F401 - registers benchmarks
+
+    return {name: setup for name, setup in sorted(_REGISTRY.items()) if not pattern or pattern in name}
+
+
+# =============================================================================
+# TIMING
+# =============================================================================
+
+def _time_sync(func: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+async def _time_async(func: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        await func()
+    return time.perf_counter() - start
+
+
+async def _measure(func: Callable[[], Any], rounds: int, min_time: float) -> Tuple[List[float], int]:
+    """Per-call seconds for each round, and the loop count used."""
+    is_async = inspect.iscoroutinefunction(func)
+
+    async def timed(loops: int) -> float:
+        return await _time_async(func, loops) if is_async else _time_sync(func, loops)
+
+    # Warm up (imports, caches, regex compilation) and calibrate
+    await timed(1)
+    loops = 1
+    while loops < MAX_LOOPS:
+        if await timed(loops) >= min_time:
+            break
+        loops *= 2
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            samples.append(await timed(loops) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples, loops
+
+
+def run_benchmark(setup: Callable[[], Callable[[], Any]], rounds: int = 7,
+                  min_time: float = 0.05) -> Dict[str, Any]:
+    """Run one benchmark; times are in microseconds per call."""
+    async def _run():
+        if inspect.isgeneratorfunction(setup):
+            fixture = setup()
+            try:
+                return await _measure(next(fixture), rounds, min_time)
+            finally:
+                # Resume past the yield to run teardown
+                next(fixture, None)
+        return await _measure(setup(), rounds, min_time)
+
+    samples, loops = asyncio.run(_run())
+    to_us = 1_000_000
+    return {
+        "median_us": round(statistics.median(samples) * to_us, 3),
+        "min_us": round(min(samples) * to_us, 3),
+        "mean_us": round(statistics.fmean(samples) * to_us, 3),
+        "stdev_us": round(statistics.pstdev(samples) * to_us, 3),
+        "loops": loops,
+        "rounds": rounds,
+    }
+
+
+def run_all(pattern: Optional[str] = None, rounds: int = 7, min_time: float = 0.05,
+            progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, setup in get_benchmarks(pattern).items():
+        results[name] = run_benchmark(setup, rounds=rounds, min_time=min_time)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+# =============================================================================
+# BASELINES
+# =============================================================================
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {"results": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, Any]], path: Path = BASELINE_PATH) -> None:
+    """Merge results into the baseline file (benchmarks not run are kept)."""
+    baseline = load_baseline(path)
+    baseline["environment"] = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    baseline["results"] = {**baseline.get("results", {}), **results}
+    baseline["results"] = dict(sorted(baseline["results"].items()))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare medians against the baseline.
+
+    Status per benchmark: "regressed" (slower than baseline * (1 + threshold)),
+    "improved" (faster than baseline / (1 + threshold)), "ok", or "new".
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            rows.append({"name": name, "current_us": current["median_us"], "status": "new"})
+            continue
+        ratio = current["median_us"] / base["median_us"] if base["median_us"] else 1.0
+        if ratio > 1 + threshold:
+            status = "regressed"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name,
+            "baseline_us": base["median_us"],
+            "current_us": current["median_us"],
+            "change": round(ratio - 1, 4),
+            "status": status,
+        })
+    return rows
+
+
+def _format_us(value: float) -> str:
+    if value >= 1000:
+        return f"{value / 1000:.2f} ms"
+    return f"{value:.1f} us"
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Council hot-path micro-benchmarks")
+    parser.add_argument("-k", dest="pattern", default=None, help="Only run benchmarks containing this string")
+    parser.add_argument("--compare", action="store_true", help="Compare with baseline.json; exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results into baseline.json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args(argv)
+
+    def progress(name: str, result: Dict[str, Any]) -> None:
+        print(f"{name:<52} {_format_us(result['median_us']):>12}  (min {_format_us(result['min_us'])}, "
+              f"{result['loops']} loops x {result['rounds']})")
+
+    results = run_all(args.pattern, rounds=args.rounds, min_time=args.min_time, progress=progress)
+    if not results:
+        print(f"No benchmarks match {args.pattern!r}")
+        sys.exit(1)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(results)
+        print(f"Baseline updated: {BASELINE_PATH}")
+
+    if args.compare:
+        rows = compare(results, load_baseline(), args.threshold)
+        print()
+        for row in rows:
+            if row["status"] == "new":
+                print(f"{row['name']:<52} {'new':>10}")
+            else:
+                print(f"{row['name']:<52} {row['change']:>+10.1%}  {row['status']}")
+        regressed = [row["name"] for row in rows if row["status"] == "regressed"]
+        if regressed:
+            print(f"\nFAIL: {len(regressed)} benchmark(s) regressed more than {args.threshold:.0%}: "
+                  f"{', '.join(regressed)}")
+            sys.exit(1)
+        print(f"\nOK: no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Council SSE load test.
+
+k6-config.js only covers simple GET endpoints. This drives N concurrent
+users through the full council flow:
+
+    POST /conversations                         create
+    POST /conversations/{id}/messages           council SSE (stages 1-3)
+    POST /conversations/{id}/chat/stream        follow-up SSE (chairman only)
+
+and reports, per session and aggregated:
+- time to first SSE event and to first token
+- per-stage latency (stageN_start -> stageN_complete)
+- TTFT per model and stage
+- SSE frames per second
+- HTTP / stream / per-model error rates
+
+Results are written as JSON and a self-contained HTML page.
+
+OFFLINE RUNS:
+--spawn-workers N starts `uvicorn backend.tests.load.offline_app:app
+--workers N` (auth/storage/billing replaced in-process, see offline_app.py)
+and points it at either MOCK_LLM (--llm mock) or a running
+fake_openrouter.py (--llm upstream), so capacity can be compared across
+worker counts without Supabase or OpenRouter.
+
+Usage:
+    # Self-contained: 2 workers, mock LLM, 20 users
+    python -m backend.tests.load.council_load --spawn-workers 2 --users 20
+
+    # Real HTTP/SSE upstream path via the stand-in
+    python -m backend.tests.load.fake_openrouter --port 8090 &
+    python -m backend.tests.load.council_load --spawn-workers 4 --llm upstream --users 50
+
+    # Against a running backend (real auth: pass a JWT)
+    python -m backend.tests.load.council_load --base-url http://localhost:8081 --token $API_TOKEN
+
+Options:
+    --users N           Concurrent users (default: 10)
+    --sessions N        Council sessions per user (default: 1)
+    --followups N       Follow-up chat messages per session (default: 1)
+    --ramp-up SECONDS   Spread user start times over this window (default: 5)
+    --think-time SECS   Pause between a user's requests (default: 1)
+    --mock-latency P    Mock profile: zero (default), realistic, stress, default
+    --output PATH       Report path without extension (default: council-load-report)
+    --max-error-rate F  Exit 1 if the session error rate exceeds F
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_QUESTION = (
+    "We're a 40-person B2B SaaS company at $4M ARR. Should we expand into Spain "
+    "this year or double down on the UK? Consider hiring, pricing and cash runway."
+)
+DEFAULT_FOLLOWUP = "What would the first 90 days of the pilot look like?"
+
+STAGES = ("stage1", "stage2", "stage3")
+
+
+@dataclass
+class SessionResult:
+    """Measurements for one user session (council message + follow-ups)."""
+
+    user: int
+    ok: bool = True
+    error: Optional[str] = None
+    create_ms: Optional[float] = None
+    first_event_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    council_ms: Optional[float] = None
+    stage_ms: Dict[str, float] = field(default_factory=dict)
+    ttft_ms: Dict[str, float] = field(default_factory=dict)
+    frames: int = 0
+    stream_seconds: float = 0.0
+    error_events: int = 0
+    model_errors: Counter = field(default_factory=Counter)
+    followup_first_token_ms: List[float] = field(default_factory=list)
+    followup_ms: List[float] = field(default_factory=list)
+
+
+# =============================================================================
+# SSE CLIENT
+# =============================================================================
+
+async def iter_sse_events(response: httpx.Response) -> AsyncGenerator[Dict[str, Any], None]:
+    """Parse `data: {...}` lines into dicts (comments and bad JSON are skipped)."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data: "):
+            continue
+        try:
+            yield json.loads(line[6:])
+        except json.JSONDecodeError:
+            continue
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+async def run_council_message(client: httpx.AsyncClient, conversation_id: str,
+                              question: str, result: SessionResult) -> None:
+    """Stream one council message and record stage/model timings into result."""
+    start = time.perf_counter()
+    stage_started: Dict[str, float] = {}
+
+    async with client.stream("POST", f"/api/v1/conversations/{conversation_id}/messages",
+                             json={"content": question}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(f"messages HTTP {response.status_code}")
+
+        async for event in iter_sse_events(response):
+            now_ms = _elapsed_ms(start)
+            event_type = event.get("type", "")
+            result.frames += 1
+            if result.first_event_ms is None:
+                result.first_event_ms = now_ms
+
+            stage = event_type.split("_", 1)[0]
+            if event_type.endswith("_start") and stage in STAGES:
+                stage_started[stage] = now_ms
+            elif event_type.endswith("_complete") and event_type == f"{stage}_complete":
+                if stage in stage_started:
+                    result.stage_ms[stage] = now_ms - stage_started[stage]
+            elif event_type.endswith("_token") and stage in STAGES:
+                if result.first_token_ms is None:
+                    result.first_token_ms = now_ms
+                key = f"{stage}:{event.get('model', 'unknown')}"
+                if key not in result.ttft_ms:
+                    result.ttft_ms[key] = now_ms - stage_started.get(stage, 0.0)
+            elif event_type.endswith("_model_error") or event_type == "stage3_error":
+                result.model_errors[f"{stage}:{event.get('model', 'unknown')}"] += 1
+            elif event_type == "error":
+                result.error_events += 1
+                raise RuntimeError(f"stream error: {event.get('message', '')[:80]}")
+
+    result.council_ms = _elapsed_ms(start)
+    result.stream_seconds += result.council_ms / 1000
+    if "stage3" not in result.stage_ms:
+        raise RuntimeError("stream ended before stage3_complete")
+
+
+async def run_followup(client: httpx.AsyncClient, conversation_id: str,
+                       question: str, result: SessionResult) -> None:
+    """Stream one follow-up chat message."""
+    start = time.perf_counter()
+    first_token = None
+    completed = False
+
+    async with client.stream("POST", f"/api/v1/conversations/{conversation_id}/chat/stream",
+                             json={"content": question}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(f"chat/stream HTTP {response.status_code}")
+
+        async for event in iter_sse_events(response):
+            result.frames += 1
+            event_type = event.get("type", "")
+            if event_type == "chat_token" and first_token is None:
+                first_token = _elapsed_ms(start)
+            elif event_type == "chat_complete":
+                completed = True
+            elif event_type in ("chat_error", "error"):
+                result.error_events += 1
+                raise RuntimeError(f"chat error: {str(event.get('message', ''))[:80]}")
+
+    elapsed = _elapsed_ms(start)
+    result.stream_seconds += elapsed / 1000
+    result.followup_ms.append(elapsed)
+    if first_token is not None:
+        result.followup_first_token_ms.append(first_token)
+    if not completed:
+        raise RuntimeError("chat stream ended before chat_complete")
+
+
+async def run_session(client: httpx.AsyncClient, user: int, args: argparse.Namespace) -> SessionResult:
+    """create conversation -> council message -> follow-ups."""
+    result = SessionResult(user=user)
+    try:
+        start = time.perf_counter()
+        response = await client.post("/api/v1/conversations", json={})
+        result.create_ms = _elapsed_ms(start)
+        if response.status_code != 200:
+            raise RuntimeError(f"create HTTP {response.status_code}")
+        conversation_id = response.json()["id"]
+
+        await run_council_message(client, conversation_id, args.question, result)
+        for _ in range(args.followups):
+            await asyncio.sleep(args.think_time)
+            await run_followup(client, conversation_id, args.followup, result)
+    except (httpx.HTTPError, RuntimeError, KeyError, ValueError) as e:
+        result.ok = False
+        result.error = f"{type(e).__name__}: {e}" if not isinstance(e, RuntimeError) else str(e)
+    return result
+
+
+async def run_user(user: int, args: argparse.Namespace, start_delay: float) -> List[SessionResult]:
+    await asyncio.sleep(start_delay)
+    token = args.token or f"loadtest-user-{user}"
+    headers = {"Authorization": f"Bearer {token}"}
+    results = []
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers,
+                                 timeout=httpx.Timeout(args.timeout, connect=10.0)) as client:
+        for session in range(args.sessions):
+            if session:
+                await asyncio.sleep(args.think_time)
+            results.append(await run_session(client, user, args))
+    return results
+
+
+async def run_load(args: argparse.Namespace) -> Tuple[List[SessionResult], float]:
+    """Run all users concurrently; returns results and wall-clock seconds."""
+    step = args.ramp_up / args.users if args.users > 1 else 0.0
+    start = time.perf_counter()
+    per_user = await asyncio.gather(*(run_user(i, args, i * step) for i in range(args.users)))
+    return [r for results in per_user for r in results], time.perf_counter() - start
+
+
+# =============================================================================
+# REPORT
+# =============================================================================
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    """count/mean/p50/p90/p95/p99/max (nearest rank), rounded to 0.1."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "p50": round(rank(50), 1),
+        "p90": round(rank(90), 1),
+        "p95": round(rank(95), 1),
+        "p99": round(rank(99), 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+def build_report(results: List[SessionResult], wall_seconds: float, config: Dict[str, Any],
+                 upstream_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    succeeded = [r for r in results if r.ok]
+    errors = Counter((r.error or "").split(":")[0] for r in results if not r.ok)
+    model_errors: Counter = Counter()
+    ttft: Dict[str, List[float]] = defaultdict(list)
+    for r in results:
+        model_errors.update(r.model_errors)
+        for key, value in r.ttft_ms.items():
+            ttft[key].append(value)
+
+    latency = {
+        "create_conversation": percentiles([r.create_ms for r in results if r.create_ms is not None]),
+        "time_to_first_event": percentiles([r.first_event_ms for r in results if r.first_event_ms is not None]),
+        "time_to_first_token": percentiles([r.first_token_ms for r in results if r.first_token_ms is not None]),
+        "council_total": percentiles([r.council_ms for r in succeeded if r.council_ms is not None]),
+        "followup_first_token": percentiles([v for r in results for v in r.followup_first_token_ms]),
+        "followup_total": percentiles([v for r in results for v in r.followup_ms]),
+    }
+    for stage in STAGES:
+        latency[stage] = percentiles([r.stage_ms[stage] for r in results if stage in r.stage_ms])
+
+    total = len(results)
+    return {
+        "config": config,
+        "summary": {
+            "sessions": total,
+            "succeeded": len(succeeded),
+            "failed": total - len(succeeded),
+            "error_rate": round((total - len(succeeded)) / total, 4) if total else 0.0,
+            "wall_seconds": round(wall_seconds, 1),
+            "sessions_per_minute": round(len(succeeded) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+            "frames": sum(r.frames for r in results),
+        },
+        "latency_ms": latency,
+        "ttft_ms_by_model": {key: percentiles(values) for key, values in sorted(ttft.items())},
+        "frames_per_second": percentiles([
+            r.frames / r.stream_seconds for r in results if r.stream_seconds > 0
+        ]),
+        "errors": dict(errors.most_common()),
+        "model_errors": dict(model_errors.most_common()),
+        "upstream": upstream_stats,
+    }
+
+
+def _table(title: str, rows: Dict[str, Dict[str, Any]]) -> str:
+    columns = ("count", "mean", "p50", "p90", "p95", "p99", "max")
+    head = "".join(f"<th>{c}</th>" for c in ("", *columns))
+    body = "".join(
+        "<tr><td>{}</td>{}</tr>".format(
+            html.escape(name), "".join(f"<td>{stats.get(c, '')}</td>" for c in columns)
+        )
+        for name, stats in rows.items()
+    )
+    return f"<h2>{html.escape(title)}</h2><table><tr>{head}</tr>{body}</table>"
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    summary = "".join(
+        f"<tr><th>{html.escape(k)}</th><td>{html.escape(str(v))}</td></tr>"
+        for k, v in {**report["config"], **report["summary"]}.items()
+    )
+    errors = "".join(
+        f"<tr><td>{html.escape(k)}</td><td>{v}</td></tr>"
+        for k, v in {**report["errors"], **report["model_errors"]}.items()
+    ) or "<tr><td>none</td><td></td></tr>"
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Council load test</title>
+<style>
+body {{ font-family: system-ui, sans-serif; margin: 2rem; color: #1f2937; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+th, td {{ border: 1px solid #d1d5db; padding: 4px 10px; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+</style></head><body>
+<h1>Council load test</h1>
+<table>{summary}</table>
+{_table("Latency (ms)", report["latency_ms"])}
+{_table("TTFT by stage:model (ms)", report["ttft_ms_by_model"])}
+{_table("SSE frames per second (per session)", {"frames/s": report["frames_per_second"]})}
+<h2>Errors</h2><table>{errors}</table>
+</body></html>
+"""
+
+
+def write_report(report: Dict[str, Any], output: str) -> Tuple[str, str]:
+    json_path, html_path = f"{output}.json", f"{output}.html"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(render_html(report))
+    return json_path, html_path
+
+
+# =============================================================================
+# OFFLINE SERVER
+# =============================================================================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_for_server(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health/live")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"backend at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def spawn_backend(workers: int, llm: str, upstream_url: str,
+                  mock_latency: str = "zero") -> Tuple[subprocess.Popen, str]:
+    """Start offline_app under uvicorn; returns the process and its base URL."""
+    port = _free_port()
+    env = dict(os.environ)
+    if llm == "mock":
+        env["MOCK_LLM"] = "true"
+        env["MOCK_LLM_LATENCY"] = mock_latency
+        # Same per-model timings as the upstream stand-in for unrecorded models
+        env.setdefault("MOCK_LLM_PROFILES", os.path.join(os.path.dirname(__file__), "openrouter_profiles.json"))
+    else:
+        env["MOCK_LLM"] = "false"
+        env["OPENROUTER_API_URL"] = upstream_url
+        env.setdefault("OPENROUTER_API_KEY", "loadtest")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.tests.load.offline_app:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop_backend(process: subprocess.Popen) -> None:
+    """SIGTERM, then SIGKILL if background tasks hold up graceful shutdown."""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=10)
+
+
+async def fetch_upstream_stats(upstream_url: str) -> Optional[Dict[str, Any]]:
+    """Read /_stats from fake_openrouter (None if it isn't reachable)."""
+    base = upstream_url.rsplit("/chat/completions", 1)[0].replace("/api/v1", "")
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(f"{base}/_stats")
+            return response.json() if response.status_code == 200 else None
+    except httpx.HTTPError:
+        return None
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Council SSE load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8081")
+    parser.add_argument("--token", default=None, help="Bearer token for every user (default: per-user offline tokens)")
+    parser.add_argument("--spawn-workers", type=int, default=0, help="Start offline_app with N uvicorn workers")
+    parser.add_argument("--llm", choices=("mock", "upstream"), default="mock")
+    parser.add_argument("--mock-latency", choices=("default", "zero", "realistic", "stress"), default="zero",
+                        help="MOCK_LLM_LATENCY profile for spawned mock backends")
+    parser.add_argument("--upstream-url", default="http://127.0.0.1:8090/chat/completions")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--followups", type=int, default=1)
+    parser.add_argument("--ramp-up", type=float, default=5.0)
+    parser.add_argument("--think-time", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request read timeout (seconds)")
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    parser.add_argument("--followup", default=DEFAULT_FOLLOWUP)
+    parser.add_argument("--output", default="council-load-report")
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    return parser.parse_args(argv)
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    process = None
+    if args.spawn_workers:
+        process, args.base_url = spawn_backend(args.spawn_workers, args.llm, args.upstream_url, args.mock_latency)
+    try:
+        await _wait_for_server(args.base_url, timeout=60.0)
+        print(f"Running {args.users} users x {args.sessions} sessions against {args.base_url} ...")
+        results, wall_seconds = await run_load(args)
+    finally:
+        if process is not None:
+            stop_backend(process)
+
+    config = {
+        "base_url": args.base_url,
+        "workers": args.spawn_workers or "external",
+        "llm": args.llm,
+        "mock_latency": args.mock_latency if args.llm == "mock" else None,
+        "users": args.users,
+        "sessions_per_user": args.sessions,
+        "followups_per_session": args.followups,
+        "ramp_up_seconds": args.ramp_up,
+        "think_time_seconds": args.think_time,
+    }
+    upstream = await fetch_upstream_stats(args.upstream_url) if args.llm == "upstream" else None
+    report = build_report(results, wall_seconds, config, upstream)
+    json_path, html_path = write_report(report, args.output)
+
+    summary = report["summary"]
+    council = report["latency_ms"]["council_total"]
+    print(f"{summary['succeeded']}/{summary['sessions']} sessions ok, "
+          f"error rate {summary['error_rate']:.2%}, council p50 {council.get('p50')}ms "
+          f"p95 {council.get('p95')}ms, {summary['sessions_per_minute']} sessions/min")
+    print(f"Report: {json_path}, {html_path}")
+
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        print(f"FAIL: error rate {summary['error_rate']:.2%} > {args.max_error_rate:.2%}")
+        return 1
+    return 0
+
+
+def main():
+    sys.exit(asyncio.run(main_async(parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Local OpenRouter stand-in for load tests.
+
+Implements the endpoints the backend calls upstream so the real httpx /
+HTTP2 / SSE client path (connection pool, circuit breakers, retries) can be
+load tested offline without spending credits:
+
+- POST /chat/completions   streaming (SSE) and non-streaming
+                           (openrouter.py, image_analyzer.py)
+- POST /embeddings         (vector_store.py)
+- GET  /_stats             request counts per model/outcome, peak concurrency
+- POST /_reset             clear stats
+
+Behaviour per model comes from a JSON profile file (default:
+openrouter_profiles.json next to this file). Model entries are matched
+exactly first, then as glob patterns ("anthropic/*"), and are merged over
+"default". Profile keys:
+
+    ttft_ms              {"p50", "p95"} - log-normal time to first token
+    tokens_per_second    streaming rate after the first token
+    output_tokens        {"min", "max"} - response length (capped by max_tokens)
+    error_rate           fraction answered with one of error_statuses
+    rate_limit_rate      fraction answered 429 with Retry-After
+    truncation_rate      fraction cut short with finish_reason "length"
+    midstream_error_rate fraction that send an SSE error event mid-stream
+    stall_rate           fraction that stop sending for stall_seconds
+    embedding_latency_ms {"p50", "p95"}
+    embedding_dimensions vector size when the request doesn't set one
+
+Usage:
+    python -m backend.tests.load.fake_openrouter --port 8090
+    OPENROUTER_API_URL=http://localhost:8090/chat/completions python -m backend.main
+
+Options:
+    --config PATH    Profile file (default: openrouter_profiles.json)
+    --host HOST      Bind address (default: 127.0.0.1)
+    --port PORT      Port (default: 8090)
+    --seed N         Seed the RNG for reproducible runs
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent / "openrouter_profiles.json"
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "ttft_ms": {"p50": 900, "p95": 2500},
+    "tokens_per_second": 60,
+    "output_tokens": {"min": 250, "max": 700},
+    "prompt_tokens_per_char": 0.25,
+    "error_rate": 0.0,
+    "error_statuses": [500, 502, 503],
+    "rate_limit_rate": 0.0,
+    "retry_after_seconds": 2,
+    "truncation_rate": 0.0,
+    "midstream_error_rate": 0.0,
+    "stall_rate": 0.0,
+    "stall_seconds": 30,
+    "embedding_latency_ms": {"p50": 120, "p95": 400},
+    "embedding_dimensions": 1536,
+}
+
+# Word list for generated completions; leading spaces mimic BPE tokens
+_WORDS = (
+    "the council recommends a phased approach that balances cost risk and speed "
+    "start with a pilot measure retention and expand once unit economics are proven "
+    "key risks include pricing pressure hiring delays and integration complexity "
+    "## Rationale **Recommendation:** - customers revenue margin team roadmap"
+).split()
+
+# z-score of the 95th percentile of a standard normal
+_Z95 = 1.6449
+
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Load a profile file; missing keys fall back to DEFAULT_PROFILE."""
+    with open(path or DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.setdefault("models", {})
+    config["default"] = {**DEFAULT_PROFILE, **config.get("default", {})}
+    return config
+
+
+def resolve_profile(config: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Default profile merged with the exact or first glob-matching model entry."""
+    models = config.get("models", {})
+    override = models.get(model)
+    if override is None:
+        override = next(
+            (entry for pattern, entry in models.items() if fnmatch.fnmatchcase(model, pattern)),
+            {},
+        )
+    return {**config["default"], **override}
+
+
+def sample_latency_ms(rng: random.Random, spec: Dict[str, float]) -> float:
+    """Log-normal sample with the given median (p50) and 95th percentile."""
+    p50 = max(float(spec.get("p50", 0)), 0.0)
+    p95 = max(float(spec.get("p95", p50)), p50)
+    if p50 <= 0:
+        return 0.0
+    sigma = math.log(p95 / p50) / _Z95 if p95 > p50 else 0.0
+    return rng.lognormvariate(math.log(p50), sigma)
+
+
+def _estimate_prompt_tokens(messages: List[Dict[str, Any]], per_char: float) -> int:
+    chars = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            # Multimodal content: count text parts only
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        chars += len(str(content))
+    return max(1, int(chars * per_char))
+
+
+def _error_body(status: int, message: str) -> Dict[str, Any]:
+    return {"error": {"code": status, "message": message}}
+
+
+class FakeOpenRouter:
+    """Request handling and stats for one server instance."""
+
+    def __init__(self, config: Dict[str, Any], seed: Optional[int] = None):
+        self.config = config
+        seed = seed if seed is not None else config.get("seed")
+        self.rng = random.Random(seed)
+        self.stats: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.started_at = time.time()
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _count(self, model: str, outcome: str) -> None:
+        self.stats[f"{model}|{outcome}"] += 1
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self) -> None:
+        self.in_flight -= 1
+
+    def _pick_failure(self, profile: Dict[str, Any]) -> Optional[JSONResponse]:
+        """Up-front 429/5xx responses, decided before any latency."""
+        roll = self.rng.random()
+        if roll < profile["rate_limit_rate"]:
+            return JSONResponse(
+                _error_body(429, "Rate limit exceeded"),
+                status_code=429,
+                headers={"Retry-After": str(profile["retry_after_seconds"])},
+            )
+        if roll < profile["rate_limit_rate"] + profile["error_rate"]:
+            status = self.rng.choice(profile["error_statuses"])
+            return JSONResponse(_error_body(status, "Provider returned error"), status_code=status)
+        return None
+
+    def _plan(self, profile: Dict[str, Any], max_tokens: Optional[int]) -> Dict[str, Any]:
+        """Decide length, finish reason and mid-stream behaviour for one completion."""
+        length_spec = profile["output_tokens"]
+        tokens = self.rng.randint(int(length_spec["min"]), int(length_spec["max"]))
+        finish_reason = "stop"
+        if max_tokens and tokens >= max_tokens:
+            tokens, finish_reason = max_tokens, "length"
+        elif self.rng.random() < profile["truncation_rate"]:
+            finish_reason = "length"
+
+        stall_at = midstream_error_at = None
+        if self.rng.random() < profile["stall_rate"]:
+            stall_at = self.rng.randint(0, max(tokens - 1, 0))
+        if self.rng.random() < profile["midstream_error_rate"]:
+            midstream_error_at = self.rng.randint(1, max(tokens - 1, 1))
+
+        return {
+            "tokens": tokens,
+            "finish_reason": finish_reason,
+            "ttft": sample_latency_ms(self.rng, profile["ttft_ms"]) / 1000,
+            "interval": 1.0 / max(float(profile["tokens_per_second"]), 0.001),
+            "stall_at": stall_at,
+            "stall_seconds": float(profile["stall_seconds"]),
+            "midstream_error_at": midstream_error_at,
+        }
+
+    def _token(self, index: int) -> str:
+        word = self.rng.choice(_WORDS)
+        return word if index == 0 else f" {word}"
+
+    # -------------------------------------------------------------------------
+    # Chat completions
+    # -------------------------------------------------------------------------
+
+    async def chat_completions(self, body: Dict[str, Any]) -> Any:
+        model = body.get("model", "unknown")
+        profile = resolve_profile(self.config, model)
+
+        failure = self._pick_failure(profile)
+        if failure is not None:
+            self._count(model, str(failure.status_code))
+            return failure
+
+        plan = self._plan(profile, body.get("max_tokens"))
+        prompt_tokens = _estimate_prompt_tokens(body.get("messages", []), profile["prompt_tokens_per_char"])
+        completion_id = f"gen-{uuid.uuid4().hex[:24]}"
+
+        if body.get("stream"):
+            return StreamingResponse(
+                self._stream(model, completion_id, prompt_tokens, plan),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+
+        self._enter()
+        try:
+            await asyncio.sleep(plan["ttft"] + plan["tokens"] * plan["interval"])
+        finally:
+            self._exit()
+        content = "".join(self._token(i) for i in range(plan["tokens"]))
+        self._count(model, plan["finish_reason"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": plan["finish_reason"],
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": plan["tokens"],
+                "total_tokens": prompt_tokens + plan["tokens"],
+            },
+        }
+
+    def _chunk(self, completion_id: str, model: str, delta: Dict[str, Any],
+               finish_reason: Optional[str] = None, usage: Optional[Dict[str, int]] = None) -> str:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            data["usage"] = usage
+        return f"data: {json.dumps(data)}\n\n"
+
+    async def _stream(self, model: str, completion_id: str, prompt_tokens: int,
+                      plan: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        self._enter()
+        outcome = "disconnected"
+        try:
+            # OpenRouter sends keep-alive comments while the provider is thinking
+            yield ": OPENROUTER PROCESSING\n\n"
+            await asyncio.sleep(plan["ttft"])
+
+            for i in range(plan["tokens"]):
+                if i == plan["stall_at"]:
+                    await asyncio.sleep(plan["stall_seconds"])
+                if i == plan["midstream_error_at"]:
+                    outcome = "midstream_error"
+                    yield f"data: {json.dumps(_error_body(502, 'Provider disconnected'))}\n\n"
+                    return
+                if i:
+                    await asyncio.sleep(plan["interval"])
+                delta = {"content": self._token(i)}
+                if i == 0:
+                    delta["role"] = "assistant"
+                yield self._chunk(completion_id, model, delta)
+
+            # Like OpenRouter, usage rides on the final chunk with the finish reason
+            yield self._chunk(completion_id, model, {"content": ""}, plan["finish_reason"], usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": plan["tokens"],
+                "total_tokens": prompt_tokens + plan["tokens"],
+            })
+            yield "data: [DONE]\n\n"
+            outcome = plan["finish_reason"]
+        finally:
+            # Runs on client disconnect too (generator is closed)
+            self._exit()
+            self._count(model, outcome)
+
+    # -------------------------------------------------------------------------
+    # Embeddings
+    # -------------------------------------------------------------------------
+
+    async def embeddings(self, body: Dict[str, Any]) -> Any:
+        model = body.get("model", "unknown")
+        profile = resolve_profile(self.config, model)
+
+        failure = self._pick_failure(profile)
+        if failure is not None:
+            self._count(model, str(failure.status_code))
+            return failure
+
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = int(body.get("dimensions") or profile["embedding_dimensions"])
+
+        self._enter()
+        try:
+            await asyncio.sleep(sample_latency_ms(self.rng, profile["embedding_latency_ms"]) / 1000)
+        finally:
+            self._exit()
+
+        self._count(model, "embedding")
+        prompt_tokens = sum(max(1, len(text) // 4) for text in inputs)
+        return {
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": deterministic_embedding(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    # -------------------------------------------------------------------------
+    # Stats
+    # -------------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_model: Dict[str, Dict[str, int]] = {}
+        for key, count in self.stats.items():
+            model, outcome = key.split("|", 1)
+            by_model.setdefault(model, {})[outcome] = count
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": sum(self.stats.values()),
+            "by_model": by_model,
+        }
+
+    def reset_stats(self) -> None:
+        self.stats.clear()
+        self.peak_in_flight = self.in_flight
+        self.started_at = time.time()
+
+
+def deterministic_embedding(text: str, dimensions: int) -> List[float]:
+    """Unit vector derived from the text, so identical inputs embed identically."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [round(v / norm, 6) for v in vector]
+
+
+def create_app(config: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> FastAPI:
+    """Build the stand-in app. Routes are served with and without the /api/v1 prefix."""
+    server = FakeOpenRouter(config or load_config(), seed=seed)
+    app = FastAPI(title="Fake OpenRouter", docs_url=None, redoc_url=None)
+    app.state.server = server
+
+    async def _authorized(request: Request) -> Optional[JSONResponse]:
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse(_error_body(401, "No auth credentials found"), status_code=401)
+        return None
+
+    async def chat_completions(request: Request):
+        denied = await _authorized(request)
+        if denied is not None:
+            return denied
+        return await server.chat_completions(await request.json())
+
+    async def embeddings(request: Request):
+        denied = await _authorized(request)
+        if denied is not None:
+            return denied
+        return await server.embeddings(await request.json())
+
+    for prefix in ("", "/api/v1"):
+        app.add_api_route(f"{prefix}/chat/completions", chat_completions, methods=["POST"])
+        app.add_api_route(f"{prefix}/embeddings", embeddings, methods=["POST"])
+
+    @app.get("/_stats")
+    async def stats():
+        return server.get_stats()
+
+    @app.post("/_reset")
+    async def reset():
+        server.reset_stats()
+        return {"status": "reset"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenRouter stand-in for load tests")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG_PATH), help="Profile JSON file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible runs")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(load_config(args.config), seed=args.seed)
+    print(f"Fake OpenRouter on http://{args.host}:{args.port} (profiles: {args.config})")
+    print(f"  OPENROUTER_API_URL=http://{args.host}:{args.port}/chat/completions")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Backend app wired for offline load tests.
+
+Imports backend.main and replaces the pieces that need Supabase so the
+council SSE flow can run with no network access:
+
+- auth: any "Bearer <token>" is accepted; the user ID is derived from the
+  token, so each load-test user gets its own conversations
+- storage: conversations live in a per-process dict
+- billing: every user can query
+- slowapi rate limits are disabled (they'd cap a single load-test IP)
+
+Everything else - routers, council stages, SSE streaming, the OpenRouter
+client (MOCK_LLM=true, or OPENROUTER_API_URL pointing at
+fake_openrouter.py) - is the production code.
+
+Each worker process has its own store. A request for a conversation this
+worker hasn't seen (created on another worker) gets an empty conversation
+for that user rather than a 404.
+
+Usage:
+    MOCK_LLM=true uvicorn backend.tests.load.offline_app:app --port 8081 --workers 2
+"""
+
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from backend import billing, storage, transcript_cache
+from backend.auth import get_current_user, get_effective_user
+from backend.main import app
+from backend.rate_limit import limiter
+
+_LOAD_TEST_NAMESPACE = uuid.UUID("6f1c9d8e-2b4a-4c1e-9a7f-3d5e8b2c1a00")
+
+_conversations: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def offline_user(request: Request) -> Dict[str, Any]:
+    auth = request.headers.get("authorization", "")
+    if not auth.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    token = auth[7:]
+    return {
+        "id": str(uuid.uuid5(_LOAD_TEST_NAMESPACE, token)),
+        "email": f"{token}@loadtest.local",
+        "access_token": token,
+    }
+
+
+def _new_conversation(conversation_id: str, user_id: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": conversation_id,
+        "user_id": user_id,
+        "created_at": _now(),
+        "title": "New Conversation",
+        "messages": [],
+    }
+
+
+def create_conversation(conversation_id: str, user_id: str, access_token: Optional[str] = None,
+                        company_id: Optional[str] = None) -> Dict[str, Any]:
+    conversation = _new_conversation(conversation_id, user_id)
+    conversation["company_id"] = company_id
+    with _lock:
+        _conversations[conversation_id] = conversation
+    return conversation
+
+
+def get_conversation(conversation_id: str, access_token: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    with _lock:
+        if conversation_id not in _conversations:
+            # Created on another worker; ownership check is skipped when user_id is None
+            _conversations[conversation_id] = _new_conversation(conversation_id, None)
+        return _conversations[conversation_id]
+
+
+def add_user_message(conversation_id: str, content: str, user_id: str,
+                     access_token: Optional[str] = None, **kwargs) -> None:
+    get_conversation(conversation_id)["messages"].append(
+        {"role": "user", "content": content, "created_at": _now()}
+    )
+
+
+def add_assistant_message(conversation_id: str, stage1, stage2, stage3, user_id: str,
+                          access_token: Optional[str] = None, **kwargs) -> None:
+    get_conversation(conversation_id)["messages"].append({
+        "role": "assistant",
+        "stage1": stage1,
+        "stage2": stage2,
+        "stage3": stage3,
+        "id": str(uuid.uuid4()),
+        "created_at": _now(),
+    })
+
+
+def get_message_stages(conversation_id: str, message_id: str,
+                       access_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    for msg in get_conversation(conversation_id)["messages"]:
+        if msg.get("id") == message_id and msg["role"] == "assistant":
+            return {"id": message_id, "stage1": msg["stage1"], "stage2": msg["stage2"]}
+    return None
+
+
+def update_conversation_history_summary(conversation_id: str, summary: str, summarized_messages: int,
+                                        access_token: Optional[str] = None) -> bool:
+    conversation = get_conversation(conversation_id)
+    if (conversation.get("history_summary_messages") or 0) >= summarized_messages:
+        return False
+    conversation["history_summary"] = summary
+    conversation["history_summary_messages"] = summarized_messages
+    return True
+
+
+def update_conversation_title(conversation_id: str, title: str, access_token: Optional[str] = None) -> None:
+    get_conversation(conversation_id)["title"] = title
+
+
+def update_conversation_department(conversation_id: str, department: str, access_token: Optional[str] = None) -> None:
+    get_conversation(conversation_id)["department"] = department
+
+
+def check_can_query(user_id: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+    return {"can_query": True, "reason": None, "remaining": -1}
+
+
+def _noop(*args, **kwargs) -> None:
+    return None
+
+
+def install() -> None:
+    """Apply the offline replacements (idempotent)."""
+    app.dependency_overrides[get_current_user] = offline_user
+    app.dependency_overrides[get_effective_user] = offline_user
+    limiter.enabled = False
+
+    storage.create_conversation = create_conversation
+    storage.get_conversation = get_conversation
+    storage.add_user_message = add_user_message
+    storage.add_assistant_message = add_assistant_message
+    storage.get_message_stages = get_message_stages
+    storage.update_conversation_history_summary = update_conversation_history_summary
+    storage.update_conversation_title = update_conversation_title
+    storage.update_conversation_department = update_conversation_department
+    billing.check_can_query = check_can_query
+    billing.increment_query_usage = _noop
+    # Offline messages bypass storage's write-through, so don't cache transcripts
+    transcript_cache.TRANSCRIPT_CACHE_ENABLED = False
+
+
+install()
@@ -0,0 +1,122 @@
+"""
+Tests for routers/admin.py - admin user listing and platform stats
+
+Tests cover:
+- User list reads the synced admin_user_index with server-side filters
+- Keyset cursor round trip and invalid cursors
+- Platform stats served from the counters RPC
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _index_row(n):
+    return {"user_id": f"user-{n}", "email": f"u{n}@example.com",
+            "created_at": f"2024-01-0{n}T00:00:00+00:00", "last_sign_in_at": None,
+            "email_confirmed_at": None, "user_metadata": {}}
+
+
+def _supabase(rows, count=None):
+    """Service client whose admin_user_index query chain returns rows."""
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value
+    for method in ("is_", "ilike", "eq", "or_", "order", "limit", "range"):
+        getattr(query, method).return_value = query
+    query.execute.return_value = MagicMock(data=rows, count=count if count is not None else len(rows))
+    return supabase, query
+
+
+@pytest.fixture
+def client():
+    """Test client for the admin router with an authorized admin."""
+    from backend.auth import get_current_user
+    from backend.routers.admin import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def override_user():
+        return {"id": "admin-1", "email": "admin@example.com", "access_token": "mock-token"}
+
+    app.dependency_overrides[get_current_user] = override_user
+
+    with patch("backend.routers.admin.check_is_platform_admin", AsyncMock(return_value=(True, "super_admin"))), \
+         patch("backend.routers.admin.log_platform_audit", AsyncMock()):
+        yield TestClient(app)
+
+
+class TestListUsers:
+    """Tests for GET /admin/users."""
+
+    def test_filters_in_database(self, client):
+        """Search, deletion and test-user filters are pushed into the query."""
+        supabase, query = _supabase([_index_row(3), _index_row(2)], count=2)
+
+        with patch("backend.routers.admin.get_supabase_service", return_value=supabase):
+            response = client.get("/admin/users?search=a_b&page_size=5")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [u["id"] for u in body["users"]] == ["user-3", "user-2"]
+        assert body["total"] == 2
+        assert body["next_cursor"] is None
+        supabase.table.assert_called_with("admin_user_index")
+        query.is_.assert_called_once_with("deleted_at", "null")
+        query.ilike.assert_called_once_with("email", "%a\\_b%")
+        query.eq.assert_called_once_with("is_test", False)
+        query.limit.assert_called_once_with(6)
+        supabase.auth.admin.list_users.assert_not_called()
+
+    def test_cursor_round_trip(self, client):
+        """A full page returns a cursor that resumes after the last row."""
+        supabase, query = _supabase([_index_row(3), _index_row(2), _index_row(1)], count=3)
+
+        with patch("backend.routers.admin.get_supabase_service", return_value=supabase):
+            first = client.get("/admin/users?page_size=2").json()
+            query.execute.return_value = MagicMock(data=[_index_row(1)], count=None)
+            second = client.get(f"/admin/users?page_size=2&cursor={first['next_cursor']}").json()
+
+        assert len(first["users"]) == 2
+        assert first["next_cursor"]
+        # The total is counted once and carried through the cursor
+        assert second["total"] == 3
+        assert [c.kwargs for c in supabase.table.return_value.select.call_args_list] == [{"count": "exact"}, {}]
+        query.or_.assert_called_once_with(
+            'created_at.lt."2024-01-02T00:00:00+00:00",'
+            'and(created_at.eq."2024-01-02T00:00:00+00:00",or(user_id.lt."user-2"))'
+        )
+
+    def test_invalid_cursor(self, client):
+        """Should return 400 for a cursor issued by another listing."""
+        from backend.storage import encode_cursor
+
+        response = client.get(f"/admin/users?cursor={encode_cursor('date', [True, 't', 'id'])}")
+
+        assert response.status_code == 400
+
+
+class TestPlatformStats:
+    """Tests for GET /admin/stats."""
+
+    def test_reads_counters(self, client):
+        """Stats come from the get_platform_stats RPC, not table scans."""
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value = MagicMock(data={
+            "total_users": 10, "total_companies": 3, "total_conversations": 40,
+            "total_messages": 900, "active_users_24h": 2, "active_users_7d": None,
+        })
+
+        with patch("backend.routers.admin.get_supabase_service", return_value=supabase):
+            response = client.get("/admin/stats")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "total_users": 10, "total_companies": 3, "total_conversations": 40,
+            "total_messages": 900, "active_users_24h": 2, "active_users_7d": 0,
+        }
+        supabase.rpc.assert_called_once_with("get_platform_stats", {})
+        supabase.table.assert_not_called()
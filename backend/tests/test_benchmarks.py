@@ -0,0 +1,72 @@
+"""
+Tests for tests/benchmarks - micro-benchmark suite
+
+Tests cover:
+- Every registered benchmark sets up and runs once (keeps cases from rotting)
+- Baseline covers every benchmark
+- Regression comparison and fixture-style teardown
+"""
+
+import asyncio
+import inspect
+
+import pytest
+
+from backend.tests.benchmarks.runner import get_benchmarks
+
+
+class TestBenchmarkCases:
+    """Smoke tests for registered cases."""
+
+    @pytest.mark.parametrize("name", sorted(get_benchmarks()))
+    def test_case_runs_once(self, name):
+        """Setup builds inputs and the timed callable completes."""
+        setup = get_benchmarks()[name]
+        fixture = setup() if inspect.isgeneratorfunction(setup) else None
+        func = next(fixture) if fixture else setup()
+        try:
+            result = func()
+            if inspect.isawaitable(result):
+                asyncio.run(result)
+        finally:
+            if fixture:
+                next(fixture, None)
+
+    def test_baseline_covers_all_benchmarks(self):
+        """New benchmarks must be added to baseline.json (--save-baseline)."""
+        from backend.tests.benchmarks.runner import load_baseline
+
+        assert set(get_benchmarks()) <= set(load_baseline()["results"])
+
+
+class TestRunner:
+    """Tests for timing, teardown and comparison."""
+
+    def test_generator_setup_is_torn_down(self):
+        """Code after `yield` runs once timing is done."""
+        from backend.tests.benchmarks.runner import run_benchmark
+
+        events = []
+
+        def setup():
+            events.append("setup")
+            yield lambda: None
+            events.append("teardown")
+
+        result = run_benchmark(setup, rounds=2, min_time=0.001)
+
+        assert events == ["setup", "teardown"]
+        assert result["rounds"] == 2
+        assert result["median_us"] >= 0
+
+    def test_compare_flags_regressions(self):
+        """Slowdowns past the threshold regress; big speedups are reported as improved."""
+        from backend.tests.benchmarks.runner import compare
+
+        baseline = {"results": {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "c": {"median_us": 100.0}}}
+        current = {"a": {"median_us": 130.0}, "b": {"median_us": 110.0}, "c": {"median_us": 50.0},
+                   "d": {"median_us": 1.0}}
+
+        status = {row["name"]: row["status"] for row in compare(current, baseline, threshold=0.25)}
+
+        assert status == {"a": "regressed", "b": "ok", "c": "improved", "d": "new"}
@@ -0,0 +1,155 @@
+"""
+Tests for cassettes.py - record/replay of OpenRouter SSE streams
+
+Tests cover:
+- Replaying the sample cassette through _process_sse_stream
+- Replay speed control
+- Recording a stream (with key redaction) and replaying it back
+- First-chunk timing from the request and secrets split across chunks
+- query_model_stream in replay mode
+"""
+
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+SAMPLE_DIR = str(Path(__file__).parent / "cassettes")
+SAMPLE_TEXT = (
+    "**Recommendation:** Start with a focused pilot in one region.\n\n"
+    "## Rationale\n\nA pilot limits spend while you validate demand, pricing and "
+    "onboarding before committing to a national rollout."
+)
+
+
+async def _collect(gen):
+    return [chunk async for chunk in gen]
+
+
+class TestReplay:
+    """Tests for replaying cassettes."""
+
+    @pytest.mark.asyncio
+    async def test_sample_cassette_replays_through_parser(self):
+        """Content, usage and [DONE] handling come from the real stream parser."""
+        from backend.cassettes import replay_stream
+
+        chunks = await _collect(replay_stream("openai/gpt-4o", [], directory=SAMPLE_DIR, speed="instant"))
+
+        usage = [c for c in chunks if c.startswith("[USAGE:")]
+        content = "".join(c for c in chunks if not c.startswith("["))
+        assert content == SAMPLE_TEXT
+        assert len(usage) == 1
+        assert '"completion_tokens": 34' in usage[0]
+
+    @pytest.mark.asyncio
+    async def test_speed_multiplier_scales_delays(self):
+        """N× replay takes roughly recorded duration / N."""
+        from backend.cassettes import replay_stream, load_cassette, find_cassette
+
+        cassette = load_cassette(find_cassette("openai/gpt-4o", [], SAMPLE_DIR))
+        start = time.perf_counter()
+        await _collect(replay_stream("openai/gpt-4o", [], cassette=cassette, speed="10x"))
+        elapsed = time.perf_counter() - start
+
+        assert cassette.duration / 10 * 0.8 <= elapsed < cassette.duration
+
+    def test_parse_speed(self):
+        """Speed strings map to multipliers; 0 means no delays."""
+        from backend.cassettes import parse_speed
+
+        assert parse_speed("recorded") == 1.0
+        assert parse_speed("instant") == 0.0
+        assert parse_speed("4x") == 4.0
+        assert parse_speed("bogus") == 1.0
+
+    @pytest.mark.asyncio
+    async def test_missing_cassette_yields_error(self, tmp_path):
+        """An empty cassette directory produces an error chunk, not an exception."""
+        from backend.cassettes import replay_stream
+
+        chunks = await _collect(replay_stream("openai/gpt-4o", [], directory=str(tmp_path)))
+        assert chunks[0].startswith("[Error: No cassette")
+
+
+class TestRecording:
+    """Tests for recording live streams."""
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay_round_trip(self, tmp_path):
+        """Recorded bytes are saved with timings, keys redacted, and replay identically."""
+        from backend.cassettes import RecordingResponse, Cassette, replay_stream
+        from backend.openrouter_stream import _process_sse_stream
+        from backend.cassettes import _NullBreaker
+
+        class FakeResponse:
+            status_code = 200
+
+            async def aiter_bytes(self):
+                yield b'data: {"choices":[{"delta":{"content":"Hel'
+                yield b'lo"}}]}\n\ndata: {"choices":[{"delta":{"content":" sk-or-v1-abcdef0123456789"}}]}\n\n'
+                yield b'data: {"choices":[{"delta":{"content":""},"finish_reason":"stop"}],"usage":{"prompt_tokens":5,"completion_tokens":2,"total_tokens":7}}\n\n'
+                yield b"data: [DONE]\n\n"
+
+        messages = [{"role": "user", "content": "hi"}]
+        recorder = RecordingResponse(FakeResponse(), "test/model", {"max_tokens": 100}, messages, directory=str(tmp_path))
+        live = [c async for c in _process_sse_stream(recorder, "test/model", _NullBreaker(), time.time(), 0, 0)
+                if not isinstance(c, tuple)]
+        await recorder.save()
+
+        saved = Cassette.load(recorder.path)
+        assert len(saved.chunks) == 4
+        assert saved.request["max_tokens"] == 100
+        assert "content" not in str(saved.request)
+        assert "abcdef0123456789" not in str(saved.chunks)
+
+        replayed = await _collect(replay_stream("test/model", messages, directory=str(tmp_path), speed="instant"))
+        assert live[0] == "Hello"
+        assert replayed[0] == "Hello"
+        assert replayed[1] == " [REDACTED]"
+        assert replayed[-1].startswith("[USAGE:")
+
+    @pytest.mark.asyncio
+    async def test_first_chunk_timed_from_request_and_split_secret_redacted(self, tmp_path):
+        """TTFT counts from the request; a key split across chunks is still redacted."""
+        from backend.cassettes import RecordingResponse, Cassette
+
+        class FakeResponse:
+            status_code = 200
+
+            async def aiter_bytes(self):
+                yield b'data: {"choices":[{"delta":{"content":"key sk-or-v1-abc'
+                yield b'def0123456789 end"}}]}\n\n'
+                yield b"data: [DONE]\n\n"
+
+        messages = [{"role": "user", "content": "hi"}]
+        recorder = RecordingResponse(FakeResponse(), "test/model", {}, messages, directory=str(tmp_path),
+                                     started_at=time.time() - 1.5)
+        [line async for line in recorder.aiter_lines()]
+        await recorder.save()
+
+        saved = Cassette.load(recorder.path)
+        assert saved.chunks[0][0] >= 1.5
+        text = "".join(chunk for _, chunk in saved.chunks)
+        assert "sk-or" not in text and "def0123456789" not in text
+        assert '"key [REDACTED] end"' in text
+        assert len(saved.chunks) == 3
+
+
+class TestQueryModelStreamReplay:
+    """Tests for the openrouter.py integration."""
+
+    @pytest.mark.asyncio
+    async def test_query_model_stream_uses_cassettes_in_replay_mode(self):
+        """No HTTP call is made; chunks come from the cassette."""
+        from backend import openrouter
+
+        with patch.object(openrouter, "MOCK_LLM", False), \
+             patch.object(openrouter, "OPENROUTER_CASSETTE_MODE", "replay"), \
+             patch("backend.cassettes.OPENROUTER_CASSETTE_DIR", SAMPLE_DIR), \
+             patch("backend.cassettes.OPENROUTER_CASSETTE_SPEED", "instant"), \
+             patch.object(openrouter, "get_http_client", side_effect=AssertionError("no HTTP in replay")):
+            chunks = await _collect(openrouter.query_model_stream("openai/gpt-4o", [{"role": "user", "content": "x"}]))
+
+        assert "".join(c for c in chunks if not c.startswith("[")) == SAMPLE_TEXT
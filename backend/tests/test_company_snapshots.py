@@ -0,0 +1,171 @@
+"""
+Tests for company_snapshots.py - versioned company view snapshots
+
+Tests cover:
+- If-None-Match parsing
+- Building on a miss and serving later requests from the snapshot
+- Version bumps invalidating snapshots across workers
+- 304 responses for a matching ETag
+- ETags without caching when Redis is unavailable
+- Access checks cached per company version
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _request(if_none_match=None):
+    request = MagicMock()
+    request.headers = {"if-none-match": if_none_match} if if_none_match else {}
+    return request
+
+
+@pytest.fixture
+def snapshots():
+    """company_snapshots wired to an in-memory Redis."""
+    from backend import company_snapshots
+
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    with patch.object(company_snapshots, "get_redis", AsyncMock(return_value=client)), \
+         patch.object(company_snapshots, "COMPANY_SNAPSHOT_ENABLED", True), \
+         patch.object(company_snapshots, "_snapshot_cache", company_snapshots.SnapshotCache()):
+        yield company_snapshots, client
+
+
+class TestEtags:
+    """Tests for etag_matches."""
+
+    def test_matches(self):
+        """Exact, weak, listed and wildcard validators match."""
+        from backend.company_snapshots import etag_matches
+
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"x"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+
+class TestServeCompanyView:
+    """Tests for serve_company_view."""
+
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, snapshots):
+        """The view is built once and then served from the snapshot."""
+        cs, client = snapshots
+        build = MagicMock(return_value={"departments": [{"id": "d1"}]})
+
+        first = await cs.serve_company_view(_request(), "co-1", "team", build)
+        second = await cs.serve_company_view(_request(), "co-1", "team", build)
+
+        assert build.call_count == 1
+        assert first.body == second.body == b'{"departments":[{"id":"d1"}]}'
+        assert first.headers["etag"] == second.headers["etag"]
+        assert await client.exists("axcouncil:company:co-1:snapshot:team") == 1
+
+    @pytest.mark.asyncio
+    async def test_async_build(self, snapshots):
+        """Async build functions are awaited."""
+        cs, _ = snapshots
+
+        async def build():
+            return {"stats": {"roles": 2}}
+
+        response = await cs.serve_company_view(_request(), "co-1", "overview", build)
+
+        assert response.body == b'{"stats":{"roles":2}}'
+
+    @pytest.mark.asyncio
+    async def test_bump_invalidates_other_workers(self, snapshots):
+        """A write on one worker makes every worker rebuild."""
+        cs, _ = snapshots
+        build = MagicMock(side_effect=[{"v": 1}, {"v": 2}])
+        await cs.serve_company_view(_request(), "co-1", "team", build)
+
+        other_worker = cs.SnapshotCache()
+        with patch.object(cs, "_snapshot_cache", other_worker):
+            await cs.bump_company_version("co-1")
+        response = await cs.serve_company_view(_request(), "co-1", "team", build)
+
+        assert build.call_count == 2
+        assert response.body == b'{"v":2}'
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self, snapshots):
+        """A matching If-None-Match gets a 304 without a body."""
+        cs, _ = snapshots
+        build = MagicMock(return_value={"playbooks": []})
+        etag = (await cs.serve_company_view(_request(), "co-1", "playbooks", build)).headers["etag"]
+
+        response = await cs.serve_company_view(_request(etag), "co-1", "playbooks", build)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == etag
+        assert build.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_snapshot_rebuilt(self, snapshots):
+        """Snapshots older than the TTL are rebuilt even without a bump."""
+        cs, client = snapshots
+        build = MagicMock(return_value={"v": 1})
+        await cs.serve_company_view(_request(), "co-1", "team", build)
+
+        with patch.object(cs.time, "time", return_value=cs.time.time() + cs.get_snapshot_cache().ttl + 1):
+            await cs.serve_company_view(_request(), "co-1", "team", build)
+
+        assert build.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_without_redis(self, snapshots):
+        """Without Redis every request builds, but ETags still yield 304s."""
+        cs, _ = snapshots
+        build = MagicMock(return_value={"departments": []})
+
+        with patch.object(cs, "get_redis", AsyncMock(return_value=None)):
+            etag = (await cs.serve_company_view(_request(), "co-1", "team", build)).headers["etag"]
+            response = await cs.serve_company_view(_request(etag), "co-1", "team", build)
+
+        assert response.status_code == 304
+        assert build.call_count == 2
+        assert cs.get_snapshot_cache().stats()["entries"] == 0
+
+
+class TestCachedAccess:
+    """Tests for verify_company_access_cached."""
+
+    @pytest.mark.asyncio
+    async def test_cached_per_version(self):
+        """Access is checked once per user and company version."""
+        from backend.routers.company import utils
+        from backend.utils.cache import user_cache
+
+        await user_cache.clear()
+        with patch.object(utils, "verify_company_access", return_value=True) as mock_verify:
+            user = {"id": "user-1"}
+            await utils.verify_company_access_cached(MagicMock(), "co-1", user, 3)
+            await utils.verify_company_access_cached(MagicMock(), "co-1", user, 3)
+            await utils.verify_company_access_cached(MagicMock(), "co-1", user, 4)
+            await utils.verify_company_access_cached(MagicMock(), "co-1", user, None)
+
+        assert mock_verify.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_denial_not_cached(self):
+        """Failed checks raise every time."""
+        from fastapi import HTTPException
+        from backend.routers.company import utils
+        from backend.utils.cache import user_cache
+
+        await user_cache.clear()
+        denied = MagicMock(side_effect=HTTPException(status_code=403, detail="Access denied"))
+        with patch.object(utils, "verify_company_access", denied):
+            for _ in range(2):
+                with pytest.raises(HTTPException):
+                    await utils.verify_company_access_cached(MagicMock(), "co-1", {"id": "user-2"}, 1)
+
+        assert denied.call_count == 2
@@ -85,6 +85,13 @@ class TestEstimateTokens:
         text = "A" * 100
         assert estimate_tokens(text) == 25  # 100 / 4
 
+    def test_rounds_up(self):
+        """Partial tokens count, and None is treated as empty."""
+        from backend.context_loader import estimate_tokens
+
+        assert estimate_tokens("abc") == 1
+        assert estimate_tokens(None) == 0
+
 
 # =============================================================================
 # TRUNCATION TESTS
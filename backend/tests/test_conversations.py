@@ -3,10 +3,13 @@ Tests for conversations router
 
 Tests the main API endpoints including:
 - CRUD operations (create, read, list, delete)
+- Single-RPC conversation loading and lazy Stage 1/2 payloads
+- Keyset cursor pagination for the conversation list
 - Star/archive functionality
 - Rename and department update
 - Bulk delete
 - Export to markdown
+- Pre-flight cost estimate
 - Input validation
 - Authorization checks
 """
@@ -256,23 +259,124 @@ class TestListConversations:
             call_kwargs = mock_list.call_args[1]
             assert call_kwargs["search"] == "expansion"
 
-    def test_list_filters_by_starred(self, client, mock_user):
-        """Should filter by starred status client-side."""
+    def test_list_passes_department_and_starred(self, client, mock_user):
+        """Should filter by department and starred status in storage, not client-side."""
         with patch('backend.routers.conversations.storage.list_conversations') as mock_list:
             mock_list.return_value = {
-                "conversations": [
-                    {"id": "conv-1", "is_starred": True},
-                    {"id": "conv-2", "is_starred": False}
-                ],
-                "has_more": False
+                "conversations": [{"id": "conv-1", "is_starred": True}],
+                "has_more": True,
+                "next_cursor": "abc"
             }
 
-            response = client.get("/conversations?starred=true")
+            response = client.get("/conversations?starred=true&department=legal")
 
             assert response.status_code == 200
-            data = response.json()
-            assert len(data["conversations"]) == 1
-            assert data["conversations"][0]["id"] == "conv-1"
+            call_kwargs = mock_list.call_args[1]
+            assert call_kwargs["starred"] is True
+            assert call_kwargs["department"] == "legal"
+            assert response.json()["conversations"] == [{"id": "conv-1", "is_starred": True}]
+
+    def test_list_with_cursor(self, client, mock_user):
+        """Should pass the cursor to storage and return next_cursor."""
+        with patch('backend.routers.conversations.storage.list_conversations') as mock_list:
+            mock_list.return_value = {"conversations": [], "has_more": True, "next_cursor": "abc"}
+
+            response = client.get("/conversations?cursor=xyz&sort_by=activity")
+
+            assert response.status_code == 200
+            assert response.json()["next_cursor"] == "abc"
+            assert mock_list.call_args[1]["cursor"] == "xyz"
+            assert mock_list.call_args[1]["sort_by"] == "activity"
+
+    def test_list_rejects_invalid_cursor(self, client, mock_user):
+        """Should return 400 for a malformed or mismatched cursor."""
+        with patch('backend.routers.conversations.storage.list_conversations',
+                   side_effect=ValueError("Malformed cursor")):
+            response = client.get("/conversations?cursor=garbage")
+
+        assert response.status_code == 400
+
+
+class TestStorageListConversations:
+    """Tests for keyset pagination in storage.list_conversations."""
+
+    @staticmethod
+    def _row(n, starred=False, count=4):
+        return {"id": f"conv-{n}", "created_at": "2024-01-01T00:00:00+00:00",
+                "updated_at": "2024-01-05T00:00:00+00:00", "last_message_at": f"2024-01-0{n}T00:00:00+00:00",
+                "title": f"Conv {n}", "message_count": count, "is_starred": starred,
+                "is_archived": False, "department": "standard"}
+
+    def _list(self, rows, **kwargs):
+        from unittest.mock import MagicMock
+        from backend import storage
+
+        query = MagicMock()
+        for method in ("select", "eq", "gt", "filter", "or_", "order", "limit", "range"):
+            getattr(query, method).return_value = query
+        query.execute.return_value = MagicMock(data=rows)
+        client = MagicMock()
+        client.table.return_value = query
+        with patch.object(storage, "_get_client", return_value=client):
+            return storage.list_conversations("user-123", **kwargs), query
+
+    def test_first_page_uses_denormalized_columns(self):
+        """Filters on message_count in SQL, orders by the sort keys and fetches limit + 1."""
+        result, query = self._list([self._row(3), self._row(2), self._row(1)], limit=2)
+
+        query.gt.assert_called_once_with("message_count", 0)
+        assert [c.args[0] for c in query.order.call_args_list] == ["is_starred", "last_message_at", "id"]
+        query.limit.assert_called_once_with(3)
+        query.or_.assert_not_called()
+        assert [c["id"] for c in result["conversations"]] == ["conv-3", "conv-2"]
+        assert result["conversations"][0]["last_updated"] == "2024-01-03T00:00:00+00:00"
+        assert result["has_more"] is True
+        assert result["next_cursor"]
+
+    def test_cursor_round_trip(self):
+        """The next page continues strictly after the last row of the previous one."""
+        from backend.storage import encode_list_cursor
+
+        cursor = encode_list_cursor("activity", self._row(2, starred=True, count=7))
+        result, query = self._list([self._row(1)], limit=2, cursor=cursor, sort_by="activity")
+
+        query.or_.assert_called_once_with(
+            'is_starred.lt.true,and(is_starred.eq.true,or('
+            'message_count.lt.7,and(message_count.eq.7,or('
+            'last_message_at.lt."2024-01-02T00:00:00+00:00",and(last_message_at.eq."2024-01-02T00:00:00+00:00",'
+            'or(id.lt."conv-2"))))))'
+        )
+        assert result["has_more"] is False
+        assert result["next_cursor"] is None
+
+    def test_search_uses_full_text_index(self):
+        """Title search is a prefix match on search_vector, not ilike."""
+        _, query = self._list([], search="expansion pl")
+
+        query.filter.assert_called_once_with("search_vector", "fts(simple)", "expansion:* & pl:*")
+
+    def test_department_and_starred_filter_in_sql(self):
+        """Department and starred filters are applied to the keyset query itself."""
+        from unittest.mock import call
+        from backend.storage import encode_list_cursor
+
+        cursor = encode_list_cursor("date", self._row(2, starred=True))
+        _, query = self._list([], cursor=cursor, department="legal", starred=True)
+
+        assert call("department", "legal") in query.eq.call_args_list
+        assert call("is_starred", True) in query.eq.call_args_list
+        query.or_.assert_called_once()
+
+    def test_rejects_cursor_from_other_sort(self):
+        """A date cursor can't be used for the activity sort."""
+        from backend.storage import encode_list_cursor
+
+        cursor = encode_list_cursor("date", self._row(2))
+
+        with pytest.raises(ValueError):
+            self._list([], cursor=cursor, sort_by="activity")
+        with pytest.raises(ValueError):
+            self._list([], cursor="not-base64!!")
 
 
 class TestCreateConversation:
@@ -342,6 +446,122 @@ class TestGetConversation:
 
             assert response.status_code == 403
 
+    def test_get_conversation_defers_stages_by_default(self, client, mock_user, mock_conversation):
+        """Stage 1/2 payloads are only loaded when stages=full."""
+        with patch('backend.routers.conversations.storage.get_conversation',
+                   return_value=mock_conversation) as mock_get:
+            client.get("/conversations/conv-123")
+            assert mock_get.call_args.kwargs["include_stages"] is False
+
+            client.get("/conversations/conv-123?stages=full")
+            assert mock_get.call_args.kwargs["include_stages"] is True
+
+    def test_get_conversation_rejects_unknown_stages_mode(self, client, mock_user):
+        """Should reject stages values other than summary/full."""
+        response = client.get("/conversations/conv-123?stages=partial")
+
+        assert response.status_code == 422
+
+
+class TestGetMessageStages:
+    """Tests for GET /conversations/{id}/messages/{message_id}/stages endpoint."""
+
+    def test_returns_stage_payloads(self, client, mock_user, mock_conversation):
+        """Should return the full Stage 1/2 payloads for the owner."""
+        stages = {"id": "msg-1", "stage1": [{"model": "m/a", "response": "hi"}], "stage2": [],
+                  "label_to_model": {}, "aggregate_rankings": []}
+
+        with patch('backend.routers.conversations.storage.get_conversation', return_value=mock_conversation), \
+             patch('backend.routers.conversations.storage.get_message_stages', return_value=stages) as mock_stages:
+            response = client.get("/conversations/conv-123/messages/msg-1/stages")
+
+        assert response.status_code == 200
+        assert response.json()["stage1"][0]["response"] == "hi"
+        mock_stages.assert_called_once_with("conv-123", "msg-1", access_token="mock-token")
+
+    def test_message_not_found(self, client, mock_user, mock_conversation):
+        """Should return 404 when the message isn't an assistant message of this conversation."""
+        with patch('backend.routers.conversations.storage.get_conversation', return_value=mock_conversation), \
+             patch('backend.routers.conversations.storage.get_message_stages', return_value=None):
+            response = client.get("/conversations/conv-123/messages/msg-x/stages")
+
+        assert response.status_code == 404
+
+    def test_access_denied(self, client, mock_user):
+        """Should return 403 without loading stages for a non-owner."""
+        with patch('backend.routers.conversations.storage.get_conversation',
+                   return_value={"id": "conv-123", "user_id": "other-user-456"}), \
+             patch('backend.routers.conversations.storage.get_message_stages') as mock_stages:
+            response = client.get("/conversations/conv-123/messages/msg-1/stages")
+
+        assert response.status_code == 403
+        mock_stages.assert_not_called()
+
+
+class TestStorageGetConversation:
+    """Tests for storage.get_conversation mapping the get_conversation_page RPC."""
+
+    @staticmethod
+    def _page(**overrides):
+        page = {
+            "conversation": {"id": "conv-123", "user_id": "user-123", "title": None, "archived": False,
+                             "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-02T00:00:00Z",
+                             "curator_history": None, "history_summary": None, "history_summary_messages": 0},
+            "message_count": 5,
+            "messages": [
+                {"id": "m-1", "role": "user", "content": "Hi", "image_analysis": None},
+                {"id": "m-2", "role": "assistant", "stage3": {"response": "Hello"},
+                 "stage_summary": {"stage1": [{"model": "m/a", "chars": 120}], "stage2": []}},
+            ],
+        }
+        page.update(overrides)
+        return page
+
+    def _fetch(self, page, **kwargs):
+        from unittest.mock import MagicMock
+        from backend import storage
+
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value = MagicMock(data=page)
+        with patch.object(storage, "_get_client", return_value=client):
+            return storage.get_conversation("conv-123", access_token="jwt", **kwargs), client
+
+    def test_single_rpc_with_deferred_stages(self):
+        """One RPC call returns metadata, count and the message page."""
+        conversation, client = self._fetch(self._page(), include_stages=False)
+
+        client.rpc.assert_called_once_with("get_conversation_page", {
+            "p_conversation_id": "conv-123", "p_message_limit": 200, "p_include_stages": False,
+        })
+        client.table.assert_not_called()
+        assert conversation["title"] == "New Conversation"
+        assert conversation["last_updated"] == "2024-01-02T00:00:00Z"
+        assert conversation["messages_truncated"] is True
+        assert conversation["messages_shown"] == 2
+        user_msg, assistant_msg = conversation["messages"]
+        assert user_msg == {"id": "m-1", "role": "user", "content": "Hi"}
+        assert assistant_msg["stages_deferred"] is True
+        assert assistant_msg["stage1"] == []
+        assert assistant_msg["stage_summary"]["stage1"][0]["chars"] == 120
+
+    def test_full_stages(self):
+        """include_stages returns Stage 1/2 without the summary markers."""
+        messages = [{"id": "m-2", "role": "assistant", "stage1": [{"model": "m/a", "response": "r"}],
+                     "stage2": [], "stage3": {"response": "Hello"}}]
+
+        conversation, _ = self._fetch(self._page(messages=messages, message_count=1))
+
+        message = conversation["messages"][0]
+        assert message["stage1"] == [{"model": "m/a", "response": "r"}]
+        assert "stages_deferred" not in message
+        assert "messages_truncated" not in conversation
+
+    def test_not_found(self):
+        """A NULL page (missing or not visible under RLS) means not found."""
+        conversation, _ = self._fetch(None)
+
+        assert conversation is None
+
 
 class TestRenameConversation:
     """Tests for PATCH /conversations/{id}/rename endpoint."""
@@ -549,6 +769,42 @@ class TestExportConversation:
             assert response.status_code == 404
 
 
+class TestEstimateMessage:
+    """Tests for POST /conversations/{id}/estimate endpoint."""
+
+    def test_estimate_reports_budget(self, client, mock_user, mock_conversation):
+        """Should return the estimate and whether it fits the remaining budget."""
+        from unittest.mock import AsyncMock
+        from backend.estimator import estimate_council
+        from backend.telemetry import TelemetryStore
+
+        estimate = estimate_council(None, None, "What's the plan?", {"stage1": ["openai/gpt-4o"]},
+                                    {"stage1": 8192, "stage2": 2048, "stage3": 8192}, store=TelemetryStore())
+        rate_check = {"details": {"budget_monthly": {"current": 10_000, "limit": 10_000}}}
+
+        with patch('backend.routers.conversations.storage.get_conversation', return_value=mock_conversation), \
+             patch('backend.routers.conversations.storage.resolve_company_id', return_value="co-1"), \
+             patch('backend.routers.conversations.estimator.estimate_council_session',
+                   AsyncMock(return_value=estimate)) as mock_estimate, \
+             patch('backend.routers.conversations.quota.get_rate_status', AsyncMock(return_value=rate_check)):
+            response = client.post("/conversations/conv-123/estimate",
+                                   json={"content": "What's the plan?", "business_id": "acme"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cost_cents"] == round(estimate.cost_cents, 2)
+        assert data["remaining_budget_cents"] == 0
+        assert data["within_budget"] is False
+        assert mock_estimate.await_args.kwargs["company_uuid"] == "co-1"
+
+    def test_estimate_not_found(self, client, mock_user):
+        """Should return 404 for non-existent conversation."""
+        with patch('backend.routers.conversations.storage.get_conversation', return_value=None):
+            response = client.post("/conversations/non-existent/estimate", json={"content": "hi"})
+
+        assert response.status_code == 404
+
+
 # =============================================================================
 # INPUT VALIDATION TESTS
 # =============================================================================
@@ -0,0 +1,134 @@
+"""
+Tests for tests/load/council_load.py - council SSE load harness
+
+Tests cover:
+- SSE session measurement (stages, TTFT per model, follow-ups, errors)
+- Percentiles and report aggregation
+- HTML rendering
+"""
+
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+
+def _sse(*events):
+    async def body():
+        yield ": keep-alive\n\n"
+        for event in events:
+            yield f"data: {json.dumps(event)}\n\n"
+    return StreamingResponse(body(), media_type="text/event-stream")
+
+
+def _fake_backend(council_events):
+    app = FastAPI()
+
+    @app.post("/api/v1/conversations")
+    async def create():
+        return {"id": "conv-1"}
+
+    @app.post("/api/v1/conversations/{conversation_id}/messages")
+    async def messages(conversation_id: str):
+        return _sse(*council_events)
+
+    @app.post("/api/v1/conversations/{conversation_id}/chat/stream")
+    async def chat(conversation_id: str):
+        return _sse({"type": "chat_start"}, {"type": "chat_token", "content": "Hi", "model": "m"},
+                    {"type": "chat_complete"}, {"type": "complete"})
+
+    return app
+
+
+COUNCIL_EVENTS = [
+    {"type": "stage1_start"},
+    {"type": "stage1_token", "model": "openai/gpt-4o", "content": "A"},
+    {"type": "stage1_token", "model": "anthropic/claude", "content": "B"},
+    {"type": "stage1_token", "model": "openai/gpt-4o", "content": "C"},
+    {"type": "stage1_model_error", "model": "x-ai/grok"},
+    {"type": "stage1_complete", "data": []},
+    {"type": "stage2_start"},
+    {"type": "stage2_complete", "data": []},
+    {"type": "stage3_start"},
+    {"type": "stage3_token", "model": "openai/gpt-4o", "content": "D"},
+    {"type": "stage3_complete", "data": {}},
+    {"type": "complete"},
+]
+
+
+def _args(**overrides):
+    from backend.tests.load.council_load import parse_args
+
+    args = parse_args([])
+    args.think_time = 0
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+class TestSessionMeasurement:
+    """Tests for run_session against a scripted SSE backend."""
+
+    @pytest.mark.asyncio
+    async def test_records_stages_ttft_and_followups(self):
+        """A full session records every stage, per-model TTFT and follow-up timings."""
+        from backend.tests.load.council_load import run_session
+
+        transport = httpx.ASGITransport(app=_fake_backend(COUNCIL_EVENTS))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            result = await run_session(client, 0, _args(followups=2))
+
+        assert result.ok, result.error
+        assert set(result.stage_ms) == {"stage1", "stage2", "stage3"}
+        assert set(result.ttft_ms) == {"stage1:openai/gpt-4o", "stage1:anthropic/claude", "stage3:openai/gpt-4o"}
+        assert result.model_errors == {"stage1:x-ai/grok": 1}
+        assert len(result.followup_ms) == 2
+        assert result.frames == len(COUNCIL_EVENTS) + 2 * 4
+
+    @pytest.mark.asyncio
+    async def test_stream_error_fails_session(self):
+        """An error event or a stream without stage3 marks the session failed."""
+        from backend.tests.load.council_load import run_session
+
+        events = [{"type": "stage1_start"}, {"type": "error", "message": "boom"}]
+        transport = httpx.ASGITransport(app=_fake_backend(events))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            result = await run_session(client, 0, _args())
+
+        assert not result.ok
+        assert result.error == "stream error: boom"
+
+
+class TestReport:
+    """Tests for aggregation and rendering."""
+
+    def test_percentiles(self):
+        """Nearest-rank percentiles over a simple range."""
+        from backend.tests.load.council_load import percentiles
+
+        stats = percentiles([float(v) for v in range(1, 101)])
+        assert stats["count"] == 100
+        assert stats["p50"] == 50.0
+        assert stats["p95"] == 95.0
+        assert stats["max"] == 100.0
+        assert percentiles([]) == {"count": 0}
+
+    def test_build_report_and_html(self):
+        """Error rate, per-model TTFT and HTML output come from session results."""
+        from collections import Counter
+        from backend.tests.load.council_load import SessionResult, build_report, render_html
+
+        ok = SessionResult(user=0, council_ms=900.0, stage_ms={"stage1": 300.0},
+                           ttft_ms={"stage1:openai/gpt-4o": 120.0}, frames=50, stream_seconds=1.0)
+        failed = SessionResult(user=1, ok=False, error="messages HTTP 502", model_errors=Counter({"stage1:x": 1}))
+
+        report = build_report([ok, failed], wall_seconds=2.0, config={"users": 2})
+
+        assert report["summary"]["error_rate"] == 0.5
+        assert report["errors"] == {"messages HTTP 502": 1}
+        assert report["ttft_ms_by_model"]["stage1:openai/gpt-4o"]["p50"] == 120.0
+        assert report["frames_per_second"]["p50"] == 50.0
+        page = render_html(report)
+        assert "stage1:openai/gpt-4o" in page and "messages HTTP 502" in page
@@ -0,0 +1,355 @@
+"""
+Tests for data_export.py and the export endpoints - GDPR data export
+
+Tests cover:
+- Keyset paging of each section and company-scoped sections
+- Failed sections recorded in the summary instead of aborting the export
+- JSON, NDJSON and zip writers producing parseable output
+- Background job lifecycle, ownership checks and downloads
+- Job state shared across workers through Redis, archives uploaded to storage
+- Downloads redirecting to a signed URL from any worker
+- Expired archives swept from storage without another export
+"""
+
+import asyncio
+import io
+import json
+import zipfile
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+class FakeQuery:
+    """Minimal chainable query returning rows filtered by id keyset."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.after = None
+        self.page_size = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(("in", column, list(values)))
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self.page_size = n
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.after, list(self.filters)))
+        if self.table in self.client.failing:
+            raise RuntimeError("boom")
+        rows = [dict(r) for r in self.client.data.get(self.table, [])
+                if self.after is None or r["id"] > self.after]
+        return MagicMock(data=rows[:self.page_size] if self.page_size else rows)
+
+
+class FakeClient:
+    def __init__(self, data, failing=()):
+        self.data = data
+        self.failing = set(failing)
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def _data():
+    return {
+        "profiles": [{"id": "user-1", "email": "u@example.com", "full_name": "U", "internal_flag": True}],
+        "companies": [{"id": "c1", "name": "Acme"}],
+        "departments": [{"id": "d1", "company_id": "c1", "name": "Ops"}],
+        "conversations": [{"id": f"conv-{n}", "title": f"T{n}"} for n in range(5)],
+        "messages": [{"id": f"m{n}", "content": "hi", "search_vector": "'hi':1"} for n in range(3)],
+    }
+
+
+def _collect(stream):
+    async def run():
+        return b"".join([chunk async for chunk in stream])
+    return asyncio.run(run())
+
+
+class TestUserDataExport:
+    """Tests for section paging."""
+
+    def test_keyset_paging(self):
+        """Pages by id until a short page, holding one page at a time."""
+        from backend.data_export import UserDataExport, EXPORT_SECTIONS
+
+        client = FakeClient(_data())
+        export = UserDataExport(client, "user-1", page_size=2)
+        section = next(s for s in EXPORT_SECTIONS if s.name == "conversations")
+
+        async def run():
+            return [row async for row in export.rows(section)]
+
+        rows = asyncio.run(run())
+
+        assert [r["id"] for r in rows] == [f"conv-{n}" for n in range(5)]
+        assert [after for table, after, _ in client.calls] == [None, "conv-1", "conv-3"]
+        assert client.calls[0][2] == [("eq", "user_id", "user-1")]
+        assert export.counts["conversations"] == 5
+
+    def test_messages_use_smaller_pages(self):
+        """Messages page at their own cap rather than the shared page size."""
+        from dataclasses import replace
+        from backend.data_export import UserDataExport, EXPORT_SECTIONS
+
+        client = FakeClient(_data())
+        section = replace(next(s for s in EXPORT_SECTIONS if s.name == "messages"), page_size=2)
+
+        async def run():
+            return [row async for row in UserDataExport(client, "user-1", page_size=500).rows(section)]
+
+        rows = asyncio.run(run())
+
+        assert [r["id"] for r in rows] == ["m0", "m1", "m2"]
+        assert [after for _, after, _ in client.calls] == [None, "m1"]
+        assert all("search_vector" not in r for r in rows)
+
+    def test_company_sections_use_owned_companies(self):
+        """Company-scoped sections filter by the companies exported earlier."""
+        from backend.data_export import UserDataExport, stream_ndjson
+
+        client = FakeClient(_data())
+        _collect(stream_ndjson(UserDataExport(client, "user-1")))
+
+        department_calls = [filters for table, _, filters in client.calls if table == "departments"]
+        assert department_calls == [[("in", "company_id", ["c1"])]]
+
+    def test_failed_section_is_reported(self):
+        """A failing table is listed in the summary; other sections still export."""
+        from backend.data_export import UserDataExport, stream_ndjson
+
+        client = FakeClient(_data(), failing={"roles"})
+        lines = [json.loads(line) for line in _collect(stream_ndjson(UserDataExport(client, "user-1"))).splitlines()]
+
+        summary = lines[-1]
+        assert summary["section"] == "summary"
+        assert summary["data"]["failed_sections"] == ["roles"]
+        assert summary["data"]["counts"]["messages"] == 3
+
+
+class TestWriters:
+    """Tests for the output formats."""
+
+    def test_json_document(self):
+        """JSON output is one valid document with every section."""
+        from backend.data_export import UserDataExport, stream_json, EXPORT_SECTIONS
+
+        body = json.loads(_collect(stream_json(UserDataExport(FakeClient(_data()), "user-1", page_size=2))))
+
+        assert body["export_version"] == "2.0"
+        assert body["user"]["email"] == "u@example.com"
+        assert "internal_flag" not in body["user"]
+        assert all(section.name in body for section in EXPORT_SECTIONS)
+        assert len(body["conversations"]) == 5
+        assert "search_vector" not in body["messages"][0]
+        assert body["summary"]["counts"]["companies"] == 1
+
+    def test_zip_archive(self):
+        """Zip output opens and holds one NDJSON file per section."""
+        from backend.data_export import UserDataExport, stream_zip
+
+        data = _collect(stream_zip(UserDataExport(FakeClient(_data()), "user-1")))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = archive.namelist()
+            conversations = archive.read("conversations.ndjson").decode().splitlines()
+            summary = json.loads(archive.read("summary.json"))
+
+        assert names[0] == "export.json"
+        assert "messages.ndjson" in names
+        assert len(conversations) == 5
+        assert summary["failed_sections"] == []
+
+
+class TestExportJobs:
+    """Tests for background export jobs."""
+
+    def test_job_lifecycle(self, tmp_path):
+        """Jobs spool to disk, complete, and are only visible to their owner."""
+        from backend import data_export
+
+        async def run():
+            job = await data_export.start_export_job(
+                data_export.UserDataExport(FakeClient(_data()), "user-1"), "ndjson")
+            await job.task
+            return job, await data_export.get_export_job(job.id, "user-1"), \
+                await data_export.get_export_job(job.id, "user-2")
+
+        with patch.object(data_export, "EXPORT_SPOOL_DIR", str(tmp_path)), \
+             patch.object(data_export, "EXPORT_STORAGE_BUCKET", ""), \
+             patch.object(data_export, "get_redis", AsyncMock(return_value=None)):
+            job, mine, theirs = asyncio.run(run())
+        try:
+            assert job.status == "complete"
+            assert job.size_bytes > 0
+            assert len(open(job.path, "rb").read()) == job.size_bytes
+            assert mine is job
+            assert theirs is None
+        finally:
+            data_export._jobs.pop(job.id, None)
+
+    def test_job_shared_across_workers(self, tmp_path):
+        """Another worker sees the job through Redis and the archive in storage."""
+        fakeredis = pytest.importorskip("fakeredis")
+        from backend import data_export
+
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        bucket = MagicMock()
+        bucket.list.return_value = []
+        uploaded = {}
+        bucket.upload.side_effect = lambda path, file, options: uploaded.update({path: open(file, "rb").read()})
+
+        async def run():
+            job = await data_export.start_export_job(
+                data_export.UserDataExport(FakeClient(_data()), "user-1"), "json")
+            await job.task
+            data_export._jobs.clear()  # Simulate a different worker
+            return job, await data_export.get_export_job(job.id, "user-1"), \
+                await data_export.get_export_job(job.id, "user-2")
+
+        with patch.object(data_export, "EXPORT_SPOOL_DIR", str(tmp_path)), \
+             patch.object(data_export, "get_redis", AsyncMock(return_value=redis)), \
+             patch.object(data_export, "_storage", return_value=bucket):
+            job, remote, theirs = asyncio.run(run())
+
+        assert remote.status == "complete"
+        assert remote.storage_path == f"user-1/{job.id}.json"
+        assert remote.size_bytes == len(uploaded[remote.storage_path]) > 0
+        assert remote.path is None
+        assert theirs is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_sweep_removes_expired_archives(self):
+        """Uploaded archives are deleted once expired, on any worker, without a new export."""
+        fakeredis = pytest.importorskip("fakeredis")
+        from backend import data_export
+
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        bucket = MagicMock()
+
+        async def run():
+            await data_export._track_stored("user-1/old.zip", 100)
+            await data_export._track_stored("user-1/new.zip", 500)
+            first = await data_export.sweep_stored_exports(now=200)
+            second = await data_export.sweep_stored_exports(now=200)
+            return first, second, await redis.zrange(data_export.STORED_EXPORTS_KEY, 0, -1)
+
+        with patch.object(data_export, "get_redis", AsyncMock(return_value=redis)), \
+             patch.object(data_export, "_storage", return_value=bucket):
+            first, second, remaining = asyncio.run(run())
+
+        assert (first, second) == (1, 0)
+        bucket.remove.assert_called_once_with(["user-1/old.zip"])
+        assert remaining == ["user-1/new.zip"]
+
+    def test_prune_removes_expired_files(self, tmp_path):
+        """Expired jobs are dropped along with their spool file."""
+        from backend import data_export
+
+        path = tmp_path / "export.zip"
+        path.write_bytes(b"x")
+        job = data_export.ExportJob(id="old", user_id="user-1", format="zip", status="complete",
+                                    created_at=0, path=str(path))
+        data_export._jobs[job.id] = job
+
+        data_export._prune_jobs()
+
+        assert "old" not in data_export._jobs
+        assert not path.exists()
+
+
+@pytest.fixture
+def client():
+    """Test client for the conversations router with mocked auth."""
+    from backend.auth import get_current_user
+    from backend.routers.conversations import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def override_user():
+        return {"id": "user-1", "email": "u@example.com", "access_token": "mock-token"}
+
+    app.dependency_overrides[get_current_user] = override_user
+    return TestClient(app)
+
+
+class TestExportEndpoints:
+    """Tests for the export endpoints."""
+
+    def test_streams_export(self, client):
+        """Streams the requested format as an attachment."""
+        with patch("backend.database.get_supabase_with_auth", return_value=FakeClient(_data())):
+            response = client.get("/conversations/export/all?format=ndjson")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+        assert json.loads(response.text.splitlines()[-1])["section"] == "summary"
+
+    def test_job_status_hides_other_users(self, client):
+        """Jobs owned by other users are reported as not found."""
+        from backend import data_export
+
+        data_export._jobs["other"] = data_export.ExportJob(id="other", user_id="user-2", format="json")
+        try:
+            assert client.get("/conversations/export/jobs/other").status_code == 404
+        finally:
+            data_export._jobs.pop("other", None)
+
+    def test_download_requires_complete_job(self, client, tmp_path):
+        """Pending jobs return 409; complete jobs download the spooled file."""
+        from backend import data_export
+
+        path = tmp_path / "export.json"
+        path.write_text('{"ok": true}')
+        job = data_export.ExportJob(id="mine", user_id="user-1", format="json", status="running")
+        data_export._jobs[job.id] = job
+        try:
+            assert client.get("/conversations/export/jobs/mine/download").status_code == 409
+
+            job.status, job.path = "complete", str(path)
+            response = client.get("/conversations/export/jobs/mine/download")
+            assert response.status_code == 200
+            assert response.json() == {"ok": True}
+        finally:
+            data_export._jobs.pop("mine", None)
+
+    def test_download_redirects_to_signed_url(self, client):
+        """Uploaded archives are downloaded through a signed storage URL."""
+        from backend import data_export
+
+        job = data_export.ExportJob(id="stored", user_id="user-1", format="zip", status="complete",
+                                    storage_path="user-1/stored.zip")
+        bucket = MagicMock()
+        bucket.create_signed_url.return_value = {"signedURL": "https://storage.example/signed"}
+        with patch.object(data_export, "get_export_job", AsyncMock(return_value=job)), \
+             patch.object(data_export, "_storage", return_value=bucket):
+            response = client.get("/conversations/export/jobs/stored/download", follow_redirects=False)
+
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://storage.example/signed"
+        assert bucket.create_signed_url.call_args[0][0] == "user-1/stored.zip"
@@ -0,0 +1,111 @@
+"""
+Tests for database.py - user-scoped Supabase clients
+
+Tests cover:
+- One shared connection pool across all user tokens
+- Per-request Authorization headers carrying each user's JWT, even when
+  clients for several tokens are built before any of them runs a query
+- No full supabase Client construction for table/rpc access
+- Closing the shared pool
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def database():
+    from backend import database
+    database.close_auth_http_client()
+    with patch.object(database, "SUPABASE_URL", "https://example.supabase.co"), \
+         patch.object(database, "SUPABASE_KEY", "anon-key"):
+        yield database
+    database.close_auth_http_client()
+
+
+@pytest.fixture
+def seen(database):
+    """Route the shared pool to a mock transport and record every request."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=[])
+
+    with patch.object(database, "_auth_transport", httpx.MockTransport(handler)):
+        yield requests
+
+
+class TestAuthenticatedClient:
+    """Tests for get_supabase_with_auth."""
+
+    def test_shares_connection_pool(self, database):
+        """Clients for different tokens share one transport, not one session."""
+        a = database.get_supabase_with_auth("token-a")
+        b = database.get_supabase_with_auth("token-b")
+        pool = database.get_auth_transport()
+
+        assert a.postgrest.session is not b.postgrest.session
+        assert a.postgrest.session._transport is pool
+        assert b.postgrest.session._transport is pool
+        assert a.schema("other").session._transport is pool
+
+    def test_token_sent_per_request(self, database, seen):
+        """Each request carries its own user's JWT and the anon key."""
+        database.get_supabase_with_auth("token-a").table("companies").select("id").execute()
+        database.get_supabase_with_auth("token-b").rpc("get_things", {"x": 1}).execute()
+
+        assert [r.headers["authorization"] for r in seen] == ["Bearer token-a", "Bearer token-b"]
+        assert all(r.headers["apikey"] == "anon-key" for r in seen)
+        assert str(seen[0].url).startswith("https://example.supabase.co/rest/v1/companies")
+        assert str(seen[1].url) == "https://example.supabase.co/rest/v1/rpc/get_things"
+
+    def test_interleaved_clients_keep_their_token(self, database, seen):
+        """Building a second user's client never changes the first user's JWT."""
+        a = database.get_supabase_with_auth("token-a")
+        b = database.get_supabase_with_auth("token-b")
+        query_a = a.table("companies").select("id")
+        query_b = b.table("companies").select("id")
+        a.schema("other").table("companies").select("id")
+
+        query_a.execute()
+        query_b.execute()
+        a.rpc("get_things").execute()
+
+        assert [r.headers["authorization"] for r in seen] == [
+            "Bearer token-a", "Bearer token-b", "Bearer token-a",
+        ]
+        assert all(r.headers.get("accept-profile", "public") == "public" for r in seen)
+
+    def test_no_full_client_for_queries(self, database):
+        """Table and RPC access never builds a full supabase Client."""
+        with patch.object(database, "create_client") as mock_create:
+            client = database.get_supabase_with_auth("token-a")
+            client.table("companies")
+            client.rpc("get_things")
+
+        mock_create.assert_not_called()
+
+    def test_close_pool(self, database):
+        """Closing the pool makes the next client open a fresh one."""
+        first = database.get_auth_transport()
+        database.close_auth_http_client()
+
+        assert database.get_auth_transport() is not first
+
+    def test_closing_a_session_keeps_the_pool(self, database):
+        """A user's session closing does not close the shared transport."""
+        pool = database.get_auth_transport()
+        with patch.object(httpx.HTTPTransport, "close") as mock_close:
+            database.get_auth_http_client({"apikey": "anon-key"}).close()
+
+        mock_close.assert_not_called()
+        assert database.get_auth_transport() is pool
+
+    def test_requires_configuration(self, database):
+        """Missing Supabase settings raise."""
+        with patch.object(database, "SUPABASE_KEY", None):
+            with pytest.raises(ValueError):
+                database.get_supabase_with_auth("token-a")
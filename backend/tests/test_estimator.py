@@ -0,0 +1,187 @@
+"""
+Tests for estimator.py - pre-flight council cost and latency estimator
+
+Tests cover:
+- Prompt token counting from system prompt, history and query
+- Completion tokens from telemetry (per stage, other-stage fallback, max_tokens cap)
+- Defaults when telemetry is thin
+- Stage chaining (stage 2/3 prompts include earlier output), pricing and ETA
+- Remaining budget and the reject/downgrade pre-flight decision
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+MAX_TOKENS = {"stage1": 8192, "stage2": 2048, "stage3": 8192}
+
+
+def _store_with(model, stage, completion_tokens, samples=10, ttft_ms=1000, latency_ms=11000):
+    from backend.telemetry import TelemetryStore
+
+    store = TelemetryStore(window_seconds=3600, slots=12)
+    for _ in range(samples):
+        store.record(model, stage=stage, ttft_ms=ttft_ms, latency_ms=latency_ms,
+                     completion_tokens=completion_tokens)
+    return store
+
+
+class TestTokenCounting:
+    """Tests for prompt token estimation."""
+
+    def test_prompt_includes_system_history_and_query(self):
+        """Each message adds its content plus per-message overhead."""
+        from backend.estimator import (
+            MESSAGE_OVERHEAD_TOKENS, QUERY_WRAPPER_TOKENS, estimate_prompt_tokens,
+        )
+
+        history = [{"role": "user", "content": "a" * 400}, {"role": "assistant", "content": "b" * 800}]
+
+        tokens = estimate_prompt_tokens("s" * 4000, history, "q" * 40)
+
+        assert tokens == 1000 + 100 + 200 + 10 + QUERY_WRAPPER_TOKENS + 4 * MESSAGE_OVERHEAD_TOKENS
+
+
+class TestModelEstimates:
+    """Tests for per-model completion, cost and ETA."""
+
+    def test_uses_stage_telemetry(self):
+        """Mean completion length, p50 TTFT and throughput drive the estimate."""
+        from backend.estimator import estimate_council
+
+        # 1000 tokens over (11000 - 1000) ms = 100 tok/s
+        store = _store_with("openai/gpt-4o", "stage1", 1000)
+
+        estimate = estimate_council(None, None, "hi", {"stage1": ["openai/gpt-4o"]}, MAX_TOKENS, store=store)
+        model = estimate.stages[0].models[0]
+
+        assert model.source == "telemetry"
+        assert model.completion_tokens == 1000
+        # ~1s TTFT plus ~10s generation, within histogram bucket resolution
+        assert 10_500 <= model.eta_ms <= 13_000
+
+    def test_falls_back_to_other_stage_then_default(self):
+        """Other-stage telemetry beats defaults; too few samples means defaults."""
+        from backend.estimator import DEFAULT_COMPLETION_RATIO, estimate_council
+
+        store = _store_with("openai/gpt-4o", "stage3", 700)
+        for _ in range(2):
+            store.record("x-ai/grok-4", stage="stage1", latency_ms=1000, completion_tokens=50)
+
+        estimate = estimate_council(None, None, "hi", {"stage1": ["openai/gpt-4o", "x-ai/grok-4"]},
+                                    MAX_TOKENS, store=store)
+        gpt, grok = estimate.stages[0].models
+
+        assert (gpt.source, gpt.completion_tokens) == ("telemetry", 700)
+        assert grok.source == "default"
+        assert grok.completion_tokens == int(8192 * DEFAULT_COMPLETION_RATIO)
+
+    def test_completion_capped_at_max_tokens(self):
+        """A model can't be predicted to write more than max_tokens."""
+        from backend.estimator import estimate_council
+
+        store = _store_with("openai/gpt-4o", "stage2", 6000)
+
+        estimate = estimate_council(None, None, "hi", {"stage2": ["openai/gpt-4o"]}, MAX_TOKENS, store=store)
+
+        assert estimate.stages[1].models[0].completion_tokens == 2048
+
+    def test_cost_uses_model_pricing(self):
+        """Prompt and completion tokens are priced per 1M tokens, in cents."""
+        from backend.estimator import estimate_council, estimate_prompt_tokens
+
+        store = _store_with("openai/gpt-4o-mini", "stage1", 1000)
+        query = "q" * 4000
+
+        estimate = estimate_council(None, None, query, {"stage1": ["openai/gpt-4o-mini"]},
+                                    MAX_TOKENS, store=store)
+
+        prompt = estimate_prompt_tokens(None, None, query)
+        # gpt-4o-mini: $0.15 in / $0.60 out per 1M tokens
+        expected = (prompt * 0.15 + 1000 * 0.60) / 1_000_000 * 100
+        assert estimate.cost_cents == pytest.approx(expected)
+
+
+class TestCouncilEstimate:
+    """Tests for stage chaining and totals."""
+
+    def test_later_stages_include_earlier_output(self):
+        """Stage 2 reads every stage 1 response; stage 3 also reads the rankings."""
+        from backend.estimator import CHAIRMAN_PROMPT_TOKENS, RANKING_PROMPT_TOKENS, estimate_council
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore()
+        stage_models = {
+            "stage1": ["m/a", "m/b"],
+            "stage2": ["m/r"],
+            "stage3": ["m/chair", "m/backup-chair"],
+        }
+        history = [{"role": "user", "content": "h" * 400}]
+
+        estimate = estimate_council("s" * 400, history, "q" * 40, stage_models, MAX_TOKENS, store=store)
+        stage1, stage2, stage3 = estimate.stages
+
+        assert stage2.models[0].prompt_tokens == 100 + 10 + stage1.completion_tokens + RANKING_PROMPT_TOKENS
+        assert stage3.models[0].prompt_tokens == (
+            100 + 100 + 10 + stage1.completion_tokens + stage2.completion_tokens + CHAIRMAN_PROMPT_TOKENS
+        )
+        # Only the primary chairman runs
+        assert [m.model for m in stage3.models] == ["m/chair"]
+        assert estimate.eta_ms == pytest.approx(stage1.eta_ms + stage2.eta_ms + stage3.eta_ms)
+
+    def test_to_dict_totals(self):
+        """Serialized totals add up across stages."""
+        from backend.estimator import estimate_council
+        from backend.telemetry import TelemetryStore
+
+        estimate = estimate_council(None, None, "hi", {"stage1": ["m/a"], "stage3": ["m/c"]},
+                                    MAX_TOKENS, store=TelemetryStore())
+        data = estimate.to_dict()
+
+        assert [s["stage"] for s in data["stages"]] == ["stage1", "stage2", "stage3"]
+        assert data["completion_tokens"] == sum(s["completion_tokens"] for s in data["stages"])
+        assert data["stages"][0]["models"][0]["source"] == "default"
+
+
+class TestBudget:
+    """Tests for remaining budget and the pre-flight decision."""
+
+    def test_remaining_budget_cents(self):
+        """Remaining budget comes from budget_monthly; no limit means None."""
+        from backend.estimator import remaining_budget_cents
+
+        rate_check = {"details": {"budget_monthly": {"current": 9_900, "limit": 10_000}}}
+
+        assert remaining_budget_cents(rate_check) == 100
+        assert remaining_budget_cents({"details": {"budget_monthly": {"current": 12_000, "limit": 10_000}}}) == 0
+        assert remaining_budget_cents({"details": {}}) is None
+        assert remaining_budget_cents(None) is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("enforcement,costs,action,modifier", [
+        ("reject", [150.0], "reject", None),
+        ("reject", [50.0], "allow", None),
+        ("downgrade", [150.0, 80.0], "downgrade", "concise"),
+        ("downgrade", [150.0, 120.0], "reject", None),
+    ])
+    async def test_preflight_decision(self, enforcement, costs, action, modifier):
+        """Over-budget sessions are rejected, or retried with the concise modifier."""
+        from backend.routers import conversations
+        from backend.routers.conversations import SendMessageRequest, _preflight_budget_check
+
+        estimates = [MagicMock(cost_cents=cost, **{"to_dict.return_value": {"cost_cents": cost}}) for cost in costs]
+        estimate_fn = AsyncMock(side_effect=estimates)
+        rate_check = {"details": {"budget_monthly": {"current": 9_900, "limit": 10_000}}}
+
+        with patch.object(conversations, "COUNCIL_BUDGET_ENFORCEMENT", enforcement), \
+             patch.object(conversations, "_estimate_send_message", estimate_fn):
+            decision = await _preflight_budget_check(
+                SendMessageRequest(content="hi"), "hi", [], "co-1", None, rate_check
+            )
+
+        assert decision["action"] == action
+        assert decision["modifier"] == modifier
+        assert decision["remaining_cents"] == 100
+        assert estimate_fn.await_count == len(costs)
+        if len(costs) > 1:
+            assert estimate_fn.await_args.kwargs["modifier"] == "concise"
@@ -0,0 +1,142 @@
+"""
+Tests for tests/load/fake_openrouter.py - local OpenRouter stand-in
+
+Tests cover:
+- Profile resolution (exact, glob, default)
+- Streaming through the real query_model_stream client path
+- Truncation, 429 and auth responses
+- Deterministic embeddings and stats
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+
+def _config(**overrides):
+    from backend.tests.load.fake_openrouter import DEFAULT_PROFILE
+
+    default = {
+        **DEFAULT_PROFILE,
+        "ttft_ms": {"p50": 0, "p95": 0},
+        "tokens_per_second": 100000,
+        "output_tokens": {"min": 20, "max": 40},
+        "embedding_latency_ms": {"p50": 0, "p95": 0},
+        "embedding_dimensions": 8,
+        **overrides,
+    }
+    return {"default": default, "models": {"anthropic/*": {"tokens_per_second": 5}}}
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake")
+
+
+class TestProfiles:
+    """Tests for profile resolution and latency sampling."""
+
+    def test_glob_and_default_resolution(self):
+        """Glob entries override default; unknown models get default."""
+        from backend.tests.load.fake_openrouter import resolve_profile
+
+        config = _config()
+        assert resolve_profile(config, "anthropic/claude-opus-4.5")["tokens_per_second"] == 5
+        assert resolve_profile(config, "openai/gpt-4o")["tokens_per_second"] == 100000
+
+    def test_bundled_profile_file_loads(self):
+        """The shipped openrouter_profiles.json is valid and complete."""
+        from backend.tests.load.fake_openrouter import load_config, resolve_profile, DEFAULT_PROFILE
+
+        profile = resolve_profile(load_config(), "google/gemini-3-pro-preview")
+        assert set(DEFAULT_PROFILE) <= set(profile)
+        assert profile["ttft_ms"]["p50"] == 4000
+
+    def test_latency_percentiles(self):
+        """Log-normal samples hit the configured median and p95."""
+        import random
+        from backend.tests.load.fake_openrouter import sample_latency_ms
+
+        rng = random.Random(1)
+        samples = sorted(sample_latency_ms(rng, {"p50": 100, "p95": 400}) for _ in range(4000))
+        assert 90 < samples[2000] < 110
+        assert 340 < samples[3800] < 460
+
+
+class TestChatCompletions:
+    """Tests for /chat/completions."""
+
+    @pytest.mark.asyncio
+    async def test_real_stream_client_path(self):
+        """query_model_stream parses the stand-in's SSE, including usage."""
+        from backend import openrouter
+        from backend.tests.load.fake_openrouter import create_app
+
+        app = create_app(_config(), seed=7)
+        async with _client(app) as client:
+            with patch.object(openrouter, "MOCK_LLM", False), \
+                 patch.object(openrouter, "OPENROUTER_API_URL", "http://fake/chat/completions"), \
+                 patch.object(openrouter, "get_http_client", return_value=client):
+                chunks = [c async for c in openrouter.query_model_stream(
+                    "openai/gpt-4o", [{"role": "user", "content": "Should we expand?"}]
+                )]
+
+        usage = [c for c in chunks if c.startswith("[USAGE:")]
+        assert len(usage) == 1
+        assert "".join(c for c in chunks if not c.startswith("["))
+        stats = app.state.server.get_stats()
+        assert stats["by_model"]["openai/gpt-4o"] == {"stop": 1}
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_max_tokens_truncates(self):
+        """A max_tokens below the sampled length ends with finish_reason length."""
+        from backend.tests.load.fake_openrouter import create_app
+
+        async with _client(create_app(_config(), seed=1)) as client:
+            response = await client.post(
+                "/api/v1/chat/completions",
+                headers={"Authorization": "Bearer test"},
+                json={"model": "openai/gpt-4o", "messages": [], "max_tokens": 5},
+            )
+
+        data = response.json()
+        assert data["choices"][0]["finish_reason"] == "length"
+        assert data["usage"]["completion_tokens"] == 5
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_and_auth(self):
+        """Configured 429s carry Retry-After; missing auth is 401."""
+        from backend.tests.load.fake_openrouter import create_app
+
+        app = create_app(_config(rate_limit_rate=1.0, retry_after_seconds=3))
+        async with _client(app) as client:
+            limited = await client.post(
+                "/chat/completions", headers={"Authorization": "Bearer test"},
+                json={"model": "x-ai/grok-4", "messages": []},
+            )
+            unauthorized = await client.post("/chat/completions", json={"model": "x-ai/grok-4"})
+
+        assert limited.status_code == 429
+        assert limited.headers["retry-after"] == "3"
+        assert unauthorized.status_code == 401
+
+
+class TestEmbeddings:
+    """Tests for /embeddings."""
+
+    @pytest.mark.asyncio
+    async def test_embeddings_are_deterministic_unit_vectors(self):
+        """Same text gives the same vector of the requested size."""
+        from backend.tests.load.fake_openrouter import create_app
+
+        async with _client(create_app(_config())) as client:
+            response = await client.post(
+                "/embeddings", headers={"Authorization": "Bearer test"},
+                json={"model": "openai/text-embedding-3-small", "input": ["a", "a", "b"]},
+            )
+
+        vectors = [item["embedding"] for item in response.json()["data"]]
+        assert len(vectors[0]) == 8
+        assert vectors[0] == vectors[1] != vectors[2]
+        assert abs(sum(v * v for v in vectors[0]) - 1.0) < 1e-3
@@ -0,0 +1,217 @@
+"""
+Tests for history.py - conversation history compaction
+
+Tests cover:
+- Summary plus uncovered turns, newest first, within the token budget
+- Newest turn always kept (truncated if needed)
+- Lagging summaries and absolute message indices with truncated storage
+- Choosing which turns to fold into the summary
+- Background summary update (storage, model call, failure handling, single-flight,
+  superseded writes from other workers)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+def _turn(n, synthesis_chars=40):
+    return [
+        {"role": "user", "content": f"question {n}"},
+        {"role": "assistant", "stage1": [], "stage2": [], "stage3": {"response": f"answer {n} " + "x" * synthesis_chars}},
+    ]
+
+
+def _conversation(turns, summary=None, summarized=0, **extra):
+    messages = [m for n in range(turns) for m in _turn(n)]
+    return {"messages": messages, "message_count": len(messages),
+            "history_summary": summary, "history_summary_messages": summarized, **extra}
+
+
+def _contents(history):
+    return [m["content"] for m in history]
+
+
+class TestBuildCompactedHistory:
+    """Tests for build_compacted_history."""
+
+    def test_summary_replaces_covered_turns(self):
+        """Covered turns are replaced by the summary; the rest stay verbatim."""
+        from backend.history import SUMMARY_HEADER, build_compacted_history
+
+        conversation = _conversation(4, summary="Earlier: pricing plan.", summarized=4)
+
+        history, stats = build_compacted_history(conversation)
+
+        assert history[0] == {"role": "assistant", "content": SUMMARY_HEADER + "Earlier: pricing plan."}
+        assert [c for c in _contents(history[1:]) if c.startswith("question")] == ["question 2", "question 3"]
+        assert stats["history_verbatim_turns"] == 2
+        assert stats["history_summarized_turns"] == 2
+        assert stats["history_omitted_turns"] == 0
+        assert stats["history_tokens"] > 0
+
+    def test_budget_drops_oldest_turns(self):
+        """Turns that don't fit the budget are omitted, oldest first."""
+        from backend.history import build_compacted_history, count_history_tokens, render_history_message
+
+        conversation = _conversation(5)
+        one_turn = count_history_tokens([render_history_message(m) for m in _turn(0)])
+
+        history, stats = build_compacted_history(conversation, token_budget=one_turn * 2 + 5)
+
+        assert "question 3" in _contents(history)[0]
+        assert stats["history_verbatim_turns"] == 2
+        assert stats["history_omitted_turns"] == 3
+        assert stats["history_tokens"] <= one_turn * 2 + 5
+
+    def test_newest_turn_is_truncated_to_fit(self):
+        """A single oversized turn is trimmed rather than dropped."""
+        from backend.history import build_compacted_history
+
+        conversation = {"messages": _turn(0, synthesis_chars=40_000), "message_count": 2}
+
+        history, stats = build_compacted_history(conversation, token_budget=500)
+
+        assert stats["history_verbatim_turns"] == 1
+        assert history[-1]["content"].endswith("... [truncated]")
+        assert stats["history_tokens"] <= 500 + 10
+
+    def test_lagging_summary_keeps_uncovered_turns(self):
+        """Turns the summary hasn't reached yet are still sent verbatim."""
+        from backend.history import build_compacted_history
+
+        conversation = _conversation(5, summary="Turns 0-1.", summarized=4)
+
+        history, stats = build_compacted_history(conversation)
+
+        assert stats["history_verbatim_turns"] == 3
+        assert "question 2" in _contents(history)
+
+    def test_indices_are_absolute_when_storage_truncates(self):
+        """message_count aligns the summary with a truncated message list."""
+        from backend.history import build_compacted_history
+
+        conversation = _conversation(3, summary="Old stuff.", summarized=8)
+        conversation["message_count"] = 10  # Storage only returned the last 6 messages
+
+        history, stats = build_compacted_history(conversation)
+
+        # Absolute indices 4-9: turn at 4-5 and 6-7 are covered, 8-9 is not
+        assert stats["history_summarized_turns"] == 2
+        assert [c for c in _contents(history) if c.startswith("question")] == ["question 2"]
+
+    def test_disabled_sends_everything(self):
+        """With compaction off the summary is ignored and all turns are sent."""
+        from backend import history as history_module
+
+        conversation = _conversation(4, summary="ignored", summarized=6)
+
+        with patch.object(history_module, "HISTORY_COMPACTION_ENABLED", False):
+            history, stats = history_module.build_compacted_history(conversation)
+
+        assert len(history) == 8
+        assert stats["history_verbatim_turns"] == 4
+
+
+class TestTurnsToFold:
+    """Tests for choosing turns to summarize."""
+
+    def test_folds_all_but_verbatim_window(self):
+        """Everything older than the last K turns and not yet covered is folded."""
+        from backend.history import _turns_to_fold
+
+        turns, covered = _turns_to_fold(_conversation(5, summary="s", summarized=2), verbatim_turns=2)
+
+        assert [turn[0][1]["content"] for turn in turns] == ["question 1", "question 2"]
+        assert covered == 6
+
+    def test_nothing_to_fold(self):
+        """Short conversations keep every turn verbatim."""
+        from backend.history import _turns_to_fold
+
+        assert _turns_to_fold(_conversation(2), verbatim_turns=2) == ([], 0)
+
+
+class TestUpdateHistorySummary:
+    """Tests for the background summary update."""
+
+    @pytest.mark.asyncio
+    async def test_update_stores_summary_and_usage(self):
+        """The summarizer sees the old summary and new turns; results are persisted."""
+        from backend import history as history_module
+
+        storage = MagicMock()
+        storage.get_conversation.return_value = _conversation(4, summary="Old summary.", summarized=2)
+        query_model = AsyncMock(return_value={"content": " New summary. ", "usage": {"total_tokens": 50}})
+        save_usage = AsyncMock(return_value=True)
+
+        with patch("backend.storage", storage), \
+             patch("backend.openrouter.query_model", query_model), \
+             patch("backend.model_registry.get_primary_model", AsyncMock(return_value="google/gemini-2.5-flash")), \
+             patch("backend.routers.company.utils.save_internal_llm_usage", save_usage):
+            updated = await history_module.update_history_summary("conv-1", "jwt", "co-1")
+
+        assert updated
+        prompt = query_model.await_args.args[1][0]["content"]
+        assert "Old summary." in prompt
+        assert "question 1" in prompt and "question 0" not in prompt and "question 2" not in prompt
+        storage.update_conversation_history_summary.assert_called_once_with(
+            "conv-1", "New summary.", 4, access_token="jwt"
+        )
+        assert save_usage.await_args.kwargs["operation_type"] == "history_summary"
+
+    @pytest.mark.asyncio
+    async def test_failed_model_call_keeps_old_summary(self):
+        """A failed summarizer call never raises and writes nothing."""
+        from backend import history as history_module
+
+        storage = MagicMock()
+        storage.get_conversation.return_value = _conversation(4)
+
+        with patch("backend.storage", storage), \
+             patch("backend.openrouter.query_model", AsyncMock(side_effect=RuntimeError("timeout"))), \
+             patch("backend.model_registry.get_primary_model", AsyncMock(return_value="m/a")):
+            assert await history_module.update_history_summary("conv-1") is False
+
+        storage.update_conversation_history_summary.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_superseded_summary_is_not_reported(self):
+        """A write skipped because another worker stored a newer summary returns False."""
+        from backend import history as history_module
+
+        storage = MagicMock()
+        storage.get_conversation.return_value = _conversation(4)
+        storage.update_conversation_history_summary.return_value = False
+        save_usage = AsyncMock(return_value=True)
+
+        with patch("backend.storage", storage), \
+             patch("backend.openrouter.query_model", AsyncMock(return_value={"content": "S", "usage": {"total_tokens": 5}})), \
+             patch("backend.model_registry.get_primary_model", AsyncMock(return_value="m/a")), \
+             patch("backend.routers.company.utils.save_internal_llm_usage", save_usage):
+            assert await history_module.update_history_summary("conv-1", "jwt", "co-1") is False
+
+        storage.update_conversation_history_summary.assert_called_once()
+        save_usage.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_schedule_is_single_flight(self):
+        """Only one update runs per conversation at a time."""
+        from backend import history as history_module
+
+        release = asyncio.Event()
+
+        async def slow_update(*args):
+            await release.wait()
+            return True
+
+        with patch.object(history_module, "update_history_summary", side_effect=slow_update) as update:
+            first = history_module.schedule_summary_update("conv-1")
+            second = history_module.schedule_summary_update("conv-1")
+            release.set()
+            await first
+
+        assert first is second
+        assert update.call_count == 1
+        assert "conv-1" not in history_module._pending_updates
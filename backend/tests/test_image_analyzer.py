@@ -0,0 +1,197 @@
+"""
+Tests for image_analyzer.py - concurrent multi-image analysis
+
+Tests cover:
+- Bounded parallel vision requests with the model resolved once
+- Progress events per image in completion order
+- Failed images reported without failing the message
+- Empty answers and unreadable images counted as failures without hanging
+- Batched multimodal requests with per-image retry of uncovered images
+- Per-image requests for models without multi-image support
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+
+def _images(count):
+    return [{"data": b"png", "type": "image/png", "name": f"shot{i}.png"} for i in range(1, count + 1)]
+
+
+class _FakeVision:
+    """Stands in for _request_vision, tracking concurrency and request shapes."""
+
+    def __init__(self, reply=None, delays=None):
+        self.reply = reply or (lambda content: "A screenshot")
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = []
+
+    async def __call__(self, model, content):
+        self.requests.append((model, content))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            prompt = content[0]["text"]
+            await asyncio.sleep(next((d for key, d in self.delays.items() if key in prompt), 0.01))
+            return self.reply(content)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def analyzer():
+    from backend import image_analyzer
+
+    model = AsyncMock(return_value="openai/gpt-4o")
+    with patch("backend.openrouter.MOCK_LLM", False), \
+         patch.object(image_analyzer, "_get_vision_model", model):
+        yield image_analyzer, model
+
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+
+class TestConcurrentAnalysis:
+    """Tests for stream_image_analysis without batching."""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self, analyzer):
+        """At most `concurrency` requests run at once and the model is resolved once."""
+        ia, model = analyzer
+        vision = _FakeVision()
+
+        with patch.object(ia, "_request_vision", vision):
+            events = await _collect(ia.stream_image_analysis(_images(5), "What changed?", concurrency=2, batch=False))
+
+        assert len(vision.requests) == 5
+        assert vision.peak == 2
+        model.assert_awaited_once()
+        assert [e["type"] for e in events] == ["image_analysis_progress"] * 5 + ["image_analysis_result"]
+        assert [e["completed"] for e in events[:5]] == [1, 2, 3, 4, 5]
+        assert events[-1]["analyzed"] == 5
+
+    @pytest.mark.asyncio
+    async def test_progress_in_completion_order(self, analyzer):
+        """A slow first image doesn't hold back the others; the combined text keeps attachment order."""
+        ia, _ = analyzer
+        vision = _FakeVision(reply=lambda content: f"Described {content[0]['text'].split('(Image ')[1][0]}",
+                             delays={"(Image 1)": 0.1})
+
+        with patch.object(ia, "_request_vision", vision):
+            events = await _collect(ia.stream_image_analysis(_images(3), "q", concurrency=3, batch=False))
+
+        assert [e["index"] for e in events[:3]] == [2, 3, 1]
+        assert events[0]["name"] == "shot2.png"
+        analysis = events[-1]["analysis"]
+        assert analysis.index("[Image 1: shot1.png]") < analysis.index("[Image 2: shot2.png]")
+        assert "Described 1" in analysis
+
+    @pytest.mark.asyncio
+    async def test_failed_image(self, analyzer):
+        """A failing request marks that image as unanalyzed."""
+        ia, _ = analyzer
+
+        def reply(content):
+            if "(Image 2)" in content[0]["text"]:
+                raise RuntimeError("upstream 500")
+            return "Fine"
+
+        with patch.object(ia, "_request_vision", _FakeVision(reply=reply)):
+            events = await _collect(ia.stream_image_analysis(_images(2), "q", batch=False))
+
+        failed = next(e for e in events if e.get("index") == 2)
+        assert failed["success"] is False
+        assert events[-1]["failed"] == 1
+        assert "(Unable to analyze this image)" in events[-1]["analysis"]
+
+    @pytest.mark.asyncio
+    async def test_empty_answer_is_a_failure(self, analyzer):
+        """Progress, totals and the combined text agree on empty descriptions."""
+        ia, _ = analyzer
+
+        reply = lambda content: "" if "(Image 1)" in content[0]["text"] else "Fine"
+        with patch.object(ia, "_request_vision", _FakeVision(reply=reply)):
+            events = await _collect(ia.stream_image_analysis(_images(2), "q", batch=False))
+
+        first = next(e for e in events if e.get("index") == 1)
+        assert first["success"] is False
+        assert events[-1]["analyzed"] == 1
+        assert events[-1]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_analyze_images_returns_combined_text(self, analyzer):
+        """analyze_images keeps returning the combined context."""
+        ia, _ = analyzer
+
+        with patch.object(ia, "_request_vision", _FakeVision()):
+            analysis = await ia.analyze_images(_images(2), "q")
+
+        assert analysis.count("A screenshot") == 2
+        assert "The user has attached 2 image(s)" in analysis
+        assert await ia.analyze_images([], "q") == ""
+
+
+class TestBatchedAnalysis:
+    """Tests for multi-image requests."""
+
+    @pytest.mark.asyncio
+    async def test_batch_with_retry(self, analyzer):
+        """Images go in one request; any the answer skips are retried alone."""
+        ia, _ = analyzer
+
+        def reply(content):
+            if len(content) > 2:
+                return "### Image 1\nA chart\n\n### Image 3\nA table"
+            return "A form"
+
+        vision = _FakeVision(reply=reply)
+        with patch.object(ia, "_request_vision", vision), \
+             patch.object(ia, "IMAGE_ANALYSIS_BATCH_SIZE", 4):
+            events = await _collect(ia.stream_image_analysis(_images(3), "q", batch=True))
+
+        assert len(vision.requests) == 2
+        batch_content = vision.requests[0][1]
+        assert sum(1 for part in batch_content if part["type"] == "image_url") == 3
+        descriptions = {e["index"]: e["description"] for e in events[:3]}
+        assert descriptions == {1: "A chart", 2: "A form", 3: "A table"}
+
+    @pytest.mark.asyncio
+    async def test_unreadable_image_falls_back_to_single_requests(self, analyzer):
+        """An image that can't be encoded doesn't hang the stream; the others are still analyzed."""
+        ia, _ = analyzer
+        images = _images(3)
+        images[1]["data"] = None
+
+        vision = _FakeVision()
+        with patch.object(ia, "_request_vision", vision), \
+             patch.object(ia, "IMAGE_ANALYSIS_BATCH_SIZE", 4):
+            events = await asyncio.wait_for(_collect(ia.stream_image_analysis(images, "q", batch=True)), 5)
+
+        assert events[-1]["analyzed"] == 2
+        assert events[-1]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_single_image_models_not_batched(self, analyzer):
+        """Models without multi-image support get one request per image."""
+        ia, model = analyzer
+        model.return_value = "some/vision-model"
+        vision = _FakeVision()
+
+        with patch.object(ia, "_request_vision", vision):
+            await _collect(ia.stream_image_analysis(_images(3), "q", batch=True))
+
+        assert len(vision.requests) == 3
+        assert all(m == "some/vision-model" for m, _ in vision.requests)
+
+    def test_split_batch_response(self):
+        """Headings in common markdown variants are recognised."""
+        from backend.image_analyzer import _split_batch_response
+
+        content = "Intro\n## **Image 2: logo**\nA logo\n---\n### image 5\nIgnored\n#### Image 1\nA photo"
+
+        assert _split_batch_response(content, [1, 2]) == {2: "A logo", 1: "A photo"}
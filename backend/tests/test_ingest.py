@@ -0,0 +1,261 @@
+"""
+Tests for ingest.py - batched analytics ingestion
+
+Tests cover:
+- Multi-row inserts per table, split by batch size
+- Size-triggered flushes
+- Failed flushes keeping rows for retry with backoff
+- Permanently bad rows isolated by bisection and rejected
+- Spool file rewrite and recovery of orphaned spools
+- Buffer cap dropping the oldest rows
+- Usage helpers queueing rows instead of inserting inline
+"""
+
+import asyncio
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def _client():
+    client = MagicMock()
+    client.inserted = []
+
+    def table(name):
+        builder = MagicMock()
+
+        def insert(rows, **kwargs):
+            client.inserted.append((name, rows, kwargs))
+            return builder
+        builder.insert.side_effect = insert
+        builder.execute.side_effect = lambda: client.execute_hook()
+        return builder
+
+    client.table.side_effect = table
+    client.execute_hook = MagicMock(return_value=MagicMock(data=[]))
+    return client
+
+
+def _ingester(client, tmp_path=None, **kwargs):
+    from backend.ingest import BatchIngester
+    return BatchIngester(spool_dir=str(tmp_path) if tmp_path else None,
+                         client_factory=lambda: client, **kwargs)
+
+
+class TestFlush:
+    """Tests for batching and flushing."""
+
+    def test_batches_per_table(self):
+        """Rows are grouped per table and split into batch_size inserts."""
+        client = _client()
+        ingester = _ingester(client, batch_size=2)
+
+        async def run():
+            for n in range(3):
+                ingester._append("usage_events", {"n": n})
+            ingester._append("activity_logs", {"title": "x"})
+            return await ingester.flush()
+
+        assert asyncio.run(run()) == 4
+        assert [(table, len(rows)) for table, rows, _ in client.inserted] == \
+            [("usage_events", 2), ("usage_events", 1), ("activity_logs", 1)]
+        assert client.inserted[0][2] == {"returning": "minimal", "default_to_null": False}
+        assert ingester.backlog() == 0
+        assert ingester.stats()["flushed_rows"] == 4
+
+    def test_size_triggered_flush(self):
+        """Reaching batch_size schedules a flush without waiting for the interval."""
+        client = _client()
+        ingester = _ingester(client, batch_size=2)
+
+        async def run():
+            ingester.enqueue("session_usage", {"n": 1})
+            ingester.enqueue("session_usage", {"n": 2})
+            await ingester._pending_flush
+
+        asyncio.run(run())
+        assert [len(rows) for _, rows, _ in client.inserted] == [2]
+
+    def test_failed_flush_is_retried(self):
+        """A failing insert keeps its rows in order and backs off."""
+        client = _client()
+        client.execute_hook.side_effect = [RuntimeError("db down"), MagicMock(data=[])]
+        ingester = _ingester(client)
+
+        async def run():
+            ingester._append("usage_events", {"n": 1})
+            ingester._append("usage_events", {"n": 2})
+            first = await ingester.flush()
+            skipped = await ingester.flush()
+            retried = await ingester.flush(force=True)
+            return first, skipped, retried
+
+        assert asyncio.run(run()) == (0, 0, 2)
+        assert client.inserted[-1][1] == [{"n": 1}, {"n": 2}]
+        assert ingester.stats()["failed_flushes"] == 1
+        assert ingester.stats()["retrying"] is False
+
+    def test_bad_row_is_rejected(self):
+        """A row refused on its own is isolated; the rest of its batch is written."""
+        from postgrest.exceptions import APIError
+
+        client = _client()
+        attempts = []
+
+        def execute():
+            rows = client.inserted[-1][1]
+            attempts.append(len(rows))
+            if any(row.get("bad") for row in rows):
+                raise APIError({"message": "violates foreign key constraint", "code": "23503"})
+            return MagicMock(data=[])
+        client.execute_hook.side_effect = execute
+        ingester = _ingester(client)
+
+        async def run():
+            for n in range(6):
+                ingester._append("usage_events", {"n": n, "bad": n == 2})
+            return await ingester.flush()
+
+        assert asyncio.run(run()) == 5
+        assert ingester.backlog() == 0
+        assert ingester.stats()["rejected_rows"] == 1
+        assert ingester.stats()["failed_flushes"] == 0
+        assert ingester.stats()["retrying"] is False
+        assert attempts[0] == 6 and len(attempts) < 12
+
+    def test_transient_errors(self):
+        """Network, 5xx and connection errors are retried; row errors are not."""
+        import httpx
+        from postgrest.exceptions import APIError
+        from backend.ingest import _is_transient
+
+        assert _is_transient(httpx.ConnectError("refused"))
+        assert _is_transient(RuntimeError("db down"))
+        assert _is_transient(APIError({"message": "Bad Gateway", "code": "502"}))
+        assert _is_transient(APIError({"message": "deadlock detected", "code": "40P01"}))
+        assert _is_transient(APIError({"message": "no connection", "code": "PGRST001"}))
+        assert not _is_transient(APIError({"message": "duplicate key", "code": "23505"}))
+        assert not _is_transient(APIError({"message": "unknown column", "code": "PGRST204"}))
+
+    def test_buffer_cap_drops_oldest(self):
+        """Beyond max_buffered rows the oldest are dropped and counted."""
+        ingester = _ingester(_client(), batch_size=1, max_buffered=2)
+
+        for n in range(4):
+            ingester._append("usage_events", {"n": n})
+
+        assert list(ingester._buffers["usage_events"]) == [{"n": 2}, {"n": 3}]
+        assert ingester.stats()["dropped_rows"] == 2
+
+
+class TestSpool:
+    """Tests for the on-disk spool."""
+
+    def test_spool_tracks_buffer(self, tmp_path):
+        """Enqueued rows are spooled; the spool is emptied by a successful flush."""
+        client = _client()
+        ingester = _ingester(client, tmp_path)
+
+        async def run():
+            ingester.enqueue("usage_events", {"n": 1})
+            with open(ingester.spool_path) as f:
+                spooled = [json.loads(line) for line in f]
+            await ingester.flush()
+            return spooled
+
+        assert asyncio.run(run()) == [{"table": "usage_events", "row": {"n": 1}}]
+        assert open(ingester.spool_path).read() == ""
+        ingester.close()
+
+    def test_recovers_orphaned_spool(self, tmp_path):
+        """Spools of dead processes are claimed, replayed and removed."""
+        orphan = tmp_path / "ingest-999999999.ndjson"
+        orphan.write_text(
+            json.dumps({"table": "activity_logs", "row": {"title": "a"}}) + "\n"
+            + json.dumps({"table": "unknown", "row": {}}) + "\n"
+            + '{"table": "usage_ev'  # Torn write
+        )
+        ingester = _ingester(_client(), tmp_path)
+
+        with patch("backend.ingest._pid_alive", return_value=False):
+            assert ingester.recover() == 1
+
+        assert list(ingester._buffers["activity_logs"]) == [{"title": "a"}]
+        assert not orphan.exists()
+        assert os.path.exists(ingester.spool_path)
+        ingester.close()
+
+    def test_skips_live_process_spool(self, tmp_path):
+        """Spools owned by running workers are left alone."""
+        live = tmp_path / "ingest-12345.ndjson"
+        live.write_text(json.dumps({"table": "activity_logs", "row": {}}) + "\n")
+        ingester = _ingester(_client(), tmp_path)
+
+        with patch("backend.ingest._pid_alive", return_value=True):
+            assert ingester.recover() == 0
+
+        assert live.exists()
+
+
+class TestUsageHelpers:
+    """Tests for the company usage helpers."""
+
+    def test_session_usage_is_queued(self):
+        """save_session_usage queues the row instead of inserting inline."""
+        from backend.routers.company import utils
+
+        async def run():
+            with patch("backend.openrouter.MOCK_LLM", False), \
+                 patch.object(utils, "ingest_row", return_value=True) as mock_ingest, \
+                 patch.object(utils, "get_service_client") as mock_client:
+                saved = await utils.save_session_usage("company-1", "conv-1", {
+                    "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15, "by_model": {},
+                })
+            return saved, mock_ingest, mock_client
+
+        saved, mock_ingest, mock_client = asyncio.run(run())
+        assert saved is True
+        table, row = mock_ingest.call_args.args
+        assert table == "session_usage"
+        assert row["conversation_id"] == "conv-1"
+        mock_client.assert_not_called()
+
+    def test_direct_insert_when_disabled(self):
+        """With ingestion disabled, ingest_row inserts the single row."""
+        from backend import ingest
+
+        client = _client()
+        with patch.object(ingest, "INGEST_ENABLED", False), \
+             patch.object(ingest, "_ingester", _ingester(client)):
+            assert asyncio.run(ingest.ingest_row("usage_events", {"n": 1})) is True
+
+        assert client.inserted == [("usage_events", {"n": 1}, {})]
+
+    def test_direct_insert_failure_reports_cause(self):
+        """A failed usage insert is logged with its error, as before batching."""
+        from backend import ingest
+        from backend.routers.company import utils
+
+        client = _client()
+        client.table = MagicMock(side_effect=RuntimeError("violates foreign key constraint"))
+
+        async def run():
+            with patch("backend.openrouter.MOCK_LLM", False), \
+                 patch.object(ingest, "INGEST_ENABLED", False), \
+                 patch.object(ingest, "_ingester", _ingester(client)), \
+                 patch.object(utils, "log_app_event") as mock_log:
+                saved = await utils.save_session_usage("company-1", "conv-1", {"total_tokens": 1, "by_model": {}})
+            return saved, mock_log
+
+        saved, mock_log = asyncio.run(run())
+        assert saved is False
+        event = mock_log.call_args
+        assert event.args[0] == "SESSION_USAGE_SAVE_FAILED"
+        assert "foreign key" in event.kwargs["error"]
+
+    def test_rejects_unknown_table(self):
+        """Only the analytics tables can be batch-ingested."""
+        with pytest.raises(ValueError):
+            _ingester(_client()).enqueue("messages", {})
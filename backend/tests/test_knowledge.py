@@ -5,6 +5,7 @@ These tests verify:
 1. UUID validation
 2. Pydantic model validation
 3. Knowledge entry field constraints
+4. Company snapshot version bumps on knowledge writes
 """
 
 import pytest
@@ -332,3 +333,58 @@ class TestKnowledgeValidation:
                 status=status
             )
             assert req.status == status
+
+
+# =============================================================================
+# Company Snapshot Invalidation Tests
+# =============================================================================
+
+ENTRY_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+@pytest.fixture
+def knowledge_client():
+    """Test client for the knowledge router with mocked auth."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from backend.auth import get_current_user
+    from backend.routers.knowledge import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def override_user():
+        return {"id": "user-1", "access_token": "mock-token"}
+
+    app.dependency_overrides[get_current_user] = override_user
+    return TestClient(app)
+
+
+class TestKnowledgeWritesBumpCompanyVersion:
+    """Knowledge writes invalidate the cached company overview."""
+
+    def test_update_and_delete_bump_entry_company(self, knowledge_client):
+        """The entry's company is looked up and its version bumped after the write."""
+        from unittest.mock import AsyncMock, patch
+
+        bump = AsyncMock()
+        with patch("backend.routers.knowledge.bump_company_version", bump), \
+             patch("backend.knowledge.get_knowledge_entry_company_id", return_value="co-1"), \
+             patch("backend.knowledge.update_knowledge_entry", return_value={"id": ENTRY_ID}), \
+             patch("backend.knowledge.deactivate_knowledge_entry", return_value=True):
+            assert knowledge_client.patch(f"/knowledge/knowledge/{ENTRY_ID}", json={"title": "New"}).status_code == 200
+            assert knowledge_client.delete(f"/knowledge/knowledge/{ENTRY_ID}").status_code == 200
+
+        assert [c.args for c in bump.await_args_list] == [("co-1",), ("co-1",)]
+
+    def test_failed_delete_does_not_bump(self, knowledge_client):
+        """Nothing is invalidated when the write didn't happen."""
+        from unittest.mock import AsyncMock, patch
+
+        bump = AsyncMock()
+        with patch("backend.routers.knowledge.bump_company_version", bump), \
+             patch("backend.knowledge.get_knowledge_entry_company_id", return_value="co-1"), \
+             patch("backend.knowledge.deactivate_knowledge_entry", return_value=False):
+            knowledge_client.delete(f"/knowledge/knowledge/{ENTRY_ID}")
+
+        bump.assert_not_awaited()
@@ -0,0 +1,120 @@
+"""
+Tests for leaderboard.py - model leaderboard rollups
+
+Tests cover:
+- Combining per-department rollup rows into sorted leaderboards
+- Time windows passed to the rollup RPC
+- Snapshot caching and invalidation when a session is recorded
+- Summary built from department rollups
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def _rollup(department, model, rank_sum, rank_count, sessions, wins):
+    return {"department": department, "model": model, "rank_sum": rank_sum,
+            "rank_count": rank_count, "sessions": sessions, "wins": wins}
+
+
+ROWS = [
+    _rollup("marketing", "model-a", 3.0, 3, 3, 2),
+    _rollup("marketing", "model-b", 6.0, 3, 3, 1),
+    _rollup("sales", "model-a", 4.0, 2, 2, 0),
+    _rollup("sales", "model-b", 2.0, 2, 2, 2),
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from backend import leaderboard
+    leaderboard.invalidate_leaderboard_cache()
+    yield
+    leaderboard.invalidate_leaderboard_cache()
+
+
+def _supabase(rows):
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=rows)
+    supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = MagicMock(data=[])
+    return supabase
+
+
+class TestRollupLeaderboard:
+    """Tests for leaderboard aggregation from rollups."""
+
+    def test_overall_combines_departments(self):
+        """Sums across departments, then sorts by average rank."""
+        from backend import leaderboard
+
+        with patch.object(leaderboard, "get_supabase_service", return_value=_supabase(ROWS)):
+            overall = leaderboard.get_overall_leaderboard()
+
+        assert overall == [
+            {"model": "model-a", "avg_rank": 1.4, "sessions": 5, "wins": 2, "win_rate": 40.0},
+            {"model": "model-b", "avg_rank": 1.6, "sessions": 5, "wins": 3, "win_rate": 60.0},
+        ]
+
+    def test_department_leaderboard(self):
+        """Filters rollups to one department."""
+        from backend import leaderboard
+
+        with patch.object(leaderboard, "get_supabase_service", return_value=_supabase(ROWS)):
+            sales = leaderboard.get_department_leaderboard("sales")
+
+        assert [m["model"] for m in sales] == ["model-b", "model-a"]
+        assert sales[0]["win_rate"] == 100.0
+
+    def test_windows(self):
+        """7d reads buckets from six days ago; all time passes no bound; unknown windows are rejected."""
+        from datetime import datetime, timedelta, timezone
+        from backend import leaderboard
+
+        supabase = _supabase(ROWS)
+        with patch.object(leaderboard, "get_supabase_service", return_value=supabase):
+            leaderboard.get_overall_leaderboard("7d")
+            leaderboard.get_overall_leaderboard("all")
+
+        expected = (datetime.now(timezone.utc).date() - timedelta(days=6)).isoformat()
+        assert supabase.rpc.call_args_list[0].args == ("get_model_leaderboard", {"p_since": expected})
+        assert supabase.rpc.call_args_list[1].args == ("get_model_leaderboard", {"p_since": None})
+        with pytest.raises(ValueError):
+            leaderboard.get_overall_leaderboard("90d")
+
+
+class TestSnapshotCache:
+    """Tests for the per-process snapshot cache."""
+
+    def test_cached_until_session_recorded(self):
+        """Reads hit the RPC once; recording a session invalidates the snapshot."""
+        from backend import leaderboard
+
+        supabase = _supabase(ROWS)
+        with patch.object(leaderboard, "get_supabase_service", return_value=supabase):
+            leaderboard.get_leaderboard_summary()
+            leaderboard.get_overall_leaderboard()
+            assert supabase.rpc.call_count == 1
+
+            leaderboard.record_session_rankings("conv-1", "sales", None, [
+                {"model": "model-a", "average_rank": 1.0, "rankings_count": 3},
+                {"model": "model-b", "average_rank": 2.0, "rankings_count": 3},
+            ])
+            leaderboard.get_overall_leaderboard()
+
+        assert supabase.rpc.call_count == 2
+        records = supabase.table.return_value.insert.call_args.args[0]
+        assert len({r["created_at"] for r in records}) == 1
+
+    def test_summary(self):
+        """Summary has the overall leader and per-department leaders."""
+        from backend import leaderboard
+
+        with patch.object(leaderboard, "get_supabase_service", return_value=_supabase(ROWS)):
+            summary = leaderboard.get_leaderboard_summary("30d")
+
+        assert summary["window"] == "30d"
+        assert summary["overall"]["leader"]["model"] == "model-a"
+        assert summary["overall"]["total_sessions"] == 5
+        assert summary["departments"]["marketing"]["leader"]["model"] == "model-a"
+        assert summary["departments"]["sales"]["sessions"] == 2
@@ -0,0 +1,158 @@
+"""
+Tests for log_pipeline.py - async, sampled logging
+
+Tests cover:
+- Sampling and per-event rate limits (WARNING/ERROR never dropped)
+- Only listed high-frequency events are rate limited (audit events never are)
+- Queue handler writes on a background thread and drops when full
+- Exceptions formatted on the listener thread as structured fields
+- JSON formatter handles non-serializable extras
+"""
+
+import json
+import logging
+import queue
+
+
+class TestLogSampler:
+    """Tests for LogSampler."""
+
+    def test_sampled_out_events_are_counted(self):
+        """An event with rate 0 is never logged at INFO."""
+        from backend.log_pipeline import LogSampler
+
+        sampler = LogSampler(sample_rates={"TITLE_GEN_CHECK": 0.0}, max_per_second=0)
+
+        assert not any(sampler.should_log("TITLE_GEN_CHECK") for _ in range(10))
+        assert sampler.should_log("OTHER_EVENT")
+        assert sampler.stats()["sampled_out"] == {"TITLE_GEN_CHECK": 10}
+
+    def test_rate_limit_per_event(self):
+        """Each event type is capped per second independently."""
+        from backend.log_pipeline import LogSampler
+
+        sampler = LogSampler(sample_rates={}, max_per_second=3,
+                             rate_limited={"STAGE1_MODEL_COMPLETE", "STAGE2_MODEL_COMPLETE"})
+        results = [sampler.should_log("STAGE1_MODEL_COMPLETE") for _ in range(5)]
+
+        assert results == [True, True, True, False, False]
+        assert sampler.should_log("STAGE2_MODEL_COMPLETE")
+        assert sampler.stats()["rate_limited"] == {"STAGE1_MODEL_COMPLETE": 2}
+
+    def test_unlisted_events_are_not_rate_limited(self):
+        """Audit events and anything else not listed are never capped."""
+        from backend.log_pipeline import LogSampler, DEFAULT_RATE_LIMITED_EVENTS
+
+        sampler = LogSampler(sample_rates={}, max_per_second=1)
+
+        assert all(sampler.should_log("ADMIN: Impersonation started") for _ in range(100))
+        assert all(sampler.should_log("GDPR_DATA_EXPORT") for _ in range(100))
+        assert [sampler.should_log("TITLE_GEN_CHECK") for _ in range(2)] == [True, False]
+        assert sampler.stats()["rate_limited_events"] == sorted(DEFAULT_RATE_LIMITED_EVENTS.split(","))
+
+    def test_warnings_and_errors_bypass_limits(self):
+        """WARNING and ERROR are never sampled or limited."""
+        from backend.log_pipeline import LogSampler
+
+        sampler = LogSampler(sample_rates={"X": 0.0}, max_per_second=1)
+
+        assert all(sampler.should_log("X", "ERROR") for _ in range(5))
+        assert all(sampler.should_log("X", "WARNING") for _ in range(5))
+
+    def test_parse_sampling_ignores_malformed(self):
+        """Bad entries in LOG_EVENT_SAMPLING are skipped; rates are clamped."""
+        from backend.log_pipeline import _parse_sampling
+
+        assert _parse_sampling("A:0.5, B:oops,C,D:2") == {"A": 0.5, "D": 1.0}
+
+
+class TestQueueHandler:
+    """Tests for the background-thread handler."""
+
+    def test_records_written_by_listener(self):
+        """Records reach the wrapped handler after the listener drains the queue."""
+        from backend import log_pipeline
+
+        class ListHandler(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.messages = []
+
+            def emit(self, record):
+                self.messages.append(record.getMessage())
+
+        target = ListHandler()
+        handler = log_pipeline.make_async_handler(target)
+        logger = logging.getLogger("test_log_pipeline.async")
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            logger.warning("hello %s", "world")
+            handler.listener.stop()  # Drains the queue
+        finally:
+            logger.removeHandler(handler)
+
+        assert target.messages == ["hello world"]
+
+    def test_exception_formatted_on_listener(self):
+        """Tracebacks reach the JSON formatter as the structured exception field."""
+        from backend import log_pipeline
+        from backend.security import StructuredJsonFormatter
+
+        class ListHandler(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.lines = []
+
+            def emit(self, record):
+                self.lines.append(self.format(record))
+
+        target = ListHandler()
+        target.setFormatter(StructuredJsonFormatter())
+        handler = log_pipeline.make_async_handler(target)
+        logger = logging.getLogger("test_log_pipeline.exception")
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("failed for %s", "user-1")
+            handler.listener.stop()
+        finally:
+            logger.removeHandler(handler)
+
+        data = json.loads(target.lines[0])
+        assert data["message"] == "failed for user-1"
+        assert "ValueError: boom" in data["exception"]
+        assert "Traceback" not in data["message"]
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """A full queue drops records and counts them."""
+        from backend.log_pipeline import DroppingQueueHandler
+
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg", None, None)
+        handler.enqueue(record)
+        handler.enqueue(record)
+
+        assert handler.dropped == 1
+
+
+class TestStructuredJsonFormatter:
+    """Tests for the JSON formatter."""
+
+    def test_non_serializable_extras_are_stringified(self):
+        """Extras that aren't JSON types are converted with str()."""
+        from backend.security import StructuredJsonFormatter
+
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, "event", None, None)
+        record.correlation_id = "abc"
+        record.payload = {"ok": 1}
+        record.obj = object()
+
+        data = json.loads(StructuredJsonFormatter().format(record))
+
+        assert data["correlation_id"] == "abc"
+        assert data["payload"] == {"ok": 1}
+        assert data["obj"].startswith("<object object")
@@ -0,0 +1,127 @@
+"""
+Tests for metrics.py - Prometheus metrics registry
+
+Tests cover:
+- Counter/gauge/histogram recording and text exposition
+- Label escaping and series cap
+- SSE frame instrumentation
+- PostgREST resource labelling
+- /health/prometheus endpoint
+"""
+
+import pytest
+
+
+# =============================================================================
+# METRIC TYPES
+# =============================================================================
+
+class TestMetricTypes:
+    """Tests for Counter, Gauge and Histogram."""
+
+    def test_counter_renders_with_labels(self):
+        """Counters accumulate per label set."""
+        from backend.metrics import Counter
+
+        c = Counter("test_total", "Test counter", ("kind",))
+        c.inc(kind="a")
+        c.inc(2, kind="a")
+        c.inc(kind="b")
+
+        text = "\n".join(c.render())
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{kind="a"} 3' in text
+        assert 'test_total{kind="b"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram buckets, sum and count follow the exposition format."""
+        from backend.metrics import Histogram
+
+        h = Histogram("test_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+        h.observe(0.05, route="/x")
+        h.observe(0.5, route="/x")
+        h.observe(5.0, route="/x")
+
+        text = "\n".join(h.render())
+        assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{route="/x",le="1"} 2' in text
+        assert 'test_seconds_bucket{route="/x",le="+Inf"} 3' in text
+        assert 'test_seconds_count{route="/x"} 3' in text
+        assert h.get_count(route="/x") == 3
+
+    def test_label_values_are_escaped(self):
+        """Quotes and newlines in label values are escaped."""
+        from backend.metrics import Gauge
+
+        g = Gauge("test_gauge", "Test gauge", ("name",))
+        g.set(1, name='a"b\nc')
+
+        assert 'name="a\\"b\\nc"' in "\n".join(g.render())
+
+    def test_series_cap_drops_overflow(self):
+        """New label sets beyond the cap are dropped and counted."""
+        from backend import metrics
+
+        c = metrics.Counter("capped_total", "Capped", ("k",))
+        original = metrics.MAX_SERIES_PER_METRIC
+        metrics.MAX_SERIES_PER_METRIC = 2
+        try:
+            for i in range(5):
+                c.inc(k=str(i))
+        finally:
+            metrics.MAX_SERIES_PER_METRIC = original
+
+        assert c.dropped == 3
+
+
+# =============================================================================
+# INSTRUMENTATION HELPERS
+# =============================================================================
+
+class TestInstrumentation:
+    """Tests for SSE and database helpers."""
+
+    @pytest.mark.asyncio
+    async def test_instrument_sse_stream_counts_frames(self):
+        """Each yielded frame increments sse_frames_sent_total."""
+        from backend.metrics import instrument_sse_stream, SSE_FRAMES_SENT
+
+        async def gen():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+
+        before = SSE_FRAMES_SENT.get(endpoint="test")
+        frames = [f async for f in instrument_sse_stream(gen(), "test")]
+
+        assert len(frames) == 3
+        assert SSE_FRAMES_SENT.get(endpoint="test") == before + 3
+
+    def test_resource_from_path(self):
+        """PostgREST paths map to table or rpc names."""
+        from backend.metrics import _resource_from_path
+
+        assert _resource_from_path("/rest/v1/conversations") == "conversations"
+        assert _resource_from_path("/rest/v1/rpc/check_rate_limits") == "rpc/check_rate_limits"
+        assert _resource_from_path("/auth/v1/user") == "other"
+
+
+# =============================================================================
+# ENDPOINT
+# =============================================================================
+
+class TestPrometheusEndpoint:
+    """Tests for /health/prometheus."""
+
+    def test_endpoint_returns_text_format(self):
+        """Endpoint serves Prometheus text with request durations by route."""
+        from fastapi.testclient import TestClient
+        from backend.main import app
+
+        client = TestClient(app)
+        client.get("/health/live")
+        response = client.get("/health/prometheus")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/health/live"' in response.text
+        assert "# TYPE event_loop_lag_seconds histogram" in response.text
@@ -7,6 +7,7 @@ Tests cover:
 - Stage 3 content generation with length variants
 - Stage detection from messages
 - Streaming response generation
+- Latency profiles (zero / realistic / stress) through the real SSE parser
 """
 
 import pytest
@@ -384,6 +385,147 @@ class TestGenerateMockResponseStream:
         assert len(short_content) < len(long_content)
 
 
+# =============================================================================
+# LATENCY PROFILE TESTS
+# =============================================================================
+
+async def _collect_stream(model="openai/gpt-4o", max_tokens=512):
+    from backend.mock_llm import generate_mock_response_stream
+
+    return [
+        chunk async for chunk in generate_mock_response_stream(
+            model, [{"role": "user", "content": "Hello"}], max_tokens=max_tokens
+        )
+    ]
+
+
+class TestLatencyProfiles:
+    """Tests for MOCK_LLM_LATENCY profiles."""
+
+    def test_tokenize_round_trips(self):
+        """Token-sized pieces join back to the original text."""
+        from backend.mock_llm import _tokenize, _stage3_content
+
+        content = _stage3_content("medium")
+        tokens = _tokenize(content)
+
+        assert "".join(tokens) == content
+        assert max(len(token) for token in tokens) <= 7
+        assert len(tokens) > len(content) / 7
+
+    @pytest.mark.asyncio
+    async def test_zero_profile_streams_tokens_and_usage(self):
+        """Zero profile has no sleeps and ends with a parser-produced usage event."""
+        import time
+        from backend.mock_llm import _stage1_content
+
+        with patch('backend.config.MOCK_LLM_LATENCY', 'zero'), \
+             patch('backend.mock_llm.asyncio.sleep') as sleep:
+            await _collect_stream()  # warm imports
+            start = time.perf_counter()
+            chunks = await _collect_stream()
+            elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.5
+        sleep.assert_not_called()
+        assert chunks[-1].startswith("[USAGE:")
+        content = chunks[:-1]
+        assert "".join(content) == _stage1_content("openai/gpt-4o", "short")
+        assert max(len(chunk) for chunk in content) <= 7
+
+    @pytest.mark.asyncio
+    async def test_usage_counts_streamed_tokens(self):
+        """completion_tokens equals the number of token events sent."""
+        import json
+
+        with patch('backend.config.MOCK_LLM_LATENCY', 'stress'):
+            chunks = await _collect_stream()
+
+        usage = json.loads(chunks[-1][len("[USAGE:"):-1])
+        assert usage["completion_tokens"] == len(chunks) - 1
+        assert usage["model"] == "openai/gpt-4o"
+
+    def test_stress_profile_groups_tokens_into_bursts(self):
+        """Stress cassettes batch several SSE events into one network chunk."""
+        from backend.mock_llm import _build_mock_stream, _stage1_content
+
+        content = _stage1_content("openai/gpt-4o", "medium")
+        cassette = _build_mock_stream("openai/gpt-4o", [], content, "stress")
+        events = sum(text.count("data: ") for _, text in cassette.chunks)
+
+        assert len(cassette.chunks) < events
+        assert cassette.chunks[0][0] <= 0.05
+
+    def test_realistic_profile_uses_model_timings(self):
+        """Realistic cassettes pace tokens at the model's tokens/sec after a TTFT delay."""
+        from backend.mock_llm import _build_mock_stream, _realistic_profile, _tokenize
+
+        content = "word " * 400
+        with patch('backend.mock_llm.random.uniform', return_value=1.0), \
+             patch('backend.mock_llm.random.lognormvariate', return_value=700.0):
+            cassette = _build_mock_stream("openai/gpt-4o", [], content, "realistic")
+
+        per_token = 1.0 / _realistic_profile("openai/gpt-4o")["tokens_per_second"]
+        assert cassette.chunks[0][0] == pytest.approx(0.7)
+        assert cassette.chunks[1][0] == pytest.approx(per_token)
+        assert len(cassette.chunks) == len(_tokenize(content)) + 2
+        assert _realistic_profile("some/unknown-model")["tokens_per_second"] == 60
+
+    def test_realistic_profiles_measured_from_cassettes(self, tmp_path):
+        """Recorded cassettes set a model's TTFT percentiles and tokens/sec."""
+        import json
+        from backend.cassettes import Cassette
+        from backend.mock_llm import _realistic_profile, _recorded_profiles
+
+        def event(content, usage=None):
+            data = {"choices": [{"delta": {"content": content}}]}
+            if usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data)}\n\n"
+
+        for i, ttft in enumerate((0.4, 0.6, 1.2)):
+            Cassette("openai/gpt-4o", chunks=[
+                (ttft, event("a")),
+                (0.5, event("b", {"completion_tokens": 10})),
+                (0.0, "data: [DONE]\n\n"),
+            ]).save(tmp_path / f"openai-gpt-4o__h{i}.json")
+
+        _recorded_profiles.cache_clear()
+        with patch('backend.config.OPENROUTER_CASSETTE_DIR', str(tmp_path)), \
+             patch('backend.config.MOCK_LLM_PROFILES', ''):
+            profile = _realistic_profile("openai/gpt-4o")
+            fallback = _realistic_profile("meta/llama")
+        _recorded_profiles.cache_clear()
+
+        assert profile["ttft_ms"]["p50"] == pytest.approx(600)
+        assert profile["ttft_ms"]["p95"] == pytest.approx(1200)
+        assert profile["tokens_per_second"] == pytest.approx(20)
+        assert fallback["tokens_per_second"] == 60
+
+    def test_realistic_profile_file_is_opt_in(self):
+        """MOCK_LLM_PROFILES only covers models when explicitly configured."""
+        from pathlib import Path
+        from backend.mock_llm import _realistic_profile
+        from backend.tests.load.fake_openrouter import load_config, resolve_profile
+
+        path = Path(__file__).parent / "load" / "openrouter_profiles.json"
+        config = load_config(str(path))
+        with patch('backend.config.OPENROUTER_CASSETTE_DIR', ''), \
+             patch('backend.config.MOCK_LLM_PROFILES', str(path)):
+            for model in ("anthropic/claude-opus-4.5", "google/gemini-3-pro", "meta/llama"):
+                expected = resolve_profile(config, model)
+                profile = _realistic_profile(model)
+                assert profile["ttft_ms"] == expected["ttft_ms"]
+                assert profile["tokens_per_second"] == expected["tokens_per_second"]
+
+    def test_unknown_mode_falls_back_to_default(self):
+        """Unrecognised MOCK_LLM_LATENCY keeps the original behaviour."""
+        from backend.mock_llm import _get_latency_mode
+
+        with patch('backend.config.MOCK_LLM_LATENCY', 'warp'):
+            assert _get_latency_mode() == "default"
+
+
 # =============================================================================
 # STAGE 2 CONTENT TESTS
 # =============================================================================
@@ -0,0 +1,105 @@
+"""
+Tests for profiler.py - on-demand sampling profiler
+
+Tests cover:
+- Thread and task samples in collapsed-stack format
+- Correlation-ID filtering
+- Duration/rate caps and single-profile guard
+"""
+
+import asyncio
+import contextvars
+import time
+
+import pytest
+
+
+async def _waiting_handler():
+    await asyncio.sleep(0.5)
+
+
+async def _other_handler():
+    await asyncio.sleep(0.5)
+
+
+async def _busy_handler(seconds: float):
+    await asyncio.sleep(0.05)
+    # CPU-bound without yielding, like a large JSON parse on the loop
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+    """Tests for SamplingProfiler."""
+
+    @pytest.mark.asyncio
+    async def test_collects_thread_and_task_stacks(self):
+        """Busy loop code shows up in thread samples, awaiting code in task samples."""
+        from backend.profiler import SamplingProfiler
+
+        profiler = SamplingProfiler(duration=0.3, sample_hz=100)
+        profile_task = asyncio.create_task(profiler.run())
+        await asyncio.sleep(0)  # Let the profiler install its task factory
+        busy = asyncio.create_task(_busy_handler(0.2))
+        waiting = asyncio.create_task(_waiting_handler())
+
+        result = await profile_task
+        await busy
+        waiting.cancel()
+
+        assert result["thread_samples"] > 0
+        assert result["task_samples"] > 0
+        lines = result["collapsed"].splitlines()
+        assert any(line.startswith("thread:event-loop;") and "_busy_handler" in line for line in lines)
+        assert any(line.startswith("task:") and "_waiting_handler" in line for line in lines)
+        # Every line ends with a sample count
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_correlation_filter_keeps_matching_tasks_only(self):
+        """Only tasks created under the requested correlation ID are sampled."""
+        from backend.profiler import SamplingProfiler
+
+        cid = contextvars.ContextVar("cid", default="")
+        profiler = SamplingProfiler(
+            duration=0.3, sample_hz=100, correlation_id="wanted",
+            correlation_getter=cid.get,
+        )
+        profile_task = asyncio.create_task(profiler.run())
+        await asyncio.sleep(0)
+
+        async def start(correlation_id, coro):
+            cid.set(correlation_id)
+            return asyncio.create_task(coro)
+
+        wanted = await asyncio.create_task(start("wanted", _waiting_handler()))
+        other = await asyncio.create_task(start("other", _other_handler()))
+
+        result = await profile_task
+        wanted.cancel()
+        other.cancel()
+
+        assert "_waiting_handler" in result["collapsed"]
+        assert "_other_handler" not in result["collapsed"]
+
+    def test_caps_are_applied(self):
+        """Duration and sample rate are clamped to the configured maximums."""
+        from backend.profiler import SamplingProfiler
+        from backend.config import PROFILER_MAX_DURATION_SECONDS, PROFILER_MAX_SAMPLE_HZ
+
+        profiler = SamplingProfiler(duration=10_000, sample_hz=100_000)
+
+        assert profiler.duration == PROFILER_MAX_DURATION_SECONDS
+        assert profiler.sample_hz == PROFILER_MAX_SAMPLE_HZ
+
+    @pytest.mark.asyncio
+    async def test_only_one_profile_at_a_time(self):
+        """A second concurrent profile is rejected."""
+        from backend.profiler import run_profile, ProfilerBusyError
+
+        first = asyncio.create_task(run_profile(duration=0.2, sample_hz=10))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ProfilerBusyError):
+            await run_profile(duration=0.2, sample_hz=10)
+        await first
@@ -0,0 +1,463 @@
+"""
+Tests for quota.py - Redis quota engine
+
+Tests cover:
+- Atomic check-and-reserve (no over-admission under concurrency)
+- Seeding cold keys from Postgres once, including pending deltas of the same window
+- Cached hashes invalidated after billing webhooks and rate-limit changes
+- Refusing seeds that overlap a flush (DB path instead)
+- Company rate limits, warnings and post-session status
+- Rate status for estimates read from the engine without reserving
+- Commit/release settlement and pending deltas
+- Reservations released by streams that are dropped before they start
+- Batched reconciliation to Postgres, acking deltas only after their write
+- Deltas written to the hour and billing period they were counted in
+- DB fallback when Redis is unavailable
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripting for fakeredis
+
+LIMITS = [20, 100, 10_000_000, 10_000]
+NOW = datetime(2026, 10, 18, 15, 30, tzinfo=timezone.utc)
+SESSIONS = "c:co-1:sessions:2026101815"
+TOKENS = "c:co-1:tokens:2026101815"
+COST = "c:co-1:cost:2026101815"
+PERIOD = "20261101000000"
+QUERIES = f"u:user-1:queries:{PERIOD}"
+
+
+class _FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+def _user_seed(used=0, limit=100, active="1", period=PERIOD):
+    return [1, used, limit, active, period]
+
+
+def _company_seed(hourly=0, daily=0, tokens=0, cost=0, limits=LIMITS, alert=80):
+    return [1, hourly, daily, tokens, cost, *limits, alert]
+
+
+@pytest.fixture
+def redis_quota():
+    """quota module wired to an in-memory Redis with scriptable seed loaders."""
+    from backend import quota
+
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    user_seed = AsyncMock(return_value=_user_seed())
+    company_seed = AsyncMock(return_value=_company_seed())
+    with patch.object(quota, "get_redis", AsyncMock(return_value=client)), \
+         patch.object(quota, "QUOTA_ENGINE_ENABLED", True), \
+         patch.object(quota, "_load_user_seed", user_seed), \
+         patch.object(quota, "_load_company_seed", company_seed), \
+         patch.object(quota, "_mock_mode", return_value=False), \
+         patch.object(quota, "datetime", _FixedDatetime):
+        yield quota, client, user_seed, company_seed
+
+
+class TestReserve:
+    """Tests for reserve_session on the Redis path."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reservations_never_over_admit(self, redis_quota):
+        """Only as many sessions as the remaining quota are admitted."""
+        quota, client, user_seed, _ = redis_quota
+        user_seed.return_value = _user_seed(used=7, limit=10)
+
+        results = await asyncio.gather(*[quota.reserve_session("user-1", "co-1") for _ in range(10)])
+
+        assert sum(r.allowed for r in results) == 3
+        blocked = [r for r in results if not r.allowed]
+        assert all(r.billing_blocked for r in blocked)
+        assert blocked[0].reason == "Monthly query limit reached (10 queries). Upgrade to continue."
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "3"
+        assert await client.hget(quota.PENDING_KEY, SESSIONS) == "3"
+        # Concurrent cold misses share one DB load
+        assert user_seed.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_seeds_once_and_adds_pending_deltas(self, redis_quota):
+        """Cold keys are seeded from Postgres plus deltas not yet reconciled."""
+        quota, client, user_seed, company_seed = redis_quota
+        await client.hset(quota.PENDING_KEY, mapping={
+            QUERIES: 2, SESSIONS: 4,
+            "c:co-1:sessions:2026101809": 3,  # Earlier today: daily window only
+            "c:co-1:sessions:2026101723": 7,  # Yesterday: neither window
+        })
+
+        first = await quota.reserve_session("user-1", "co-1")
+        second = await quota.reserve_session("user-1", "co-1")
+
+        assert user_seed.await_count == 1
+        assert company_seed.await_count == 1
+        assert first.remaining == 98
+        assert second.remaining == 97
+        assert second.rate_check["details"]["sessions_hourly"] == {"current": 5, "limit": 20}
+        assert second.rate_check["details"]["sessions_daily"] == {"current": 8, "limit": 100}
+
+    @pytest.mark.asyncio
+    async def test_monthly_seed_only_adds_this_months_usage(self, redis_quota):
+        """Tokens and cost pending from last month don't count toward this month."""
+        quota, client, _, _ = redis_quota
+        await client.hset(quota.PENDING_KEY, mapping={
+            TOKENS: 100, "c:co-1:tokens:2026100102": 20, "c:co-1:cost:2026101000": 7,
+            "c:co-1:tokens:2026093023": 5_000, "c:co-1:cost:2026093023": 900,
+        })
+
+        status = await quota.get_rate_status("user-1", "co-1")
+
+        assert status["details"]["tokens_monthly"]["current"] == 120
+        assert status["details"]["budget_monthly"]["current"] == 7
+
+    @pytest.mark.asyncio
+    async def test_billing_change_reseeds_user(self, redis_quota):
+        """After a webhook the next request reseeds; queries from the old period don't carry over."""
+        quota, client, user_seed, _ = redis_quota
+        user_seed.return_value = _user_seed(used=9, limit=10)
+        await quota.reserve_session("user-1")
+        assert not (await quota.reserve_session("user-1")).allowed
+
+        user_seed.return_value = _user_seed(used=0, limit=10, period="20261201000000")
+        await quota.invalidate_user_quota("user-1")
+        renewed = await quota.reserve_session("user-1")
+
+        assert renewed.allowed and renewed.remaining == 10
+        assert renewed.billing_period == "20261201000000"
+        assert await client.hgetall(quota.PENDING_KEY) == {
+            QUERIES: "1", "u:user-1:queries:20261201000000": "1",
+        }
+
+    @pytest.mark.asyncio
+    async def test_limits_change_reseeds_company(self, redis_quota):
+        """New rate limits apply on the next request; window counters are kept."""
+        quota, client, _, company_seed = redis_quota
+        await quota.reserve_session("user-1", "co-1")
+        company_seed.return_value = _company_seed(limits=[1, 100, 10_000_000, 10_000])
+
+        await quota.invalidate_company_limits("co-1")
+        result = await quota.reserve_session("user-1", "co-1")
+
+        assert not result.allowed
+        assert result.rate_check["details"]["sessions_hourly"] == {"current": 1, "limit": 1}
+
+    @pytest.mark.asyncio
+    async def test_seed_is_refused_while_a_flush_runs(self, redis_quota):
+        """A cold key isn't seeded under the flush lock; the DB path answers instead."""
+        quota, client, _, _ = redis_quota
+        await client.set(quota.FLUSH_LOCK_KEY, "other-worker")
+        reserve_db = AsyncMock(return_value=quota.QuotaReservation("user-1", "co-1"))
+
+        with patch.object(quota, "_reserve_db", reserve_db):
+            result = await quota.reserve_session("user-1", "co-1")
+
+        assert result.backend == "db"
+        reserve_db.assert_awaited_once()
+        assert await client.exists(f"{quota.KEY_PREFIX}:u:user-1") == 0
+
+    @pytest.mark.asyncio
+    async def test_seed_read_across_a_flush_is_refused(self, redis_quota):
+        """A Postgres read taken before a flush finished can't seed after it."""
+        quota, client, _, company_seed = redis_quota
+
+        async def read_then_flush(company_id):
+            await client.hset(quota.PENDING_KEY, SESSIONS, 2)
+            with patch.object(quota, "_increment_rate_counters_db", AsyncMock(return_value={"ok": 1})), \
+                 patch.object(quota, "_increment_query_usage_by"):
+                assert await quota.flush_pending() == 1
+            return _company_seed()
+
+        company_seed.side_effect = read_then_flush
+        reserve_db = AsyncMock(return_value=quota.QuotaReservation("user-1", "co-1"))
+        with patch.object(quota, "_reserve_db", reserve_db):
+            result = await quota.reserve_session("user-1", "co-1")
+
+        assert result.backend == "db"
+        assert await client.exists(quota._window_keys("co-1", NOW)[0]) == 0
+
+    @pytest.mark.asyncio
+    async def test_inactive_subscription_is_blocked(self, redis_quota):
+        """Inactive subscriptions are rejected without reserving anything."""
+        quota, client, user_seed, _ = redis_quota
+        user_seed.return_value = _user_seed(active="0")
+
+        result = await quota.reserve_session("user-1")
+
+        assert result.billing_blocked
+        assert result.reason == "Subscription is not active"
+        assert await client.exists(quota.PENDING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_exceeded_reserves_nothing(self, redis_quota):
+        """An exhausted company limit rejects the session and leaves counters alone."""
+        quota, client, _, company_seed = redis_quota
+        company_seed.return_value = _company_seed(hourly=20, daily=90)
+
+        result = await quota.reserve_session("user-1", "co-1")
+
+        assert not result.allowed
+        assert not result.billing_blocked
+        assert result.rate_check["exceeded"] == ["sessions_hourly"]
+        assert result.rate_check["warnings"] == ["sessions_daily"]
+        assert await client.exists(quota.PENDING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_chat_mode_skips_rate_enforcement(self, redis_quota):
+        """check_rate=False still counts the session but doesn't enforce limits."""
+        quota, client, _, company_seed = redis_quota
+        company_seed.return_value = _company_seed(hourly=20)
+
+        result = await quota.reserve_session("user-1", "co-1", count_query=False, check_rate=False)
+
+        assert result.allowed
+        assert not result.reserved_query
+        assert await client.hget(quota.PENDING_KEY, SESSIONS) == "1"
+
+
+class TestRateStatus:
+    """Tests for get_rate_status."""
+
+    @pytest.mark.asyncio
+    async def test_reads_engine_counters_without_reserving(self, redis_quota):
+        """Unflushed usage is reported and nothing is reserved."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+        await quota.commit_session(reservation, tokens=100, cost_cents=9_000)
+        pending = await client.hgetall(quota.PENDING_KEY)
+
+        status = await quota.get_rate_status("user-1", "co-1")
+
+        assert status["details"]["budget_monthly"] == {"current": 9_000, "limit": 10_000}
+        assert status["details"]["sessions_hourly"]["current"] == 1
+        assert status["warnings"] == ["budget_monthly"]
+        assert await client.hgetall(quota.PENDING_KEY) == pending
+        assert await quota.get_rate_status("user-1", None) == quota._empty_rate_check()
+
+
+class TestSettle:
+    """Tests for commit_session and release_session."""
+
+    @pytest.mark.asyncio
+    async def test_commit_records_usage_and_returns_warnings(self, redis_quota):
+        """Tokens and cost land in the monthly window; warnings use post-session values."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+
+        status = await quota.commit_session(reservation, tokens=8_500_000, cost_cents=120)
+
+        assert status["warnings"] == ["tokens_monthly"]
+        assert status["details"]["sessions_hourly"]["current"] == 1
+        assert status["details"]["budget_monthly"] == {"current": 120, "limit": 10_000}
+        pending = await client.hgetall(quota.PENDING_KEY)
+        assert pending == {QUERIES: "1", SESSIONS: "1", TOKENS: "8500000", COST: "120"}
+        # Settling twice is a no-op
+        await quota.release_session(reservation)
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "1"
+
+    @pytest.mark.asyncio
+    async def test_release_gives_quota_back(self, redis_quota):
+        """Unfinished sessions don't consume quota."""
+        quota, client, user_seed, _ = redis_quota
+        user_seed.return_value = _user_seed(used=9, limit=10)
+
+        reservation = await quota.reserve_session("user-1", "co-1")
+        assert not (await quota.reserve_session("user-1", "co-1")).allowed
+        await quota.release_session(reservation)
+
+        assert (await quota.reserve_session("user-1", "co-1")).allowed
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "1"
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_commit_returns_session(self, redis_quota):
+        """count_session=False keeps the query but gives back the company session."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+
+        await quota.commit_session(reservation, count_session=False)
+
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "1"
+        assert await client.hget(quota.PENDING_KEY, SESSIONS) == "0"
+
+
+class TestHoldForStream:
+    """Tests for hold_for_stream."""
+
+    @pytest.mark.asyncio
+    async def test_dropped_stream_releases(self, redis_quota):
+        """A response body that is never iterated still gives the reservation back."""
+        import gc
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+
+        async def events():
+            yield "data: never sent\n\n"
+
+        stream = await quota.hold_for_stream(reservation, events())
+        del stream
+        gc.collect()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert reservation.settled
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "0"
+        assert await client.hget(quota.PENDING_KEY, SESSIONS) == "0"
+
+    @pytest.mark.asyncio
+    async def test_committed_stream_keeps_usage(self, redis_quota):
+        """Sessions committed inside the stream aren't released at the end."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+
+        async def events():
+            yield "data: stage1\n\n"
+            await quota.commit_session(reservation, tokens=50)
+
+        stream = await quota.hold_for_stream(reservation, events())
+        assert [event async for event in stream] == ["data: stage1\n\n"]
+
+        assert await client.hget(quota.PENDING_KEY, QUERIES) == "1"
+        assert await client.hget(quota.PENDING_KEY, TOKENS) == "50"
+
+
+class TestFlushPending:
+    """Tests for batched reconciliation."""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_batched_deltas(self, redis_quota):
+        """Deltas are summed per entity and written with one call each."""
+        quota, client, _, _ = redis_quota
+        for _ in range(3):
+            reservation = await quota.reserve_session("user-1", "co-1")
+            await quota.commit_session(reservation, tokens=100, cost_cents=2)
+
+        increment = AsyncMock(return_value={"hourly_sessions": 3})
+        with patch.object(quota, "_increment_rate_counters_db", increment), \
+             patch.object(quota, "_increment_query_usage_by") as by_user:
+            written = await quota.flush_pending()
+
+        assert written == 2
+        increment.assert_awaited_once_with("co-1", 3, 300, 6, datetime(2026, 10, 18, 15, tzinfo=timezone.utc))
+        by_user.assert_called_once_with("user-1", 3, PERIOD)
+        assert await client.exists(quota.PENDING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_each_hour_to_its_window(self, redis_quota):
+        """Usage counted before an hour rolled over isn't added to the current window."""
+        quota, client, _, _ = redis_quota
+        await client.hset(quota.PENDING_KEY, mapping={
+            "c:co-1:sessions:2026101814": 2, "c:co-1:tokens:2026101814": 40, SESSIONS: 1,
+        })
+
+        increment = AsyncMock(return_value={"hourly_sessions": 1})
+        with patch.object(quota, "_increment_rate_counters_db", increment):
+            assert await quota.flush_pending() == 2
+
+        assert sorted(call.args for call in increment.await_args_list) == [
+            ("co-1", 1, 0, 0, datetime(2026, 10, 18, 15, tzinfo=timezone.utc)),
+            ("co-1", 2, 40, 0, datetime(2026, 10, 18, 14, tzinfo=timezone.utc)),
+        ]
+        assert await client.exists(quota.PENDING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_queries_from_a_reset_period_are_dropped(self, redis_quota):
+        """Queries whose billing period was reset in Postgres are acked without counting."""
+        quota, client, _, _ = redis_quota
+        await client.hset(quota.PENDING_KEY, QUERIES, 4)
+
+        with patch.object(quota, "_increment_query_usage_by", return_value=False) as by_user, \
+             patch.object(quota, "log_app_event") as log:
+            assert await quota.flush_pending() == 1
+
+        by_user.assert_called_once_with("user-1", 4, PERIOD)
+        log.assert_called_once_with("QUOTA_FLUSH_STALE_PERIOD", level="INFO", user_id="user-1", queries=4)
+        assert await client.exists(quota.PENDING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_writes_stay_pending(self, redis_quota):
+        """A failed DB write leaves the delta pending for the next flush."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+        await quota.commit_session(reservation, tokens=100)
+
+        with patch.object(quota, "_increment_rate_counters_db", AsyncMock(return_value={})), \
+             patch.object(quota, "_increment_query_usage_by", side_effect=RuntimeError("db down")):
+            assert await quota.flush_pending() == 0
+
+        assert await client.hgetall(quota.PENDING_KEY) == {
+            QUERIES: "1", SESSIONS: "1", TOKENS: "100",
+        }
+
+    @pytest.mark.asyncio
+    async def test_deltas_stay_visible_until_written(self, redis_quota):
+        """Pending deltas count during the DB write; ones added meanwhile survive the ack."""
+        quota, client, _, _ = redis_quota
+        reservation = await quota.reserve_session("user-1", "co-1")
+        await quota.commit_session(reservation, tokens=100)
+
+        async def slow_write(company_id, sessions, tokens, cost, window):
+            assert await client.hget(quota.PENDING_KEY, SESSIONS) == "1"
+            assert await quota.flush_pending() == 0  # Another worker's flush is skipped
+            await client.hincrby(quota.PENDING_KEY, SESSIONS, 2)
+            return {"hourly_sessions": 1}
+
+        with patch.object(quota, "_increment_rate_counters_db", slow_write), \
+             patch.object(quota, "_increment_query_usage_by"):
+            assert await quota.flush_pending() == 2
+
+        assert await client.hgetall(quota.PENDING_KEY) == {SESSIONS: "2"}
+        assert await client.exists(quota.FLUSH_LOCK_KEY) == 0
+
+
+class TestDatabaseFallback:
+    """Tests for the DB path used when Redis is unavailable."""
+
+    @pytest.mark.asyncio
+    async def test_reserve_and_commit_use_original_calls(self):
+        """Without Redis the engine makes the same billing and rate-limit calls as before."""
+        from backend import quota
+
+        rate_status = {"allowed": True, "exceeded": [], "warnings": ["sessions_hourly"], "details": {}}
+        check_rate_limits = AsyncMock(return_value=rate_status)
+        increment_rate_counters = AsyncMock(return_value={"hourly_sessions": 17})
+        billing = MagicMock()
+        billing.check_can_query.return_value = {"can_query": True, "reason": None, "remaining": 5}
+
+        with patch.object(quota, "get_redis", AsyncMock(return_value=None)), \
+             patch.object(quota, "billing", billing), \
+             patch("backend.routers.company.utils.check_rate_limits", check_rate_limits), \
+             patch("backend.routers.company.utils.increment_rate_counters", increment_rate_counters):
+            reservation = await quota.reserve_session("user-1", "co-1", access_token="jwt")
+            status = await quota.commit_session(reservation, tokens=50, cost_cents=1)
+
+        assert reservation.backend == "db"
+        assert reservation.allowed and reservation.remaining == 5
+        billing.increment_query_usage.assert_called_once_with("user-1", access_token="jwt")
+        increment_rate_counters.assert_awaited_once_with(company_id="co-1", sessions=1, tokens=50, cost_cents=1)
+        assert status["warnings"] == ["sessions_hourly"]
+        assert check_rate_limits.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_blocked_user_is_not_charged(self):
+        """A billing rejection on the DB path never increments usage."""
+        from backend import quota
+
+        billing = MagicMock()
+        billing.check_can_query.return_value = {
+            "can_query": False, "reason": "Subscription is not active", "remaining": 0,
+        }
+        with patch.object(quota, "get_redis", AsyncMock(return_value=None)), \
+             patch.object(quota, "billing", billing):
+            reservation = await quota.reserve_session("user-1")
+            await quota.release_session(reservation)
+
+        assert reservation.billing_blocked
+        assert reservation.reason == "Subscription is not active"
+        billing.increment_query_usage.assert_not_called()
@@ -0,0 +1,170 @@
+"""
+Tests for search.py and the search router - full-text search
+
+Tests cover:
+- Prefix tsquery building for as-you-type filters
+- Snippet escaping that keeps only <mark> highlights
+- RPC parameters, page size and keyset cursor round trip
+- Company access checks and input validation
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+COMPANY = "11111111-1111-1111-1111-111111111111"
+
+
+def _row(n, kind="message", rank=0.5):
+    return {"kind": kind, "id": f"00000000-0000-0000-0000-00000000000{n}", "conversation_id": "conv-1",
+            "title": f"Result {n}", "snippet": f"the <mark>plan</mark> {n}", "rank": rank,
+            "updated_at": "2024-01-01T00:00:00+00:00"}
+
+
+def _rpc_client(rows):
+    client = MagicMock()
+    client.rpc.return_value.execute.return_value = MagicMock(data=rows)
+    return client
+
+
+class TestQueryHelpers:
+    """Tests for query building and snippet escaping."""
+
+    def test_prefix_tsquery(self):
+        """Words become AND-ed prefix terms; punctuation and operators are dropped."""
+        from backend.search import prefix_tsquery
+
+        assert prefix_tsquery("Expansion plan") == "expansion:* & plan:*"
+        assert prefix_tsquery("a & b | !c:*") == "a:* & b:* & c:*"
+        assert prefix_tsquery("año fiscal") == "año:* & fiscal:*"
+        assert prefix_tsquery("  ?! ") is None
+        assert prefix_tsquery(None) is None
+
+    def test_highlight_escapes_content(self):
+        """User content is escaped; only the highlight tags survive."""
+        from backend.search import _highlight
+
+        assert _highlight("<script>x</script> <mark>plan</mark>") == \
+            "&lt;script&gt;x&lt;/script&gt; <mark>plan</mark>"
+        assert _highlight(None) == ""
+
+
+class TestSearchContent:
+    """Tests for search.search_content."""
+
+    def test_rpc_params_and_cursor(self):
+        """Fetches limit + 1 and returns a cursor that resumes after the last row."""
+        from backend import search
+
+        client = _rpc_client([_row(1, rank=0.9), _row(2, rank=0.5), _row(3, rank=0.1)])
+
+        with patch.object(search, "get_supabase_service", return_value=client), \
+             patch.object(search, "verify_user_company_access", return_value=True):
+            first = search.search_content(COMPANY, "user-1", "plan", kinds=["message"], limit=2)
+            second = search.search_content(COMPANY, "user-1", "plan", limit=2, cursor=first["next_cursor"])
+
+        assert [r["title"] for r in first["results"]] == ["Result 1", "Result 2"]
+        assert first["results"][0]["type"] == "message"
+        assert first["has_more"] is True
+        first_params = client.rpc.call_args_list[0].args[1]
+        assert first_params["p_kinds"] == ["message"]
+        assert first_params["p_limit"] == 3
+        assert first_params["p_cursor_rank"] is None
+        second_params = client.rpc.call_args_list[1].args[1]
+        assert (second_params["p_cursor_rank"], second_params["p_cursor_kind"], second_params["p_cursor_id"]) == \
+            (0.5, "message", _row(2)["id"])
+        assert second_params["p_kinds"] == list(search.SEARCH_KINDS)
+        assert len(second["results"]) == 2
+        assert second["has_more"] is True
+
+    def test_no_access(self):
+        """Users outside the company get None and no query runs."""
+        from backend import search
+
+        client = _rpc_client([])
+
+        with patch.object(search, "get_supabase_service", return_value=client), \
+             patch.object(search, "verify_user_company_access", return_value=False):
+            assert search.search_content(COMPANY, "user-1", "plan") is None
+
+        client.rpc.assert_not_called()
+
+    def test_invalid_input(self):
+        """Unknown kinds and foreign cursors are rejected."""
+        from backend import search
+        from backend.storage import encode_cursor
+
+        with pytest.raises(ValueError):
+            search.search_content(COMPANY, "user-1", "plan", kinds=["emails"])
+        with pytest.raises(ValueError):
+            search.search_content(COMPANY, "user-1", "plan", cursor=encode_cursor("date", [True, "t", "id"]))
+
+    def test_query_without_words(self):
+        """Punctuation-only queries return an empty page without hitting the database."""
+        from backend import search
+
+        client = _rpc_client([])
+
+        with patch.object(search, "get_supabase_service", return_value=client), \
+             patch.object(search, "verify_user_company_access", return_value=True):
+            result = search.search_content(COMPANY, "user-1", "!!")
+
+        assert result == {"results": [], "has_more": False, "next_cursor": None}
+        client.rpc.assert_not_called()
+
+
+@pytest.fixture
+def client():
+    """Test client for the search router with mocked auth."""
+    from backend.auth import get_current_user
+    from backend.routers.search import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def override_user():
+        return {"id": "user-1", "access_token": "mock-token"}
+
+    app.dependency_overrides[get_current_user] = override_user
+    return TestClient(app)
+
+
+class TestSearchEndpoint:
+    """Tests for GET /search."""
+
+    def test_search(self, client):
+        """Passes the parsed types through and returns the page."""
+        page = {"results": [], "has_more": False, "next_cursor": None}
+
+        with patch("backend.routers.search.storage.resolve_company_id", return_value=COMPANY), \
+             patch("backend.routers.search.search.search_content", return_value=page) as mock_search:
+            response = client.get("/search?q=plan&company_id=acme&types=knowledge,%20playbook")
+
+        assert response.status_code == 200
+        assert response.json() == page
+        assert mock_search.call_args.kwargs["kinds"] == ["knowledge", "playbook"]
+        assert mock_search.call_args.kwargs["company_id"] == COMPANY
+
+    def test_rejects_unknown_types(self, client):
+        """Should return 400 for unknown result types."""
+        with patch("backend.routers.search.storage.resolve_company_id", return_value=COMPANY):
+            response = client.get("/search?q=plan&company_id=acme&types=emails")
+
+        assert response.status_code == 400
+
+    def test_forbidden(self, client):
+        """Should return 403 when the user has no access to the company."""
+        with patch("backend.routers.search.storage.resolve_company_id", return_value=COMPANY), \
+             patch("backend.routers.search.search.search_content", return_value=None):
+            response = client.get("/search?q=plan&company_id=acme")
+
+        assert response.status_code == 403
+
+    def test_unknown_company(self, client):
+        """Should return 404 for a company that doesn't exist."""
+        with patch("backend.routers.search.storage.resolve_company_id", side_effect=ValueError("nope")):
+            response = client.get("/search?q=plan&company_id=missing")
+
+        assert response.status_code == 404
@@ -0,0 +1,237 @@
+"""
+Tests for telemetry.py - model performance telemetry store
+
+Tests cover:
+- Percentile estimation from bucketed counts
+- Rolling window expiry
+- Per-model/per-stage series and stage context
+- Error/truncation rates and tokens/sec derivation
+- Completion length histogram
+- SSE stream processing feeding the store
+"""
+
+import pytest
+
+
+# =============================================================================
+# PERCENTILE ESTIMATION
+# =============================================================================
+
+class TestEstimatePercentile:
+    """Tests for estimate_percentile."""
+
+    def test_empty_returns_none(self):
+        """No observations should yield None."""
+        from backend.telemetry import estimate_percentile
+
+        assert estimate_percentile((10, 20), [0, 0, 0], 50) is None
+
+    def test_interpolates_within_bucket(self):
+        """Median of a single bucket should land inside its bounds."""
+        from backend.telemetry import estimate_percentile
+
+        value = estimate_percentile((100, 200, 300), [0, 10, 0, 0], 50)
+        assert 100 <= value <= 200
+
+    def test_overflow_bucket_reports_floor(self):
+        """Values above the last bound report the last bound."""
+        from backend.telemetry import estimate_percentile
+
+        assert estimate_percentile((100, 200), [0, 0, 5], 99) == 200.0
+
+
+# =============================================================================
+# TELEMETRY STORE
+# =============================================================================
+
+class TestTelemetryStore:
+    """Tests for TelemetryStore."""
+
+    def test_records_per_model_and_stage(self):
+        """Series are keyed by (model, stage)."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        store.record("m/a", stage="stage1", ttft_ms=400, latency_ms=2000, completion_tokens=100, now=1000)
+        store.record("m/a", stage="stage3", ttft_ms=800, latency_ms=4000, completion_tokens=100, now=1000)
+        store.record("m/b", stage="stage1", ttft_ms=300, latency_ms=1000, now=1000)
+
+        snap = store.snapshot(now=1000)
+        assert [(s["model"], s["stage"]) for s in snap] == [
+            ("m/a", "stage1"), ("m/a", "stage3"), ("m/b", "stage1"),
+        ]
+        assert store.snapshot(model="m/a", stage="stage3", now=1000)[0]["requests"] == 1
+
+    def test_error_and_truncation_rates(self):
+        """Rates are computed over all requests in the window."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        for _ in range(6):
+            store.record("m/a", stage="stage1", latency_ms=1000, now=1000)
+        store.record("m/a", stage="stage1", error=True, now=1000)
+        store.record("m/a", stage="stage1", truncated=True, latency_ms=1000, now=1000)
+
+        s = store.snapshot(now=1000)[0]
+        assert s["requests"] == 8
+        assert s["error_rate"] == 0.125
+        assert s["truncation_rate"] == 0.125
+
+    def test_tokens_per_sec_excludes_ttft(self):
+        """Throughput is measured over generation time, not queueing."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        # 100 tokens over (2000 - 1000) ms = 100 tok/s
+        store.record("m/a", stage="stage1", ttft_ms=1000, latency_ms=2000, completion_tokens=100, now=1000)
+
+        tps = store.snapshot(now=1000)[0]["tokens_per_sec"]
+        assert tps["count"] == 1
+        assert tps["mean"] == 100.0
+
+    def test_completion_tokens_histogram(self):
+        """Completion lengths are tracked for the cost estimator; errors add none."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        store.record("m/a", stage="stage1", latency_ms=2000, completion_tokens=300, now=1000)
+        store.record("m/a", stage="stage1", latency_ms=2000, completion_tokens=500, now=1000)
+        store.record("m/a", stage="stage1", latency_ms=100, error=True, now=1000)
+
+        completion = store.snapshot(now=1000)[0]["completion_tokens"]
+        assert completion["count"] == 2
+        assert completion["mean"] == 400.0
+        assert 256 <= completion["p50"] <= 512
+
+    def test_window_expires_old_slots(self):
+        """Data older than the window drops out of snapshots."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        store.record("m/a", stage="stage1", latency_ms=1000, now=1000)
+        assert store.snapshot(now=1030)[0]["requests"] == 1
+        assert store.snapshot(now=1100) == []
+
+    def test_series_cap_drops_new_series(self):
+        """Series beyond max_series are dropped and counted."""
+        from backend.telemetry import TelemetryStore
+
+        store = TelemetryStore(window_seconds=60, slots=6, max_series=2)
+        for i in range(4):
+            store.record(f"m/{i}", stage="stage1", latency_ms=1000, now=1000)
+
+        stats = store.stats()
+        assert stats["series"] == 2
+        assert stats["dropped_series"] == 2
+
+    def test_stage_defaults_to_context(self):
+        """Stage comes from set_telemetry_stage when not passed."""
+        from backend.telemetry import TelemetryStore, set_telemetry_stage, reset_telemetry_stage
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        token = set_telemetry_stage("stage2")
+        try:
+            store.record("m/a", latency_ms=1000, now=1000)
+        finally:
+            reset_telemetry_stage(token)
+
+        assert store.snapshot(now=1000)[0]["stage"] == "stage2"
+
+    def test_stage_decorator_does_not_leak(self):
+        """Decorated stages are reset on return and between generator yields."""
+        import asyncio
+        from backend.telemetry import telemetry_stage, get_telemetry_stage
+
+        @telemetry_stage("stage3")
+        async def synthesize():
+            return get_telemetry_stage()
+
+        @telemetry_stage("stage1")
+        async def stream():
+            yield get_telemetry_stage()
+            yield get_telemetry_stage()
+
+        async def run():
+            seen = [await synthesize(), get_telemetry_stage()]
+            async for stage in stream():
+                seen += [stage, get_telemetry_stage()]
+            return seen
+
+        default = get_telemetry_stage()
+        assert asyncio.run(run()) == ["stage3", default, "stage1", default, "stage1", default]
+
+    def test_snapshot_rows_include_buckets(self):
+        """Flush rows carry percentiles and raw histogram buckets."""
+        from backend.telemetry import TelemetryStore, _build_snapshot_rows
+
+        store = TelemetryStore(window_seconds=60, slots=6)
+        store.record("m/a", stage="stage1", ttft_ms=400, latency_ms=2000, completion_tokens=50, now=1000)
+
+        rows = _build_snapshot_rows(store.snapshot(include_buckets=True, now=1000), 60)
+        assert rows[0]["model"] == "m/a"
+        assert rows[0]["ttft_p50_ms"] is not None
+        assert sum(rows[0]["histograms"]["latency_ms"]) == 1
+
+
+# =============================================================================
+# STREAM INTEGRATION
+# =============================================================================
+
+class _FakeResponse:
+    def __init__(self, lines):
+        self._lines = lines
+
+    async def aiter_lines(self):
+        for line in self._lines:
+            yield line
+
+
+class _FakeBreaker:
+    async def record_success(self):
+        pass
+
+
+class TestStreamTelemetry:
+    """_process_sse_stream should feed the global store."""
+
+    @pytest.mark.asyncio
+    async def test_done_records_usage(self):
+        """A completed stream records one successful request."""
+        import time
+        from backend.openrouter_stream import _process_sse_stream
+        from backend.telemetry import get_telemetry_store
+
+        store = get_telemetry_store()
+        store.clear()
+        lines = [
+            'data: {"choices": [{"delta": {"content": "Hi"}}]}',
+            'data: {"choices": [{"delta": {}}], "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}}',
+            'data: [DONE]',
+        ]
+        chunks = [c async for c in _process_sse_stream(
+            _FakeResponse(lines), "test/model", _FakeBreaker(), time.time(), 0, 3
+        )]
+
+        assert "Hi" in chunks
+        snap = store.snapshot(model="test/model")
+        assert snap[0]["requests"] == 1
+        assert snap[0]["errors"] == 0
+        store.clear()
+
+    @pytest.mark.asyncio
+    async def test_truncation_is_recorded(self):
+        """finish_reason=length counts as a truncation."""
+        import time
+        from backend.openrouter_stream import _process_sse_stream
+        from backend.telemetry import get_telemetry_store
+
+        store = get_telemetry_store()
+        store.clear()
+        lines = ['data: {"choices": [{"delta": {"content": "x"}, "finish_reason": "length"}]}']
+        chunks = [c async for c in _process_sse_stream(
+            _FakeResponse(lines), "test/model", _FakeBreaker(), time.time(), 0, 3
+        )]
+
+        assert "[TRUNCATED]" in chunks
+        assert store.snapshot(model="test/model")[0]["truncation_rate"] == 1.0
+        store.clear()
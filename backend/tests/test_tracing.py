@@ -0,0 +1,133 @@
+"""
+Tests for tracing.py - in-process council tracing
+
+Tests cover:
+- Span nesting and correlation-ID grouping
+- Retroactive spans and error status
+- Ring buffer eviction and per-trace span cap
+- Chrome trace export
+"""
+
+import pytest
+
+
+@pytest.fixture
+def correlation_id():
+    """Run the test inside a request context with a known correlation ID."""
+    from backend.main import set_correlation_id, _correlation_id
+
+    token = set_correlation_id("trace-test-1")
+    yield "trace-test-1"
+    _correlation_id.reset(token)
+
+
+@pytest.fixture(autouse=True)
+def clear_tracer():
+    from backend.tracing import get_tracer
+
+    get_tracer().clear()
+    yield
+    get_tracer().clear()
+
+
+class TestSpans:
+    """Tests for span recording."""
+
+    def test_nested_spans_share_trace_and_link_parent(self, correlation_id):
+        """Inner spans record the enclosing span as parent."""
+        from backend.tracing import trace_span, get_tracer
+
+        with trace_span("persist.assistant_message") as outer:
+            with trace_span("db.post", resource="messages") as inner:
+                inner.set(rows=1)
+
+        trace = get_tracer().get(correlation_id)
+        assert trace["span_count"] == 2
+        by_name = {s["name"]: s for s in trace["spans"]}
+        assert by_name["db.post"]["parent_id"] == by_name["persist.assistant_message"]["span_id"]
+        assert by_name["db.post"]["attributes"] == {"resource": "messages", "rows": 1}
+        assert outer is not inner
+
+    def test_no_trace_outside_request(self):
+        """Spans without a correlation ID are not stored."""
+        from backend.tracing import trace_span, record_span, get_tracer
+
+        with trace_span("validation"):
+            pass
+        record_span("stage1", 0.5)
+
+        assert get_tracer().list_traces() == []
+
+    def test_record_span_and_error_status(self, correlation_id):
+        """Retroactive spans keep their duration; exceptions mark spans errored."""
+        from backend.tracing import trace_span, record_span, get_tracer
+
+        record_span("llm.stream", 1.5, model="openai/gpt-4o", ttft_ms=320)
+        with pytest.raises(ValueError):
+            with trace_span("ranking_parse"):
+                raise ValueError("bad ranking")
+
+        spans = {s["name"]: s for s in get_tracer().get(correlation_id)["spans"]}
+        assert spans["llm.stream"]["duration_ms"] == pytest.approx(1500, abs=5)
+        assert spans["ranking_parse"]["status"] == "error"
+        assert spans["ranking_parse"]["attributes"]["error"] == "ValueError"
+
+    @pytest.mark.asyncio
+    async def test_traced_decorator(self, correlation_id):
+        """@traced wraps an async function in a span."""
+        from backend.tracing import traced, get_tracer
+
+        @traced("context_build")
+        async def build():
+            return "prompt"
+
+        assert await build() == "prompt"
+        assert get_tracer().get(correlation_id)["spans"][0]["name"] == "context_build"
+
+
+class TestTracer:
+    """Tests for buffer bounds."""
+
+    def test_oldest_trace_evicted(self):
+        """The ring buffer keeps only the newest traces."""
+        from backend.tracing import Tracer, Span
+
+        tracer = Tracer(max_traces=2, max_spans_per_trace=10)
+        for trace_id in ("a", "b", "c"):
+            tracer.add(trace_id, Span("stage1"))
+
+        assert [t["trace_id"] for t in tracer.list_traces()] == ["c", "b"]
+        assert tracer.stats()["evicted"] == 1
+
+    def test_span_cap_counts_dropped(self):
+        """Spans beyond the per-trace cap are dropped and counted."""
+        from backend.tracing import Tracer, Span
+
+        tracer = Tracer(max_traces=2, max_spans_per_trace=2)
+        for _ in range(5):
+            tracer.add("a", Span("db.get"))
+
+        trace = tracer.get("a")
+        assert trace["span_count"] == 2
+        assert trace["dropped_spans"] == 3
+
+
+class TestChromeExport:
+    """Tests for Chrome trace export."""
+
+    def test_models_get_their_own_lanes(self, correlation_id):
+        """Each model renders as its own thread; other spans share main."""
+        from backend.tracing import record_span, get_tracer, to_chrome_trace
+
+        record_span("llm.stream", 1.0, model="model-a")
+        record_span("llm.stream", 1.2, model="model-b")
+        record_span("stage1", 1.3)
+
+        chrome = to_chrome_trace(get_tracer().get(correlation_id))
+        events = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+        lanes = {e["args"]["name"] for e in chrome["traceEvents"] if e["name"] == "thread_name"}
+
+        assert len(events) == 3
+        assert {"main", "model-a", "model-b"} <= lanes
+        assert len({e["tid"] for e in events}) == 3
+        assert all(e["dur"] > 0 for e in events)
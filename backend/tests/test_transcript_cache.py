@@ -0,0 +1,265 @@
+"""
+Tests for transcript_cache.py - cached conversation transcripts
+
+Tests cover:
+- Loading on a miss and serving follow-up reads from memory
+- Write-through of new messages and field updates
+- Memory copies revalidated against the Redis version across workers
+- Invalidation, byte-bounded eviction and owner-only hits
+- Worker-thread updates with no event loop invalidating synchronously
+- Stale database loads not published over a newer write
+- Bypass when Redis is unavailable
+- storage.py write-through hooks
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripting for fakeredis
+
+
+def _conversation(messages=None, user_id="user-1"):
+    return {
+        "id": "conv-1",
+        "title": "Pricing",
+        "user_id": user_id,
+        "messages": messages if messages is not None else [{"id": "m1", "role": "user", "content": "hi"}],
+        "message_count": len(messages) if messages is not None else 1,
+        "history_summary": None,
+        "history_summary_messages": 0,
+    }
+
+
+@pytest.fixture
+def transcripts():
+    """transcript_cache wired to an in-memory Redis and a mocked database load."""
+    from backend import transcript_cache
+
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    cache = transcript_cache.TranscriptCache()
+    load = MagicMock(return_value=_conversation())
+    with patch.object(transcript_cache, "get_redis", AsyncMock(return_value=client)), \
+         patch.object(transcript_cache, "TRANSCRIPT_CACHE_ENABLED", True), \
+         patch.object(transcript_cache, "_transcript_cache", cache), \
+         patch("backend.storage.get_conversation", load):
+        yield transcript_cache, cache, client, load
+
+
+async def _settle(cache):
+    while cache._pending:
+        await asyncio.wait(list(cache._pending.values()))
+
+
+class TestReads:
+    """Tests for get_transcript."""
+
+    @pytest.mark.asyncio
+    async def test_miss_then_memory_hit(self, transcripts):
+        """The first read loads from the database; the next is served from memory."""
+        tc, cache, client, load = transcripts
+
+        first = await tc.get_transcript("conv-1", "jwt", "user-1")
+        second = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert first == second == _conversation()
+        assert load.call_count == 1
+        assert await client.get("axcouncil:transcript:conv-1:v") == "1"
+        assert (cache.misses, cache.memory_hits) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_returns_copies(self, transcripts):
+        """Callers modifying the message list don't change the cache."""
+        tc, _, _, _ = transcripts
+
+        (await tc.get_transcript("conv-1", "jwt", "user-1"))["messages"].clear()
+
+        assert len((await tc.get_transcript("conv-1", "jwt", "user-1"))["messages"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_other_user_reads_database(self, transcripts):
+        """Cached transcripts are only served to their owner."""
+        tc, _, _, load = transcripts
+
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+        await tc.get_transcript("conv-1", "other-jwt", "user-2")
+
+        assert load.call_count == 2
+        assert load.call_args.kwargs == {"access_token": "other-jwt"}
+
+    @pytest.mark.asyncio
+    async def test_bypassed_without_redis(self, transcripts):
+        """Without Redis every read goes to the database."""
+        tc, cache, _, load = transcripts
+
+        with patch.object(tc, "get_redis", AsyncMock(return_value=None)):
+            await tc.get_transcript("conv-1", "jwt", "user-1")
+            await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert load.call_count == 2
+        assert cache.stats()["entries"] == 0
+
+
+class TestWrites:
+    """Tests for write-through and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_message_write_through(self, transcripts):
+        """Appended messages and title updates are visible without a reload."""
+        tc, cache, _, load = transcripts
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        tc.record_message("conv-1", {"id": "m2", "role": "assistant", "stage3": {"response": "ok"}}, "2026-01-01T00:00:00")
+        tc.record_fields("conv-1", title="Renamed")
+        conversation = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert load.call_count == 1
+        assert [m["id"] for m in conversation["messages"]] == ["m1", "m2"]
+        assert conversation["message_count"] == 2
+        assert conversation["last_updated"] == "2026-01-01T00:00:00"
+        assert conversation["title"] == "Renamed"
+        assert cache.writes == 2
+
+    @pytest.mark.asyncio
+    async def test_message_limit(self, transcripts):
+        """Appends keep the newest TRANSCRIPT_MESSAGE_LIMIT messages, like get_conversation."""
+        tc, _, _, load = transcripts
+        load.return_value = _conversation([{"id": f"m{n}", "role": "user", "content": ""} for n in range(3)])
+
+        with patch.object(tc, "TRANSCRIPT_MESSAGE_LIMIT", 3):
+            await tc.get_transcript("conv-1", "jwt", "user-1")
+            tc.record_message("conv-1", {"id": "m3", "role": "user", "content": ""}, "now")
+            conversation = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert [m["id"] for m in conversation["messages"]] == ["m1", "m2", "m3"]
+        assert conversation["message_count"] == 4
+        assert conversation["messages_truncated"] is True
+
+    @pytest.mark.asyncio
+    async def test_other_worker_write(self, transcripts):
+        """A turn written by another worker is read from Redis, not the stale memory copy."""
+        tc, cache, client, load = transcripts
+        other_worker = tc.TranscriptCache()
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        other_worker.update("conv-1", tc._append_message({"id": "m2", "role": "user", "content": "again"}, "now"))
+        await _settle(other_worker)
+        conversation = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert [m["id"] for m in conversation["messages"]] == ["m1", "m2"]
+        assert load.call_count == 1
+        assert cache.redis_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, transcripts):
+        """Archive/delete drop the transcript everywhere."""
+        tc, cache, client, load = transcripts
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        tc.invalidate_transcript("conv-1")
+        await _settle(cache)
+
+        assert await client.exists("axcouncil:transcript:conv-1") == 0
+        assert await client.get("axcouncil:transcript:conv-1:v") == "2"
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+        assert load.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_load_not_published(self, transcripts):
+        """A load that raced a newer write is returned but doesn't replace it."""
+        tc, cache, client, load = transcripts
+        other_worker = tc.TranscriptCache()
+
+        async def slow_load(conversation_id, access_token):
+            # Another worker handles the next turn while this load is in flight
+            other_worker.update("conv-1", None)
+            await _settle(other_worker)
+            return _conversation()
+
+        with patch.object(cache, "_load", slow_load):
+            stale = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert [m["id"] for m in stale["messages"]] == ["m1"]
+        assert await client.exists("axcouncil:transcript:conv-1") == 0
+        assert "conv-1" not in cache._entries
+
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+        assert await client.exists("axcouncil:transcript:conv-1") == 1
+
+    @pytest.mark.asyncio
+    async def test_update_from_worker_thread(self, transcripts):
+        """Updates from asyncio.to_thread are forwarded to the event loop."""
+        tc, cache, _, _ = transcripts
+        await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        await asyncio.to_thread(tc.record_fields, "conv-1", history_summary="Earlier turns", history_summary_messages=1)
+        await asyncio.sleep(0)
+        conversation = await tc.get_transcript("conv-1", "jwt", "user-1")
+
+        assert conversation["history_summary"] == "Earlier turns"
+
+    @pytest.mark.asyncio
+    async def test_worker_thread_without_loop_invalidates(self, transcripts):
+        """With no event loop to forward to, a thread update drops the transcript synchronously."""
+        tc, cache, _, load = transcripts
+        server = fakeredis.FakeServer()
+        client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        sync_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+
+        with patch.object(tc, "get_redis", AsyncMock(return_value=client)), \
+             patch.object(tc, "_get_sync_redis", return_value=sync_client):
+            await tc.get_transcript("conv-1", "jwt", "user-1")
+            cache._loop = None
+            await asyncio.to_thread(tc.record_fields, "conv-1", title="Renamed")
+
+            assert await client.exists("axcouncil:transcript:conv-1") == 0
+            assert await client.get("axcouncil:transcript:conv-1:v") == "2"
+            load.return_value = {**_conversation(), "title": "Renamed"}
+            assert (await tc.get_transcript("conv-1", "jwt", "user-1"))["title"] == "Renamed"
+        assert load.call_count == 2
+
+    def test_memory_bounded_by_bytes(self):
+        """The least recently used transcripts are evicted beyond max_bytes."""
+        from backend.transcript_cache import TranscriptCache
+
+        cache = TranscriptCache(max_bytes=250, max_entry_bytes=200)
+        cache._put("a", {}, 1, 100)
+        cache._put("b", {}, 1, 100)
+        cache._put("c", {}, 1, 100)
+        cache._put("big", {}, 1, 201)
+
+        assert list(cache._entries) == ["b", "c"]
+        assert cache.stats()["bytes"] == 200
+        assert cache.evictions == 1
+
+
+class TestStorageHooks:
+    """Tests for storage.py writing through to the cache."""
+
+    def test_add_user_message_records_message(self):
+        """The stored message is appended in get_conversation's shape."""
+        from backend import storage
+
+        supabase = MagicMock()
+        supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[{"id": "m9"}])
+        with patch.object(storage, "_get_client", return_value=supabase), \
+             patch.object(storage, "record_message") as mock_record:
+            storage.add_user_message("conv-1", "hello", "user-1", access_token="jwt", image_analysis="a chart")
+
+        conversation_id, message, updated_at = mock_record.call_args.args
+        assert conversation_id == "conv-1"
+        assert message == {"id": "m9", "role": "user", "content": "hello", "image_analysis": "a chart"}
+
+    def test_delete_invalidates(self):
+        """Deleting a conversation drops its transcript."""
+        from backend import storage
+
+        supabase = MagicMock()
+        supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(data=[{"id": "conv-1"}])
+        with patch.object(storage, "_get_client", return_value=supabase), \
+             patch.object(storage, "invalidate_transcript") as mock_invalidate:
+            assert storage.delete_conversation("conv-1", access_token="jwt") is True
+
+        mock_invalidate.assert_called_once_with("conv-1")
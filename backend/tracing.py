@@ -0,0 +1,357 @@
+"""
+In-process tracing for council sessions.
+
+Answers "where did the time go?" for a single slow request: context loading,
+each model stream, ranking parse, chairman synthesis, output validation and
+every database call, all grouped under the request's correlation ID.
+
+USAGE:
+    with trace_span("validation", model=model):
+        ...
+
+    @traced("context_build")
+    async def get_system_prompt_with_context(...): ...
+
+    # Work whose start isn't wrapped (streams, hooks): record after the fact
+    record_span("llm.stream", duration_seconds, model=model, ttft_ms=...)
+
+STORAGE:
+Traces live in a bounded ring buffer (TRACING_MAX_TRACES, oldest evicted),
+each capped at TRACING_MAX_SPANS_PER_TRACE spans. Spans recorded outside a
+request (no correlation ID) are ignored.
+
+EXPORT:
+GET /admin/diagnostics/traces/{trace_id}?format=json|chrome. The Chrome trace
+format opens in chrome://tracing or https://ui.perfetto.dev, with one lane per
+model. With TRACING_SENTRY_FORWARD=true, spans are also attached to the
+current Sentry transaction.
+"""
+
+import contextvars
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from .config import (
+        TRACING_ENABLED,
+        TRACING_MAX_TRACES,
+        TRACING_MAX_SPANS_PER_TRACE,
+        TRACING_SENTRY_FORWARD,
+    )
+    from .security import _get_correlation_id
+except ImportError:
+    from backend.config import (
+        TRACING_ENABLED,
+        TRACING_MAX_TRACES,
+        TRACING_MAX_SPANS_PER_TRACE,
+        TRACING_SENTRY_FORWARD,
+    )
+    from backend.security import _get_correlation_id
+
+
+# Correlation ID placeholders used outside a request
+_NO_TRACE = {"", "no-correlation-id", "no-ctx"}
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """A timed operation within a trace. Times are epoch seconds."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes", "status")
+
+    def __init__(self, name: str, parent_id: Optional[int] = None, start: Optional[float] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.start = start if start is not None else time.time()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.status = "ok"
+
+    def set(self, **attributes) -> None:
+        """Add attributes (token counts, model, result sizes...)."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.time()
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round((end - self.start) * 1000, 2),
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is off or there is no request to attach to."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Innermost open span, used as the parent of new spans
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class _Trace:
+    __slots__ = ("trace_id", "route", "created_at", "spans", "dropped_spans")
+
+    def __init__(self, trace_id: str, route: str):
+        self.trace_id = trace_id
+        self.route = route
+        self.created_at = time.time()
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+
+
+class Tracer:
+    """Bounded, thread-safe store of recent traces keyed by correlation ID."""
+
+    def __init__(self, max_traces: int = TRACING_MAX_TRACES,
+                 max_spans_per_trace: int = TRACING_MAX_SPANS_PER_TRACE):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def add(self, trace_id: str, span: Span) -> None:
+        """Store a finished span under its trace, evicting the oldest trace if full."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                trace = _Trace(trace_id, _current_route())
+                self._traces[trace_id] = trace
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+                    self._evicted += 1
+            if len(trace.spans) >= self.max_spans_per_trace:
+                trace.dropped_spans += 1
+                return
+            trace.spans.append(span)
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Trace as a JSON-serializable dict, spans ordered by start time."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return None
+            spans = sorted((s.to_dict() for s in trace.spans), key=lambda s: s["start"])
+            dropped = trace.dropped_spans
+            route, created_at = trace.route, trace.created_at
+
+        duration_ms = 0.0
+        if spans:
+            first = spans[0]["start"]
+            last = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+            duration_ms = round((last - first) * 1000, 2)
+        return {
+            "trace_id": trace_id,
+            "route": route,
+            "created_at": created_at,
+            "duration_ms": duration_ms,
+            "span_count": len(spans),
+            "dropped_spans": dropped,
+            "spans": spans,
+        }
+
+    def list_traces(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of the most recent traces, newest first."""
+        with self._lock:
+            traces = list(self._traces.values())[-limit:][::-1]
+            return [
+                {
+                    "trace_id": t.trace_id,
+                    "route": t.route,
+                    "created_at": t.created_at,
+                    "span_count": len(t.spans),
+                    "duration_ms": round(
+                        (max((s.end or s.start) for s in t.spans) - min(s.start for s in t.spans)) * 1000, 2
+                    ) if t.spans else 0.0,
+                }
+                for t in traces
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+            self._evicted = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": TRACING_ENABLED,
+                "traces": len(self._traces),
+                "max_traces": self.max_traces,
+                "max_spans_per_trace": self.max_spans_per_trace,
+                "evicted": self._evicted,
+                "sentry_forwarding": TRACING_SENTRY_FORWARD,
+            }
+
+
+# Global singleton
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the global tracer."""
+    return _tracer
+
+
+# =============================================================================
+# RECORDING API
+# =============================================================================
+
+def _current_trace_id() -> Optional[str]:
+    trace_id = _get_correlation_id()
+    return None if trace_id in _NO_TRACE else trace_id
+
+
+def _current_route() -> str:
+    try:
+        from .main import get_request_route
+    except ImportError:
+        try:
+            from backend.main import get_request_route
+        except ImportError:
+            return ""
+    return get_request_route()
+
+
+def _finish(trace_id: str, span: Span) -> None:
+    _tracer.add(trace_id, span)
+    if TRACING_SENTRY_FORWARD:
+        try:
+            from .sentry import record_span as sentry_record_span
+        except ImportError:
+            from backend.sentry import record_span as sentry_record_span
+        description = span.attributes.get("model") or span.attributes.get("resource") or span.name
+        sentry_record_span(span.name, str(description), span.start, span.end, **span.attributes)
+
+
+@contextmanager
+def trace_span(name: str, **attributes) -> Iterator[Any]:
+    """
+    Time the enclosed block as a span of the current request's trace.
+
+    Nested spans record the enclosing span as their parent. Exceptions mark
+    the span as errored and propagate. Don't hold a span open across a
+    `yield` in an async generator; use record_span() for those.
+    """
+    trace_id = _current_trace_id() if TRACING_ENABLED else None
+    if trace_id is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    span = Span(name, parent_id=parent.span_id if parent else None, attributes=attributes)
+    started = time.perf_counter()
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Exited in a different context than it was entered in
+            _current_span.set(parent)
+        span.end = span.start + (time.perf_counter() - started)
+        _finish(trace_id, span)
+
+
+def record_span(name: str, duration: float, status: str = "ok", **attributes) -> None:
+    """
+    Record a span that has just finished and lasted `duration` seconds.
+
+    For work whose start isn't wrapped in trace_span (model streams, HTTP
+    hooks, generator stages).
+    """
+    if not TRACING_ENABLED:
+        return
+    trace_id = _current_trace_id()
+    if trace_id is None:
+        return
+
+    end = time.time()
+    parent = _current_span.get()
+    span = Span(name, parent_id=parent.span_id if parent else None, start=end - max(0.0, duration),
+                attributes=attributes)
+    span.end = end
+    span.status = status
+    _finish(trace_id, span)
+
+
+def traced(name: str):
+    """Decorator form of trace_span for async functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with trace_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def _lane(name: str, attributes: Dict[str, Any]) -> str:
+    """Display lane: one per model, one for database calls, the rest on main."""
+    if "model" in attributes:
+        return str(attributes["model"])
+    if name.startswith("db."):
+        return "db"
+    return "main"
+
+
+def to_chrome_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a trace from Tracer.get() to the Chrome Trace Event format.
+
+    Each span becomes a complete ("X") event; lanes (models, db, main) are
+    mapped to thread IDs with thread_name metadata so they render as rows.
+    """
+    lanes: Dict[str, int] = {"main": 1}
+    events: List[Dict[str, Any]] = []
+
+    for span in trace["spans"]:
+        attributes = span["attributes"]
+        lane = _lane(span["name"], attributes)
+        tid = lanes.setdefault(lane, len(lanes) + 1)
+        events.append({
+            "name": span["name"],
+            "cat": span["name"].split(".", 1)[0],
+            "ph": "X",
+            "ts": round(span["start"] * 1_000_000),
+            "dur": round(span["duration_ms"] * 1000),
+            "pid": 1,
+            "tid": tid,
+            "args": {**attributes, "status": span["status"], "span_id": span["span_id"],
+                     "parent_id": span["parent_id"]},
+        })
+
+    metadata = [
+        {"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+         "args": {"name": f"{trace['route'] or 'request'} [{trace['trace_id']}]"}},
+    ] + [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}}
+        for lane, tid in lanes.items()
+    ]
+    return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
@@ -0,0 +1,428 @@
+"""
+Read-through cache of conversation transcripts for follow-up turns.
+
+send_message, chat_with_chairman and the estimate endpoint need the whole
+conversation (up to 200 messages with Stage 1/2/3 payloads) to build the
+council history, and the previous turn wrote those messages moments earlier.
+Transcripts are kept in two tiers:
+
+1. REDIS - axcouncil:transcript:{id} holds {"version", "conversation"} and
+   axcouncil:transcript:{id}:v the current version, shared by all workers.
+2. MEMORY - A per-process LRU bounded by TRANSCRIPT_CACHE_MAX_BYTES. An entry
+   is served only while its version matches the Redis version, so a turn
+   handled by another worker is never missed.
+
+storage.py writes through: add_user_message / add_assistant_message append
+the new message, title and history summary updates patch their fields, and
+archive / delete drop the transcript (bumping the version, so the key never
+goes back to an earlier one). Every publish is a compare-and-set against
+the version its data was based on: a database load that raced a newer write
+is returned to its caller but not cached. Writes run as tasks on the event loop
+(forwarded there from worker threads), in order per conversation; get_transcript
+waits for a conversation's pending writes before reading it. The loop is bound
+at startup; a worker thread that finds no running loop invalidates the
+transcript with a synchronous Redis call instead, so no write is lost.
+
+Without Redis the cache is bypassed and transcripts load from the database.
+"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from .config import (
+        TRANSCRIPT_CACHE_ENABLED,
+        TRANSCRIPT_CACHE_TTL,
+        TRANSCRIPT_CACHE_MAX_BYTES,
+        TRANSCRIPT_CACHE_MAX_ENTRY_BYTES,
+    )
+    from .config import REDIS_URL, REDIS_ENABLED
+    from .cache import get_redis
+    from .metrics import record_cache_lookup
+except ImportError:
+    from backend.config import (
+        TRANSCRIPT_CACHE_ENABLED,
+        TRANSCRIPT_CACHE_TTL,
+        TRANSCRIPT_CACHE_MAX_BYTES,
+        TRANSCRIPT_CACHE_MAX_ENTRY_BYTES,
+    )
+    from backend.config import REDIS_URL, REDIS_ENABLED
+    from backend.cache import get_redis
+    from backend.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Matches the default message_limit of storage.get_conversation
+TRANSCRIPT_MESSAGE_LIMIT = 200
+
+Conversation = Dict[str, Any]
+# Returns the updated conversation, or None to drop the transcript
+TranscriptUpdate = Optional[Callable[[Conversation], Optional[Conversation]]]
+
+
+def _redis_key(conversation_id: str) -> str:
+    return f"axcouncil:transcript:{conversation_id}"
+
+
+def _version_key(conversation_id: str) -> str:
+    return f"axcouncil:transcript:{conversation_id}:v"
+
+
+# Publish a transcript only if the version is still the one it was based on.
+# KEYS: 1 version, 2 transcript
+# ARGV: 1 expected version (0 = none), 2 ttl, 3 conversation JSON, 4 store (1/0)
+PUBLISH_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') ~= tonumber(ARGV[1]) then
+    return false
+end
+local version = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if ARGV[4] == '1' then
+    redis.call('SET', KEYS[2], '{"version": ' .. version .. ', "conversation": ' .. ARGV[3] .. '}', 'EX', ARGV[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+return version
+"""
+
+# Drop a transcript but move the version on, so in-flight loads don't publish
+# KEYS: 1 version, 2 transcript; ARGV: 1 ttl
+INVALIDATE_SCRIPT = """
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+
+_sync_client = None
+
+
+def _get_sync_redis():
+    """Blocking Redis client for worker threads with no event loop to hand over to."""
+    global _sync_client
+    if not REDIS_ENABLED:
+        return None
+    if _sync_client is None:
+        import redis
+        _sync_client = redis.Redis.from_url(REDIS_URL, decode_responses=True,
+                                            socket_timeout=5.0, socket_connect_timeout=5.0)
+    return _sync_client
+
+
+def _copy(conversation: Conversation) -> Conversation:
+    """Shallow copy so callers can't modify the cached message list."""
+    return {**conversation, "messages": list(conversation.get("messages") or [])}
+
+
+# =============================================================================
+# TRANSCRIPT UPDATES
+# =============================================================================
+
+def _append_message(message: Dict[str, Any], updated_at: str) -> TranscriptUpdate:
+    def apply(conversation: Conversation) -> Conversation:
+        messages = list(conversation.get("messages") or []) + [message]
+        count = conversation.get("message_count") or len(messages) - 1
+        updated = {**conversation, "messages": messages, "message_count": count + 1, "last_updated": updated_at}
+        if len(messages) > TRANSCRIPT_MESSAGE_LIMIT:
+            updated["messages"] = messages[-TRANSCRIPT_MESSAGE_LIMIT:]
+            updated["messages_truncated"] = True
+            updated["messages_shown"] = TRANSCRIPT_MESSAGE_LIMIT
+        return updated
+    return apply
+
+
+def _set_fields(**fields: Any) -> TranscriptUpdate:
+    def apply(conversation: Conversation) -> Conversation:
+        return {**conversation, **fields}
+    return apply
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+@dataclass
+class _Entry:
+    conversation: Conversation
+    version: int
+    size: int
+
+
+class TranscriptCache:
+    """Per-process LRU of transcripts, validated against Redis versions."""
+
+    def __init__(self, max_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = TRANSCRIPT_CACHE_MAX_ENTRY_BYTES,
+                 ttl: int = TRANSCRIPT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+    # -------------------------------------------------------------------------
+    # Memory tier
+    # -------------------------------------------------------------------------
+
+    def _put(self, conversation_id: str, conversation: Conversation, version: int, size: int) -> None:
+        self._drop(conversation_id)
+        if size > self.max_entry_bytes:
+            return
+        self._entries[conversation_id] = _Entry(conversation, version, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def _drop(self, conversation_id: str) -> None:
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    # -------------------------------------------------------------------------
+    # Redis tier
+    # -------------------------------------------------------------------------
+
+    async def _lookup(self, client, conversation_id: str,
+                      record: bool = True) -> Tuple[Optional[Conversation], int]:
+        """
+        Current transcript from memory or Redis (None if not cached), and the
+        version to publish against (0 if there is none).
+        """
+        raw_version = await client.get(_version_key(conversation_id))
+        version = int(raw_version) if raw_version is not None else 0
+        if raw_version is not None:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(conversation_id)
+                if record:
+                    self.memory_hits += 1
+                    record_cache_lookup("transcript", True, tier="memory")
+                return entry.conversation, version
+
+            raw = await client.get(_redis_key(conversation_id))
+            if raw:
+                cached = json.loads(raw)
+                if cached.get("version") == version:
+                    self._put(conversation_id, cached["conversation"], version, len(raw))
+                    if record:
+                        self.redis_hits += 1
+                        record_cache_lookup("transcript", True)
+                    return cached["conversation"], version
+
+        if record:
+            self.misses += 1
+            record_cache_lookup("transcript", False)
+        return None, version
+
+    async def _publish(self, client, conversation_id: str, conversation: Conversation, expected: int) -> bool:
+        """
+        Store a transcript under a new version in Redis and memory, unless the
+        version has moved on from `expected` (a newer write won the race).
+        """
+        body = json.dumps(conversation, default=str)
+        size = len(body) + 32
+        version = await client.eval(
+            PUBLISH_SCRIPT, 2, _version_key(conversation_id), _redis_key(conversation_id),
+            expected, self.ttl, body, int(size <= self.max_entry_bytes),
+        )
+        if version is None:
+            self._drop(conversation_id)
+            return False
+        self._put(conversation_id, conversation, int(version), size)
+        return True
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    async def _load(self, conversation_id: str, access_token: Optional[str]) -> Optional[Conversation]:
+        try:
+            from . import storage
+        except ImportError:
+            from backend import storage
+        return await asyncio.to_thread(storage.get_conversation, conversation_id, access_token=access_token)
+
+    async def get(self, conversation_id: str, access_token: Optional[str], user_id: str) -> Optional[Conversation]:
+        """
+        Get a conversation transcript, loading it from the database on a miss.
+
+        Cached transcripts are only returned to their owner; anyone else gets
+        the database (RLS-scoped) result.
+
+        Returns:
+            Conversation dict as returned by storage.get_conversation, or None
+        """
+        if not TRANSCRIPT_CACHE_ENABLED:
+            return await self._load(conversation_id, access_token)
+
+        self._loop = asyncio.get_running_loop()
+        pending = self._pending.get(conversation_id)
+        if pending is not None and not pending.done() and pending.get_loop() is self._loop:
+            await asyncio.wait([pending])
+
+        client = await get_redis()
+        if client is None:
+            return await self._load(conversation_id, access_token)
+
+        try:
+            cached, version = await self._lookup(client, conversation_id)
+        except Exception as e:
+            logger.debug("Transcript cache read failed for %s: %s", conversation_id, e)
+            cached, version = None, None
+        if cached is not None and cached.get("user_id") == user_id:
+            return _copy(cached)
+
+        # The version read before the load guards the publish below
+        conversation = await self._load(conversation_id, access_token)
+        if conversation is not None and conversation.get("user_id") == user_id and version is not None:
+            try:
+                await self._publish(client, conversation_id, _copy(conversation), version)
+            except Exception as e:
+                self._drop(conversation_id)
+                logger.debug("Transcript cache write failed for %s: %s", conversation_id, e)
+        return conversation
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop that worker-thread updates are forwarded to (app startup)."""
+        self._loop = loop
+
+    def _invalidate_sync(self, conversation_id: str) -> None:
+        """
+        Drop a transcript from a worker thread with a blocking Redis call.
+        The memory entry is left alone (it isn't thread-safe); the version
+        bump makes every worker's copy stale.
+        """
+        try:
+            client = _get_sync_redis()
+            if client is not None:
+                client.eval(INVALIDATE_SCRIPT, 2, _version_key(conversation_id),
+                            _redis_key(conversation_id), self.ttl)
+        except Exception as e:
+            logger.debug("Transcript cache invalidation failed for %s: %s", conversation_id, e)
+
+    async def _apply(self, conversation_id: str, update: TranscriptUpdate) -> None:
+        client = await get_redis()
+        try:
+            if client is not None and update is not None:
+                current, version = await self._lookup(client, conversation_id, record=False)
+                if current is not None and await self._publish(client, conversation_id, update(current), version):
+                    self.writes += 1
+                    return
+            if client is not None:
+                await client.eval(INVALIDATE_SCRIPT, 2, _version_key(conversation_id),
+                                  _redis_key(conversation_id), self.ttl)
+        except Exception as e:
+            logger.debug("Transcript cache update failed for %s: %s", conversation_id, e)
+        self._drop(conversation_id)
+
+    def update(self, conversation_id: str, update: TranscriptUpdate) -> None:
+        """
+        Apply an update to a cached transcript (None drops it).
+
+        Safe to call from sync code on the event loop or from worker threads.
+        """
+        if not TRANSCRIPT_CACHE_ENABLED:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            # Worker thread (asyncio.to_thread) - hand over to the loop
+            if self._loop is not None and self._loop.is_running():
+                try:
+                    self._loop.call_soon_threadsafe(self.update, conversation_id, update)
+                    return
+                except RuntimeError:
+                    pass
+            # No loop to apply the update on; invalidating keeps readers correct
+            self._invalidate_sync(conversation_id)
+            return
+
+        previous = self._pending.get(conversation_id)
+        if previous is not None and (previous.done() or previous.get_loop() is not loop):
+            previous = None
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait([previous])
+            await self._apply(conversation_id, update)
+
+        task = loop.create_task(run())
+        self._pending[conversation_id] = task
+
+        def _done(finished: asyncio.Task) -> None:
+            if self._pending.get(conversation_id) is finished:
+                del self._pending[conversation_id]
+        task.add_done_callback(_done)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "enabled": TRANSCRIPT_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate_percent": round((self.memory_hits + self.redis_hits) / lookups * 100, 2) if lookups else 0.0,
+            "evictions": self.evictions,
+            "writes": self.writes,
+            "pending_writes": len(self._pending),
+        }
+
+
+_transcript_cache: Optional[TranscriptCache] = None
+
+
+def get_transcript_cache() -> TranscriptCache:
+    """Get the process-wide transcript cache."""
+    global _transcript_cache
+    if _transcript_cache is None:
+        _transcript_cache = TranscriptCache()
+    return _transcript_cache
+
+
+# =============================================================================
+# PUBLIC HELPERS
+# =============================================================================
+
+async def get_transcript(conversation_id: str, access_token: Optional[str], user_id: str) -> Optional[Conversation]:
+    """Get a conversation for a follow-up turn (see TranscriptCache.get)."""
+    return await get_transcript_cache().get(conversation_id, access_token, user_id)
+
+
+def record_message(conversation_id: str, message: Dict[str, Any], updated_at: str) -> None:
+    """Append a newly stored message to the cached transcript."""
+    get_transcript_cache().update(conversation_id, _append_message(message, updated_at))
+
+
+def record_fields(conversation_id: str, **fields: Any) -> None:
+    """Patch top-level fields (title, history summary) of the cached transcript."""
+    get_transcript_cache().update(conversation_id, _set_fields(**fields))
+
+
+def invalidate_transcript(conversation_id: str) -> None:
+    """Drop the cached transcript (archive, delete)."""
+    get_transcript_cache().update(conversation_id, None)
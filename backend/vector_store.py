@@ -24,6 +24,7 @@ from .config import (
     QDRANT_COLLECTION_DOCUMENTS,
     EMBEDDING_DIMENSIONS,
     OPENROUTER_API_KEY,
+    OPENROUTER_EMBEDDINGS_URL,
 )
 from .security import log_error, log_app_event
 
@@ -147,7 +148,7 @@ async def get_embedding(text: str) -> Optional[list[float]]:
     try:
         async with httpx.AsyncClient(timeout=30) as client:
             response = await client.post(
-                "https://openrouter.ai/api/v1/embeddings",
+                OPENROUTER_EMBEDDINGS_URL,
                 headers={
                     "Authorization": f"Bearer {OPENROUTER_API_KEY}",
                     "Content-Type": "application/json",
@@ -73,9 +73,11 @@ export const adminMethods = {
     return response.json();
   },
 
-  async getModelAnalytics(): Promise<ModelAnalyticsResponse> {
+  async getModelAnalytics(window: '7d' | '30d' | 'all' = 'all'): Promise<ModelAnalyticsResponse> {
     const headers = await getAuthHeaders();
-    const response = await fetch(`${API_BASE}${API_VERSION}/admin/model-analytics`, { headers });
+    const response = await fetch(`${API_BASE}${API_VERSION}/admin/model-analytics?window=${window}`, {
+      headers,
+    });
     if (!response.ok) {
       throw new Error('Failed to fetch model analytics');
     }
@@ -86,12 +88,14 @@ export const adminMethods = {
     page?: number;
     page_size?: number;
     search?: string;
+    cursor?: string;
   }): Promise<AdminUsersResponse> {
     const headers = await getAuthHeaders();
     const searchParams = new URLSearchParams();
     if (params?.page) searchParams.set('page', params.page.toString());
     if (params?.page_size) searchParams.set('page_size', params.page_size.toString());
     if (params?.search) searchParams.set('search', params.search);
+    if (params?.cursor) searchParams.set('cursor', params.cursor);
     const url = `${API_BASE}${API_VERSION}/admin/users?${searchParams.toString()}`;
     const response = await fetch(url, { headers });
     if (!response.ok) {
@@ -28,6 +28,7 @@ export const conversationsMethods = {
   async listConversations({
     limit = 20,
     offset = 0,
+    cursor = null,
     search = '',
     includeArchived = false,
     sortBy = 'date',
@@ -36,7 +37,11 @@ export const conversationsMethods = {
     const headers = await getAuthHeaders();
     const params = new URLSearchParams();
     params.set('limit', limit.toString());
-    params.set('offset', offset.toString());
+    if (cursor) {
+      params.set('cursor', cursor);
+    } else {
+      params.set('offset', offset.toString());
+    }
     params.set('sort_by', sortBy);
     if (search) {
       params.set('search', search);
@@ -91,6 +96,22 @@ export const conversationsMethods = {
     return response.json();
   },
 
+  /**
+   * Get the full Stage 1/2 payloads of one assistant message.
+   * Conversations load with a stage summary only (stages_deferred).
+   */
+  async getMessageStages(conversationId: string, messageId: string) {
+    const headers = await getAuthHeaders();
+    const response = await fetch(
+      `${API_BASE}${API_VERSION}/conversations/${conversationId}/messages/${messageId}/stages`,
+      { headers }
+    );
+    if (!response.ok) {
+      throw new Error('Failed to get message stages');
+    }
+    return response.json();
+  },
+
   async sendMessage(conversationId: string, content: string, businessId: string | null = null) {
     const headers = await getAuthHeaders();
     const response = await fetch(
@@ -276,29 +297,32 @@ export const conversationsMethods = {
     }
   },
 
-  async getLeaderboardSummary() {
+  async getLeaderboardSummary(window: '7d' | '30d' | 'all' = 'all') {
     const headers = await getAuthHeaders();
-    const response = await fetch(`${API_BASE}${API_VERSION}/leaderboard`, { headers });
+    const response = await fetch(`${API_BASE}${API_VERSION}/leaderboard?window=${window}`, { headers });
     if (!response.ok) {
       throw new Error('Failed to get leaderboard');
     }
     return response.json();
   },
 
-  async getOverallLeaderboard() {
+  async getOverallLeaderboard(window: '7d' | '30d' | 'all' = 'all') {
     const headers = await getAuthHeaders();
-    const response = await fetch(`${API_BASE}${API_VERSION}/leaderboard/overall`, { headers });
+    const response = await fetch(`${API_BASE}${API_VERSION}/leaderboard/overall?window=${window}`, {
+      headers,
+    });
     if (!response.ok) {
       throw new Error('Failed to get overall leaderboard');
     }
     return response.json();
   },
 
-  async getDepartmentLeaderboard(department: string) {
+  async getDepartmentLeaderboard(department: string, window: '7d' | '30d' | 'all' = 'all') {
     const headers = await getAuthHeaders();
-    const response = await fetch(`${API_BASE}${API_VERSION}/leaderboard/department/${department}`, {
-      headers,
-    });
+    const response = await fetch(
+      `${API_BASE}${API_VERSION}/leaderboard/department/${department}?window=${window}`,
+      { headers }
+    );
     if (!response.ok) {
       throw new Error('Failed to get department leaderboard');
     }
@@ -12,6 +12,8 @@
 export interface ListConversationsOptions {
   limit?: number;
   offset?: number;
+  /** next_cursor from the previous page (takes precedence over offset) */
+  cursor?: string | null;
   search?: string;
   includeArchived?: boolean;
   sortBy?: 'date' | 'activity';
@@ -155,6 +157,8 @@ export interface AdminUsersResponse {
   total: number;
   page: number;
   page_size: number;
+  /** Opaque keyset cursor for the next page; null on the last page */
+  next_cursor?: string | null;
 }
 
 export interface AdminCompanyInfo {
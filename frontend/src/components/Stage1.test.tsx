@@ -3,7 +3,7 @@
  *
  * Safety net for the Stage1 component (Individual AI Responses).
  * Tests: rendering states (loading, responses, streaming, collapsed),
- * model cards, collapse toggle, error detection.
+ * model cards, collapse toggle, error detection, deferred (pending) responses.
  */
 
 import { describe, it, expect, vi, beforeEach } from 'vitest';
@@ -300,6 +300,40 @@ describe('Stage1', () => {
     });
   });
 
+  // =========================================================================
+  // Deferred Stages
+  // =========================================================================
+
+  describe('Deferred Stages', () => {
+    const pendingResponses = sampleResponses.map(({ model }) => ({
+      model,
+      response: '',
+      pending: true,
+    }));
+
+    it('shows pending responses as loading, not empty or errored', () => {
+      const { container } = renderStage1({ responses: pendingResponses });
+
+      expect(screen.getAllByText('stages.loadingResponse')).toHaveLength(3);
+      expect(screen.queryByText('stages.noResponse')).not.toBeInTheDocument();
+      expect(container.querySelector('.model-card.error')).toBeNull();
+    });
+
+    it('shows no error pills for pending responses when collapsed', () => {
+      const { container } = renderStage1({ responses: pendingResponses, defaultCollapsed: true });
+
+      expect(screen.getByText('OpenAI')).toBeInTheDocument();
+      expect(container.querySelector('.model-summary-pill.error')).toBeNull();
+      expect(container.querySelector('.pill-error')).toBeNull();
+    });
+
+    it('still marks a genuinely empty saved response as empty', () => {
+      renderStage1({ responses: [{ model: 'gpt-4', response: '' }] });
+
+      expect(screen.getByText('stages.noResponse')).toBeInTheDocument();
+    });
+  });
+
   // =========================================================================
   // Stopped State
   // =========================================================================
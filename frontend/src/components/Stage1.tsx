@@ -402,7 +402,9 @@ const ModelCard = memo(function ModelCard({
         aria-live="polite"
         aria-busy={data.isStreaming}
       >
-        {data.isEmpty ? (
+        {data.isPending ? (
+          <p className="model-card-preview">{t('stages.loadingResponse')}</p>
+        ) : data.isEmpty ? (
           <p className="model-card-empty">{t('stages.noResponse')}</p>
         ) : data.hasError ? (
           <p className="model-card-error">{data.response || t('stages.errorOccurred')}</p>
@@ -475,6 +477,7 @@ function Stage1({
   expandedModel: externalExpandedModel,
   onExpandedModelChange,
   aggregateRankings,
+  onOpen,
 }: Stage1Props) {
   const { t } = useTranslation();
   const [isCollapsed, setIsCollapsed] = useState(defaultCollapsed);
@@ -537,19 +540,22 @@ function Stage1({
         hasError: hasError || hasTextError,
         isEmpty: isComplete && !textContent && !hasError,
         isStopped: Boolean(wasStopped),
+        isPending: false,
       });
     });
   } else if (responses && responses.length > 0) {
     responses.forEach((resp) => {
-      const hasTextError = textLooksLikeError(resp.response);
+      const isPending = Boolean(resp.pending);
+      const hasTextError = !isPending && textLooksLikeError(resp.response);
       displayData.push({
         model: resp.model,
         response: resp.response,
         isStreaming: false,
         isComplete: !hasTextError,
         hasError: hasTextError,
-        isEmpty: !resp.response,
+        isEmpty: !isPending && !resp.response,
         isStopped: false,
+        isPending,
       });
     });
   }
@@ -630,6 +636,7 @@ function Stage1({
 
   const toggleCollapsed = () => {
     setUserToggled(true);
+    if (isCollapsed) onOpen?.();
     setIsCollapsed(!isCollapsed);
   };
 
@@ -82,6 +82,7 @@ function Stage2({
   isComplete,
   defaultCollapsed = true,
   onModelClick,
+  onOpen,
 }: Stage2Props) {
   const { t } = useTranslation();
   const [activeTab, setActiveTab] = useState(0);
@@ -125,20 +126,23 @@ function Stage2({
         hasError: hasError || hasTextError,
         isEmpty: isComplete && !textValue && !hasError,
         parsed_ranking: null,
+        isPending: false,
       });
     });
   } else if (rankings && rankings.length > 0) {
     // Use final rankings
     rankings.forEach((rank) => {
-      const hasTextError = textLooksLikeError(rank.ranking);
+      const isPending = Boolean(rank.pending);
+      const hasTextError = !isPending && textLooksLikeError(rank.ranking);
       displayData.push({
         model: rank.model,
         ranking: rank.ranking,
         isStreaming: false,
         isComplete: !hasTextError,
         hasError: hasTextError,
-        isEmpty: !rank.ranking,
+        isEmpty: !isPending && !rank.ranking,
         parsed_ranking: rank.parsed_ranking ?? null,
+        isPending,
       });
     });
   }
@@ -202,6 +206,7 @@ function Stage2({
 
   const toggleCollapsed = () => {
     setUserToggled(true);
+    if (isCollapsed) onOpen?.();
     setIsCollapsed(!isCollapsed);
   };
 
@@ -341,7 +346,9 @@ function Stage2({
               aria-live="polite"
               aria-busy={activeData.isStreaming}
             >
-              {activeData.isEmpty ? (
+              {activeData.isPending ? (
+                <p className="empty-message">{t('stages.loadingEvaluation')}</p>
+              ) : activeData.isEmpty ? (
                 <p className="empty-message">{t('stages.noEvaluation')}</p>
               ) : activeData.hasError ? (
                 <p className="empty-message">{activeData.ranking || t('stages.evaluationError')}</p>
@@ -30,6 +30,7 @@ import { makeClickable } from '../../utils/a11y';
 import type { Project } from '../../types/business';
 import type { Conversation, StreamingState } from '../../types/conversation';
 import type { AggregateRanking } from '../../types/stages';
+import { useMessageStages } from '../../hooks/queries/useConversations';
 
 /**
  * Remove [GAP: ...] markers from AI responses.
@@ -54,12 +55,14 @@ interface LoadingState {
 interface Stage1ResponseItem {
   model: string;
   response: string;
+  pending?: boolean;
 }
 
 interface Stage2RankingItem {
   model: string;
   ranking: string;
   parsed_ranking?: string[];
+  pending?: boolean;
 }
 
 interface Stage3Response {
@@ -75,6 +78,11 @@ interface Stage3StreamingState {
   model?: string;
 }
 
+interface StageSummary {
+  stage1: Array<{ model: string; chars: number }>;
+  stage2: Array<{ model: string; parsed_ranking?: string[] }>;
+}
+
 interface Message {
   id?: string;
   role: 'user' | 'assistant';
@@ -93,6 +101,9 @@ interface Message {
   label_to_model?: Record<string, string>;
   imageAnalysis?: string;
   usage?: UsageData;
+  /** Stage 1/2 payloads weren't loaded with the conversation; fetch on expand */
+  stages_deferred?: boolean;
+  stage_summary?: StageSummary;
 }
 
 interface CouncilStagesProps {
@@ -125,10 +136,44 @@ interface MessageListProps {
  * CouncilStages - Wrapper that connects Stage1 and Stage2 with shared expanded model state
  * When user clicks a ranking in Stage2, it expands the corresponding card in Stage1
  */
-function CouncilStages({ msg, conversation }: CouncilStagesProps) {
+function CouncilStages({ msg: rawMsg, conversation }: CouncilStagesProps) {
   const [expandedModel, setExpandedModel] = useState<string | null>(null);
+  const [stagesRequested, setStagesRequested] = useState(false);
+
+  // Saved conversations load Stage 1/2 as a summary only; fetch the full
+  // payloads the first time either stage is opened.
+  const deferred = Boolean(rawMsg.stages_deferred && rawMsg.id && conversation?.id);
+  const { data: loadedStages } = useMessageStages(
+    conversation?.id ?? '',
+    rawMsg.id ?? '',
+    deferred && stagesRequested
+  );
+  const requestStages = deferred ? () => setStagesRequested(true) : undefined;
+
+  let msg = rawMsg;
+  if (deferred) {
+    msg = loadedStages
+      ? { ...rawMsg, stage1: loadedStages.stage1, stage2: loadedStages.stage2 }
+      : {
+          ...rawMsg,
+          // Placeholders keep the collapsed headers (model list, rankings) visible.
+          // pending marks them not-yet-loaded; only a zero-length saved response is empty.
+          stage1: (rawMsg.stage_summary?.stage1 ?? []).map((s) => ({
+            model: s.model,
+            response: '',
+            pending: s.chars > 0,
+          })),
+          stage2: (rawMsg.stage_summary?.stage2 ?? []).map((s) => ({
+            model: s.model,
+            ranking: '',
+            pending: true,
+            ...(s.parsed_ranking ? { parsed_ranking: s.parsed_ranking } : {}),
+          })),
+        };
+  }
 
   const handleRankingClick = (model: string) => {
+    requestStages?.();
     setExpandedModel(model);
   };
 
@@ -157,6 +202,7 @@ function CouncilStages({ msg, conversation }: CouncilStagesProps) {
             expandedModel={expandedModel}
             onExpandedModelChange={setExpandedModel}
             {...(aggregateRankings ? { aggregateRankings } : {})}
+            {...(requestStages ? { onOpen: requestStages } : {})}
           />
         </Suspense>
       )}
@@ -179,6 +225,7 @@ function CouncilStages({ msg, conversation }: CouncilStagesProps) {
                 isComplete={isStageComplete}
                 {...(conversation?.title ? { conversationTitle: conversation.title } : {})}
                 onModelClick={handleRankingClick}
+                {...(requestStages ? { onOpen: requestStages } : {})}
               />
             </Suspense>
           );
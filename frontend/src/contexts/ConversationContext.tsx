@@ -155,6 +155,8 @@ export function ConversationProvider({ children }: ConversationProviderProps) {
   // Track if we're explicitly loading more (vs background refetch)
   const isLoadingMoreRef = useRef<boolean>(false);
   const pendingOffsetRef = useRef<number>(0);
+  // Keyset cursor for the next page (from the last response's next_cursor)
+  const nextCursorRef = useRef<string | null>(null);
 
   const {
     data: conversationsData,
@@ -174,8 +176,10 @@ export function ConversationProvider({ children }: ConversationProviderProps) {
         limit,
         sortBy: apiSortBy,
         offset: currentOffset,
+        cursor: currentOffset > 0 ? nextCursorRef.current : null,
         companyId: selectedBusiness,
       });
+      nextCursorRef.current = result.next_cursor ?? null;
 
       // Reset the loading more flag after fetch completes
       const wasLoadingMore = isLoadingMoreRef.current;
@@ -266,6 +270,7 @@ export function ConversationProvider({ children }: ConversationProviderProps) {
   useEffect(() => {
     isLoadingMoreRef.current = false;
     pendingOffsetRef.current = 0;
+    nextCursorRef.current = null;
   }, [selectedBusiness]);
 
   // ═══════════════════════════════════════════════════════════════════════════
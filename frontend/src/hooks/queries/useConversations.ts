@@ -8,6 +8,8 @@ export const conversationKeys = {
   details: () => [...conversationKeys.all, 'detail'] as const,
   detail: (id: string) => [...conversationKeys.details(), id] as const,
   messages: (id: string) => [...conversationKeys.detail(id), 'messages'] as const,
+  stages: (id: string, messageId: string) =>
+    [...conversationKeys.detail(id), 'stages', messageId] as const,
 };
 
 interface ListConversationsParams {
@@ -28,13 +30,13 @@ export function useConversations(params: ListConversationsParams = {}) {
 export function useInfiniteConversations(params: Omit<ListConversationsParams, 'offset'> = {}) {
   return useInfiniteQuery({
     queryKey: conversationKeys.list({ ...params, infinite: true }),
-    queryFn: ({ pageParam }: { pageParam: number }) =>
-      api.listConversations({ ...params, offset: pageParam, limit: params.limit ?? 20 }),
-    getNextPageParam: (lastPage: { has_more: boolean }, allPages: unknown[]) => {
+    queryFn: ({ pageParam }: { pageParam: string | null }) =>
+      api.listConversations({ ...params, cursor: pageParam, limit: params.limit ?? 20 }),
+    getNextPageParam: (lastPage: { has_more: boolean; next_cursor?: string | null }) => {
       if (!lastPage.has_more) return undefined;
-      return allPages.length * (params.limit ?? 20);
+      return lastPage.next_cursor ?? undefined;
     },
-    initialPageParam: 0,
+    initialPageParam: null as string | null,
   });
 }
 
@@ -46,6 +48,19 @@ export function useConversation(conversationId: string) {
   });
 }
 
+/**
+ * Full Stage 1/2 payloads for a message loaded with stages_deferred.
+ * Only fetched once enabled (i.e. when the user expands a stage).
+ */
+export function useMessageStages(conversationId: string, messageId: string, enabled: boolean) {
+  return useQuery({
+    queryKey: conversationKeys.stages(conversationId, messageId),
+    queryFn: () => api.getMessageStages(conversationId, messageId),
+    enabled: enabled && !!conversationId && !!messageId,
+    staleTime: Infinity, // Stage payloads never change once saved
+  });
+}
+
 export function useCreateConversation() {
   const queryClient = useQueryClient();
 
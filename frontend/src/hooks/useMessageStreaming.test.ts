@@ -377,6 +377,7 @@ describe('Stream event types', () => {
     'error',
     'cancelled',
     'image_analysis_start',
+    'image_analysis_progress',
     'image_analysis_complete',
     'usage',
   ];
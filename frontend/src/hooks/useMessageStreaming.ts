@@ -724,6 +724,15 @@ export function useMessageStreaming({
           break;
         }
 
+        case 'image_analysis_progress': {
+          const name = event.name as string | undefined;
+          const completed = event.completed as number | undefined;
+          const total = event.total as number | undefined;
+          const success = event.success as boolean | undefined;
+          log.debug('[IMAGE] Analyzed', name, `(${completed}/${total})`, success ? '' : 'failed');
+          break;
+        }
+
         case 'image_analysis_error': {
           const message = event.message as string | undefined;
           const failedCount = event.failed_count as number | undefined;
@@ -31,6 +31,7 @@ export interface ListConversationsParams {
 export interface ListConversationsResponse {
   conversations: Conversation[];
   has_more: boolean;
+  next_cursor?: string | null;
 }
 
 // Business endpoints
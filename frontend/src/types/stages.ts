@@ -35,6 +35,8 @@ export interface Stage1DisplayData {
   hasError: boolean;
   isEmpty: boolean;
   isStopped: boolean;
+  /** Saved response whose text hasn't been fetched yet (deferred stages) */
+  isPending: boolean;
 }
 
 /** Rank data for a model card */
@@ -56,7 +58,8 @@ export interface ModelCardProps {
 
 /** Props for Stage1 component */
 export interface Stage1Props {
-  responses?: Array<{ model: string; response: string }>;
+  /** pending: placeholder for a saved response that is still being fetched */
+  responses?: Array<{ model: string; response: string; pending?: boolean }>;
   streaming?: Record<string, StreamingState>;
   isLoading: boolean;
   stopped?: boolean;
@@ -67,6 +70,8 @@ export interface Stage1Props {
   expandedModel?: string | null;
   onExpandedModelChange?: (model: string | null) => void;
   aggregateRankings?: AggregateRanking[];
+  /** Called when the user expands the stage (used to lazy-load deferred payloads) */
+  onOpen?: () => void;
 }
 
 /** Provider group for collapsed summary */
@@ -92,11 +97,19 @@ export interface Stage2DisplayData {
   hasError: boolean;
   isEmpty: boolean;
   parsed_ranking: string[] | null;
+  /** Saved evaluation whose text hasn't been fetched yet (deferred stages) */
+  isPending: boolean;
 }
 
 /** Props for Stage2 component */
 export interface Stage2Props {
-  rankings?: Array<{ model: string; ranking: string; parsed_ranking?: string[] }>;
+  /** pending: placeholder for a saved evaluation that is still being fetched */
+  rankings?: Array<{
+    model: string;
+    ranking: string;
+    parsed_ranking?: string[];
+    pending?: boolean;
+  }>;
   streaming?: Record<string, StreamingState>;
   labelToModel?: Record<string, string>;
   aggregateRankings?: AggregateRanking[];
@@ -105,6 +118,8 @@ export interface Stage2Props {
   defaultCollapsed?: boolean;
   conversationTitle?: string;
   onModelClick?: (model: string) => void;
+  /** Called when the user expands the stage (used to lazy-load deferred payloads) */
+  onOpen?: () => void;
 }
 
 // =============================================================================
@@ -0,0 +1,52 @@
+-- =============================================================================
+-- Model Telemetry Snapshots
+-- =============================================================================
+-- The backend keeps rolling per-model/per-stage histograms in memory
+-- (backend/telemetry.py) and periodically flushes a summary row per series
+-- here. This gives a persistent view of TTFT, latency, throughput, error and
+-- truncation rates for choosing council members and tuning timeouts.
+--
+-- Rows are append-only; each row summarizes the rolling window that ended at
+-- captured_at. Raw bucket counts are kept in histograms for re-aggregation.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS public.model_telemetry_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    model TEXT NOT NULL,
+    stage TEXT NOT NULL,              -- stage1, stage2, stage3, chat, title, direct
+    window_seconds INTEGER NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    truncations INTEGER NOT NULL DEFAULT 0,
+    error_rate NUMERIC(6, 4) NOT NULL DEFAULT 0,
+    truncation_rate NUMERIC(6, 4) NOT NULL DEFAULT 0,
+    ttft_p50_ms NUMERIC,
+    ttft_p90_ms NUMERIC,
+    ttft_p99_ms NUMERIC,
+    latency_p50_ms NUMERIC,
+    latency_p90_ms NUMERIC,
+    latency_p99_ms NUMERIC,
+    tokens_per_sec_p50 NUMERIC,
+    tokens_per_sec_mean NUMERIC,
+    histograms JSONB NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_telemetry_snapshots_captured_at
+    ON public.model_telemetry_snapshots(captured_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_model_telemetry_snapshots_model_stage
+    ON public.model_telemetry_snapshots(model, stage, captured_at DESC);
+
+ALTER TABLE public.model_telemetry_snapshots ENABLE ROW LEVEL SECURITY;
+
+-- Platform-wide operational data: only the backend (service role) reads/writes
+DROP POLICY IF EXISTS "Service role full access to model telemetry" ON public.model_telemetry_snapshots;
+CREATE POLICY "Service role full access to model telemetry" ON public.model_telemetry_snapshots
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+COMMENT ON TABLE public.model_telemetry_snapshots IS
+'Periodic snapshots of rolling per-model/per-stage LLM performance (TTFT, latency, tokens/sec, error and truncation rates) flushed by the backend telemetry store.';
@@ -0,0 +1,33 @@
+-- ============================================================================
+-- Batched Query Usage Increment
+-- ============================================================================
+-- The Redis quota engine (backend/quota.py) reserves queries in Redis and
+-- reconciles them to Postgres in batches. This applies a user's accumulated
+-- delta in one atomic statement; p_count may be negative when reservations
+-- for failed sessions were released after an earlier flush.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION increment_query_usage_by(p_user_id UUID, p_count INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_new_count INTEGER;
+BEGIN
+    INSERT INTO public.user_profiles (user_id, queries_used_this_period, updated_at)
+    VALUES (p_user_id, GREATEST(p_count, 0), NOW())
+    ON CONFLICT (user_id) DO UPDATE
+    SET
+        queries_used_this_period = GREATEST(COALESCE(public.user_profiles.queries_used_this_period, 0) + p_count, 0),
+        updated_at = NOW()
+    RETURNING queries_used_this_period INTO v_new_count;
+
+    RETURN v_new_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = '';
+
+-- Only the backend (service role) reconciles batched usage
+REVOKE EXECUTE ON FUNCTION increment_query_usage_by(UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_query_usage_by(UUID, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION increment_query_usage_by IS
+    'Atomically applies a batched query usage delta (quota engine reconciliation).';
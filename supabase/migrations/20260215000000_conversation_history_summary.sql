@@ -0,0 +1,27 @@
+-- ============================================================================
+-- Conversation History Summaries
+-- ============================================================================
+-- Council follow-ups used to re-send every prior turn verbatim, so prompt size
+-- grew with conversation length. backend/history.py now sends only the most
+-- recent turns verbatim and folds older turns into a rolling summary, updated
+-- in the background after each turn.
+--
+-- history_summary_messages is the number of messages (from the start of the
+-- conversation) the summary covers, so updates only fold in new turns.
+-- session_usage.history_tokens records how much of each prompt was history.
+-- ============================================================================
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS history_summary TEXT,
+    ADD COLUMN IF NOT EXISTS history_summary_messages INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN conversations.history_summary IS
+    'Rolling summary of earlier council turns, used in place of their full text in follow-up prompts.';
+COMMENT ON COLUMN conversations.history_summary_messages IS
+    'Number of messages (oldest first) folded into history_summary.';
+
+ALTER TABLE session_usage
+    ADD COLUMN IF NOT EXISTS history_tokens INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN session_usage.history_tokens IS
+    'Estimated prompt tokens spent on conversation history (summary plus verbatim turns).';
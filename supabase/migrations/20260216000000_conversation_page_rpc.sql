@@ -0,0 +1,106 @@
+-- ============================================================================
+-- Single Round-Trip Conversation Loading
+-- ============================================================================
+-- storage.get_conversation made three sequential queries (conversation row,
+-- exact message count, then up to 200 messages with select('*')), and every
+-- assistant row carried its full stage1/stage2 JSON - often hundreds of KB
+-- per turn - although the UI only shows Stage 3 until a tab is expanded.
+--
+-- get_conversation_page returns metadata, total count and the most recent
+-- page of messages in one call. By default assistant messages carry Stage 3
+-- plus a small stage_summary (per-model response lengths and parsed
+-- rankings); full Stage 1/2 payloads are fetched per message on demand.
+--
+-- SECURITY INVOKER: runs with the caller's RLS policies, exactly like the
+-- table queries it replaces. Returns NULL if the conversation isn't visible.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION get_conversation_page(
+    p_conversation_id UUID,
+    p_message_limit INTEGER DEFAULT 200,
+    p_include_stages BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = ''
+AS $$
+    SELECT jsonb_build_object(
+        'conversation', jsonb_build_object(
+            'id', c.id,
+            'user_id', c.user_id,
+            'title', c.title,
+            'archived', c.archived,
+            'created_at', c.created_at,
+            'updated_at', c.updated_at,
+            'curator_history', c.curator_history,
+            'history_summary', c.history_summary,
+            'history_summary_messages', c.history_summary_messages
+        ),
+        'message_count', (
+            SELECT count(*) FROM public.messages m WHERE m.conversation_id = c.id
+        ),
+        'messages', COALESCE((
+            SELECT jsonb_agg(page.message ORDER BY page.created_at, page.id)
+            FROM (
+                SELECT
+                    m.id,
+                    m.created_at,
+                    jsonb_build_object(
+                        'id', m.id,
+                        'role', m.role,
+                        'content', m.content,
+                        'image_analysis', m.image_analysis,
+                        'stage3', m.stage3,
+                        'label_to_model', m.label_to_model,
+                        'aggregate_rankings', m.aggregate_rankings,
+                        'created_at', m.created_at
+                    )
+                    || CASE
+                        WHEN m.role <> 'assistant' THEN '{}'::jsonb
+                        WHEN p_include_stages THEN jsonb_build_object(
+                            'stage1', m.stage1,
+                            'stage2', m.stage2
+                        )
+                        ELSE jsonb_build_object('stage_summary', jsonb_build_object(
+                            'stage1', COALESCE((
+                                SELECT jsonb_agg(jsonb_build_object(
+                                    'model', e->>'model',
+                                    'chars', length(e->>'response')
+                                ))
+                                FROM jsonb_array_elements(
+                                    CASE WHEN jsonb_typeof(m.stage1::jsonb) = 'array'
+                                         THEN m.stage1::jsonb ELSE '[]'::jsonb END
+                                ) e
+                            ), '[]'::jsonb),
+                            'stage2', COALESCE((
+                                SELECT jsonb_agg(jsonb_build_object(
+                                    'model', e->>'model',
+                                    'parsed_ranking', e->'parsed_ranking'
+                                ))
+                                FROM jsonb_array_elements(
+                                    CASE WHEN jsonb_typeof(m.stage2::jsonb) = 'array'
+                                         THEN m.stage2::jsonb ELSE '[]'::jsonb END
+                                ) e
+                            ), '[]'::jsonb)
+                        ))
+                    END AS message
+                FROM public.messages m
+                WHERE m.conversation_id = c.id
+                ORDER BY m.created_at DESC, m.id DESC
+                -- NULL limit = all messages
+                LIMIT CASE WHEN p_message_limit > 0 THEN p_message_limit END
+            ) page
+        ), '[]'::jsonb)
+    )
+    FROM public.conversations c
+    WHERE c.id = p_conversation_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_conversation_page(UUID, INTEGER, BOOLEAN) TO authenticated, service_role;
+
+COMMENT ON FUNCTION get_conversation_page IS
+    'Conversation metadata, message count and the latest message page in one round trip; Stage 1/2 payloads only when p_include_stages.';
+
+-- Paging relies on idx_messages_conversation_created (conversation_id, created_at DESC).
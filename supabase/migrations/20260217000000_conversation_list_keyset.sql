@@ -0,0 +1,92 @@
+-- ============================================================================
+-- Conversation List: Denormalized Counts + Keyset Pagination
+-- ============================================================================
+-- storage.list_conversations joined messages(count) for every row, dropped
+-- zero-message conversations in Python (so pages came back short) and sorted
+-- "activity" in Python within a single page (so the global order was wrong).
+--
+-- conversations now carries message_count and last_message_at, maintained by
+-- a trigger on messages, so the list is a plain indexed scan that can be
+-- paginated with a keyset cursor:
+--   date:     is_starred DESC, last_message_at DESC, id DESC
+--   activity: is_starred DESC, message_count DESC, last_message_at DESC, id DESC
+-- ============================================================================
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN conversations.message_count IS
+    'Number of messages in the conversation (maintained by trigger_sync_conversation_message_stats).';
+COMMENT ON COLUMN conversations.last_message_at IS
+    'created_at of the newest message (maintained by trigger_sync_conversation_message_stats).';
+
+-- =============================================
+-- STEP 1: BACKFILL
+-- =============================================
+
+UPDATE conversations c
+SET message_count = stats.message_count,
+    last_message_at = stats.last_message_at
+FROM (
+    SELECT conversation_id, count(*) AS message_count, max(created_at) AS last_message_at
+    FROM messages
+    GROUP BY conversation_id
+) stats
+WHERE stats.conversation_id = c.id;
+
+-- =============================================
+-- STEP 2: KEEP IN SYNC ON WRITE
+-- =============================================
+-- SECURITY DEFINER so the counters stay correct whichever role writes the
+-- message. Deliberately doesn't touch updated_at.
+
+CREATE OR REPLACE FUNCTION sync_conversation_message_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.conversations
+        SET message_count = message_count + 1,
+            last_message_at = GREATEST(COALESCE(last_message_at, NEW.created_at), NEW.created_at)
+        WHERE id = NEW.conversation_id;
+        RETURN NEW;
+    END IF;
+
+    UPDATE public.conversations
+    SET message_count = GREATEST(message_count - 1, 0),
+        last_message_at = (
+            SELECT max(m.created_at) FROM public.messages m WHERE m.conversation_id = OLD.conversation_id
+        )
+    WHERE id = OLD.conversation_id;
+    RETURN OLD;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION sync_conversation_message_stats() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS trigger_sync_conversation_message_stats ON messages;
+
+CREATE TRIGGER trigger_sync_conversation_message_stats
+    AFTER INSERT OR DELETE ON messages
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_conversation_message_stats();
+
+-- =============================================
+-- STEP 3: COVERING INDEXES FOR BOTH SORT MODES
+-- =============================================
+-- Partial on message_count > 0: empty conversations never appear in the list.
+-- INCLUDE carries the list's remaining columns for index-only scans.
+
+CREATE INDEX IF NOT EXISTS idx_conversations_list_date
+    ON conversations (user_id, company_id, is_archived, is_starred DESC, last_message_at DESC, id DESC)
+    INCLUDE (title, created_at, updated_at, message_count, department)
+    WHERE message_count > 0;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_list_activity
+    ON conversations (user_id, company_id, is_archived, is_starred DESC, message_count DESC, last_message_at DESC, id DESC)
+    INCLUDE (title, created_at, updated_at, department)
+    WHERE message_count > 0;
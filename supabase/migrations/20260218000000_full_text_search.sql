@@ -0,0 +1,259 @@
+-- ============================================================================
+-- Full-Text Search
+-- ============================================================================
+-- Search used ilike('%term%') on conversation titles, knowledge entries and
+-- playbook titles: unindexed sequential scans that only match substrings.
+--
+-- Each searchable table gets a trigger-maintained search_vector with a GIN
+-- index, and search_content() returns ranked hits with highlighted snippets
+-- across conversation titles, message content, knowledge entries and
+-- playbooks, paginated by a (rank, kind, id) keyset.
+--
+-- The 'simple' configuration is used throughout: content is multilingual, so
+-- no language-specific stemming or stop words.
+-- ============================================================================
+
+-- =============================================
+-- STEP 1: SEARCH VECTOR COLUMNS
+-- =============================================
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE knowledge_entries ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE org_documents ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+-- =============================================
+-- STEP 2: TRIGGERS
+-- =============================================
+
+CREATE OR REPLACE FUNCTION conversations_search_vector_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    NEW.search_vector := setweight(to_tsvector('simple', COALESCE(NEW.title, '')), 'A');
+    RETURN NEW;
+END;
+$$;
+
+-- Messages: user text plus the Stage 3 synthesis. Truncated to stay well
+-- under the 1MB tsvector limit on very long responses.
+CREATE OR REPLACE FUNCTION messages_search_vector_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('simple', left(
+        concat_ws(' ', NEW.content, NEW.stage3::jsonb->>'response'), 100000
+    ));
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION knowledge_entries_search_vector_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(NEW.problem_statement, '')), 'B') ||
+        setweight(to_tsvector('simple', left(COALESCE(NEW.decision_text, ''), 100000)), 'C');
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION org_documents_search_vector_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = ''
+AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(NEW.summary, '')), 'B');
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_conversations_search_vector ON conversations;
+CREATE TRIGGER trigger_conversations_search_vector
+    BEFORE INSERT OR UPDATE OF title ON conversations
+    FOR EACH ROW EXECUTE FUNCTION conversations_search_vector_update();
+
+DROP TRIGGER IF EXISTS trigger_messages_search_vector ON messages;
+CREATE TRIGGER trigger_messages_search_vector
+    BEFORE INSERT OR UPDATE OF content, stage3 ON messages
+    FOR EACH ROW EXECUTE FUNCTION messages_search_vector_update();
+
+DROP TRIGGER IF EXISTS trigger_knowledge_entries_search_vector ON knowledge_entries;
+CREATE TRIGGER trigger_knowledge_entries_search_vector
+    BEFORE INSERT OR UPDATE OF title, problem_statement, decision_text ON knowledge_entries
+    FOR EACH ROW EXECUTE FUNCTION knowledge_entries_search_vector_update();
+
+DROP TRIGGER IF EXISTS trigger_org_documents_search_vector ON org_documents;
+CREATE TRIGGER trigger_org_documents_search_vector
+    BEFORE INSERT OR UPDATE OF title, summary ON org_documents
+    FOR EACH ROW EXECUTE FUNCTION org_documents_search_vector_update();
+
+-- =============================================
+-- STEP 3: BACKFILL
+-- =============================================
+-- Sets search_vector directly with the trigger expressions instead of no-op
+-- updates of the source columns. knowledge_updated_at_trigger fires on every
+-- UPDATE of knowledge_entries and would reset updated_at (the list order), so
+-- it is disabled for the backfill.
+
+UPDATE conversations
+SET search_vector = setweight(to_tsvector('simple', COALESCE(title, '')), 'A')
+WHERE search_vector IS NULL;
+
+UPDATE messages
+SET search_vector = to_tsvector('simple', left(concat_ws(' ', content, stage3::jsonb->>'response'), 100000))
+WHERE search_vector IS NULL;
+
+DO $$
+DECLARE
+    has_updated_at_trigger BOOLEAN := EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgrelid = 'public.knowledge_entries'::regclass
+          AND tgname = 'knowledge_updated_at_trigger'
+    );
+BEGIN
+    IF has_updated_at_trigger THEN
+        ALTER TABLE public.knowledge_entries DISABLE TRIGGER knowledge_updated_at_trigger;
+    END IF;
+
+    UPDATE public.knowledge_entries
+    SET search_vector =
+        setweight(to_tsvector('simple', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(problem_statement, '')), 'B') ||
+        setweight(to_tsvector('simple', left(COALESCE(decision_text, ''), 100000)), 'C')
+    WHERE search_vector IS NULL;
+
+    IF has_updated_at_trigger THEN
+        ALTER TABLE public.knowledge_entries ENABLE TRIGGER knowledge_updated_at_trigger;
+    END IF;
+END;
+$$;
+
+UPDATE org_documents
+SET search_vector =
+    setweight(to_tsvector('simple', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('simple', COALESCE(summary, '')), 'B')
+WHERE search_vector IS NULL;
+
+-- =============================================
+-- STEP 4: GIN INDEXES
+-- =============================================
+
+CREATE INDEX IF NOT EXISTS idx_conversations_search ON conversations USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_messages_search ON messages USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_knowledge_entries_search ON knowledge_entries USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_org_documents_search ON org_documents USING GIN (search_vector);
+
+-- =============================================
+-- STEP 5: RANKED SEARCH
+-- =============================================
+-- Called by the backend with the service role after it has verified company
+-- access, so conversations and messages are filtered by p_user_id explicitly.
+-- Messages are collapsed to the best hit per conversation. Snippets are only
+-- computed for the returned page.
+
+CREATE OR REPLACE FUNCTION search_content(
+    p_company_id UUID,
+    p_user_id UUID,
+    p_query TEXT,
+    p_kinds TEXT[] DEFAULT ARRAY['conversation', 'message', 'knowledge', 'playbook'],
+    p_limit INTEGER DEFAULT 20,
+    p_cursor_rank REAL DEFAULT NULL,
+    p_cursor_kind TEXT DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    kind TEXT,
+    id UUID,
+    conversation_id UUID,
+    title TEXT,
+    snippet TEXT,
+    rank REAL,
+    updated_at TIMESTAMPTZ
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = ''
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('simple', p_query) AS query
+    ),
+    hits AS (
+        SELECT 'conversation'::text AS kind, c.id, c.id AS conversation_id, c.title,
+               c.title AS body, ts_rank(c.search_vector, q.query) AS rank, c.updated_at
+        FROM public.conversations c, q
+        WHERE 'conversation' = ANY(p_kinds)
+          AND c.company_id = p_company_id
+          AND c.user_id = p_user_id
+          AND c.search_vector @@ q.query
+
+        UNION ALL
+
+        SELECT * FROM (
+            SELECT DISTINCT ON (m.conversation_id)
+                   'message'::text, m.id, m.conversation_id, c.title,
+                   concat_ws(' ', m.content, m.stage3::jsonb->>'response'),
+                   ts_rank(m.search_vector, q.query), m.created_at
+            FROM public.messages m
+            JOIN public.conversations c ON c.id = m.conversation_id, q
+            WHERE 'message' = ANY(p_kinds)
+              AND c.company_id = p_company_id
+              AND c.user_id = p_user_id
+              AND m.search_vector @@ q.query
+            ORDER BY m.conversation_id, ts_rank(m.search_vector, q.query) DESC
+        ) best_message
+
+        UNION ALL
+
+        SELECT 'knowledge'::text, k.id, k.source_conversation_id, k.title,
+               concat_ws(' ', k.title, k.problem_statement, k.decision_text),
+               ts_rank(k.search_vector, q.query), k.updated_at
+        FROM public.knowledge_entries k, q
+        WHERE 'knowledge' = ANY(p_kinds)
+          AND k.company_id = p_company_id
+          AND k.is_active
+          AND k.search_vector @@ q.query
+
+        UNION ALL
+
+        SELECT 'playbook'::text, d.id, NULL::uuid, d.title,
+               concat_ws(' ', d.title, d.summary),
+               ts_rank(d.search_vector, q.query), d.updated_at
+        FROM public.org_documents d, q
+        WHERE 'playbook' = ANY(p_kinds)
+          AND d.company_id = p_company_id
+          AND d.is_active
+          AND d.search_vector @@ q.query
+    ),
+    page AS (
+        SELECT * FROM hits
+        WHERE p_cursor_rank IS NULL
+           OR (hits.rank, hits.kind, hits.id) < (p_cursor_rank, p_cursor_kind, p_cursor_id)
+        ORDER BY hits.rank DESC, hits.kind DESC, hits.id DESC
+        LIMIT LEAST(GREATEST(p_limit, 1), 101)
+    )
+    SELECT page.kind, page.id, page.conversation_id, page.title,
+           ts_headline('simple', left(page.body, 20000), q.query,
+                       'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "'),
+           page.rank, page.updated_at
+    FROM page, q
+    ORDER BY page.rank DESC, page.kind DESC, page.id DESC;
+$$;
+
+REVOKE ALL ON FUNCTION search_content(UUID, UUID, TEXT, TEXT[], INTEGER, REAL, TEXT, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION search_content(UUID, UUID, TEXT, TEXT[], INTEGER, REAL, TEXT, UUID) TO service_role;
+
+COMMENT ON FUNCTION search_content IS
+    'Ranked full-text search over conversations, messages, knowledge entries and playbooks with highlighted snippets. Service role only; callers verify company access.';
@@ -0,0 +1,270 @@
+-- ============================================================================
+-- Admin User Index + Platform Counters
+-- ============================================================================
+-- The admin user list and platform stats called auth.admin.list_users() to
+-- fetch every user, then filtered, searched and paginated in Python, and
+-- loaded the whole user_deletions set on each request. Stats also ran
+-- count="exact" scans over companies, conversations and messages.
+--
+-- admin_user_index mirrors the auth.users columns the admin portal needs,
+-- plus soft-deletion status, and is kept in sync by triggers on auth.users
+-- and user_deletions. It has a trigram index for email search and a keyset
+-- index on (created_at DESC, user_id DESC).
+--
+-- platform_counters holds row counts maintained by insert/delete triggers.
+-- Each counter is split over 16 shard rows and every trigger bumps a random
+-- shard, so concurrent message inserts don't queue on one row lock.
+-- get_platform_stats() sums the shards and reads indexed active-user counts
+-- from admin_user_index.
+--
+-- Both tables have RLS enabled with no policies: service role only.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- =============================================
+-- STEP 1: USER INDEX TABLE
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS public.admin_user_index (
+    user_id UUID PRIMARY KEY,
+    email TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_sign_in_at TIMESTAMPTZ,
+    email_confirmed_at TIMESTAMPTZ,
+    user_metadata JSONB,
+    is_test BOOLEAN NOT NULL DEFAULT false,
+    -- Set while the user is soft-deleted (user_deletions row not yet purged)
+    deleted_at TIMESTAMPTZ
+);
+
+ALTER TABLE public.admin_user_index ENABLE ROW LEVEL SECURITY;
+
+REVOKE ALL ON public.admin_user_index FROM anon, authenticated;
+GRANT SELECT ON public.admin_user_index TO service_role;
+
+COMMENT ON TABLE public.admin_user_index IS
+    'Admin portal copy of auth.users (maintained by trigger_sync_admin_user_index and trigger_sync_admin_user_deletion).';
+
+-- =============================================
+-- STEP 2: KEEP IN SYNC WITH auth.users
+-- =============================================
+
+CREATE OR REPLACE FUNCTION public.sync_admin_user_index()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM public.admin_user_index WHERE user_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    INSERT INTO public.admin_user_index (
+        user_id, email, created_at, last_sign_in_at, email_confirmed_at, user_metadata, is_test
+    )
+    VALUES (
+        NEW.id,
+        COALESCE(NEW.email, ''),
+        COALESCE(NEW.created_at, now()),
+        NEW.last_sign_in_at,
+        NEW.email_confirmed_at,
+        NEW.raw_user_meta_data,
+        COALESCE(NEW.raw_user_meta_data->>'is_test', '') = 'true'
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        email = EXCLUDED.email,
+        last_sign_in_at = EXCLUDED.last_sign_in_at,
+        email_confirmed_at = EXCLUDED.email_confirmed_at,
+        user_metadata = EXCLUDED.user_metadata,
+        is_test = EXCLUDED.is_test;
+    RETURN NEW;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.sync_admin_user_index() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS trigger_sync_admin_user_index ON auth.users;
+
+CREATE TRIGGER trigger_sync_admin_user_index
+    AFTER INSERT OR DELETE OR UPDATE OF email, last_sign_in_at, email_confirmed_at, raw_user_meta_data
+    ON auth.users
+    FOR EACH ROW
+    EXECUTE FUNCTION public.sync_admin_user_index();
+
+-- =============================================
+-- STEP 3: KEEP DELETION STATUS IN SYNC
+-- =============================================
+
+CREATE OR REPLACE FUNCTION public.sync_admin_user_deletion()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE public.admin_user_index SET deleted_at = NULL WHERE user_id = OLD.user_id;
+        RETURN OLD;
+    END IF;
+
+    UPDATE public.admin_user_index
+    SET deleted_at = CASE WHEN NEW.permanently_deleted_at IS NULL THEN NEW.deleted_at END
+    WHERE user_id = NEW.user_id;
+    RETURN NEW;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.sync_admin_user_deletion() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS trigger_sync_admin_user_deletion ON public.user_deletions;
+
+CREATE TRIGGER trigger_sync_admin_user_deletion
+    AFTER INSERT OR UPDATE OR DELETE ON public.user_deletions
+    FOR EACH ROW
+    EXECUTE FUNCTION public.sync_admin_user_deletion();
+
+-- =============================================
+-- STEP 4: BACKFILL
+-- =============================================
+
+INSERT INTO public.admin_user_index (
+    user_id, email, created_at, last_sign_in_at, email_confirmed_at, user_metadata, is_test
+)
+SELECT
+    u.id,
+    COALESCE(u.email, ''),
+    COALESCE(u.created_at, now()),
+    u.last_sign_in_at,
+    u.email_confirmed_at,
+    u.raw_user_meta_data,
+    COALESCE(u.raw_user_meta_data->>'is_test', '') = 'true'
+FROM auth.users u
+ON CONFLICT (user_id) DO NOTHING;
+
+UPDATE public.admin_user_index i
+SET deleted_at = d.deleted_at
+FROM public.user_deletions d
+WHERE d.user_id = i.user_id
+  AND d.permanently_deleted_at IS NULL;
+
+-- =============================================
+-- STEP 5: INDEXES
+-- =============================================
+
+-- Keyset pagination of the active user list (newest first)
+CREATE INDEX IF NOT EXISTS idx_admin_user_index_list
+    ON public.admin_user_index (created_at DESC, user_id DESC)
+    WHERE deleted_at IS NULL;
+
+-- Substring email search (ilike '%term%')
+CREATE INDEX IF NOT EXISTS idx_admin_user_index_email_trgm
+    ON public.admin_user_index USING GIN (email extensions.gin_trgm_ops);
+
+-- Exact email lookups (duplicate checks on invitation)
+CREATE INDEX IF NOT EXISTS idx_admin_user_index_email_lower
+    ON public.admin_user_index (lower(email));
+
+-- Active-user counts
+CREATE INDEX IF NOT EXISTS idx_admin_user_index_last_sign_in
+    ON public.admin_user_index (last_sign_in_at)
+    WHERE last_sign_in_at IS NOT NULL;
+
+-- =============================================
+-- STEP 6: PLATFORM COUNTERS
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS public.platform_counters (
+    name TEXT NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (name, shard)
+);
+
+ALTER TABLE public.platform_counters ENABLE ROW LEVEL SECURITY;
+
+REVOKE ALL ON public.platform_counters FROM anon, authenticated;
+GRANT SELECT ON public.platform_counters TO service_role;
+
+-- Generic row counter: the counter name is the trigger argument. A delete may
+-- take a shard below zero; only the sum across shards is meaningful.
+CREATE OR REPLACE FUNCTION public.bump_platform_counter()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    INSERT INTO public.platform_counters AS c (name, shard, value)
+    VALUES (TG_ARGV[0], floor(random() * 16)::smallint, CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END)
+    ON CONFLICT (name, shard) DO UPDATE
+    SET value = c.value + EXCLUDED.value,
+        updated_at = now();
+    RETURN NULL;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.bump_platform_counter() FROM PUBLIC, anon, authenticated;
+
+-- Backfill into shard 0 (triggers spread later changes over shards 0-15)
+DELETE FROM public.platform_counters
+WHERE name IN ('users', 'companies', 'conversations', 'messages');
+
+INSERT INTO public.platform_counters (name, shard, value)
+VALUES
+    ('users', 0, (SELECT count(*) FROM auth.users)),
+    ('companies', 0, (SELECT count(*) FROM public.companies)),
+    ('conversations', 0, (SELECT count(*) FROM public.conversations)),
+    ('messages', 0, (SELECT count(*) FROM public.messages));
+
+DROP TRIGGER IF EXISTS trigger_count_users ON auth.users;
+CREATE TRIGGER trigger_count_users
+    AFTER INSERT OR DELETE ON auth.users
+    FOR EACH ROW EXECUTE FUNCTION public.bump_platform_counter('users');
+
+DROP TRIGGER IF EXISTS trigger_count_companies ON public.companies;
+CREATE TRIGGER trigger_count_companies
+    AFTER INSERT OR DELETE ON public.companies
+    FOR EACH ROW EXECUTE FUNCTION public.bump_platform_counter('companies');
+
+DROP TRIGGER IF EXISTS trigger_count_conversations ON public.conversations;
+CREATE TRIGGER trigger_count_conversations
+    AFTER INSERT OR DELETE ON public.conversations
+    FOR EACH ROW EXECUTE FUNCTION public.bump_platform_counter('conversations');
+
+DROP TRIGGER IF EXISTS trigger_count_messages ON public.messages;
+CREATE TRIGGER trigger_count_messages
+    AFTER INSERT OR DELETE ON public.messages
+    FOR EACH ROW EXECUTE FUNCTION public.bump_platform_counter('messages');
+
+-- =============================================
+-- STEP 7: STATS RPC
+-- =============================================
+
+CREATE OR REPLACE FUNCTION public.get_platform_stats()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SET search_path = ''
+AS $$
+    SELECT jsonb_build_object(
+        'total_users', (SELECT GREATEST(COALESCE(sum(value), 0), 0) FROM public.platform_counters WHERE name = 'users'),
+        'total_companies', (SELECT GREATEST(COALESCE(sum(value), 0), 0) FROM public.platform_counters WHERE name = 'companies'),
+        'total_conversations', (SELECT GREATEST(COALESCE(sum(value), 0), 0) FROM public.platform_counters WHERE name = 'conversations'),
+        'total_messages', (SELECT GREATEST(COALESCE(sum(value), 0), 0) FROM public.platform_counters WHERE name = 'messages'),
+        'active_users_24h', (
+            SELECT count(*) FROM public.admin_user_index
+            WHERE last_sign_in_at >= now() - INTERVAL '24 hours'
+        ),
+        'active_users_7d', (
+            SELECT count(*) FROM public.admin_user_index
+            WHERE last_sign_in_at >= now() - INTERVAL '7 days'
+        )
+    );
+$$;
+
+REVOKE ALL ON FUNCTION public.get_platform_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_platform_stats() TO service_role;
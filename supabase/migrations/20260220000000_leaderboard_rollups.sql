@@ -0,0 +1,166 @@
+-- ============================================================================
+-- Model Leaderboard Rollups
+-- ============================================================================
+-- Every leaderboard request (including admin model-analytics) selected all
+-- model_rankings rows and aggregated them in Python, so cost grew with every
+-- council session ever run.
+--
+-- model_leaderboard_rollups keeps per (department, day, model) sums that a
+-- statement-level trigger on model_rankings updates as sessions are recorded:
+--   rank_sum / rank_count -> average rank
+--   sessions              -> council sessions the model was ranked in
+--   wins                  -> sessions where it had the best average rank
+--
+-- get_model_leaderboard(p_since) sums the daily buckets per department and
+-- model, so 7d / 30d / all-time leaderboards read a handful of rows.
+-- ============================================================================
+
+-- =============================================
+-- STEP 1: ROLLUP TABLE
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS public.model_leaderboard_rollups (
+    department TEXT NOT NULL,
+    bucket DATE NOT NULL,
+    model TEXT NOT NULL,
+    rank_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    rank_count INTEGER NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (department, bucket, model)
+);
+
+ALTER TABLE public.model_leaderboard_rollups ENABLE ROW LEVEL SECURITY;
+
+REVOKE ALL ON public.model_leaderboard_rollups FROM anon, authenticated;
+GRANT SELECT ON public.model_leaderboard_rollups TO service_role;
+
+-- Time-windowed reads scan recent buckets only
+CREATE INDEX IF NOT EXISTS idx_model_leaderboard_rollups_bucket
+    ON public.model_leaderboard_rollups (bucket);
+
+COMMENT ON TABLE public.model_leaderboard_rollups IS
+    'Daily leaderboard sums per department and model (maintained by trigger_rollup_model_rankings).';
+
+-- =============================================
+-- STEP 2: INCREMENTAL UPDATE ON INSERT
+-- =============================================
+-- Statement-level with a transition table: one record_session_rankings call
+-- inserts every model of a session in one statement, so the session winner
+-- (lowest average_rank per conversation) is known here.
+
+CREATE OR REPLACE FUNCTION public.rollup_model_rankings()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+BEGIN
+    INSERT INTO public.model_leaderboard_rollups AS r (
+        department, bucket, model, rank_sum, rank_count, sessions, wins
+    )
+    SELECT
+        COALESCE(n.department, 'standard'),
+        (n.created_at AT TIME ZONE 'UTC')::date,
+        n.model,
+        sum(n.average_rank),
+        count(*),
+        count(*),
+        count(*) FILTER (WHERE n.place = 1)
+    FROM (
+        SELECT department, created_at, model, average_rank,
+               row_number() OVER (PARTITION BY conversation_id ORDER BY average_rank, model) AS place
+        FROM new_rankings
+    ) n
+    GROUP BY 1, 2, 3
+    ON CONFLICT (department, bucket, model) DO UPDATE SET
+        rank_sum = r.rank_sum + EXCLUDED.rank_sum,
+        rank_count = r.rank_count + EXCLUDED.rank_count,
+        sessions = r.sessions + EXCLUDED.sessions,
+        wins = r.wins + EXCLUDED.wins;
+    RETURN NULL;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.rollup_model_rankings() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS trigger_rollup_model_rankings ON public.model_rankings;
+
+CREATE TRIGGER trigger_rollup_model_rankings
+    AFTER INSERT ON public.model_rankings
+    REFERENCING NEW TABLE AS new_rankings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.rollup_model_rankings();
+
+-- =============================================
+-- STEP 3: BACKFILL
+-- =============================================
+-- A session is one council run, matching the trigger: sessions counts one per
+-- ranking row and wins one per run. Older rows were written one insert per
+-- model with their own timestamps, so a run can straddle a second boundary.
+-- Rows of a conversation are therefore grouped into runs by gap: a row more
+-- than 2 seconds after the previous one starts a new run. Two runs of one
+-- conversation recorded within 2 seconds of each other would merge; council
+-- runs take far longer than that.
+
+TRUNCATE public.model_leaderboard_rollups;
+
+INSERT INTO public.model_leaderboard_rollups (department, bucket, model, rank_sum, rank_count, sessions, wins)
+SELECT
+    COALESCE(m.department, 'standard'),
+    (m.created_at AT TIME ZONE 'UTC')::date,
+    m.model,
+    sum(m.average_rank),
+    count(*),
+    count(*),
+    count(*) FILTER (WHERE m.place = 1)
+FROM (
+    SELECT department, created_at, model, average_rank,
+           row_number() OVER (
+               PARTITION BY conversation_id, run
+               ORDER BY average_rank, model
+           ) AS place
+    FROM (
+        SELECT department, created_at, model, average_rank, conversation_id,
+               sum(new_run) OVER (
+                   PARTITION BY conversation_id ORDER BY created_at, model
+               ) AS run
+        FROM (
+            SELECT department, created_at, model, average_rank, conversation_id,
+                   CASE
+                       WHEN created_at - lag(created_at) OVER (
+                           PARTITION BY conversation_id ORDER BY created_at, model
+                       ) <= interval '2 seconds' THEN 0
+                       ELSE 1
+                   END AS new_run
+            FROM public.model_rankings
+        ) gaps
+    ) runs
+) m
+GROUP BY 1, 2, 3;
+
+-- =============================================
+-- STEP 4: READ RPC
+-- =============================================
+
+CREATE OR REPLACE FUNCTION public.get_model_leaderboard(p_since DATE DEFAULT NULL)
+RETURNS TABLE (
+    department TEXT,
+    model TEXT,
+    rank_sum DOUBLE PRECISION,
+    rank_count BIGINT,
+    sessions BIGINT,
+    wins BIGINT
+)
+LANGUAGE sql
+STABLE
+SET search_path = ''
+AS $$
+    SELECT r.department, r.model, sum(r.rank_sum), sum(r.rank_count), sum(r.sessions), sum(r.wins)
+    FROM public.model_leaderboard_rollups r
+    WHERE p_since IS NULL OR r.bucket >= p_since
+    GROUP BY r.department, r.model;
+$$;
+
+REVOKE ALL ON FUNCTION public.get_model_leaderboard(DATE) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_model_leaderboard(DATE) TO service_role;
@@ -0,0 +1,13 @@
+-- ============================================================================
+-- Data Export Archives: Private Storage Bucket
+-- ============================================================================
+-- Background GDPR exports (data_export.py) are uploaded here as
+-- {user_id}/{job_id}.{ext} so any API worker can serve the download through a
+-- short-lived signed URL. The bucket is private and only the service role
+-- writes to it; archives older than EXPORT_JOB_TTL_SECONDS are removed when the
+-- same user starts a new export.
+-- ============================================================================
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('data-exports', 'data-exports', false)
+ON CONFLICT (id) DO NOTHING;
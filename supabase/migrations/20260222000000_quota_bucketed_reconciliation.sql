@@ -0,0 +1,127 @@
+-- ============================================================================
+-- Bucketed Quota Reconciliation
+-- ============================================================================
+-- The Redis quota engine (backend/quota.py) keeps pending company deltas per
+-- hour and pending query counts per billing period. Reconciliation used to
+-- write them to whatever window or period was current at flush time, so
+-- usage counted before an hour/month rollover or a Stripe period reset landed
+-- in the next one.
+--
+-- increment_rate_limit_counter_at: same as increment_rate_limit_counter but
+--   writes to the hour/day/month windows containing p_window.
+-- increment_query_usage_for_period: applies a batched query delta only while
+--   the profile is still in the billing period p_period (UTC end of period as
+--   YYYYMMDDHH24MISS, '0' for none); returns NULL when the period has changed.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION increment_rate_limit_counter_at(
+    p_company_id UUID,
+    p_window TIMESTAMPTZ,
+    p_sessions INTEGER DEFAULT 1,
+    p_tokens INTEGER DEFAULT 0,
+    p_cost_cents INTEGER DEFAULT 0
+) RETURNS TABLE(
+    hourly_sessions INTEGER,
+    daily_sessions INTEGER,
+    monthly_tokens INTEGER,
+    monthly_cost_cents INTEGER
+) AS $$
+DECLARE
+    v_now TIMESTAMPTZ := NOW();
+    v_hour_start TIMESTAMPTZ := date_trunc('hour', p_window);
+    v_day_start TIMESTAMPTZ := date_trunc('day', p_window);
+    v_month_start TIMESTAMPTZ := date_trunc('month', p_window);
+    v_hourly INTEGER;
+    v_daily INTEGER;
+    v_monthly_tokens INTEGER;
+    v_monthly_cost INTEGER;
+BEGIN
+    INSERT INTO public.rate_limit_counters (company_id, window_type, window_start, session_count, token_count, cost_cents, updated_at)
+    VALUES (p_company_id, 'hourly', v_hour_start, p_sessions, p_tokens, p_cost_cents, v_now)
+    ON CONFLICT (company_id, window_type, window_start)
+    DO UPDATE SET
+        session_count = public.rate_limit_counters.session_count + p_sessions,
+        token_count = public.rate_limit_counters.token_count + p_tokens,
+        cost_cents = public.rate_limit_counters.cost_cents + p_cost_cents,
+        updated_at = v_now
+    RETURNING session_count INTO v_hourly;
+
+    INSERT INTO public.rate_limit_counters (company_id, window_type, window_start, session_count, token_count, cost_cents, updated_at)
+    VALUES (p_company_id, 'daily', v_day_start, p_sessions, p_tokens, p_cost_cents, v_now)
+    ON CONFLICT (company_id, window_type, window_start)
+    DO UPDATE SET
+        session_count = public.rate_limit_counters.session_count + p_sessions,
+        token_count = public.rate_limit_counters.token_count + p_tokens,
+        cost_cents = public.rate_limit_counters.cost_cents + p_cost_cents,
+        updated_at = v_now
+    RETURNING session_count INTO v_daily;
+
+    INSERT INTO public.rate_limit_counters (company_id, window_type, window_start, session_count, token_count, cost_cents, updated_at)
+    VALUES (p_company_id, 'monthly', v_month_start, p_sessions, p_tokens, p_cost_cents, v_now)
+    ON CONFLICT (company_id, window_type, window_start)
+    DO UPDATE SET
+        session_count = public.rate_limit_counters.session_count + p_sessions,
+        token_count = public.rate_limit_counters.token_count + p_tokens,
+        cost_cents = public.rate_limit_counters.cost_cents + p_cost_cents,
+        updated_at = v_now
+    RETURNING token_count, cost_cents INTO v_monthly_tokens, v_monthly_cost;
+
+    RETURN QUERY SELECT v_hourly, v_daily, v_monthly_tokens, v_monthly_cost;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = '';
+
+REVOKE EXECUTE ON FUNCTION increment_rate_limit_counter_at(UUID, TIMESTAMPTZ, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_rate_limit_counter_at(UUID, TIMESTAMPTZ, INTEGER, INTEGER, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION increment_rate_limit_counter_at IS
+    'Adds batched rate counter deltas to the windows containing p_window (quota engine reconciliation).';
+
+
+CREATE OR REPLACE FUNCTION increment_query_usage_for_period(p_user_id UUID, p_count INTEGER, p_period TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    v_period TEXT;
+    v_new_count INTEGER;
+BEGIN
+    SELECT COALESCE(to_char(subscription_period_end AT TIME ZONE 'UTC', 'YYYYMMDDHH24MISS'), '0')
+    INTO v_period
+    FROM public.user_profiles
+    WHERE user_id = p_user_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        IF p_period <> '0' THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO public.user_profiles (user_id, queries_used_this_period, updated_at)
+        VALUES (p_user_id, GREATEST(p_count, 0), NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET
+            queries_used_this_period = GREATEST(COALESCE(public.user_profiles.queries_used_this_period, 0) + p_count, 0),
+            updated_at = NOW()
+        RETURNING queries_used_this_period INTO v_new_count;
+        RETURN v_new_count;
+    END IF;
+
+    IF v_period <> p_period THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE public.user_profiles
+    SET
+        queries_used_this_period = GREATEST(COALESCE(queries_used_this_period, 0) + p_count, 0),
+        updated_at = NOW()
+    WHERE user_id = p_user_id
+    RETURNING queries_used_this_period INTO v_new_count;
+
+    RETURN v_new_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = '';
+
+REVOKE EXECUTE ON FUNCTION increment_query_usage_for_period(UUID, INTEGER, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_query_usage_for_period(UUID, INTEGER, TEXT) TO service_role;
+
+COMMENT ON FUNCTION increment_query_usage_for_period IS
+    'Applies a batched query usage delta if the billing period is unchanged (quota engine reconciliation).';